@@ -2,42 +2,73 @@
 
 __version__ = '0.7.5'
 
-import importlib
+import sys
 import builtins
+import importlib
+from typing import TYPE_CHECKING
+
 from .configs import config, refresh_config, Mode, Config, Namespace as namespace
 from .common import *  # noqa F403
 from . import common, flow
-from .launcher import LazyLLMLaunchersBase
 from .flow import *  # noqa F403
-from .components import (LazyLLMDataprocBase, LazyLLMFinetuneBase, LazyLLMDeployBase,
-                         LazyLLMValidateBase, register as component_register, Prompter,
-                         AlpacaPrompter, ChatPrompter, FastapiApp, JsonFormatter, FileFormatter)
-
-from .module import (ModuleBase, ModuleBase as Module, UrlModule, TrainableModule, ActionModule,
-                     ServerModule, TrialModule, register as module_register,
-                     OnlineModule, OnlineChatModule, OnlineEmbeddingModule, AutoModel, OnlineMultiModalModule)
 from .hook import LazyLLMHook, LazyLLMFuncHook
-from .prompt_templates import ActorPrompt, DataPrompt
-from typing import TYPE_CHECKING
 if TYPE_CHECKING:
+    from .launcher import LazyLLMLaunchersBase
+    from .components import (LazyLLMDataprocBase, LazyLLMFinetuneBase, LazyLLMDeployBase,
+                             LazyLLMValidateBase, register as component_register, Prompter,
+                             AlpacaPrompter, ChatPrompter, FastapiApp, JsonFormatter, FileFormatter)
+    from .module import (ModuleBase, ModuleBase as Module, UrlModule, TrainableModule, ActionModule,
+                         ServerModule, TrialModule, register as module_register,
+                         OnlineModule, OnlineChatModule, OnlineEmbeddingModule, AutoModel, OnlineMultiModalModule)
+    from .prompt_templates import ActorPrompt, DataPrompt
     from .tools import (Document, Reranker, Retriever, WebModule, ToolManager, FunctionCall, SkillManager,
                         FunctionCallAgent, fc_register, ReactAgent, PlanAndSolveAgent, ReWOOAgent, SentenceSplitter,
                         LLMParser)
-from .patch import patch_os_env
-from .docs import add_doc
-config.done()
 
-patch_os_env(lambda key, value: refresh_config(key), refresh_config)
-
-del LazyLLMRegisterMetaClass  # noqa F821
-del LazyLLMRegisterMetaABCClass  # noqa F821
-del _get_base_cls_from_registry  # noqa F821
-del patch_os_env
+# subpackages below are imported on first access of one of their exports (or registries) instead of at
+# `import lazyllm`; they are loaded in this order, which is the order the eager imports used to have
+_SUBMOD_MAP = {
+    'launcher': ['LazyLLMLaunchersBase'],
+    'components': ['LazyLLMDataprocBase', 'LazyLLMFinetuneBase', 'LazyLLMDeployBase', 'LazyLLMValidateBase',
+                   'component_register', 'Prompter', 'AlpacaPrompter', 'ChatPrompter', 'FastapiApp',
+                   'JsonFormatter', 'FileFormatter'],
+    'module': ['ModuleBase', 'Module', 'UrlModule', 'TrainableModule', 'ActionModule', 'ServerModule', 'TrialModule',
+               'module_register', 'OnlineModule', 'OnlineChatModule', 'OnlineEmbeddingModule', 'AutoModel',
+               'OnlineMultiModalModule'],
+    'prompt_templates': ['ActorPrompt', 'DataPrompt'],
+}
+_SUBMOD_MAP_REVERSE = {v: k for k, vs in _SUBMOD_MAP.items() for v in vs}
+_RENAMED = {'component_register': 'register', 'Module': 'ModuleBase', 'module_register': 'register'}
+# registries (`lazyllm.launchers`, `lazyllm.deploy`, ...) are created by the subpackage defining their base class
+_REGISTRY_MAP = {'launchers': 'launcher', 'dataproc': 'components', 'finetune': 'components', 'deploy': 'components',
+                 'validate': 'components', 'formatter': 'components', 'prompter': 'components', 'online': 'module',
+                 'promptlibrary': 'prompt_templates'}
+
+
+def _import_submodule(name: str):
+    # the subpackages listed before `name` are imported first to keep their original import order
+    for submod in _SUBMOD_MAP:
+        module = importlib.import_module(f'.{submod}', package=__name__)
+        if submod == name: return module
+
+
+def _load_lazy_submodules() -> bool:
+    # import every lazy subpackage, returns whether anything new was imported (and registered its configs)
+    pending = [name for name in _SUBMOD_MAP if f'{__name__}.{name}' not in sys.modules]
+    for name in pending: _import_submodule(name)
+    return bool(pending)
 
 
 def __getattr__(name: str):
-    if name == 'tools':
-        return importlib.import_module('lazyllm.tools')
+    if name in _SUBMOD_MAP_REVERSE:
+        module = _import_submodule(_SUBMOD_MAP_REVERSE[name])
+        builtins.globals()[name] = value = getattr(module, _RENAMED.get(name, name))
+        return value
+    elif name.lower() in _REGISTRY_MAP:
+        _import_submodule(_REGISTRY_MAP[name.lower()])
+        if name in builtins.globals(): return builtins.globals()[name]
+    elif name in _SUBMOD_MAP or name == 'tools':
+        return importlib.import_module(f'.{name}', package=__name__)
     elif name in __all__:
         tools = importlib.import_module('lazyllm.tools')
         builtins.globals()[name] = value = getattr(tools, name)
@@ -45,6 +76,19 @@ def __getattr__(name: str):
     raise AttributeError(f"module 'lazyllm' has no attribute '{name}'")
 
 
+# docs of the lazy subpackages (LAZYLLM_INIT_DOC) are resolved through `__getattr__`, so import them after it
+from .patch import patch_os_env  # noqa E402
+from .docs import add_doc  # noqa E402
+config.done(load_pending=_load_lazy_submodules)
+
+patch_os_env(lambda key, value: refresh_config(key), refresh_config)
+
+del LazyLLMRegisterMetaClass  # noqa F821
+del LazyLLMRegisterMetaABCClass  # noqa F821
+del _get_base_cls_from_registry  # noqa F821
+del patch_os_env
+
+
 __all__ = [
     # components
     'LazyLLMDataprocBase',  #
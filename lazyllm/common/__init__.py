@@ -3,7 +3,7 @@ from .common import package, kwargs, arguments, LazyLLMCMD, timeout, final, Read
 from .common import FlatList, Identity, ResultCollector, ArgsDict, CaseInsensitiveDict, retry
 from .common import ReprRule, make_repr, modify_repr, is_valid_url, is_valid_path, SingletonMeta, SingletonABCMeta
 from .common import once_flag, call_once, once_wrapper, singleton, reset_on_pickle, Finalizer, TempPathGenerator
-from .inspection import _get_callsite
+from .inspection import _get_callsite, _get_callsite_location, _format_callsite
 from .exception import _trim_traceback, _register_trim_module, HandledException, _change_exception_type
 from .text import Color, colored_text
 from .option import Option, OptionIter
@@ -27,6 +27,8 @@ __all__ = [
 
     # inspection
     '_get_callsite',
+    '_get_callsite_location',
+    '_format_callsite',
 
     # utils
     'FlatList',
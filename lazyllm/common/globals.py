@@ -1,12 +1,16 @@
 import threading
 import contextvars
 import copy
+import sys
+import time
+from collections import OrderedDict
 from typing import Any, Tuple, Optional, List, Dict
 import uuid
 import inspect
 import builtins
 from .common import package, kwargs, SingletonABCMeta
 from .logger import LOG
+from ..configs import config
 from .redis_client import redis_client
 from .deprecated import deprecated
 from contextlib import contextmanager
@@ -14,6 +18,20 @@ import asyncio
 from .utils import obj2str, str2obj
 from abc import abstractmethod
 
+config.add('session_ttl', int, 0, 'SESSION_TTL',
+           description='Seconds after which an idle session of globals/locals is evicted, 0 (default) means never.')
+config.add('session_max_count', int, 65536, 'SESSION_MAX_COUNT',
+           description='The maximum number of live sessions kept by globals/locals, a safety cap beyond which the '
+                       'least recently used ones are evicted, 0 means unlimited.')
+config.add('session_max_bytes', int, 0, 'SESSION_MAX_BYTES',
+           description='The approximate memory budget (in bytes) of the sessions kept by globals/locals, '
+                       '0 means unlimited.')
+
+_SESSION_SHARDS = 32
+_SESSION_SWEEP_INTERVAL = 30
+_MAX_SIZE_VISITS = 10000
+_IMMUTABLE_TYPES = (type(None), bool, int, float, complex, str, bytes, tuple, frozenset)
+
 
 class ReadWriteLock(object):
     def __init__(self):
@@ -203,22 +221,139 @@ class Globals(metaclass=SingletonABCMeta):
     def __reduce__(self):
         return __class__, ()
 
+def _approx_size(obj: Any) -> int:
+    size, stack, seen = 0, [obj], set()
+    while stack and len(seen) < _MAX_SIZE_VISITS:
+        o = stack.pop()
+        if id(o) in seen: continue
+        seen.add(id(o))
+        size += sys.getsizeof(o, 0)
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+    return size
+
+
+class _Session(object):
+    __slots__ = ('data', 'last_access', 'nbytes', 'sized_at')
+
+    def __init__(self, data: dict, now: float):
+        self.data, self.last_access, self.nbytes, self.sized_at = data, now, 0, -1.0
+
+
+class _SessionStore(object):
+    # Sessions are spread over lock-striped shards, so that requests of different sessions do not contend on one lock.
+    # Each shard is kept in LRU order; sessions never expire unless `session_ttl` is set, and the least recently used
+    # ones are evicted once `session_max_count` or the approximate `session_max_bytes` is exceeded.
+    def __init__(self, defaults: dict, n_shards: int = _SESSION_SHARDS):
+        self._defaults = defaults
+        self._shards = [(threading.Lock(), OrderedDict()) for _ in range(n_shards)]
+        self._stats_lock, self._sweep_lock = threading.Lock(), threading.Lock()
+        self._last_sweep, self._nbytes, self._evict_cursor = time.monotonic(), 0, 0
+        self._stats = dict(created=0, expired=0, evicted=0)
+
+    def _shard(self, sid: str):
+        return self._shards[hash(sid) % len(self._shards)]
+
+    def _count(self, key: str, n: int = 1):
+        if n:
+            with self._stats_lock: self._stats[key] += n
+
+    def get(self, sid: str, create: bool = False) -> Optional[dict]:
+        lock, sessions = self._shard(sid)
+        now = time.monotonic()
+        with lock:
+            if (session := sessions.get(sid)) is not None:
+                session.last_access = now
+                sessions.move_to_end(sid)
+                return session.data
+            if not create: return None
+            session = sessions[sid] = _Session(copy.deepcopy(dict(self._defaults)), now)
+        self._count('created')
+        if (max_count := config['session_max_count']) and len(self) > max_count:
+            self._evict_lru(len(self) - max_count, sid)
+        if now - self._last_sweep >= min(_SESSION_SWEEP_INTERVAL, config['session_ttl'] or _SESSION_SWEEP_INTERVAL):
+            self.sweep()
+        return session.data
+
+    def pop(self, sid: str) -> Optional[dict]:
+        lock, sessions = self._shard(sid)
+        with lock:
+            session = sessions.pop(sid, None)
+        return session.data if session else None
+
+    def clear(self):
+        for lock, sessions in self._shards:
+            with lock: sessions.clear()
+
+    def __contains__(self, sid: str) -> bool:
+        return sid in self._shard(sid)[1]
+
+    def __len__(self) -> int:
+        return sum(len(sessions) for _, sessions in self._shards)
+
+    def _evict_lru(self, n: int, keep: str):
+        # approximate LRU: evict the oldest session of each shard in turn, never the session being created
+        evicted, start = 0, self._evict_cursor
+        for idx in range(len(self._shards)):
+            if evicted >= n: break
+            lock, sessions = self._shards[(start + idx) % len(self._shards)]
+            with lock:
+                if sessions and next(iter(sessions)) != keep:
+                    sessions.popitem(last=False)
+                    evicted += 1
+        self._evict_cursor = start + 1
+        self._count('evicted', evicted)
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        if not self._sweep_lock.acquire(blocking=False): return 0
+        try:
+            now, ttl = time.monotonic() if now is None else now, config['session_ttl']
+            self._last_sweep, expired, live = now, 0, []
+            for lock, sessions in self._shards:
+                with lock:
+                    if ttl:
+                        for sid in [sid for sid, s in sessions.items() if now - s.last_access > ttl]:
+                            sessions.pop(sid)
+                            expired += 1
+                    live.extend((sid, lock, sessions, s) for sid, s in sessions.items())
+            for _, _, _, session in live:
+                if session.last_access > session.sized_at:
+                    session.nbytes, session.sized_at = _approx_size(session.data), now
+            self._nbytes = sum(session.nbytes for *_, session in live)
+            self._count('expired', expired)
+            evicted, max_bytes = 0, config['session_max_bytes']
+            if max_bytes and self._nbytes > max_bytes:
+                for sid, lock, sessions, session in sorted(live, key=lambda x: x[3].last_access):
+                    if self._nbytes <= max_bytes: break
+                    with lock:
+                        if sessions.get(sid) is not session: continue
+                        sessions.pop(sid)
+                    self._nbytes -= session.nbytes
+                    evicted += 1
+                self._count('evicted', evicted)
+            return expired + evicted
+        finally:
+            self._sweep_lock.release()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return dict(sessions=len(self), approx_bytes=self._nbytes, shards=len(self._shards), **self._stats)
+
+
 class MemoryGlobals(Globals):
     def __init__(self):
-        self.__data = ThreadSafeDict()
+        self.__sessions = _SessionStore(type(self).__global_attrs__)
         super(__class__, self).__init__()
 
-    @property
-    def _sid(self) -> str:
-        if (sid := super(__class__, self)._sid) not in self.__data:
-            self.__data[sid] = copy.deepcopy(type(self).__global_attrs__)
-        return sid
-
     def _get_data(self, rois: Optional[List[str]] = None) -> dict:
+        data = self.__sessions.get(self._sid, create=True)
         if rois:
             assert isinstance(rois, (tuple, list))
-            return {k: v for k, v in self.__data[self._sid].items() if k in rois}
-        return self.__data[self._sid]
+            return {k: v for k, v in data.items() if k in rois}
+        return data
 
     def _update(self, d: Optional[Dict]) -> None:
         if d:
@@ -228,23 +363,35 @@ class MemoryGlobals(Globals):
         self._data[__key] = __value
 
     def __getitem__(self, __key: str):
+        if (data := self.__sessions.get(self._sid)) is None:
+            # copy on write: reading an immutable default does not need a session of its own
+            defaults = type(self).__global_attrs__
+            if isinstance(value := defaults.get(__key), _IMMUTABLE_TYPES) and __key in defaults: return value
+            data = self._data
         try:
-            return self._data[__key]
+            return data[__key]
         except KeyError:
             raise KeyError(f'Cannot find key {__key}, current session-id is {self._sid}') from None
 
     def clear(self):
-        self.__data.pop(self._sid, None)
+        self.__sessions.pop(self._sid)
 
     def _clear_all(self):
-        self.__data.clear()
+        self.__sessions.clear()
 
     def __contains__(self, item):
-        return item in self.__data[self._sid]
+        if (data := self.__sessions.get(self._sid)) is None: return item in type(self).__global_attrs__
+        return item in data
 
     def pop(self, *args, **kw):
         return self._data.pop(*args, **kw)
 
+    def session_stats(self) -> dict:
+        return self.__sessions.stats()
+
+    def _sweep_sessions(self, now: Optional[float] = None) -> int:
+        return self.__sessions.sweep(now)
+
 
 class RedisGlobals(MemoryGlobals):
     def __init__(self):
@@ -1,7 +1,10 @@
 import os
 import inspect
+from typing import Optional, Tuple
 
-def _get_callsite(depth: int = 1):
+def _get_callsite_location(depth: int = 1) -> Optional[Tuple[str, int]]:
+    # returns the raw (filename, lineno) of the caller; formatting is left to `_format_callsite`, so hot paths that
+    # only keep the location for error reports do not pay for path normalization and string building
     try:
         frame = inspect.currentframe()
         for _ in range(depth): frame = frame.f_back
@@ -9,6 +12,13 @@ def _get_callsite(depth: int = 1):
         else:
             while frame.f_code.co_name == '__setattr__' and frame.f_globals.get('__name__', '') == 'lazyllm.common.bind':
                 frame = frame.f_back
-        return f'"file: {os.path.abspath(frame.f_code.co_filename)}", line {frame.f_lineno}'
+        return frame.f_code.co_filename, frame.f_lineno
     except Exception:
         return None
+
+def _format_callsite(location: Optional[Tuple[str, int]]) -> Optional[str]:
+    if location is None: return None
+    return f'"file: {os.path.abspath(location[0])}", line {location[1]}'
+
+def _get_callsite(depth: int = 1):
+    return _format_callsite(_get_callsite_location(depth + 1))
@@ -106,11 +106,13 @@ class LazyLLMRegisterMetaClass(_MetaBind):
             new_cls._lazy_llm_group = f'{ori_group}.{group}'.strip('.')
             ld = LazyDict(group, new_cls)
             if new_cls._lazy_llm_group == group:
+                # `vars` rather than `hasattr`, which would resolve lazyllm's lazy exports and import them here
                 for m in (builtins, lazyllm) if config['use_builtin'] else (lazyllm,):
-                    assert not (hasattr(m, group) and hasattr(m, ori)), f'group name \'{ori}\' cannot be used'
+                    assert not (group in vars(m) and ori in vars(m)), f'group name \'{ori}\' cannot be used'
                 for m in (builtins, lazyllm) if config['use_builtin'] else (lazyllm,):
                     setattr(m, group, ld)
-                    setattr(m, ori, ld)
+                    # a lazy export of the same name (e.g. `lazyllm.Prompter`) takes precedence over the registry
+                    if ori not in getattr(m, '_SUBMOD_MAP_REVERSE', {}): setattr(m, ori, ld)
             LazyLLMRegisterMetaClass.all_clses[new_cls._lazy_llm_group] = ld
             if (f := getattr(new_cls, '__lazyllm_after_registry_hook__', None)):
                 f(new_cls, ori_group, group, isleaf=False)
@@ -1,5 +1,5 @@
 import lazyllm
-from lazyllm import LazyLLMRegisterMetaClass
+from lazyllm.common import LazyLLMRegisterMetaClass
 from lazyllm import LazyLLMCMD, ReadOnlyWrapper
 from lazyllm import launchers, LazyLLMLaunchersBase
 from typing import Union
@@ -1,20 +1,136 @@
 import os
 import json
+import queue
+import threading
+import time
+import concurrent.futures
 import lazyllm
 from lazyllm.components.utils.file_operate import _base64_to_file, _is_base64_with_mime
 from lazyllm import LOG, LazyLLMLaunchersBase
 from lazyllm.thirdparty import transformers as tf, torch, sentence_transformers, numpy as np, FlagEmbedding as fe
 from .base import LazyLLMDeployBase
-from typing import Union, List, Dict, Optional
+from typing import Any, Callable, Union, List, Dict, Optional
 from abc import ABC, abstractmethod
 
+lazyllm.config.add('embed_max_batch_size', int, 32, 'EMBED_MAX_BATCH_SIZE',
+                   description='The maximum number of inputs the embedding/rerank server runs in one forward pass.')
+lazyllm.config.add('embed_max_batch_wait', float, 0.005, 'EMBED_MAX_BATCH_WAIT',
+                   description='The maximum seconds the embedding/rerank server waits to gather concurrent requests '
+                               'into one batch.')
+
+_FLOAT32_MAGIC = b'\x93LZF32'
+_FLOAT32_HEADER_SIZE = 12  # (single, rows, dim) as little-endian uint32
+
+
+def encode_float32_embeddings(vectors: Any, single: bool = False) -> bytes:
+    arr = np.ascontiguousarray(vectors, dtype='<f4')
+    arr = arr.reshape(-1, arr.shape[-1]) if arr.size else arr.reshape(0, 0)
+    return _FLOAT32_MAGIC + np.array([int(single), *arr.shape], dtype='<u4').tobytes() + arr.tobytes()
+
+
+def is_float32_embeddings(payload: Any) -> bool:
+    return isinstance(payload, (bytes, bytearray, memoryview)) and bytes(payload[:len(_FLOAT32_MAGIC)]) == _FLOAT32_MAGIC
+
+
+def decode_float32_embeddings(payload: Union[bytes, bytearray, memoryview]) -> Union[List[float], List[List[float]]]:
+    if not is_float32_embeddings(payload): raise ValueError('Payload is not float32-encoded embeddings')
+    single, rows, dim = np.frombuffer(payload, dtype='<u4', count=3, offset=len(_FLOAT32_MAGIC)).tolist()
+    arr = np.frombuffer(payload, dtype='<f4', count=rows * dim,
+                        offset=len(_FLOAT32_MAGIC) + _FLOAT32_HEADER_SIZE).reshape(rows, dim)
+    return arr[0].tolist() if single else arr.tolist()
+
+
+def _dump_embeddings(vectors: List[Any], single: bool, encoding_format: Optional[str]) -> Union[str, bytes]:
+    if encoding_format == 'float32': return encode_float32_embeddings(vectors, single)
+    res = np.asarray(vectors, dtype='float32').tolist()
+    return json.dumps(res[0] if single else res)
+
+
+class _DynamicBatcher(object):
+    # The relay server calls the model once per http request from its executor threads; the batcher gathers the
+    # inputs of concurrent requests (up to `max_batch_size` inputs or `max_wait` seconds) and runs them through
+    # `batch_fn` together. Inputs are sorted by `sort_key` before being cut into forward passes, so that each pass
+    # pads to similar lengths.
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]], max_batch_size: Optional[int] = None,
+                 max_wait: Optional[float] = None, sort_key: Callable[[Any], int] = len):
+        self._batch_fn, self._sort_key = batch_fn, sort_key
+        self._max_batch_size = lazyllm.config['embed_max_batch_size'] if max_batch_size is None else max_batch_size
+        self._max_wait = lazyllm.config['embed_max_batch_wait'] if max_wait is None else max_wait
+        self._queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def max_batch_size(self) -> int: return self._max_batch_size
+
+    @property
+    def max_wait(self) -> float: return self._max_wait
+
+    def __call__(self, items: List[Any]) -> List[Any]:
+        if not items: return []
+        if self._max_batch_size <= 1: return list(self._batch_fn(list(items)))
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._loop, name='lazyllm-embed-batcher', daemon=True)
+                    self._thread.start()
+        future = concurrent.futures.Future()
+        self._queue.put((list(items), future))
+        return future.result()
+
+    def _collect(self) -> List[tuple]:
+        requests = [self._queue.get()]
+        count, deadline = len(requests[0][0]), time.monotonic() + self._max_wait
+        while count < self._max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            requests.append(request)
+            count += len(request[0])
+        return requests
+
+    def _run(self, requests: List[tuple]) -> List[List[Any]]:
+        flat = sorted(((i, j, item) for i, (items, _) in enumerate(requests) for j, item in enumerate(items)),
+                      key=lambda x: self._sort_key(x[2]))
+        results = [[None] * len(items) for items, _ in requests]
+        for start in range(0, len(flat), self._max_batch_size):
+            chunk = flat[start:start + self._max_batch_size]
+            outputs = list(self._batch_fn([item for _, _, item in chunk]))
+            if len(outputs) != len(chunk):
+                raise RuntimeError(f'Batch function returned {len(outputs)} results for {len(chunk)} inputs')
+            for (i, j, _), output in zip(chunk, outputs): results[i][j] = output
+        return results
+
+    def _loop(self):
+        while True:
+            requests = self._collect()
+            try:
+                results = self._run(requests)
+            except Exception as e:
+                if len(requests) == 1:
+                    requests[0][1].set_exception(e)
+                else:
+                    # one bad input must not fail the requests it was batched with, so retry them one by one
+                    for request in requests: self._run_single(request)
+                continue
+            for (_, future), result in zip(requests, results): future.set_result(result)
+
+    def _run_single(self, request: tuple):
+        try:
+            request[1].set_result(self._run([request])[0])
+        except Exception as e:
+            request[1].set_exception(e)
+
 
 class AbstractEmbedding(ABC):
-    def __init__(self, base_embed, source=None, init=False):
+    def __init__(self, base_embed, source=None, init=False, max_batch_size=None, max_batch_wait=None):
         from ..utils.downloader import ModelManager
         self._source = source or lazyllm.config['model_source']
         self._base_embed = ModelManager(self._source).download(base_embed) or ''
         self._embed = None
+        self._batcher = _DynamicBatcher(self._embed_batch, max_batch_size, max_batch_wait)
         self._init = lazyllm.once_flag()
         if init:
             lazyllm.call_once(self._init, self.load_embed)
@@ -27,13 +143,17 @@ class AbstractEmbedding(ABC):
     def _call(self, data: Dict[str, Union[str, List[str]]]) -> str:
         pass
 
+    def _embed_batch(self, texts: List[str]) -> List[Any]:
+        raise NotImplementedError(f'{self.__class__.__name__} does not support batched embedding')
+
     def __call__(self, data: Dict[str, Union[str, List[str]]]) -> str:
         lazyllm.call_once(self._init, self.load_embed)
         return self._call(data)
 
     def __reduce__(self):
         init = bool(os.getenv('LAZYLLM_ON_CLOUDPICKLE', None) == 'ON' or self._init)
-        return self.__class__, (self._base_embed, self._source, init)
+        return self.__class__, (self._base_embed, self._source, init, self._batcher.max_batch_size,
+                                self._batcher.max_wait)
 
 class LazyHuggingFaceDefaultEmbedding(AbstractEmbedding):
 
@@ -43,18 +163,18 @@ class LazyHuggingFaceDefaultEmbedding(AbstractEmbedding):
         self._embed = tf.AutoModel.from_pretrained(self._base_embed, trust_remote_code=True).to(self._device)
         self._embed.eval()
 
-    def _call(self, data: Dict[str, Union[str, List[str]]]):
-        string, _ = data['text'], data['images']
-        encoded_input = self._tokenizer(string, padding=True, truncation=True, return_tensors='pt',
+    def _embed_batch(self, texts: List[str]):
+        encoded_input = self._tokenizer(texts, padding=True, truncation=True, return_tensors='pt',
                                         max_length=512, add_special_tokens=True).to(self._device)
         with torch.no_grad():
             model_output = self._embed(**encoded_input)
             sentence_embeddings = model_output[0][:, 0]
-        res = torch.nn.functional.normalize(sentence_embeddings, p=2, dim=1).cpu().numpy().tolist()
-        if type(string) is str:
-            return json.dumps(res[0])
-        else:
-            return json.dumps(res)
+        return list(torch.nn.functional.normalize(sentence_embeddings, p=2, dim=1).cpu().numpy())
+
+    def _call(self, data: Dict[str, Union[str, List[str]]]):
+        string, _ = data['text'], data['images']
+        res = self._batcher([string] if type(string) is str else string)
+        return _dump_embeddings(res, type(string) is str, data.get('encoding_format'))
 
 class HuggingFaceEmbedding:
     _model_id_mapping = {}
@@ -72,8 +192,9 @@ class HuggingFaceEmbedding:
             return target_class
         return decorator
 
-    def __init__(self, base_embed, source=None):
-        self._embed = self.__class__.get_emb_cls(base_embed)(base_embed, source)
+    def __init__(self, base_embed, source=None, max_batch_size=None, max_batch_wait=None):
+        self._embed = self.__class__.get_emb_cls(base_embed)(base_embed, source, max_batch_size=max_batch_size,
+                                                             max_batch_wait=max_batch_wait)
 
     def load_embed(self):
         self._embed.load_embed()
@@ -87,13 +208,14 @@ class HuggingFaceEmbedding:
         return self._embed(*args, **kwargs)
 
 class LazyFlagEmbedding(object):
-    def __init__(self, base_embed, sparse=False, source=None, init=False):
+    def __init__(self, base_embed, sparse=False, source=None, init=False, max_batch_size=None, max_batch_wait=None):
         from ..utils.downloader import ModelManager
         source = lazyllm.config['model_source'] if not source else source
         self.base_embed = ModelManager(source).download(base_embed) or ''
         self.embed = None
         self.device = 'cpu'
         self.sparse = sparse
+        self.batcher = _DynamicBatcher(self._embed_batch, max_batch_size, max_batch_wait)
         self.init_flag = lazyllm.once_flag()
         if init:
             lazyllm.call_once(self.init_flag, self.load_embed)
@@ -102,39 +224,38 @@ class LazyFlagEmbedding(object):
         self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
         self.embed = fe.FlagAutoModel.from_finetuned(self.base_embed, use_fp16=False, devices=[self.device])
 
-    def __call__(self, data: Dict[str, Union[str, List[str]]]):
-        lazyllm.call_once(self.init_flag, self.load_embed)
-        string, _ = data['text'], data['images']
+    def _embed_batch(self, texts: List[str]):
         with torch.no_grad():
-            model_output = self.embed.encode(string, return_sparse=self.sparse)
+            model_output = self.embed.encode(texts, return_sparse=self.sparse)
         if self.sparse:
-            embeddings = model_output['lexical_weights']
-            if isinstance(string, list):
-                res = [dict(embedding) for embedding in embeddings]
-            else:
-                res = dict(embeddings)
-        else:
-            res = model_output['dense_vecs'].tolist()
+            return [dict(embedding) for embedding in model_output['lexical_weights']]
+        return list(model_output['dense_vecs'])
 
-        if type(string) is list and type(res) is dict:
-            return json.dumps([res], default=lambda x: float(x))
-        else:
-            return json.dumps(res, default=lambda x: float(x))
+    def __call__(self, data: Dict[str, Union[str, List[str]]]):
+        lazyllm.call_once(self.init_flag, self.load_embed)
+        string, _ = data['text'], data['images']
+        res = self.batcher([string] if type(string) is str else string)
+        if not self.sparse:
+            return _dump_embeddings(res, type(string) is str, data.get('encoding_format'))
+        return json.dumps(res[0] if type(string) is str else res, default=lambda x: float(x))
 
     @classmethod
-    def rebuild(cls, base_embed, sparse, init):
-        return cls(base_embed, sparse, init=init)
+    def rebuild(cls, base_embed, sparse, init, max_batch_size=None, max_batch_wait=None):
+        return cls(base_embed, sparse, init=init, max_batch_size=max_batch_size, max_batch_wait=max_batch_wait)
 
     def __reduce__(self):
         init = bool(os.getenv('LAZYLLM_ON_CLOUDPICKLE', None) == 'ON' or self.init_flag)
-        return LazyFlagEmbedding.rebuild, (self.base_embed, self.sparse, init)
+        return LazyFlagEmbedding.rebuild, (self.base_embed, self.sparse, init, self.batcher.max_batch_size,
+                                           self.batcher.max_wait)
 
 class LazyHuggingFaceRerank(object):
-    def __init__(self, base_rerank, source=None, init=False):
+    def __init__(self, base_rerank, source=None, init=False, max_batch_size=None, max_batch_wait=None):
         from ..utils.downloader import ModelManager
         source = lazyllm.config['model_source'] if not source else source
         self.base_rerank = ModelManager(source).download(base_rerank) or ''
         self.reranker = None
+        self.batcher = _DynamicBatcher(self._predict_batch, max_batch_size, max_batch_wait,
+                                       sort_key=lambda pair: len(pair[0]) + len(pair[1]))
         self.init_flag = lazyllm.once_flag()
         if init:
             lazyllm.call_once(self.init_flag, self.load_reranker)
@@ -142,28 +263,33 @@ class LazyHuggingFaceRerank(object):
     def load_reranker(self):
         self.reranker = sentence_transformers.CrossEncoder(self.base_rerank)
 
+    def _predict_batch(self, pairs: List[tuple]):
+        return list(self.reranker.predict(pairs))
+
     def __call__(self, inps):
         lazyllm.call_once(self.init_flag, self.load_reranker)
         query, documents, top_n = inps['query'], inps['documents'], inps['top_n']
         query_pairs = [(query, doc) for doc in documents]
-        scores = self.reranker.predict(query_pairs)
+        scores = np.asarray(self.batcher(query_pairs))
         sorted_indices = [(index, scores[index]) for index in np.argsort(scores)[::-1]]
         if top_n > 0:
             sorted_indices = sorted_indices[:top_n]
         return sorted_indices
 
     @classmethod
-    def rebuild(cls, base_rerank, init):
-        return cls(base_rerank, init)
+    def rebuild(cls, base_rerank, init, max_batch_size=None, max_batch_wait=None):
+        return cls(base_rerank, init=init, max_batch_size=max_batch_size, max_batch_wait=max_batch_wait)
 
     def __reduce__(self):
         init = bool(os.getenv('LAZYLLM_ON_CLOUDPICKLE', None) == 'ON' or self.init_flag)
-        return LazyHuggingFaceRerank.rebuild, (self.base_rerank, init)
+        return LazyHuggingFaceRerank.rebuild, (self.base_rerank, init, self.batcher.max_batch_size,
+                                               self.batcher.max_wait)
 
 class EmbeddingDeploy(LazyLLMDeployBase):
     message_format = {
         'text': 'text',  # str,
-        'images': []  # Union[str, List[str]]
+        'images': [],  # Union[str, List[str]]
+        'encoding_format': 'json',  # 'json' or 'float32'
     }
     keys_name_handle = {
         'inputs': 'text',
@@ -172,7 +298,8 @@ class EmbeddingDeploy(LazyLLMDeployBase):
     default_headers = {'Content-Type': 'application/json'}
 
     def __init__(self, launcher: LazyLLMLaunchersBase = None, model_type: str = 'embed', log_path: Optional[str] = None,
-                 embed_type: Optional[str] = 'dense', trust_remote_code: bool = True, port: Optional[int] = None, **kw):
+                 embed_type: Optional[str] = 'dense', trust_remote_code: bool = True, port: Optional[int] = None,
+                 max_batch_size: Optional[int] = None, max_batch_wait: Optional[float] = None, **kw):
         super().__init__(launcher=launcher)
         self._launcher = launcher
         self._port = port
@@ -181,6 +308,7 @@ class EmbeddingDeploy(LazyLLMDeployBase):
         self._sparse_embed = True if embed_type == 'sparse' else False
         self._trust_remote_code = trust_remote_code
         self._port = port
+        self._batch_kw = dict(max_batch_size=max_batch_size, max_batch_wait=max_batch_wait)
 
     def _get_model_path(self, finetuned_model=None, base_model=None):
         if not os.path.exists(finetuned_model) or \
@@ -196,18 +324,19 @@ class EmbeddingDeploy(LazyLLMDeployBase):
         finetuned_model = self._get_model_path(finetuned_model, base_model)
         if self._sparse_embed or lazyllm.config['default_embedding_engine'] == 'flagEmbedding':
             return lazyllm.deploy.RelayServer(port=self._port, func=LazyFlagEmbedding(
-                finetuned_model, sparse=self._sparse_embed),
+                finetuned_model, sparse=self._sparse_embed, **self._batch_kw),
                 launcher=self._launcher, log_path=self._log_path, cls='embedding')()
         else:
-            return lazyllm.deploy.RelayServer(port=self._port, func=HuggingFaceEmbedding(finetuned_model),
+            return lazyllm.deploy.RelayServer(port=self._port,
+                                              func=HuggingFaceEmbedding(finetuned_model, **self._batch_kw),
                                               launcher=self._launcher, log_path=self._log_path, cls='embedding')()
 
 
 @HuggingFaceEmbedding.register(model_ids=['BGE-VL-v1.5-mmeb'])
 class _BGEVLEmbedding(AbstractEmbedding):
 
-    def __init__(self, base_embed, source=None, init=False):
-        super().__init__(base_embed, source, init)
+    def __init__(self, base_embed, source=None, init=False, **kw):
+        super().__init__(base_embed, source, init, **kw)
 
     def load_embed(self):
         self._device = 'cuda' if torch.cuda.is_available() else 'cpu'
@@ -244,4 +373,4 @@ class RerankDeploy(EmbeddingDeploy):
     def __call__(self, finetuned_model=None, base_model=None):
         finetuned_model = self._get_model_path(finetuned_model, base_model)
         return lazyllm.deploy.RelayServer(port=self._port, func=LazyHuggingFaceRerank(
-            finetuned_model), launcher=self._launcher, log_path=self._log_path, cls='embedding')()
+            finetuned_model, **self._batch_kw), launcher=self._launcher, log_path=self._log_path, cls='embedding')()
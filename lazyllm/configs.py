@@ -2,7 +2,7 @@ import os
 from enum import Enum
 import json
 import threading
-from typing import List, Union, Optional
+from typing import Callable, List, Union, Optional
 from contextlib import contextmanager
 from contextvars import ContextVar
 from asyncio import events
@@ -115,8 +115,10 @@ class Config(metaclass=_ConfigMeta):
     def get_all_configs(self):
         return self._impl
 
-    def done(self):
+    def done(self, load_pending: Optional[Callable[[], bool]] = None):
         ins = _ConfigMeta._instances['lazyllm']
+        # keys of lazily imported subpackages are only registered once they are loaded
+        if ins._cfgs and load_pending: load_pending()
         assert len(ins._cfgs) == 0, f'Invalid cfgs ({"".join(ins._cfgs.keys())}) are given in {ins._cgf_path}'
 
     @contextmanager
@@ -152,6 +154,8 @@ class Config(metaclass=_ConfigMeta):
         try:
             return self._impl[name]
         except KeyError:
+            if (load := getattr(lazyllm, '_load_lazy_submodules', None)) and load():
+                return self[name]
             raise KeyError(
                 f'Unknown config key: "{name}". '
                 'Please register it via config.add(...) before access.'
@@ -236,8 +240,8 @@ class _NamespaceConfig(object):
         with self._config.temp(name, value):
             yield
 
-    def done(self):
-        return self._config.done()
+    def done(self, load_pending: Optional[Callable[[], bool]] = None):
+        return self._config.done(load_pending)
 
     @property
     def prefix(self):
@@ -1491,12 +1491,14 @@ add_chinese_doc('teardown_session', '''
 销毁当前会话环境。
 
 该函数会清空当前会话中保存的全局和局部状态，通常与 init_session 成对使用，用于释放资源和避免状态泄漏。
+会话默认不会过期，设置 ``lazyllm.config['session_ttl']`` 后，空闲超过该秒数的会话会被淘汰；会话数超过 ``session_max_count``（默认 65536，作为安全上限）或近似内存超过 ``session_max_bytes`` 时按最近最少使用（LRU）顺序淘汰；可通过 ``lazyllm.globals.session_stats()`` 查看存活会话的统计信息。
 ''')
 
 add_english_doc('teardown_session', '''
 Tear down the current session environment.
 
 This function clears all global and local states associated with the current session. It is usually paired with init_session to release resources and prevent state leakage.
+Sessions do not expire by default; when ``lazyllm.config['session_ttl']`` is set, sessions idle for longer than that many seconds are evicted. The least recently used ones are evicted once the number of sessions exceeds ``session_max_count`` (65536 by default, a safety cap) or their approximate memory exceeds ``session_max_bytes``. ``lazyllm.globals.session_stats()`` reports metrics on live sessions.
 ''')
 
 add_example('teardown_session', '''
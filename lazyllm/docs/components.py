@@ -784,6 +784,8 @@ HuggingFace嵌入模型管理类，用于管理和注册不同的嵌入模型实
 Args:
     base_embed (str): 基础嵌入模型的路径或名称。
     source (Optional[str]): 模型来源，默认为None。
+    max_batch_size (Optional[int]): 动态批处理时单次前向计算的最大输入数，默认取 ``lazyllm.config['embed_max_batch_size']``，小于等于1时关闭批处理。
+    max_batch_wait (Optional[float]): 动态批处理等待并发请求的最长秒数，默认取 ``lazyllm.config['embed_max_batch_wait']``。
 ''')
 
 add_english_doc('deploy.embed.HuggingFaceEmbedding', '''\
@@ -795,6 +797,8 @@ Attributes:
 Args:
     base_embed (str): Path or name of the base embedding model.
     source (Optional[str]): Model source, defaults to None.
+    max_batch_size (Optional[int]): Maximum number of inputs run in one forward pass by the dynamic batcher, defaults to ``lazyllm.config['embed_max_batch_size']``. Values ``<= 1`` disable batching.
+    max_batch_wait (Optional[float]): Maximum seconds the dynamic batcher waits to gather concurrent requests, defaults to ``lazyllm.config['embed_max_batch_wait']``.
 ''')
 
 add_chinese_doc('deploy.embed.HuggingFaceEmbedding.get_emb_cls', '''\
@@ -1120,6 +1124,8 @@ Args:
     embed_type (Optional[str]): 嵌入类型，可选 ``'dense'`` 或 ``'sparse'``，默认为 ``'dense'``。
     trust_remote_code (bool): 是否信任远程代码，默认为 ``True``。
     port (Optional[int]): 服务端口号，默认为 ``None``，此情况下 LazyLLM 会自动生成随机端口号。
+    max_batch_size (Optional[int]): 服务端动态批处理时单次前向计算的最大输入数，并发请求的输入会按长度排序后合并计算。默认取 ``lazyllm.config['embed_max_batch_size']``，小于等于1时关闭批处理。
+    max_batch_wait (Optional[float]): 服务端动态批处理等待并发请求的最长秒数，默认取 ``lazyllm.config['embed_max_batch_wait']``。
 
 Call Arguments:
     finetuned_model (Optional[str]): 微调后的模型路径或名称。\\n
@@ -1129,6 +1135,7 @@ Message Format:
     输入格式为包含 text（文本）和 images（图像列表）的字典。\\n
     - text (str): 需要编码的文本内容 \\n
     - images (Union[str, List[str]]): 需要编码的图像列表，可选 \\n
+    - encoding_format (str): 稠密向量的返回格式，``'json'`` （默认）返回JSON字符串，``'float32'`` 返回紧凑的二进制float32编码，可用 ``deploy.embed.decode_float32_embeddings`` 解码 \\n
 ''')
 
 add_english_doc('deploy.EmbeddingDeploy', '''\
@@ -1141,6 +1148,8 @@ Args:
     embed_type (Optional[str]): Embedding type, either ``'dense'`` or ``'sparse'``, defaults to ``'dense'``.
     trust_remote_code (bool): Whether to trust remote code, defaults to ``True``.
     port (Optional[int]): Service port number, defaults to ``None``, in which case LazyLLM will generate a random port.
+    max_batch_size (Optional[int]): Maximum number of inputs the server runs in one forward pass; inputs of concurrent requests are sorted by length and run together. Defaults to ``lazyllm.config['embed_max_batch_size']``, values ``<= 1`` disable batching.
+    max_batch_wait (Optional[float]): Maximum seconds the server waits to gather concurrent requests into one batch, defaults to ``lazyllm.config['embed_max_batch_wait']``.
 
 Call Arguments:
     finetuned_model (Optional[str]): Path or name of the fine-tuned model. \n
@@ -1150,12 +1159,16 @@ Message Format:
     Input format is a dictionary containing text and images list.\n
     - text (str): Text content to be encoded\n
     - images (Union[str, List[str]]): List of images to be encoded (optional)\n
+    - encoding_format (str): Return format of dense embeddings, ``'json'`` (default) for a JSON string or ``'float32'`` for a compact binary float32 payload, decoded by ``deploy.embed.decode_float32_embeddings``\n
 ''')
 
 add_example('deploy.EmbeddingDeploy', '''\
+>>> import lazyllm
 >>> from lazyllm import deploy
 >>> embed_service = deploy.EmbeddingDeploy(embed_type='dense')
 >>> embed_service('path/to/model')
+>>> m = lazyllm.TrainableModule('bge-large-zh-v1.5').deploy_method(deploy.EmbeddingDeploy, max_batch_size=64).start()
+>>> m.set_default_parameters(encoding_format='float32')
 ''')
 
 # Deploy-RerankDeploy
@@ -44,6 +44,10 @@ Args:
     attention (str): 可选，提示注意事项。
     examples (list[list[str, str]]): 可选，分类示例列表，每个元素为 [输入文本, 标签]。
     return_trace (bool): 是否返回执行过程的 trace，默认为 False。
+    embed (Optional[Callable]): 可选，稠密向量嵌入模型。提供后启用两阶段分类：先用意图名与示例的向量质心做最近邻匹配，置信度（余弦相似度）不低于 ``threshold`` 时直接返回，否则回退到大模型。
+    threshold (float): 嵌入阶段直接作答所需的最低置信度，默认为 0.8。
+    cache_size (Optional[int]): 最近分类结果的缓存条数，带对话历史的请求不缓存。默认在提供 ``embed`` 时为 1024，否则为 0（不缓存）。
+    online_learning (bool): 是否将大模型回退给出的有效意图在线加入对应质心，默认为 True。
 ''')
 
 add_english_doc('IntentClassifier', '''\
@@ -58,6 +62,10 @@ Args:
     attention (str): Optional, attention notes for classification.
     examples (list[list[str, str]]): Optional, classification examples, each element is [input text, label].
     return_trace (bool): Whether to return execution trace. Default is False.
+    embed (Optional[Callable]): Optional dense embedding model. When given, classification has two stages: the input is matched against the centroids of the intent names and examples, answered directly if the confidence (cosine similarity) is at least ``threshold``, and sent to the llm otherwise.
+    threshold (float): Minimum confidence for the embedding stage to answer, defaults to 0.8.
+    cache_size (Optional[int]): Number of recent decisions to cache; requests with chat history are never cached. Defaults to 1024 when ``embed`` is given, otherwise 0 (no cache).
+    online_learning (bool): Whether valid intents given by the llm fallback are added to the centroids online, defaults to True.
 ''')
 
 
@@ -86,6 +94,26 @@ add_example(
 )
 
 
+add_chinese_doc('IntentClassifier.predict', '''\
+仅运行嵌入阶段，返回与输入最接近的意图及其置信度（余弦相似度），不会调用大模型。需要在构造时提供 ``embed``。
+
+Args:
+    input (str): 输入文本。
+
+**Returns:**\n
+- Tuple[Optional[str], float]: 最接近的意图与置信度。
+''')
+
+add_english_doc('IntentClassifier.predict', '''\
+Runs only the embedding stage and returns the nearest intent with its confidence (cosine similarity), without calling the llm. Requires ``embed`` to be given at construction.
+
+Args:
+    input (str): The input text.
+
+**Returns:**\n
+- Tuple[Optional[str], float]: The nearest intent and its confidence.
+''')
+
 add_chinese_doc('IntentClassifier.intent_promt_hook', '''\
 意图分类的预处理 Hook。
 将输入文本与意图列表打包为 JSON，并生成历史对话信息字符串。
@@ -817,6 +845,40 @@ add_example('Document.get_window_nodes', '''\
 >>> window_nodes = doc.get_window_nodes(node, span=(-2, 2), merge=False)
 ''')
 
+add_chinese_doc('Document.get_window_nodes_batch', '''\
+批量获取多个节点的窗口节点。同一文档内重叠的窗口会被合并后一次性从存储中读取，使用内存 MapStore 时结果会按存储版本缓存，写入后自动失效。
+
+Args:
+    nodes (List[DocNode]): 目标节点列表，通常为检索命中的节点。
+    span (tuple[int, int]): 窗口范围，基于 node.number 的相对偏移。
+    merge (bool): 是否将每个窗口合并为一个节点返回。
+
+**Returns:**\n
+- List[Union[List[DocNode], DocNode]]: 与输入节点一一对应的窗口节点列表或合并后的节点。
+''')
+
+add_english_doc('Document.get_window_nodes_batch', '''\
+Get window nodes for many target nodes at once. Overlapping windows within one document are merged and fetched
+from the store in a single call. With an in-memory MapStore, results are cached per store version so that writes
+invalidate them.
+
+Args:
+    nodes (List[DocNode]): Target nodes, usually the hits of a retriever.
+    span (tuple[int, int]): Window range based on relative offsets of node.number.
+    merge (bool): Whether to merge each window into a single node.
+
+**Returns:**\n
+- List[Union[List[DocNode], DocNode]]: One window (list or merged node) per input node, in input order.
+''')
+
+add_example('Document.get_window_nodes_batch', '''\
+>>> import lazyllm
+>>> from lazyllm.tools import Document
+>>> doc = Document()
+>>> nodes = doc.get_nodes(doc_ids={'doc_1'}, group='CoarseChunk', kb_id='kb_1', numbers={3, 4, 10})
+>>> windows = doc.get_window_nodes_batch(nodes, span=(-2, 2), merge=True)
+''')
+
 
 
 # rag/graph_document.py
@@ -1185,6 +1247,10 @@ Args:
         需返回 `List[DocNode]`，并会将 `extra_info` 写入每个节点的 `global_metadata`。
     return_trace (bool): 是否返回处理过程的 trace，默认为 True。
     return_full_document (bool, 已弃用): 此参数将在未来版本中删除，请使用 `split_doc` 替代。
+    num_workers (int): 并行抽取页面的进程数，大于 1 时按页范围分发到常驻进程池（非本地文件系统上的文件先写入一个临时文件供各进程读取），默认为 0（在当前进程中串行抽取）。
+    pages_per_task (int): 每个抽取任务包含的页数，也是失败重试的粒度，默认为 16。
+    use_cache (bool): 是否使用按文件哈希与页码索引的持久化页面缓存，默认为 False。缓存目录由 `pdf_page_cache_dir` 配置，
+        重新导入或重试部分解析过的文件时会跳过已完成的页面；缓存的文本超过 `pdf_page_cache_max_bytes`（默认 1GB）时，最久未读取的文件会被淘汰。
 
 Notes:
     当 `split_doc=True` 时返回 `RichDocNode`，否则返回 `DocNode`，两种情况都只返回一个节点。
@@ -1202,6 +1268,10 @@ Args:
         Must return a ``List[DocNode]`` and will write ``extra_info`` into each node's ``global_metadata``.
     return_trace (bool): Whether to return the processing trace. Default is True.
     return_full_document (bool, deprecated): This parameter will be removed in a future version. Please use `split_doc` instead.
+    num_workers (int): Number of processes extracting pages in parallel. When greater than 1, page ranges are dispatched to a long-lived process pool (a file on a non-local filesystem is first copied to one temporary file the workers read). Default is 0 (extract serially in the current process).
+    pages_per_task (int): Number of pages per extraction task, which is also the granularity of retries. Default is 16.
+    use_cache (bool): Whether to use the persistent per-page cache keyed by file hash and page index. Default is False. The cache directory is configured by `pdf_page_cache_dir`;
+        re-ingesting or retrying a partially parsed file skips the pages that are already done. Once the cached text exceeds `pdf_page_cache_max_bytes` (1GB by default), the least recently read files are evicted.
 
 Notes:
     When `split_doc=True`, returns a `RichDocNode`; otherwise returns a `DocNode`. Both cases return a single node.
@@ -2605,6 +2675,9 @@ Args:
 
 add_english_doc('rag.store.ElasticSearchStore', '''
 Vector store implementation based on Elasticsearch, inheriting from StoreBase. Supports vector insertion, deletion, flexible querying (including scalar filtering).
+
+``get_page`` pages on the ``uid`` keyword that documents keep in their source. Indices holding documents written by older versions, which lack that field, are paged by sorting the matched documents in memory instead; reindex them (or upsert their documents again) to page on the index.
+
 Args:
     uris (List[str]): Elasticsearch connection URIs (e.g., ["http://localhost:9200"]).
     client_kwargs (Optional[Dict]): Additional keyword arguments for Elasticsearch client.
@@ -2614,6 +2687,10 @@ Args:
 
 add_chinese_doc('rag.store.ElasticSearchStore', '''
 基于 Elasticsearch 的向量存储实现，继承自 StoreBase。支持向量写入、删除、相似度检索，兼容标量过滤。
+
+``get_page`` 基于文档 source 中的 ``uid`` 关键字字段分页。旧版本写入的文档没有该字段，包含这类文档的索引会退化为在内存中排序后分页；
+重建索引（或重新写入这些文档）后即可直接在索引上分页。
+
 Args:
     uris (List[str]): Elasticsearch 连接 URI（如 ["http://localhost:9200"]）。
     client_kwargs (Optional[Dict]): 传递给 Elasticsearch 客户端的额外参数。
@@ -2746,17 +2823,31 @@ Args:
 add_chinese_doc('rag.store.hybrid.hybrid_store.HybridStore', '''\
 混合存储类，结合了分段存储和向量存储的功能。
 
+写入（upsert、delete、update_global_meta）会并发发往两个存储。每个批次先记入发件箱日志，两个存储都成功后才删除该记录；
+只写入了一个存储的批次（连接错误、超时或进程崩溃）会在下一次写入前或 ``connect`` 时按原顺序重试，新的写入不会等待它们。
+因其他错误失败或重试 3 次仍失败的批次会移入死信表，可通过 ``dead_letters`` 查看、``drop_dead_letters`` 丢弃。
+
 Args:
     segment_store (LazyLLMStoreBase): 分段存储实例，用于存储文档的原始内容。
     vector_store (LazyLLMStoreBase): 向量存储实例，用于存储文档的向量表示。
+    journal (Optional[str]): 发件箱日志（sqlite）的路径，默认为分段存储文件旁的 ``<文件名>.outbox.db``，
+        每个分段存储各有一份；分段存储没有文件时日志只保存在内存中。
 ''')
 
 add_english_doc('rag.store.hybrid.hybrid_store.HybridStore', '''\
 Hybrid storage class that combines segment storage and vector storage capabilities.
 
+Writes (upsert, delete, update_global_meta) are sent to both stores concurrently. Each batch is first recorded in an
+outbox journal and dropped once both stores applied it; a batch that reached only one store (a connection error, a
+timeout or a crash) is retried in its original order before the next write or on ``connect``, new writes never wait
+for it. A batch that fails with any other error, or still fails after 3 attempts, is moved to the dead letters, see
+``dead_letters`` and ``drop_dead_letters``.
+
 Args:
     segment_store (LazyLLMStoreBase): Segment storage instance for storing original document content.
     vector_store (LazyLLMStoreBase): Vector storage instance for storing document vector representations.
+    journal (Optional[str]): Path of the outbox journal (sqlite), defaults to ``<name>.outbox.db`` next to the file
+        of the segment store, one per segment store; the journal is kept in memory when the segment store has no file.
 ''')
 
 add_chinese_doc('rag.store.hybrid.hybrid_store.HybridStore.connect', '''\
@@ -2827,6 +2918,8 @@ add_chinese_doc('rag.store.hybrid.hybrid_store.HybridStore.get', '''\
 Args:
     collection_name (str): 集合名称。
     criteria (Optional[dict]): 查询条件，默认为None。
+    fields (Optional[List[str]]): 返回的字段（``uid`` 总会返回），默认为None，即返回全部字段；
+        只有包含 ``embedding`` 时才会从向量存储读取向量。
     **kwargs: 其他参数。
 
 **Returns:**\n
@@ -2842,6 +2935,8 @@ Retrieve data from the stores.
 Args:
     collection_name (str): Name of the collection.
     criteria (Optional[dict]): Query criteria, defaults to None.
+    fields (Optional[List[str]]): Fields to return (``uid`` is always returned), defaults to None for all fields;
+        embeddings are read from the vector store only when ``embedding`` is included.
     **kwargs: Additional arguments.
 
 **Returns:**\n
@@ -2861,6 +2956,8 @@ Args:
     topk (int): 返回的最大结果数量，默认为10。
     filters (Optional[Dict[str, Union[str, int, List, Set]]]): 过滤条件，默认为None。
     embed_key (Optional[str]): 嵌入向量的键名，默认为None。
+    fields (Optional[List[str]]): 返回的字段（``uid`` 和 ``score`` 总会返回），默认为None，即返回除向量外的全部字段；
+        包含 ``embedding`` 时会附带向量。
     **kwargs: 其他参数。
 
 **Returns:**\n
@@ -2877,12 +2974,57 @@ Args:
     topk (int): Maximum number of results to return, defaults to 10.
     filters (Optional[Dict[str, Union[str, int, List, Set]]]): Filter conditions, defaults to None.
     embed_key (Optional[str]): Key name for embedding vector, defaults to None.
+    fields (Optional[List[str]]): Fields to return (``uid`` and ``score`` are always returned), defaults to None
+        for all fields but the embeddings; embeddings are attached when ``embedding`` is included.
     **kwargs: Additional arguments.
 
 **Returns:**\n
 - List[dict]: List of search results.
 ''')
 
+add_chinese_doc('rag.store.hybrid.hybrid_store.HybridStore.recover', '''\
+按原顺序重放发件箱日志中尚未同时写入两个存储的批次。重放失败的批次会计入重试次数，达到上限后移入死信表。
+
+**Returns:**\n
+- bool: 所有批次都重放成功时返回True，否则返回False。
+''')
+
+add_english_doc('rag.store.hybrid.hybrid_store.HybridStore.recover', '''\
+Replay the batches in the outbox journal that have not reached both stores yet, oldest first. A failed replay counts
+as an attempt, the batch is moved to the dead letters once it runs out of attempts.
+
+**Returns:**\n
+- bool: True when every batch was replayed, False otherwise.
+''')
+
+add_chinese_doc('rag.store.hybrid.hybrid_store.HybridStore.dead_letters', '''\
+列出无法写入两个存储而被放弃的批次。
+
+**Returns:**\n
+- List[dict]: 每个批次包含 ``id``、``op``、``collection_name``、``payload`` 和最后一次的 ``error``。
+''')
+
+add_english_doc('rag.store.hybrid.hybrid_store.HybridStore.dead_letters', '''\
+List the batches given up on after failing to reach both stores.
+
+**Returns:**\n
+- List[dict]: ``id``, ``op``, ``collection_name``, ``payload`` and the last ``error`` of every batch.
+''')
+
+add_chinese_doc('rag.store.hybrid.hybrid_store.HybridStore.drop_dead_letters', '''\
+从死信表中删除批次。
+
+Args:
+    ids (Optional[List[int]]): 要删除的批次 id，默认删除全部。
+''')
+
+add_english_doc('rag.store.hybrid.hybrid_store.HybridStore.drop_dead_letters', '''\
+Remove batches from the dead letters.
+
+Args:
+    ids (Optional[List[int]]): Ids of the batches to remove, all of them by default.
+''')
+
 add_chinese_doc('rag.store.hybrid.oceanbase_store.OceanBaseStore', '''\
 OceanBase 存储类，用于存储和检索文档节点。
 
@@ -3273,6 +3415,7 @@ Args:
     target:The name of the target document group for result conversion
     output_format: Represents the output format, with a default value of None. Optional values include 'content' and 'dict', where 'content' corresponds to a string output format and 'dict' corresponds to a dictionary.
     join:  Determines whether to concatenate the output of k nodes - when output format is 'content', setting True returns a single concatenated string while False returns a list of strings (each corresponding to a node's text content); when output format is 'dict', joining is unsupported (join defaults to False) and the output will be a dictionary containing 'content', 'embedding' and 'metadata' keys.
+    cache: Whether to cache retrieval results, defaults to False. Repeated queries with the same parameters and filters (ignoring differences in whitespace) return the cached nodes, and any write to the node group or the knowledge bases they were read from invalidates them. Only takes effect with an in-memory MapStore, since other stores may be written by other processes.
 
 The `group_name` has three built-in splitting strategies, all of which use `SentenceSplitter` for splitting, with the difference being in the chunk size:
 
@@ -3297,6 +3440,7 @@ Args:
     target：目标组名，将结果转换到目标组。
     output_format: 代表输出格式，默认为None，可选值有 'content' 和 'dict'，其中 content 对应输出格式为字符串，dict 对应字典。
     join: 是否联合输出的 k 个节点，当输出格式为 content 时，如果设置该值为 True，则输出一个长字符串，如果设置为 False 则输出一个字符串列表，其中每个字符串对应每个节点的文本内容。当输出格式是 dict 时，不能联合输出，此时join默认为False,，将输出一个字典，包括'content、'embedding'、'metadata'三个key。
+    cache: 是否缓存检索结果，默认为 False。参数和过滤条件相同（忽略空白差异）的重复查询直接返回缓存的节点，对所读取的节点组或知识库的任何写入都会使其失效。仅对内存 MapStore 生效，其他存储可能被别的进程写入，不做缓存。
 
 其中 `group_name` 有三个内置的切分策略，都是使用 `SentenceSplitter` 做切分，区别在于块大小不同：
 
@@ -3704,6 +3848,30 @@ Args:
 - Union[List[DocNode], DocNode]: Window nodes list or a merged node.
 ''')
 
+add_chinese_doc('rag.document.UrlDocument.get_window_nodes_batch', '''\
+批量获取远程文档中多个节点的窗口节点。
+
+Args:
+    nodes (List[DocNode]): 目标节点列表。
+    span (tuple[int, int]): 窗口范围，基于 node.number 的相对偏移。
+    merge (bool): 是否将每个窗口合并为一个节点返回。
+
+**Returns:**\n
+- List[Union[List[DocNode], DocNode]]: 与输入节点一一对应的窗口结果。
+''')
+
+add_english_doc('rag.document.UrlDocument.get_window_nodes_batch', '''\
+Get window nodes for many target nodes in a remote document.
+
+Args:
+    nodes (List[DocNode]): Target nodes.
+    span (tuple[int, int]): Window range based on relative offsets of node.number.
+    merge (bool): Whether to merge each window into a single node.
+
+**Returns:**\n
+- List[Union[List[DocNode], DocNode]]: One window result per input node.
+''')
+
 add_english_doc('rag.doc_node.DocNode', '''
 Execute assigned tasks on the specified document.
 
@@ -4121,6 +4289,40 @@ Args:
 - List[DocNode]: List of parsed documents extracted from the file.
 ''')
 
+add_chinese_doc('rag.dataReader.SimpleDirectoryReader.iter_data', '''\
+以迭代器方式加载文件，每读完一个文件就产出该文件的 `DocNode` 列表，使下游可以在读取继续进行的同时开始切分和嵌入。
+
+``num_workers >= 1`` 时文件在长期复用的进程池中并行读取，否则由后台线程预读。同时在读或等待消费的文件数不超过 ``max_inflight``，以限制内存占用。
+
+Args:
+    num_workers (Optional[int]): 读取进程数，为空或小于1时在后台线程中读取。
+    metadatas (Optional[List[Dict]]): 与文件一一对应的用户元数据。
+    input_dir (Optional[str]): 可选，覆盖构造时给定的目录。
+    input_files (Optional[List]): 可选，覆盖构造时给定的文件列表。
+    max_inflight (Optional[int]): 最多同时在途的文件数，默认为 ``2 * num_workers`` （后台线程读取时为2）。
+    ordered (bool): 多进程读取时是否按文件顺序产出，默认为 False，即按完成顺序产出。
+
+**Returns:**\n
+- Iterator[List[DocNode]]: 每个文件对应的文档节点列表。
+''')
+
+add_english_doc('rag.dataReader.SimpleDirectoryReader.iter_data', '''\
+Load files lazily, yielding the `DocNode` list of each file as soon as it is read, so that downstream splitting and embedding can start while reading continues.
+
+With ``num_workers >= 1`` files are read in parallel by a long-lived, reused process pool; otherwise they are read ahead by background threads. At most ``max_inflight`` files are being read or waiting to be consumed, which bounds memory.
+
+Args:
+    num_workers (Optional[int]): Number of reader processes; files are read by background threads when empty or below 1.
+    metadatas (Optional[List[Dict]]): User metadata, one per file.
+    input_dir (Optional[str]): Optional directory overriding the one given at construction.
+    input_files (Optional[List]): Optional files overriding the ones given at construction.
+    max_inflight (Optional[int]): Maximum number of files in flight, defaults to ``2 * num_workers`` (2 for background threads).
+    ordered (bool): Whether parallel reading yields in file order; defaults to False, i.e. in completion order.
+
+**Returns:**\n
+- Iterator[List[DocNode]]: The document nodes of each file.
+''')
+
 add_chinese_doc('rag.dataReader.SimpleDirectoryReader.find_extractor_by_file', '''
 根据文件名或后缀从文件读取器映射中选择合适的提取器（extractor）。
 
@@ -5858,8 +6060,8 @@ add_chinese_doc('rag.utils.DocListManager.table_inited', """\
 - bool: 如果 `documents` 表存在，返回 `True`；否则返回 `False`。
 
 说明:
-    - 使用线程安全锁 (`self._db_lock`) 确保对数据库的安全访问。
-    - 通过 `self._db_path` 连接 SQLite 数据库，并使用 `check_same_thread` 配置选项。
+    - 读操作使用连接池中的连接且不持有写锁 (`self._db_lock`)，数据库以 WAL 模式运行，读取不会被写入阻塞。
+    - 连接来自 SQLAlchemy 引擎的连接池。
     - 执行 SQL 查询：`SELECT name FROM sqlite_master WHERE type='table' AND name='documents'` 来检查表是否存在。
 """)
 
@@ -5878,7 +6080,7 @@ Args:
 
 说明:
     - 如果任何文档仍在处理中或需要重新解析，该方法会返回 `False`，并附带相应的错误消息。
-    - 方法通过数据库会话和线程安全锁 (`self._db_lock`) 检索文档状态信息。
+    - 方法通过数据库会话检索文档状态信息，读取不持有写锁 (`self._db_lock`)。
     - 不安全状态包括 `working` 和 `waiting`。
 
 ''')
@@ -5911,7 +6113,7 @@ Args:
 
 说明:
     - 该方法根据 `status` 和 `exclude_status` 条件动态构造查询。
-    - 使用线程安全锁 (`self._db_lock`) 确保数据库访问安全。
+    - 读操作使用连接池中的连接且不持有写锁 (`self._db_lock`)，数据库以 WAL 模式运行，读取不会被写入阻塞。
     - 如果指定了 `limit`，查询会附加 `LIMIT` 子句。
 """)
 
@@ -5925,7 +6127,7 @@ Args:
 - List[KBDocument]: 与提供的文档 ID 对应的 `KBDocument` 对象列表。如果没有找到文档，将返回空列表。
 
 说明:
-    - 使用线程安全锁 (`self._db_lock`) 确保数据库访问的安全性。
+    - 读操作使用连接池中的连接且不持有写锁 (`self._db_lock`)，数据库以 WAL 模式运行，读取不会被写入阻塞。
     - 查询使用 SQL 的 `IN` 子句，通过 `doc_id` 字段进行过滤。
     - 如果 `doc_ids` 为空，函数将直接返回空列表，而不会查询数据库。
 ''')
@@ -5980,7 +6182,7 @@ Args:
 
 说明:
     - 方法根据提供的过滤条件动态构建 SQL 查询。
-    - 使用线程安全锁 (`self._db_lock`) 确保多线程环境下的数据库访问安全。
+    - 读操作使用连接池中的连接且不持有写锁 (`self._db_lock`)，数据库以 WAL 模式运行，读取不会被写入阻塞。
     - 如果 `status` 或 `upload_status` 参数为列表，则会使用 SQL 的 `IN` 子句进行处理。
 ''')
 
@@ -6017,6 +6219,17 @@ add_chinese_doc('rag.utils.DocListManager.delete_unreferenced_doc', '''\
     2. 文档的引用计数 (`count`) 为 0。
 ''')
 
+add_chinese_doc('rag.utils.DocListManager.count_kb_group_files', '''\
+统计知识库分组中的文件记录数，可按分组和状态过滤。默认实现基于 `list_kb_group_files`，子类应覆盖它以直接在数据库中计数。
+
+Args:
+    group (Optional[str]): 分组名称，为 `None` 时统计所有分组。
+    status (Union[str, List[str]]): 要统计的状态或状态列表，默认统计所有状态。
+
+**Returns:**\n
+- int: 匹配的 (文件, 分组) 记录数。
+''')
+
 add_chinese_doc('rag.utils.DocListManager.get_docs_need_reparse', '''\
 获取需要重新解析 (`need_reparse=True`)的指定组中的文档。
 此方法检索标记为需要重新解析 (`need_reparse=True`) 的文档，基于提供的组名。仅包含状态为 `success` 或 `failed` 的文档。
@@ -6028,7 +6241,7 @@ Args:
 - List[KBDocument]: 需要重新解析的 `KBDocument` 对象列表。
 
 说明:
-    - 使用线程安全锁 (`self._db_lock`) 确保多线程环境下的数据库访问安全。
+    - 读操作使用连接池中的连接且不持有写锁 (`self._db_lock`)，数据库以 WAL 模式运行，读取不会被写入阻塞。
     - 查询通过 SQL `JOIN` 操作连接 `KBDocument` 和 `KBGroupDocuments` 表，并基于组名和重新解析状态进行过滤。
     - 仅状态为 `success` 或 `failed` 且 `need_reparse=True` 的文档会被检索出来。
 ''')
@@ -6044,7 +6257,7 @@ Args:
 - List[str]: 符合给定模式的文档路径列表。如果没有匹配的路径，则返回空列表。
 
 说明:
-    - 使用线程安全锁 (`self._db_lock`) 确保多线程环境下的数据库访问安全。
+    - 读操作使用连接池中的连接且不持有写锁 (`self._db_lock`)，数据库以 WAL 模式运行，读取不会被写入阻塞。
     - SQL 查询中的 `LIKE` 操作符用于对文档路径进行模式匹配。
 ''')
 
@@ -6151,8 +6364,8 @@ Determines whether the `documents` table exists in the database.
 - bool: `True` if the `documents` table exists, `False` otherwise.
 
 Notes:
-    - Uses a thread-safe lock (`self._db_lock`) to ensure safe access to the database.
-    - Establishes a connection to the SQLite database at `self._db_path` with the `check_same_thread` option.
+    - Reads use pooled connections without the write lock (`self._db_lock`); the database runs in WAL mode, so they are not blocked by writes.
+    - The connection is taken from the pool of the SQLAlchemy engine.
     - Executes the SQL query: `SELECT name FROM sqlite_master WHERE type='table' AND name='documents'` to check for the table.
 """)
 
@@ -6170,7 +6383,7 @@ Args:
         - `List[bool]`: A list where each element corresponds to whether a path is new (`True`) or already exists (`False`).
 Notes:
     - If any document is still being processed or needs reparsing, the method returns `False` with an appropriate error message.
-    - The method uses a database session and thread-safe lock (`self._db_lock`) to retrieve document status information.
+    - The method uses a database session to retrieve document status information, without taking the write lock (`self._db_lock`).
     - Unsafe statuses include `working` and `waiting`.
 
 ''')
@@ -6204,7 +6417,7 @@ Args:
 
 Notes:
     - The method constructs a query dynamically based on the provided `status` and `exclude_status` conditions.
-    - A thread-safe lock (`self._db_lock`) ensures safe database access.
+    - Reads use pooled connections without the write lock (`self._db_lock`); the database runs in WAL mode, so they are not blocked by writes.
     - The `LIMIT` clause is applied if `limit` is specified.
 """)
 
@@ -6218,7 +6431,7 @@ Args:
 - List[KBDocument]: A list of `KBDocument` objects corresponding to the provided document IDs. If no documents are found, an empty list is returned.
 
 Notes:
-    - The method uses a thread-safe lock (`self._db_lock`) to ensure safe database access.
+    - Reads use pooled connections without the write lock (`self._db_lock`); the database runs in WAL mode, so they are not blocked by writes.
     - It performs a SQL join between `KBDocument` and `KBGroupDocuments` to retrieve the relevant rows.
     - After fetching, it updates the `new_meta` field of the affected rows to `None` and commits the changes to the database.
 ''')
@@ -6310,6 +6523,17 @@ This method removes documents from the database that meet the following conditio
     2. Their reference count (`count`) is 0.
 ''')
 
+add_english_doc('rag.utils.DocListManager.count_kb_group_files', '''\
+Count the file records of knowledge base groups, optionally filtered by group and status. The default implementation relies on `list_kb_group_files`; subclasses should override it to count in the database.
+
+Args:
+    group (Optional[str]): The group name; `None` counts all groups.
+    status (Union[str, List[str]]): The status or list of statuses to count. Defaults to all statuses.
+
+**Returns:**\n
+- int: The number of matching (file, group) records.
+''')
+
 add_english_doc('rag.utils.DocListManager.get_docs_need_reparse', '''\
 Retrieve documents that require reparsing for a specific group.
 This method fetches documents that are marked as needing reparsing (`need_reparse=True`) for the given group. Only documents with a status of `success` or `failed` are included in the results.
@@ -6321,7 +6545,7 @@ Args:
 - List[KBDocument]: A list of `KBDocument` objects that need reparsing.
 
 Notes:
-    - The method uses a thread-safe lock (`self._db_lock`) to ensure safe database access.
+    - Reads use pooled connections without the write lock (`self._db_lock`); the database runs in WAL mode, so they are not blocked by writes.
     - The query performs a SQL `JOIN` between `KBDocument` and `KBGroupDocuments` to filter by group and reparse status.
     - Documents with `need_reparse=True` and a status of `success` or `failed` are considered for reparsing.
 ''')
@@ -6337,7 +6561,7 @@ Args:
 - List[str]: A list of document paths that match the given pattern. If no paths match, an empty list is returned.
 
 Notes:
-    - The method uses a thread-safe lock (`self._db_lock`) to ensure safe database access.
+    - Reads use pooled connections without the write lock (`self._db_lock`); the database runs in WAL mode, so they are not blocked by writes.
     - The `LIKE` operator in the SQL query is used to perform pattern matching on document paths.
 ''')
 
@@ -7264,6 +7488,7 @@ ToolManager是一个工具管理类，用于提供工具信息和工具调用给
 Args:
     tools (List[str]): 工具名称字符串列表。
     return_trace (bool): 是否返回中间步骤和工具调用信息。
+    timeout (float | Dict[str, float]): 工具调用超时时间（秒），可以统一设置，也可以按工具名分别设置。超时的工具返回超时提示而不是抛出异常，默认不限制。
 ''')
 
 add_english_doc('ToolManager', '''\
@@ -7274,6 +7499,7 @@ When constructing this management class, you need to pass in a list of tool name
 Args:
     tools (List[str]): A list of tool name strings.
     return_trace (bool): If True, return intermediate steps and tool calls.
+    timeout (float | Dict[str, float]): Timeout of tool calls in seconds, either for all tools or per tool name. A timed-out tool returns a timeout message instead of raising. No limit by default.
 
 ''')
 
@@ -7619,6 +7845,7 @@ Args:
     memory: 预留的记忆/上下文对象。
     desc (str): Agent 能力描述。
     workspace (str): Agent 默认工作目录，默认是 `config['home']/agent_workspace`。
+    tool_timeout (float | Dict[str, float]): 工具调用超时时间（秒），可以统一设置，也可以按工具名分别设置，默认不限制。
 ''')
 
 add_english_doc('LazyLLMAgentBase', '''\
@@ -7636,6 +7863,7 @@ Args:
     memory: Reserved memory/context object.
     desc (str): Optional agent capability description.
     workspace (str): Default agent workspace path. Defaults to `config['home']/agent_workspace`.
+    tool_timeout (float | Dict[str, float]): Timeout of tool calls in seconds, either for all tools or per tool name. No limit by default.
 ''')
 
 add_chinese_doc('SkillManager', '''\
@@ -8003,6 +8231,9 @@ Args:
     skills (bool | str | List[str]): Skills 配置。True 启用 Skills 并自动筛选；传入 str/list 启用指定技能。
     desc (str): Agent 能力描述，可为空。
     workspace (str): Agent 默认工作目录，默认是 `config['home']/agent_workspace`。
+    tool_timeout (float | Dict[str, float]): 工具调用超时时间（秒），可以统一设置，也可以按工具名分别设置，默认不限制。
+
+Worker 会根据计划中 #E 变量的引用关系构建依赖图，互不依赖的工具调用会在常驻线程池中并发执行，工具调用轨迹仍按计划顺序记录。
 
 ''')
 
@@ -8020,6 +8251,9 @@ Args:
     skills (bool | str | List[str]): Skills config. True enables Skills with auto selection; pass a str/list to enable specific skills.
     desc (str): Optional agent capability description.
     workspace (str): Default agent workspace path. Defaults to `config['home']/agent_workspace`.
+    tool_timeout (float | Dict[str, float]): Timeout of tool calls in seconds, either for all tools or per tool name. No limit by default.
+
+The worker builds a dependency graph from the #E references of the plan. Tool calls that do not depend on each other run concurrently on a persistent thread pool, and the tool-call trace keeps the order of the plan.
 ''')
 
 add_chinese_doc('ReWOOAgent.build_agent', '''\
@@ -8088,22 +8322,36 @@ add_chinese_doc('BaseEvaluator', '''\
 评估模块的抽象基类。
 
 该类定义了模型评估的标准接口，支持并发处理、输入校验和评估结果的自动保存，同时内置了重试机制。
+失败的调用按指数退避（带随机抖动）重试，同时并发的调用数在失败时减半、成功后逐步恢复。
+每条样本的结果在完成时追加写入检查点，中断后再次运行会跳过检查点中已完成的样本；开启 ``cache`` 后结果还会按（指标配置，样本哈希）持久缓存，
+重试耗尽的样本既不缓存也不写入检查点。
 
 Args:
     concurrency (int): 评估过程中使用的并发线程数。
     retry (int): 每个样本的最大重试次数。
     log_base_name (Optional[str]): 用于保存结果文件的日志文件名前缀（可选）。
+    cache (bool): 是否启用按样本的结果缓存，存储方式由 ``lazyllm.config['eval_cache_strategy']`` 决定，默认为 False。缓存以类名和 ``_metric_config`` 的返回值区分，未重写 ``_metric_config`` 的子类开启时会抛出 ValueError；指标调用的模型无法识别（没有模型名、基础模型等信息）时既不缓存也不续跑。
+    checkpoint (Optional[str]): 检查点文件路径。默认在 ``eval_result_dir/checkpoints`` 下按指标配置和数据集自动生成，并在结果保存后删除；显式指定时会保留。
+    backoff (float): 首次重试前的最大等待秒数，之后每次翻倍，默认为 1.0。
+    max_backoff (float): 单次重试等待的上限秒数，默认为 60.0。
 ''')
 
 add_english_doc('BaseEvaluator', '''\
 Abstract base class for evaluation modules.
 
 This class defines the standard interface and retry logic for evaluating model outputs. It supports concurrent processing, input validation, and automatic result saving.
+Failed calls are retried with exponential backoff and full jitter, and the number of calls in flight is halved on failures and grows back on successes.
+The result of every sample is appended to a checkpoint as soon as it is done, so an interrupted run resumes from it. Results are also cached
+persistently per (metric config, sample hash) when ``cache`` is on. Samples whose retries are exhausted are neither cached nor checkpointed.
 
 Args:
     concurrency (int): Number of concurrent threads used during evaluation.
     retry (int): Number of retry attempts for each evaluation item.
     log_base_name (Optional[str]): Optional log file name prefix for saving results.
+    cache (bool): Whether to cache results per sample, stored with ``lazyllm.config['eval_cache_strategy']``. Defaults to False. Cached results are told apart by the class name and the return value of ``_metric_config``, so a subclass that does not override ``_metric_config`` raises ValueError when it is enabled. Results of a metric whose model cannot be identified (no model name, base model and so on) are neither cached nor resumed.
+    checkpoint (Optional[str]): Checkpoint file path. Defaults to a file per metric config and dataset under ``eval_result_dir/checkpoints`` that is removed once results are saved; an explicit path is kept.
+    backoff (float): Maximum wait in seconds before the first retry, doubled for each further retry. Defaults to 1.0.
+    max_backoff (float): Upper bound in seconds of a single retry wait. Defaults to 60.0.
 ''')
 
 add_example('BaseEvaluator', ['''\
@@ -8128,6 +8376,7 @@ add_chinese_doc('BaseEvaluator.process_one_data', '''\
 Args:
     data: 要处理的数据项。
     progress_bar (Optional[tqdm]): 进度条对象，默认为None。
+    checkpoint (Optional[IO]): 结果追加写入的检查点文件，默认为None。
 
 **Returns:**\n
 - Any: 返回处理结果。
@@ -8142,6 +8391,7 @@ Process a single data item.
 Args:
     data: Data item to process.
     progress_bar (Optional[tqdm]): Progress bar object, defaults to None.
+    checkpoint (Optional[IO]): Checkpoint file the result is appended to, defaults to None.
 
 **Returns:**\n
 - Any: Returns processing result.
@@ -8188,8 +8438,9 @@ Args:
 
 流程：
     1. 验证输入数据的格式和必要键
-    2. 使用并发处理器处理数据
-    3. 保存处理结果
+    2. 从检查点恢复已完成的样本
+    3. 使用并发处理器处理其余数据，每条结果完成后追加到检查点
+    4. 保存处理结果
 ''')
 
 add_english_doc('BaseEvaluator.batch_process', '''\
@@ -8204,8 +8455,9 @@ Args:
 
 Flow:
     1. Validates input data format and required keys
-    2. Processes data using concurrent processor
-    3. Saves processing results
+    2. Restores the samples already found in the checkpoint
+    3. Processes the remaining data using concurrent processor, appending every result to the checkpoint
+    4. Saves processing results
 ''')
 
 add_chinese_doc('BaseEvaluator.save_res', '''\
@@ -9316,6 +9568,8 @@ Args:
     env (dict[str, str], optional): Environment variables dictionary used in tools, for example some api keys. (default is None)
     headers(dict[str, Any], optional): HTTP headers used in sse client connection. (default is None)
     timeout (float, optional): Timeout for sse client connection, in seconds. (default is 5)
+    pool_size (int, optional): Maximum number of sessions kept for a remote server. A local server always uses one session, and concurrent calls share it. (default is 4)
+    persistent (bool, optional): Whether to keep sessions alive between calls. Sessions live on a background event loop, are pinged before reuse after being idle, and are reopened when the transport breaks. If False, every call opens a new session. (default is True)
 ''')
 
 add_chinese_doc('MCPClient', '''\
@@ -9330,6 +9584,8 @@ Args:
     env (dict[str, str], optional): 工具中使用的环境变量，例如一些 API 密钥。（默认值为None）
     headers(dict[str, Any], optional): 用于sse客户端连接的HTTP头。（默认值为None）
     timeout (float, optional): sse客户端连接的超时时间，单位为秒。(默认值为5)
+    pool_size (int, optional): 远程服务器最多保持的会话数；本地服务器始终只使用一个会话，并发调用共享该会话。（默认值为4）
+    persistent (bool, optional): 是否在调用之间保持会话。会话运行在后台事件循环中，空闲后再次使用前会先进行心跳检测，传输断开时自动重连；为False时每次调用都新建会话。（默认值为True）
 ''')
 
 
@@ -9351,14 +9607,20 @@ Args:
 
 
 add_english_doc('MCPClient.list_tools', '''\
-Retrieve the list of tools from the currently connected MCP client.
+Retrieve the list of tools from the currently connected MCP client. The result is cached after the first call.
+
+Args:
+    refresh (bool, optional): Query the server again instead of using the cached result. (default is False)
 
 **Returns:**\n
 - Any: The list of tools returned by the MCP client.
 ''')
 
 add_chinese_doc('MCPClient.list_tools', '''\
-获取当前连接的 MCP 客户端的工具列表。
+获取当前连接的 MCP 客户端的工具列表，首次调用后结果会被缓存。
+
+Args:
+    refresh (bool, optional): 是否忽略缓存重新向服务器查询。（默认值为False）
 
 **Returns:**\n
 - Any: MCP 客户端返回的工具列表。
@@ -9386,6 +9648,24 @@ Args:
 ''')
 
 
+add_english_doc('MCPClient.close', '''\
+Close all sessions kept by the client. Local servers started by the client are stopped. Sessions are also closed automatically when the process exits.
+''')
+
+add_chinese_doc('MCPClient.close', '''\
+关闭客户端保持的所有会话，并停止由客户端启动的本地服务器。进程退出时也会自动关闭。
+''')
+
+
+add_english_doc('MCPClient.aclose', '''\
+Asynchronous version of ``close``.
+''')
+
+add_chinese_doc('MCPClient.aclose', '''\
+``close`` 的异步版本。
+''')
+
+
 add_english_doc('MCPClient.deploy', '''\
 Deploys the MCP client with the specified SSE server settings asynchronously.
 
@@ -10389,6 +10669,162 @@ Args:
     **kwargs: Additional parameters.
 ''')
 
+add_chinese_doc('rag.LazyLLMStoreBase.get_windows', '''\
+按 (kb_id, doc_id, number) 区间批量获取片段，用于窗口/邻居查询。同一文档内重叠或相邻的区间会先合并。
+默认实现对每个文档调用一次 ``get``，具备有序索引的存储可以重写该方法以区间扫描的方式返回结果。
+
+Args:
+    collection_name (str): 集合名称。
+    windows (List[Tuple[str, str, int, int]]): 窗口列表，每项为 (kb_id, doc_id, start, end)，end 为闭区间。
+    **kwargs: 额外参数。
+
+Returns:
+    List[dict]: 去重后的片段列表，同一文档内按 number 升序排列。
+''')
+
+add_english_doc('rag.LazyLLMStoreBase.get_windows', '''\
+Fetch segments by (kb_id, doc_id, number) ranges in one call, used by window/neighbor lookups. Overlapping or
+adjacent ranges of the same document are merged first. The default implementation issues one ``get`` per
+document; stores with an ordered index may override it with range scans.
+
+Args:
+    collection_name (str): The collection name.
+    windows (List[Tuple[str, str, int, int]]): Windows as (kb_id, doc_id, start, end), ``end`` inclusive.
+    **kwargs: Additional parameters.
+
+Returns:
+    List[dict]: De-duplicated segments, ordered by number within each document.
+''')
+
+add_chinese_doc('rag.LazyLLMStoreBase.get_relations', '''\
+获取匹配片段的 (uid, parent) 关系对，用于父子节点的多跳解析，中间层级无需反序列化完整片段。
+默认实现基于 ``get``，支持列投影的存储可以重写该方法只读取 uid 与 parent 两列。
+
+Args:
+    collection_name (str): 集合名称。
+    criteria (Optional[dict]): 查询条件，与 ``get`` 相同。
+    **kwargs: 额外参数。
+
+Returns:
+    List[Tuple[str, Optional[str]]]: (uid, parent) 列表。
+''')
+
+add_english_doc('rag.LazyLLMStoreBase.get_relations', '''\
+Fetch (uid, parent) pairs of the matched segments, used by multi-hop parent/child resolution so that intermediate
+hops do not deserialize full segments. The default implementation is built on ``get``; stores with column
+projection may override it to read only the uid and parent columns.
+
+Args:
+    collection_name (str): The collection name.
+    criteria (Optional[dict]): Query criteria, same as ``get``.
+    **kwargs: Additional parameters.
+
+Returns:
+    List[Tuple[str, Optional[str]]]: (uid, parent) pairs.
+''')
+
+add_chinese_doc('rag.LazyLLMStoreBase.update_global_meta', '''\
+仅更新匹配片段的 ``global_meta`` 字段，不重写内容与向量。一次调用可包含多组 (criteria, patch)，
+用于批量更新多个文档的元数据。默认实现基于 ``get`` + ``upsert``，各存储可重写为原生的部分更新。
+
+Args:
+    collection_name (str): 集合名称。
+    updates (List[Tuple[dict, dict]]): (criteria, patch) 列表，criteria 与 ``get`` 相同，patch 会合并进 ``global_meta``。
+    **kwargs: 额外参数。
+
+Returns:
+    bool: 是否更新成功。
+''')
+
+add_english_doc('rag.LazyLLMStoreBase.update_global_meta', '''\
+Update only the ``global_meta`` field of the matched segments, without rewriting contents or embeddings. One call
+may carry many (criteria, patch) pairs, so the metadata of many documents is updated in a single batch. The default
+implementation is built on ``get`` + ``upsert``; stores override it with a native partial update.
+
+Args:
+    collection_name (str): The collection name.
+    updates (List[Tuple[dict, dict]]): (criteria, patch) pairs; criteria is the same as ``get``, patch is merged
+        into ``global_meta``.
+    **kwargs: Additional parameters.
+
+Returns:
+    bool: Whether the update succeeded.
+''')
+
+add_chinese_doc('rag.LazyLLMStoreBase.count', '''\
+统计匹配片段的数量。默认实现基于 ``get``，各存储可重写为原生计数，无需读取片段内容。
+
+Args:
+    collection_name (str): 集合名称。
+    criteria (Optional[dict]): 查询条件，与 ``get`` 相同。
+    **kwargs: 额外参数。
+
+Returns:
+    int: 匹配的片段数量。
+''')
+
+add_english_doc('rag.LazyLLMStoreBase.count', '''\
+Count the matched segments. The default implementation is built on ``get``; stores override it with a native count
+that does not read the segments.
+
+Args:
+    collection_name (str): The collection name.
+    criteria (Optional[dict]): Query criteria, same as ``get``.
+    **kwargs: Additional parameters.
+
+Returns:
+    int: The number of matched segments.
+''')
+
+add_chinese_doc('rag.LazyLLMStoreBase.get_page', '''\
+按 uid 排序读取匹配片段的一页。``after`` 为游标（上一页最后一个 uid），用于键集分页。
+默认实现读取全部结果后排序切片，各存储可重写为基于 uid 索引的分页。
+
+Args:
+    collection_name (str): 集合名称。
+    criteria (Optional[dict]): 查询条件，与 ``get`` 相同。
+    limit (Optional[int]): 每页数量，None 表示不限制。
+    offset (int): 跳过的片段数量（在游标之后计算）。
+    after (Optional[str]): 键集分页游标。
+    **kwargs: 额外参数。
+
+Returns:
+    List[dict]: 当前页的片段。
+''')
+
+add_english_doc('rag.LazyLLMStoreBase.get_page', '''\
+Read one page of the matched segments ordered by uid. ``after`` is a keyset cursor (the last uid of the previous
+page). The default implementation sorts and slices the full result; stores override it to page on their uid index.
+
+Args:
+    collection_name (str): The collection name.
+    criteria (Optional[dict]): Query criteria, same as ``get``.
+    limit (Optional[int]): Page size, None means unlimited.
+    offset (int): Number of segments to skip, counted after the cursor.
+    after (Optional[str]): The keyset cursor.
+    **kwargs: Additional parameters.
+
+Returns:
+    List[dict]: The segments of the page.
+''')
+
+add_chinese_doc('rag.LazyLLMStoreBase.ingestion', '''\
+批量写入的上下文管理器。当前线程在块内的写入组成一个批次，需要刷新才能使写入可见的存储（如 Elasticsearch）
+会把刷新推迟到块结束时统一执行一次；块结束后的读取能看到批次内的全部写入。默认实现不做任何处理，可以嵌套使用。
+
+**Returns:**\n
+- ContextManager: 上下文管理器。
+''')
+
+add_english_doc('rag.LazyLLMStoreBase.ingestion', '''\
+Context manager of a write batch. Writes of the calling thread inside the block form one batch; stores that make
+writes visible with a refresh (e.g. Elasticsearch) defer it and refresh once when the block ends, so reads after the
+block see every write of the batch. The default implementation does nothing; blocks may be nested.
+
+**Returns:**\n
+- ContextManager: The context manager.
+''')
+
 add_chinese_doc('rag.doc_impl.DocImpl', '''\
 文档实现类，用于管理文档处理、存储和检索的核心功能。
 
@@ -10802,6 +11238,10 @@ add_chinese_doc('rag.store.hybrid.MapStore', """\
 
 Args:
     uri (Optional[str]): SQLite数据库文件路径，默认为None（内存模式）
+    write_through (bool): 是否启用写穿模式，仅在指定 ``uri`` 时生效，默认为False。启用后内存为主副本，
+        ``connect`` 时一次性加载数据库，读操作直接由内存提供；写操作先更新内存，再由后台线程批量写入SQLite。
+    flush_interval (float): 写穿模式下后台持久化的最长间隔（秒），默认为0.5。
+    flush_batch_size (int): 写穿模式下待持久化的分段数达到该值时立即触发一次写入。
     **kwargs: 其他关键字参数
 
 Attributes:
@@ -10818,6 +11258,10 @@ Provides data persistence and BM25 full-text search via SQLite for lightweight u
 
 Args:
     uri (Optional[str]): SQLite database file path, defaults to None (in-memory mode)
+    write_through (bool): Whether to enable the write-through mode, only effective with ``uri``. Defaults to False. When enabled, memory is the primary copy:
+        the database is loaded once in ``connect`` and reads are served from memory, while writes update memory first and are persisted to SQLite in batches by a background thread.
+    flush_interval (float): Maximum interval in seconds between two background persists in write-through mode. Defaults to 0.5.
+    flush_batch_size (int): In write-through mode, a persist is triggered immediately once this many segments are pending.
     **kwargs: Other keyword arguments
 
 Attributes:
@@ -10826,6 +11270,19 @@ Attributes:
     supports_index_registration: Whether index registration is supported
 """)
 
+add_chinese_doc('rag.store.hybrid.MapStore.flush', """\
+将写穿模式下尚未持久化的写操作同步写入SQLite。
+
+同一分段在两次写入之间的多次修改只会写入最新的一次；非写穿模式下为空操作。写入失败时，未被覆盖的修改会保留并在下次写入时重试。
+""")
+
+add_english_doc('rag.store.hybrid.MapStore.flush', """\
+Synchronously persist the pending writes of the write-through mode to SQLite.
+
+Repeated writes of a segment between two persists are written once with the latest value; it is a no-op outside the write-through mode.
+On failure, the writes that were not superseded are kept and retried on the next persist.
+""")
+
 add_chinese_doc('rag.store.hybrid.MapStore.connect', """\
 连接SQLite数据库并加载数据。
 
@@ -10934,6 +11391,63 @@ Returns:
     List[dict]: Query result data list
 """)
 
+add_chinese_doc('rag.store.hybrid.MapStore.get_windows', """\
+按 (kb_id, doc_id, number) 区间批量获取片段。
+
+内存模式下使用按文档维护的有序 number 索引做二分查找；SQLite 模式下使用 (kb_id, doc_id, number) 复合索引做区间扫描。
+
+Args:
+    collection_name (str): 集合名称
+    windows (List[Tuple[str, str, int, int]]): 窗口列表，每项为 (kb_id, doc_id, start, end)
+    **kwargs: 其他查询参数
+
+Returns:
+    List[dict]: 去重后的片段列表，同一文档内按 number 升序排列
+""")
+
+add_english_doc('rag.store.hybrid.MapStore.get_windows', """\
+Fetch segments by (kb_id, doc_id, number) ranges.
+
+In memory mode an ordered per-document number index is bisected; with ``uri`` a (kb_id, doc_id, number) composite
+index serves the range scans.
+
+Args:
+    collection_name (str): Collection name
+    windows (List[Tuple[str, str, int, int]]): Windows as (kb_id, doc_id, start, end)
+    **kwargs: Other query parameters
+
+Returns:
+    List[dict]: De-duplicated segments, ordered by number within each document
+""")
+
+add_chinese_doc('rag.store.hybrid.MapStore.get_relations', """\
+获取匹配片段的 (uid, parent) 关系对。
+
+内存模式下直接读取索引；SQLite 模式下只查询 uid 与 parent 两列。
+
+Args:
+    collection_name (str): 集合名称
+    criteria (Optional[dict]): 查询条件
+    **kwargs: 其他查询参数
+
+Returns:
+    List[Tuple[str, Optional[str]]]: (uid, parent) 列表
+""")
+
+add_english_doc('rag.store.hybrid.MapStore.get_relations', """\
+Fetch (uid, parent) pairs of the matched segments.
+
+In memory mode the indexes are read directly; with ``uri`` only the uid and parent columns are selected.
+
+Args:
+    collection_name (str): Collection name
+    criteria (Optional[dict]): Query criteria
+    **kwargs: Other query parameters
+
+Returns:
+    List[Tuple[str, Optional[str]]]: (uid, parent) pairs
+""")
+
 add_infer_service_chinese_doc('InferServer', """\
 推理服务服务器类，继承自ServerBase。
 
@@ -2,7 +2,7 @@ import lazyllm
 import builtins
 from lazyllm import config
 from lazyllm.common import LazyLLMRegisterMetaClass, package, kwargs, arguments, bind
-from lazyllm.common import ReadOnlyWrapper, LOG, globals, locals, _get_callsite
+from lazyllm.common import ReadOnlyWrapper, LOG, globals, locals, _get_callsite_location, _format_callsite
 from lazyllm.common import _register_trim_module, HandledException, _change_exception_type
 from lazyllm.common.bind import _MetaBind
 from functools import partial
@@ -100,7 +100,7 @@ class FlowBase(metaclass=_MetaBind):
         assert self._capture, f'_add can only be used in `{self.__class__}.__init__` or `with {self.__class__}()`'
         self._items.append(v() if isinstance(v, type) else _FuncWrap(v) if _is_function(v) or v in self._items else v)
         self._item_ids.append(k or str(uuid.uuid4().hex))
-        self._item_pos.append(_get_callsite(depth=3))
+        self._item_pos.append(_get_callsite_location(depth=3))
         if isinstance(v, FlowBase): v._father = self
         if k:
             assert k not in self._item_names, f'Duplicated names {k}'
@@ -135,19 +135,37 @@ class FlowBase(metaclass=_MetaBind):
         return iter([self, self])
 
     def _find_user_instantiation_frame(self):
+        # only the raw location is kept here, walking `f_back` is cheap while `inspect.stack()` reads the source
+        # context of every frame; paths are resolved and formatted only when they are reported
+        self._defined_at, frame = None, None
         try:
-            for fm in inspect.stack():
-                if fm.frame.f_globals.get('__name__', '').startswith('lazyllm.flow') or fm.filename.startswith('<'):
-                    continue
-                self._defined_file = os.path.abspath(fm.frame.f_code.co_filename)
-                self._defined_func = fm.frame.f_code.co_name
-                self._defined_pos = f'"file: {self._defined_file}", line {fm.frame.f_lineno}({self._defined_func})'
-                break
+            frame = inspect.currentframe()
+            while frame is not None:
+                if not (frame.f_globals.get('__name__', '').startswith('lazyllm.flow')
+                        or frame.f_code.co_filename.startswith('<')):
+                    self._defined_at = (frame.f_code.co_filename, frame.f_code.co_name, frame.f_lineno)
+                    break
+                frame = frame.f_back
         except Exception:
-            self._defined_file, self._defined_pos, self._defined_func = None, None, None
+            pass
+        finally:
+            del frame
+
+    @property
+    def _defined_file(self) -> Optional[str]:
+        return os.path.abspath(self._defined_at[0]) if self._defined_at else None
+
+    @property
+    def _defined_func(self) -> Optional[str]:
+        return self._defined_at[1] if self._defined_at else None
+
+    @property
+    def _defined_pos(self) -> Optional[str]:
+        if not self._defined_at: return None
+        return f'"file: {self._defined_file}", line {self._defined_at[2]}({self._defined_func})'
 
     def _defined_at_the_same_scope(self, other: 'FlowBase'):
-        return self._defined_file == other._defined_file and self._defined_func == other._defined_func
+        return (self._defined_at and self._defined_at[:2]) == (other._defined_at and other._defined_at[:2])
 
     def __setattr__(self, name: str, value):
         if '_capture' in self.__dict__ and self._capture and not name.startswith('_'):
@@ -287,7 +305,7 @@ class LazyLLMFlowsBase(FlowBase, metaclass=LazyLLMRegisterMetaClass):
         except HandledException as e: raise e
         except Exception as e:
             try:
-                pos = self._item_pos[self._items.index(it)]
+                pos = _format_callsite(self._item_pos[self._items.index(it)])
             except Exception:
                 pos = None
             if '_bind_args_source' in kw: kw = (kw.get('_bind_args_source') or {}).pop('kwargs', None)
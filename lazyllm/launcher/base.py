@@ -14,7 +14,8 @@ from collections import defaultdict
 
 import lazyllm
 from lazyllm.common import RecentQueue as Queue
-from lazyllm import LazyLLMRegisterMetaClass, LazyLLMCMD, final, LOG
+from lazyllm import LazyLLMCMD, final, LOG
+from lazyllm.common import LazyLLMRegisterMetaClass
 
 
 class Status(Enum):
@@ -130,11 +131,13 @@ class Job(object):
             self.ps.wait()
         else:
             self._launcher.all_processes[self._launcher._id].append((self.jobid, self))
-            n = 0
+            deadline = time.time() + 3600
             while self.status in (Status.TBSubmitted, Status.InQueue, Status.Pending):
-                time.sleep(2)
-                n += 1
-                if n > 1800:  # 3600s
+                # a job usually prints as soon as it leaves the queue, so its output wakes the check up at once;
+                # the timeout still catches schedulers whose status changes silently
+                self._output_arrived.wait(2)
+                self._output_arrived.clear()
+                if time.time() > deadline:
                     self._launcher.all_processes[self._launcher._id].pop()
                     LOG.error('Launch failed: No computing resources are available.')
                     break
@@ -162,9 +165,11 @@ class Job(object):
 
     def _enqueue_subprocess_output(self, hooks=None):
         self.output_thread_event = threading.Event()
+        self._output_arrived = threading.Event()
 
         def impl(out, queue):
             for line in iter(out.readline, b''):
+                self._output_arrived.set()
                 try:
                     line = line.decode('utf-8')
                 except Exception:
@@ -180,6 +185,7 @@ class Job(object):
                 if self.output_thread_event.is_set():
                     break
             out.close()
+            self._output_arrived.set()
         self.output_thread = threading.Thread(target=impl, args=(self.ps.stdout, self.queue))
         self.output_thread.daemon = True
         self.output_thread.start()
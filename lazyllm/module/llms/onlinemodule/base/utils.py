@@ -1,5 +1,6 @@
 from ....module import ModuleBase
-from lazyllm import config, LazyLLMRegisterMetaClass
+from lazyllm import config
+from lazyllm.common import LazyLLMRegisterMetaClass
 from lazyllm.components.utils.downloader.model_downloader import LLMType
 from typing import Optional, Union, List
 import random
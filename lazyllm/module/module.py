@@ -1,7 +1,9 @@
 import os
+import time
 import inspect
 import traceback
 from lazyllm import ThreadPoolExecutor
+from concurrent.futures import wait, FIRST_COMPLETED
 
 import lazyllm
 from lazyllm import FlatList, Option, kwargs, globals, locals, colored_text, redis_client
@@ -29,6 +31,9 @@ lazyllm.config.add('cache_strategy', str, 'memory', 'CACHE_STRATEGY',
                    description='The default cache strategy to use(memory, file, sqlite, redis).')
 lazyllm.config.add('cache_mode', str, 'RW', 'CACHE_MODE', options=['RW', 'RO', 'WO', 'NONE'],
                    description='The default cache mode to use(Read and Write, Read Only, Write Only, None).')
+lazyllm.config.add('deploy_concurrency', int, 8, 'DEPLOY_CONCURRENCY',
+                   description='The max number of services deployed at the same time when no redis is configured, '
+                               '1 deploys them one after another.')
 redis_client = redis_client['module']
 
 
@@ -259,6 +264,55 @@ class ModuleCache(object):
 module_cache = ModuleCache()
 
 
+class _DeployPlan(object):
+    # Without redis the url of a service is only known in this process after it is deployed, so a module can only
+    # be deployed after all of its submodules are; independent modules are deployed concurrently.
+    def __init__(self):
+        self._tasks, self._deps, self._names = dict(), dict(), dict()
+        self.timeline = []
+
+    def add(self, module: 'ModuleBase', tasks: FlatList, deps: List[str]):
+        self._tasks[module._module_id] = tasks
+        self._deps[module._module_id] = set(deps)
+        self._names[module._module_id] = module.name or module.__class__.__name__
+
+    def __len__(self): return sum(len(tasks) for tasks in self._tasks.values())
+
+    def _deploy(self, module_id: str, begin: float):
+        start = time.time()
+        Parallel.sequential(*self._tasks[module_id])()
+        return dict(name=self._names[module_id], start=start - begin, ready=time.time() - begin)
+
+    def __call__(self, max_workers: int = 8):
+        begin, futures, done, error = time.time(), dict(), set(), None
+        pending = {k: deps & self._tasks.keys() for k, deps in self._deps.items()}
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            while True:
+                ready = [] if error else [k for k, deps in pending.items() if deps <= done]
+                for module_id in ready:
+                    pending.pop(module_id)
+                    if self._tasks[module_id]: futures[executor.submit(self._deploy, module_id, begin)] = module_id
+                    else: done.add(module_id)
+                if not futures:
+                    if ready: continue
+                    break
+                finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for f in finished:
+                    module_id = futures.pop(f)
+                    if f.exception(): error = error or f.exception()
+                    else:
+                        self.timeline.append(f.result())
+                        done.add(module_id)
+        # modules left behind depend on each other, deploy them in the order they were found
+        for module_id in ([] if error else pending):
+            if self._tasks[module_id]: self.timeline.append(self._deploy(module_id, begin))
+        if self.timeline:
+            LOG.info('Services startup timeline:\n' + '\n'.join(
+                f'  {t["name"]}: started at {t["start"]:.2f}s, ready at {t["ready"]:.2f}s'
+                for t in sorted(self.timeline, key=lambda t: t['start'])))
+        if error: raise error
+
+
 # use _MetaBind:
 # if bind a ModuleBase: x, then hope: isinstance(x, ModuleBase)==True,
 # example: ActionModule.submodules:: isinstance(x, ModuleBase) will add submodule.
@@ -456,6 +510,7 @@ class ModuleBase(metaclass=_MetaBind):
             assert item in self.mode_list, f'Cannot find {item} in mode list: {self.mode_list}'
         # dfs to get all train tasks
         train_tasks, deploy_tasks, eval_tasks, post_process_tasks = FlatList(), FlatList(), FlatList(), FlatList()
+        deploy_plan = _DeployPlan()
         stack, visited = [(self, iter(self.submodules if recursive else []))], set()
         while len(stack) > 0:
             try:
@@ -466,7 +521,10 @@ class ModuleBase(metaclass=_MetaBind):
                 if top._module_id in visited: continue
                 visited.add(top._module_id)
                 if 'train' in mode: train_tasks.absorb(top._get_train_tasks())
-                if 'server' in mode: deploy_tasks.absorb(top._get_deploy_tasks())
+                if 'server' in mode:
+                    (tasks := FlatList()).absorb(top._get_deploy_tasks())
+                    deploy_tasks.absorb(tasks)
+                    deploy_plan.add(top, tasks, [m._module_id for m in top.submodules] if recursive else [])
                 if 'eval' in mode: eval_tasks.absorb(top._get_eval_tasks())
                 post_process_tasks.absorb(top._get_post_process_tasks())
 
@@ -475,6 +533,9 @@ class ModuleBase(metaclass=_MetaBind):
         if 'server' in mode and len(deploy_tasks) > 0:
             if redis_client:
                 Parallel(*deploy_tasks).set_sync(False)()
+            elif lazyllm.config['deploy_concurrency'] > 1:
+                deploy_plan(max_workers=lazyllm.config['deploy_concurrency'])
+                self._deploy_timeline = deploy_plan.timeline
             else:
                 Parallel.sequential(*deploy_tasks)()
         if 'eval' in mode and len(eval_tasks) > 0:
@@ -566,7 +627,7 @@ lazyllm.ReprRule.add_rule('Module', 'Action', 'Flow')
 lazyllm.LazyLLMFlowsBase.start = flow_start
 
 
-class ModuleRegistryBase(ModuleBase, metaclass=lazyllm.LazyLLMRegisterMetaClass):
+class ModuleRegistryBase(ModuleBase, metaclass=lazyllm.common.LazyLLMRegisterMetaClass):
     __reg_overwrite__ = 'forward'
 
 
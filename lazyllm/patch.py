@@ -1,7 +1,6 @@
 import os
 import sys
 import inspect
-import requests
 import ipaddress
 import importlib.abc
 import importlib.util
@@ -24,6 +23,7 @@ os.environ['no_proxy'] = ','.join(list(no_proxies))
 
 
 def request(method, url, **kwargs):
+    import requests
     with requests.sessions.Session() as session:
         if os.environ.get('http_proxy') and _is_ip_address_url(url):
             try:
@@ -44,8 +44,11 @@ def _head(url, **kwargs):
     kwargs.setdefault('allow_redirects', False)
     return request('head', url, **kwargs)
 
-requests.get, requests.options, requests.post = _get, _options, _post
-requests.put, requests.patch, requests.delete, requests.head = _put, _patch, _delete, _head
+
+def patch_requests():
+    import requests
+    requests.get, requests.options, requests.post = _get, _options, _post
+    requests.put, requests.patch, requests.delete, requests.head = _put, _patch, _delete, _head
 
 
 def patch_httpx_func(httpx, fname):
@@ -83,6 +86,7 @@ def patch_httpx():
 
 class LazyPatchLoader(importlib.abc.Loader):
     PATCHS = {
+        'requests': patch_requests,
         'httpx': patch_httpx,
     }
     PATCHED = set()
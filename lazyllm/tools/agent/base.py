@@ -1,5 +1,5 @@
 import os
-from typing import Iterable, Optional, Union
+from typing import Dict, Iterable, Optional, Union
 
 import lazyllm
 from lazyllm.module import ModuleBase
@@ -23,7 +23,8 @@ class LazyLLMAgentBase(ModuleBase):
     def __init__(self, llm=None, tools=None, max_retries: int = 5, return_trace: bool = False,
                  stream: bool = False, return_last_tool_calls: bool = False,
                  skills: Optional[Union[bool, str, Iterable[str]]] = None, memory=None,
-                 desc: str = '', workspace: Optional[str] = None):
+                 desc: str = '', workspace: Optional[str] = None,
+                 tool_timeout: Optional[Union[float, Dict[str, float]]] = None):
         super().__init__(return_trace=return_trace)
         use_skills, skills = self._normalize_skills_config(skills)
         self._llm = llm
@@ -41,7 +42,7 @@ class LazyLLMAgentBase(ModuleBase):
         if use_skills:
             self._skill_manager = SkillManager(skills=self._skills)
             self._ensure_default_skill_tools()
-        self._tools_manager = ToolManager(self._tools, return_trace=return_trace)
+        self._tools_manager = ToolManager(self._tools, return_trace=return_trace, timeout=tool_timeout)
 
     @staticmethod
     def _normalize_skills_config(skills: Optional[Union[bool, str, Iterable[str]]]):
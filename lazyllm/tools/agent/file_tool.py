@@ -1,11 +1,25 @@
+import bisect
+import codecs
 import fnmatch
+import io
 import os
 import re
 import shutil
-from typing import Dict, List, Optional
+import threading
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 
 from .toolsManager import register
 
+_LINE_INDEX_BLOCK = 64 * 1024
+_MAX_LINE_INDEX_CACHE_SIZE = 64
+_BINARY_SNIFF_SIZE = 8192
+_SEARCH_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+_DEFAULT_IGNORED_DIRS = {'.git', '.hg', '.svn', '__pycache__', 'node_modules', '.venv', 'venv', '.tox',
+                         '.mypy_cache', '.pytest_cache', '.idea'}
+
 
 def _resolve_path(path: str) -> str:
     return os.path.abspath(os.path.expanduser(path))
@@ -26,6 +40,84 @@ def _check_root(path: str, root: Optional[str]) -> Optional[Dict[str, str]]:
     return None
 
 
+class _LineIndex(object):
+    # newline counts before every fixed-size block of a file: built with one C-speed pass, it lets a line range be
+    # served by seeking into the right block instead of decoding everything before it
+    def __init__(self, path: str, stat: os.stat_result):
+        self.key = (stat.st_size, stat.st_mtime_ns)
+        self._newlines = array('q', [0])
+        last = b''
+        with open(path, 'rb') as f:
+            while chunk := f.read(_LINE_INDEX_BLOCK):
+                self._newlines.append(self._newlines[-1] + chunk.count(b'\n'))
+                last = chunk[-1:]
+        self.total_lines = self._newlines[-1] + (1 if last and last != b'\n' else 0)
+
+    def offset(self, f, line: int) -> int:
+        # byte offset of the 1-based `line`, i.e. just after the (line - 1)-th newline
+        k = line - 1
+        if k <= 0: return 0
+        block = bisect.bisect_left(self._newlines, k) - 1
+        f.seek(block * _LINE_INDEX_BLOCK)
+        chunk, pos = f.read(_LINE_INDEX_BLOCK), -1
+        for _ in range(k - self._newlines[block]):
+            pos = chunk.find(b'\n', pos + 1)
+        return block * _LINE_INDEX_BLOCK + pos + 1
+
+
+_line_index_cache: 'OrderedDict[str, _LineIndex]' = OrderedDict()
+_line_index_lock = threading.Lock()
+
+def _get_line_index(path: str) -> _LineIndex:
+    stat = os.stat(path)
+    with _line_index_lock:
+        index = _line_index_cache.get(path)
+        if index is not None and index.key == (stat.st_size, stat.st_mtime_ns):
+            _line_index_cache.move_to_end(path)
+            return index
+    index = _LineIndex(path, stat)
+    with _line_index_lock:
+        _line_index_cache[path] = index
+        _line_index_cache.move_to_end(path)
+        while len(_line_index_cache) > _MAX_LINE_INDEX_CACHE_SIZE:
+            _line_index_cache.popitem(last=False)
+    return index
+
+
+def _newline_is_single_byte(encoding: str) -> bool:
+    return not codecs.lookup(encoding).name.startswith(('utf-16', 'utf-32'))
+
+
+def _read_lines(path: str, start_line: Optional[int], end_line: Optional[int], encoding: str, errors: str,
+                max_chars: Optional[int]) -> Tuple[str, int, int, int]:
+    if not _newline_is_single_byte(encoding):
+        with open(path, 'r', encoding=encoding, errors=errors) as f:
+            lines = f.readlines()
+        total_lines = len(lines)
+        s = 1 if start_line is None else max(1, start_line)
+        e = total_lines if end_line is None else min(end_line, total_lines)
+        return ''.join(lines[s - 1:e]), s, e, total_lines
+    index = _get_line_index(path)
+    total_lines = index.total_lines
+    s = 1 if start_line is None else max(1, start_line)
+    e = total_lines if end_line is None else min(end_line, total_lines)
+    parts, size = [], 0
+    with open(path, 'rb') as f:
+        f.seek(index.offset(f, s))
+        reader = io.TextIOWrapper(f, encoding=encoding, errors=errors)
+        try:
+            for _ in range(max(0, e - s + 1)):
+                line = reader.readline()
+                if not line: break
+                parts.append(line)
+                size += len(line)
+                # the rest of a long range would be truncated anyway
+                if max_chars is not None and size > max_chars: break
+        finally:
+            reader.detach()
+    return ''.join(parts), s, e, total_lines
+
+
 @register('builtin_tools')
 @register('tool')
 def read_file(path: str, start_line: Optional[int] = None, end_line: Optional[int] = None,
@@ -51,12 +143,7 @@ def read_file(path: str, start_line: Optional[int] = None, end_line: Optional[in
     path_abs = _resolve_path(path)
     if not os.path.isfile(path_abs):
         return {'status': 'missing', 'path': path_abs}
-    with open(path_abs, 'r', encoding=encoding, errors=errors) as f:
-        lines = f.readlines()
-    total_lines = len(lines)
-    s = 1 if start_line is None else max(1, start_line)
-    e = total_lines if end_line is None else min(end_line, total_lines)
-    content = ''.join(lines[s - 1:e])
+    content, s, e, total_lines = _read_lines(path_abs, start_line, end_line, encoding, errors, max_chars)
     truncated = False
     if max_chars is not None and len(content) > max_chars:
         content = content[:max_chars]
@@ -113,12 +200,130 @@ def list_dir(path: str = '.', recursive: bool = False, max_depth: int = 5,
     return {'status': 'ok', 'path': path_abs, 'entries': entries}
 
 
+_REGEX_META = set('.^$*+?{}[]()|\\')
+_ESCAPE_DIGITS = {'x': 2, 'u': 4, 'U': 8}
+
+def _required_literal(pattern: str) -> Optional[str]:  # noqa C901
+    # the longest run of plain characters that every match must contain, None when it cannot be told cheaply;
+    # groups may be optional or repeated, so only characters outside of them are collected
+    if '|' in pattern or pattern.startswith('(?'): return None
+    runs, cur, depth, i = [], '', 0, 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '\\' and i + 1 < len(pattern):
+            nxt = pattern[i + 1]
+            i += 2
+            if nxt.isalnum() or depth:
+                # a class, anchor, backreference or character code, skipped whole so its digits are not taken as text
+                runs.append(cur); cur = ''
+                if nxt in _ESCAPE_DIGITS:
+                    i += _ESCAPE_DIGITS[nxt]
+                elif nxt == 'N' and pattern[i:i + 1] == '{':
+                    i = pattern.find('}', i) + 1
+                    if i == 0: return None
+                elif nxt.isdigit():
+                    while i < len(pattern) and pattern[i].isdigit(): i += 1
+            else:
+                cur += nxt
+            continue
+        if c in '*?{':
+            # the previous character is optional or repeated, and the bounds of a `{m,n}` are not text to match
+            runs.append(cur[:-1]); cur = ''
+            if c == '{':
+                i = pattern.find('}', i)
+                if i < 0: return None
+        elif c == '[':
+            runs.append(cur); cur = ''
+            # a `]` right after `[` or `[^` is a member of the class
+            i += 2 if pattern[i + 1:i + 2] == '^' else 1
+            i += 1
+            while i < len(pattern) and pattern[i] != ']':
+                i += 2 if pattern[i] == '\\' else 1
+            if i >= len(pattern): return None
+        elif c in _REGEX_META:
+            depth += 1 if c == '(' else -1 if c == ')' else 0
+            runs.append(cur); cur = ''
+        elif depth:
+            runs.append(cur); cur = ''
+        else:
+            cur += c
+        i += 1
+    runs.append(cur)
+    best = max(runs, key=len)
+    return best if len(best) >= 3 else None
+
+
+def _load_ignore_rules(path: str) -> List[str]:
+    rules = []
+    try:
+        with open(os.path.join(path, '.gitignore'), encoding='utf-8', errors='replace') as f:
+            for line in f:
+                line = line.strip()
+                # negations re-include paths, which only makes the search scan more, so they are skipped
+                if line and not line.startswith(('#', '!')): rules.append(line)
+    except OSError:
+        pass
+    return rules
+
+
+def _is_ignored(rel_path: str, name: str, is_dir: bool, rules: List[str]) -> bool:
+    if is_dir and name in _DEFAULT_IGNORED_DIRS: return True
+    for rule in rules:
+        if rule.endswith('/'):
+            if not is_dir: continue
+            rule = rule.rstrip('/')
+        if '/' in rule:
+            if fnmatch.fnmatch(rel_path, rule.lstrip('/')): return True
+        elif fnmatch.fnmatch(name, rule):
+            return True
+    return False
+
+
+def _walk_files(path: str, glob: Optional[str], rules: Optional[List[str]]):
+    # `rules` is None when ignore rules are not respected
+    for dirpath, dirnames, filenames in os.walk(path):
+        rel_dir = os.path.relpath(dirpath, path).replace(os.sep, '/')
+        rel_dir = '' if rel_dir == '.' else rel_dir + '/'
+        if rules is not None:
+            dirnames[:] = [d for d in dirnames if not _is_ignored(rel_dir + d, d, True, rules)]
+        for name in filenames:
+            if glob and not fnmatch.fnmatch(name, glob):
+                continue
+            if rules is not None and _is_ignored(rel_dir + name, name, False, rules):
+                continue
+            yield os.path.join(dirpath, name)
+
+
+def _search_file(file_path: str, regex: 're.Pattern', literal: Optional[bytes], encoding: str, errors: str,
+                 max_file_size: int, max_results: int) -> List[Dict[str, str]]:
+    try:
+        if os.path.getsize(file_path) > max_file_size:
+            return []
+        with open(file_path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return []
+    # binaries are told by a NUL byte near the start, like git and grep do; utf-16/32 text is full of them
+    if _newline_is_single_byte(encoding) and b'\0' in data[:_BINARY_SNIFF_SIZE]: return []
+    if literal is not None and literal not in data: return []
+    results = []
+    literal_text = literal.decode(encoding) if literal is not None else None
+    try:
+        for idx, line in enumerate(io.TextIOWrapper(io.BytesIO(data), encoding=encoding, errors=errors), start=1):
+            if (literal_text is None or literal_text in line) and regex.search(line):
+                results.append({'path': file_path, 'line': str(idx), 'text': line.rstrip('\n')})
+                if len(results) >= max_results: break
+    except UnicodeDecodeError:
+        pass  # a file that does not decode is skipped from there on
+    return results
+
+
 @register('builtin_tools')
 @register('tool')
 def search_in_files(pattern: str, path: str = '.', glob: Optional[str] = None,
                     max_results: int = 50, root: Optional[str] = None,
                     encoding: str = 'utf-8', errors: str = 'replace',
-                    max_file_size: int = 2_000_000) -> dict:
+                    max_file_size: int = 2_000_000, respect_ignore: bool = True) -> dict:
     '''Search files for a regex pattern.
 
     Args:
@@ -130,6 +335,8 @@ def search_in_files(pattern: str, path: str = '.', glob: Optional[str] = None,
         encoding (str, optional): File encoding. Defaults to utf-8.
         errors (str, optional): Error handling for decoding. Defaults to replace.
         max_file_size (int, optional): Skip files larger than this size in bytes.
+        respect_ignore (bool, optional): Skip VCS/cache directories and paths in the .gitignore of the search path.
+            Defaults to True.
 
     Returns:
         dict: List of matches with file path and line number.
@@ -141,27 +348,22 @@ def search_in_files(pattern: str, path: str = '.', glob: Optional[str] = None,
     if not os.path.isdir(path_abs):
         return {'status': 'missing', 'path': path_abs}
     regex = re.compile(pattern)
+    literal = _required_literal(pattern) if _newline_is_single_byte(encoding) else None
+    literal = literal.encode(encoding) if literal is not None else None
+    rules = _load_ignore_rules(path_abs) if respect_ignore else []
+
+    # files are searched concurrently a window at a time and merged in walk order, so results stay deterministic
     results: List[Dict[str, str]] = []
-    for dirpath, _, filenames in os.walk(path_abs):
-        for name in filenames:
-            if glob and not fnmatch.fnmatch(name, glob):
-                continue
-            file_path = os.path.join(dirpath, name)
-            try:
-                if os.path.getsize(file_path) > max_file_size:
-                    continue
-                with open(file_path, 'r', encoding=encoding, errors=errors) as f:
-                    for idx, line in enumerate(f, start=1):
-                        if regex.search(line):
-                            results.append({
-                                'path': file_path,
-                                'line': str(idx),
-                                'text': line.rstrip('\n'),
-                            })
-                            if len(results) >= max_results:
-                                return {'status': 'ok', 'results': results}
-            except (OSError, UnicodeDecodeError):
-                continue
+    walker = _walk_files(path_abs, glob, rules if respect_ignore else None)
+    with ThreadPoolExecutor(max_workers=_SEARCH_WORKERS) as pool:
+        while True:
+            window = [f for _, f in zip(range(_SEARCH_WORKERS * 4), walker)]
+            if not window: break
+            for matches in pool.map(lambda f: _search_file(f, regex, literal, encoding, errors, max_file_size,
+                                                           max_results), window):
+                results.extend(matches)
+                if len(results) >= max_results:
+                    return {'status': 'ok', 'results': results[:max_results]}
     return {'status': 'ok', 'results': results}
 
 
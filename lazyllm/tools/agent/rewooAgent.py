@@ -1,8 +1,12 @@
 from lazyllm.module import ModuleBase
 from .base import LazyLLMAgentBase
+from .toolsManager import submit_with_context
 from lazyllm.components import ChatPrompter
-from lazyllm import pipeline, LOG, bind, Color, locals, ifs, once_wrapper
+from lazyllm.common import reset_on_pickle
+from lazyllm import pipeline, LOG, bind, Color, locals, ifs, once_wrapper, ThreadPoolExecutor
 from typing import Callable, Dict, List, Optional, Union
+import concurrent.futures
+import threading
 import re
 import json
 
@@ -31,16 +35,21 @@ S_PROMPT_PREFIX = ('Solve the following task or problem. To assist you, we provi
 S_PROMPT_SUFFIX = ('\nNow begin to solve the task or problem. Respond with '
                    'the answer directly with no extra words.\n\n')
 S_PROMPT_TEMPLATE = S_PROMPT_PREFIX + '{objective}\n{worker_evidences}' + S_PROMPT_SUFFIX + '{objective}\n'
+_EVIDENCE_PATTERN = re.compile(r'#E\d+')
+_MAX_WORKERS = 8
 
+@reset_on_pickle(('_executor', None), ('_executor_lock', threading.Lock))
 class ReWOOAgent(LazyLLMAgentBase):
     def __init__(self, llm: Union[ModuleBase, None] = None, tools: List[Union[str, Callable]] = [], *,  # noqa B006
                  plan_llm: Union[ModuleBase, None] = None, solve_llm: Union[ModuleBase, None] = None,
                  return_trace: bool = False, stream: bool = False, return_last_tool_calls: bool = False,
                  skills: Union[bool, str, List[str], None] = None, desc: str = '',
-                 workspace: Optional[str] = None):
+                 workspace: Optional[str] = None, tool_timeout: Optional[Union[float, Dict[str, float]]] = None):
         super().__init__(llm=llm, tools=tools, return_trace=return_trace, stream=stream,
                          return_last_tool_calls=return_last_tool_calls, skills=skills, desc=desc,
-                         workspace=workspace)
+                         workspace=workspace, tool_timeout=tool_timeout)
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
         if llm is None and plan_llm is None and solve_llm is None:
             raise ValueError('Either specify llm, or provide plan_llm/solve_llm.')
         if llm is None:
@@ -94,28 +103,51 @@ class ReWOOAgent(LazyLLMAgentBase):
     def _parse_and_call_tool(self, tool_call: str, evidence: Dict[str, str]):
         tool_name, tool_arguments = tool_call.split('[', 1)
         tool_arguments = tool_arguments.split(']')[0]
-        for var in re.findall(r'#E\d+', tool_arguments):
-            if var in evidence:
-                tool_arguments = tool_arguments.replace(var, str(evidence[var]))
+        tool_arguments = _EVIDENCE_PATTERN.sub(lambda m: str(evidence.get(m.group(0), m.group(0))), tool_arguments)
         tool_calls = [{'function': {'name': tool_name, 'arguments': tool_arguments}}]
         result = self._tools_manager(tool_calls)
-        locals['_lazyllm_agent']['workspace']['tool_call_trace'].append(
-            {**tool_calls[0], 'tool_call_result': result[0]}
-        )
-        return json.dumps(result[0]).strip('\"')
+        return {**tool_calls[0], 'tool_call_result': result[0]}, json.dumps(result[0]).strip('\"')
+
+    def _get_executor(self) -> concurrent.futures.ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None: self._executor = ThreadPoolExecutor(max_workers=_MAX_WORKERS)
+            return self._executor
+
+    def _run_worker_steps(self, steps: List[tuple]) -> List[tuple]:
+        # a step depends on the latest earlier step defining each #E it references; every step is submitted as soon
+        # as its dependencies are done, so independent tool calls of the plan run concurrently
+        deps, defined = [], {}
+        for idx, (var, tool_call) in enumerate(steps):
+            deps.append({v: defined[v] for v in _EVIDENCE_PATTERN.findall(tool_call) if v in defined})
+            defined[var] = idx
+        results, futures, pending = [None] * len(steps), {}, set(range(len(steps)))
+        while pending or futures:
+            for idx in sorted(i for i in pending if all(results[d] is not None for d in deps[i].values())):
+                evidence = {v: results[d][1] for v, d in deps[idx].items()}
+                futures[submit_with_context(self._get_executor(), self._parse_and_call_tool,
+                                            steps[idx][1], evidence)] = idx
+                pending.discard(idx)
+            done, _ = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                results[futures.pop(future)] = future.result()
+        return results
 
     def _get_worker_evidences(self, response: str):
         LOG.debug(f'planner plans: {response}')
-        evidence = {}
-        worker_evidences = ''
+        lines, steps = [], []
         for line in response.splitlines():
             if line.startswith('Plan'):
-                worker_evidences += line + '\n'
+                lines.append(line)
             elif re.match(r'#E\d+\s*=', line.strip()):
                 e, tool_call = line.split('=', 1)
-                evidence[e.strip()] = self._parse_and_call_tool(tool_call.strip(), evidence)
-                worker_evidences += f'Evidence:\n{evidence[e.strip()]}\n'
+                lines.append(len(steps))
+                steps.append((e.strip(), tool_call.strip()))
 
+        results = self._run_worker_steps(steps)
+        # the trace keeps the order of the plan, whatever order the tool calls finished in
+        locals['_lazyllm_agent']['workspace']['tool_call_trace'].extend(trace for trace, _ in results)
+        worker_evidences = ''.join(f'{line}\n' if isinstance(line, str) else f'Evidence:\n{results[line][1]}\n'
+                                   for line in lines)
         LOG.debug(f'worker_evidences: {worker_evidences}')
         return worker_evidences
 
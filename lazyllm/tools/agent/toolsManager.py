@@ -1,10 +1,13 @@
 import copy
 import json5 as json
 import lazyllm
+import threading
+import concurrent.futures
 import docstring_parser
+from collections import OrderedDict
 from lazyllm.module import ModuleBase
-from lazyllm.common import LazyLLMRegisterMetaClass, compile_func
-from typing import Callable, Any, Union, get_type_hints, List, Dict, Type, Set
+from lazyllm.common import LazyLLMRegisterMetaClass, compile_func, reset_on_pickle
+from typing import Callable, Any, Union, get_type_hints, List, Dict, Type, Set, Optional
 import inspect
 from pydantic import create_model, BaseModel, ValidationError
 from lazyllm import LOG
@@ -178,18 +181,44 @@ if 'tool' not in LazyLLMRegisterMetaClass.all_clses:
 if 'builtin_tools' not in LazyLLMRegisterMetaClass.all_clses:
     register.new_group('builtin_tools')
 
+_MAX_DIVERTER_CACHE_SIZE = 128
+_MAX_TOOL_WORKERS = 8
+
+
+def submit_with_context(executor: concurrent.futures.Executor, fn: Callable, *args, **kw) -> concurrent.futures.Future:
+    # run `fn` in a pooled thread with the caller's session id and a copy of its locals, like Parallel._worker
+    sid, local_data = lazyllm.globals._sid, lazyllm.locals._data
+
+    def impl():
+        lazyllm.globals._init_sid(sid)
+        lazyllm.locals._init_sid()
+        lazyllm.locals._update(local_data)
+        try:
+            return fn(*args, **kw)
+        finally:
+            lazyllm.locals.clear()
+    return executor.submit(impl)
+
+
 TOOL_CALL_FORMAT_EXAMPLE = (
     '{"function": {"name": "tool_name", "arguments": '
     '"{{"arg1": "value1", "arg2": "value2"}}"}}'
 )
 
 
+@reset_on_pickle(('_diverters', OrderedDict), ('_lock', threading.Lock), ('_executor', None))
 class ToolManager(ModuleBase):
-    def __init__(self, tools: List[Union[str, Callable]], return_trace: bool = False):
+    def __init__(self, tools: List[Union[str, Callable]], return_trace: bool = False,
+                 timeout: Optional[Union[float, Dict[str, float]]] = None):
         super().__init__(return_trace=return_trace)
         self._tools = self._load_tools(tools)
         self._format_tools()
         self._tools_desc = self._transform_to_openai_function()
+        self._timeout = timeout
+        # diverters are built once per sequence of called tools, flows are expensive to construct
+        self._diverters: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
 
     def _load_tools(self, tools: List[Union[str, Callable]]):
         if 'tmp_tool' not in LazyLLMRegisterMetaClass.all_clses:
@@ -335,14 +364,42 @@ class ToolManager(ModuleBase):
             for t in tools
         ]
 
-        tools_calls = []
-        for idx, tool in enumerate(tools):
-            name = tool['function']['name']
-            tools_calls.append(
-                self._tool_call[name] if self._validate_tool(name, tool_arguments[idx])
-                else (lambda *_, name=name: f'Tool [{name}] parameters error.')
-            )
-
+        key = tuple((tool['function']['name'], self._validate_tool(tool['function']['name'], tool_arguments[idx]))
+                    for idx, tool in enumerate(tools))
+        return self._get_diverter(key)(tuple(tool_arguments))
+
+    def _get_diverter(self, key):
+        with self._lock:
+            if (tool_diverter := self._diverters.get(key)) is not None:
+                self._diverters.move_to_end(key)
+                return tool_diverter
+        tools_calls = [self._wrap_timeout(name, self._tool_call[name]) if valid
+                       else (lambda *_, name=name: f'Tool [{name}] parameters error.') for name, valid in key]
         tool_diverter = lazyllm.diverter(tuple(tools_calls))
-        tool_results = tool_diverter(tuple(tool_arguments))
-        return tool_results
+        with self._lock:
+            self._diverters[key] = tool_diverter
+            while len(self._diverters) > _MAX_DIVERTER_CACHE_SIZE:
+                self._diverters.popitem(last=False)
+        return tool_diverter
+
+    def _get_timeout(self, name: str) -> Optional[float]:
+        return self._timeout.get(name) if isinstance(self._timeout, dict) else self._timeout
+
+    def _wrap_timeout(self, name: str, tool: Callable) -> Callable:
+        if not (timeout := self._get_timeout(name)): return tool
+
+        def call_with_timeout(arguments):
+            future = submit_with_context(self._get_executor(), tool, arguments)
+            try:
+                return future.result(timeout=timeout)
+            except concurrent.futures.TimeoutError:
+                LOG.warning(f'Tool [{name}] timed out after {timeout}s')
+                return f'Tool [{name}] timed out after {timeout}s.'
+        return call_with_timeout
+
+    def _get_executor(self) -> concurrent.futures.ThreadPoolExecutor:
+        # a timed-out call keeps running in the background, so it runs on a pool of its own
+        with self._lock:
+            if self._executor is None:
+                self._executor = lazyllm.ThreadPoolExecutor(max_workers=_MAX_TOOL_WORKERS)
+            return self._executor
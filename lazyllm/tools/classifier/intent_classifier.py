@@ -1,8 +1,13 @@
 from lazyllm.module import ModuleBase
 from lazyllm.components import AlpacaPrompter
-from lazyllm import pipeline, globals, switch
+from lazyllm import pipeline, globals, switch, LOG
+from lazyllm.common import reset_on_pickle
+from lazyllm.thirdparty import numpy as np
 from lazyllm.tools.utils import chat_history_to_str
-from typing import Dict, Union, Any, List, Optional
+from lazyllm.tools.rag.embed_wrapper import _EmbedWrapper
+from typing import Callable, Dict, Union, Any, List, Optional, Tuple
+from collections import OrderedDict
+import threading
 import json
 
 
@@ -60,15 +65,62 @@ Assistant:  查看天气
 输入文本如下:
 '''  # noqa E501
 
-
+_DEFAULT_DECISION_CACHE_SIZE = 1024
+
+
+@reset_on_pickle(('_lock', threading.Lock))
+class _NearestCentroid(object):
+    # Keeps the sum of the normalized embeddings of every intent; the cosine similarity between an input and the
+    # direction of that sum is the confidence of the intent. Arrays are replaced rather than updated in place, so
+    # predictions never take the lock.
+    def __init__(self):
+        self._labels: List[str] = []
+        self._sums = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(vec) -> 'np.ndarray':
+        vec = np.asarray(vec, dtype='float32').reshape(-1)
+        norm = float(np.linalg.norm(vec))
+        return vec / norm if norm > 0 else vec
+
+    def add(self, label: str, vec: 'np.ndarray') -> None:
+        with self._lock:
+            if label not in self._labels:
+                self._labels = self._labels + [label]
+                sums = np.zeros((len(self._labels), vec.shape[0]), dtype='float32')
+                if self._sums is not None: sums[:-1] = self._sums
+            else:
+                sums = self._sums.copy()
+            sums[self._labels.index(label)] += vec
+            self._sums = sums
+
+    def predict(self, vec: 'np.ndarray') -> Tuple[Optional[str], float]:
+        labels, sums = self._labels, self._sums
+        if sums is None or len(labels) != sums.shape[0]: return None, 0.0
+        norms = np.linalg.norm(sums, axis=1)
+        scores = sums @ vec / np.where(norms > 0, norms, 1)
+        best = int(np.argmax(scores))
+        return labels[best], float(scores[best])
+
+
+@reset_on_pickle(('_cache_lock', threading.Lock), ('_router_lock', threading.Lock), ('_router', None))
 class IntentClassifier(ModuleBase):
     def __init__(self, llm, intent_list: list = None,
                  *, prompt: str = '', constrain: str = '', attention: str = '',
-                 examples: Optional[list[list[str, str]]] = None, return_trace: bool = False) -> None:
+                 examples: Optional[list[list[str, str]]] = None, return_trace: bool = False,
+                 embed: Optional[Callable] = None, threshold: float = 0.8, cache_size: Optional[int] = None,
+                 online_learning: bool = True) -> None:
         super().__init__(return_trace=return_trace)
         self._intent_list = intent_list or []
         self._llm = llm
         self._prompt, self._constrain, self._attention, self._examples = prompt, constrain, attention, examples or []
+        self._embed, self._threshold, self._online_learning = embed, threshold, online_learning
+        self._embed_fn = _EmbedWrapper(embed) if embed else None
+        self._cache_size = (_DEFAULT_DECISION_CACHE_SIZE if embed else 0) if cache_size is None else cache_size
+        self._cache: 'OrderedDict[str, str]' = OrderedDict()
+        self._cache_lock, self._router_lock = threading.Lock(), threading.Lock()
+        self._router: Optional[_NearestCentroid] = None
         if self._intent_list:
             self._init()
 
@@ -90,7 +142,8 @@ class IntentClassifier(ModuleBase):
             '{user_constrains}', f' {self._constrain}').replace('{user_examples}', f' {examples}')
         self._llm = self._llm.share(prompt=AlpacaPrompter(dict(system=prompt, user='${input}')
                                                           ).pre_hook(self.intent_promt_hook)).used_by(self._module_id)
-        self._impl = pipeline(self._llm, self.post_process_result)
+        self._impl = pipeline(self._classify) if self._embed or self._cache_size else pipeline(
+            self._llm, self.post_process_result)
 
     def intent_promt_hook(
         self,
@@ -114,6 +167,55 @@ class IntentClassifier(ModuleBase):
         input = input.strip()
         return input if input in self._intent_list else self._intent_list[0]
 
+    def _get_router(self) -> _NearestCentroid:
+        if self._router is None:
+            with self._router_lock:
+                if self._router is None:
+                    # every intent is anchored by its own name, then refined by the provided examples
+                    router = _NearestCentroid()
+                    for text, label in [(intent, intent) for intent in self._intent_list] + list(self._examples):
+                        if label in self._intent_list: router.add(label, self._embed_text(text))
+                    self._router = router
+        return self._router
+
+    def _embed_text(self, text: str) -> 'np.ndarray':
+        return _NearestCentroid.normalize(self._embed_fn(text))
+
+    def predict(self, input: str) -> Tuple[Optional[str], float]:
+        if self._embed is None: raise RuntimeError('predict requires an `embed` model')
+        return self._get_router().predict(self._embed_text(input))
+
+    def _cache_get(self, input: str) -> Optional[str]:
+        with self._cache_lock:
+            if (intent := self._cache.get(input)) is not None: self._cache.move_to_end(input)
+            return intent
+
+    def _cache_put(self, input: str, intent: str) -> None:
+        with self._cache_lock:
+            self._cache[input] = intent
+            self._cache.move_to_end(input)
+            while len(self._cache) > self._cache_size: self._cache.popitem(last=False)
+
+    def _classify(self, input: str) -> str:
+        # decisions made with chat history depend on more than the input, so they are never cached
+        cacheable = self._cache_size > 0 and isinstance(input, str) and not globals['chat_history'].get(
+            self._llm._module_id)
+        if cacheable and (intent := self._cache_get(input)) is not None: return intent
+        intent, vec = None, None
+        if self._embed and isinstance(input, str):
+            vec = self._embed_text(input)
+            label, confidence = self._get_router().predict(vec)
+            LOG.debug(f'IntentClassifier embedding stage: {label} ({confidence:.3f})')
+            if label is not None and confidence >= self._threshold: intent = label
+        if intent is None:
+            answer = self._llm(input)
+            intent = self.post_process_result(answer)
+            # learn from the llm only when it gave a valid intent, not from the fallback to the first one
+            if vec is not None and self._online_learning and answer.strip() == intent:
+                self._get_router().add(intent, vec)
+        if cacheable: self._cache_put(input, intent)
+        return intent
+
     def forward(self, input: str, llm_chat_history: List[Dict[str, Any]] = None):
         if llm_chat_history is not None and self._llm._module_id not in globals['chat_history']:
             globals['chat_history'][self._llm._module_id] = llm_chat_history
@@ -1,41 +1,161 @@
 import os
 import abc
 import json
+import time
+import random
+import hashlib
 import threading
 from tqdm import tqdm
 from datetime import datetime
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
 
 import lazyllm
 from lazyllm.module import ModuleBase
+from lazyllm.module.module import ModuleCache, CacheNotFoundError
 from lazyllm import warp
 
 
 lazyllm.config.add('eval_result_dir', str, os.path.join(os.path.expanduser(lazyllm.config['home']), 'eval_res'),
                    'EVAL_RESULT_DIR', description='The default result directory for eval.')
+lazyllm.config.add('eval_cache_strategy', str, 'sqlite', 'EVAL_CACHE_STRATEGY',
+                   description='The cache strategy of per-sample eval results(memory, file, sqlite, redis).')
+
+_eval_caches: Dict[tuple, ModuleCache] = {}
+_eval_caches_lock = threading.Lock()
+
+def _get_eval_cache() -> ModuleCache:
+    key = (lazyllm.config['eval_cache_strategy'], lazyllm.config['cache_dir'])
+    with _eval_caches_lock:
+        if key not in _eval_caches: _eval_caches[key] = ModuleCache(key[0])
+        return _eval_caches[key]
+
+
+class _UnidentifiedModel(Exception): pass
+
+
+class _AdaptiveLimiter(object):
+    # AIMD limit on the calls in flight: a failure (usually a rate limit) halves it, every success
+    # adds back 1/limit, so the limit grows by one per round of successful calls, up to `concurrency`
+    def __init__(self, concurrency: int):
+        self._max = self._limit = float(max(1, concurrency))
+        self._inflight = 0
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @contextmanager
+    def __call__(self):
+        with self._cond:
+            self._cond.wait_for(lambda: self._inflight < int(self._limit))
+            self._inflight += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._inflight -= 1
+                self._cond.notify_all()
+
+    def feedback(self, success: bool) -> None:
+        with self._cond:
+            self._limit = min(self._max, self._limit + 1 / self._limit) if success else max(1.0, self._limit / 2)
+            self._cond.notify_all()
+
 
 class BaseEvaluator(ModuleBase):
-    def __init__(self, concurrency=1, retry=3, log_base_name=None):
+    def __init__(self, concurrency=1, retry=3, log_base_name=None, *, cache: bool = False,
+                 checkpoint: Optional[str] = None, backoff: float = 1.0, max_backoff: float = 60.0):
         super().__init__()
+        if cache and type(self)._metric_config is BaseEvaluator._metric_config:
+            # the cache key is the class name plus `_metric_config`, without it a changed model or prompt would
+            # keep being scored with the results of the old one
+            raise ValueError(f'{type(self).__name__} must override `_metric_config` to cache its results')
         self._concurrency = concurrency
         self._retry = retry
         self._lock = threading.Lock()
         self._warp = warp(self.process_one_data, _concurrent=self._concurrency)
         self._necessary_keys = []
+        self._cache = cache
+        self._checkpoint = checkpoint
+        self._backoff, self._max_backoff = backoff, max_backoff
+        self._limiter = _AdaptiveLimiter(concurrency)
+        self._local = threading.local()
 
     def _execute_with_retries(self, input_data, func, result_validator=None, post_processor=None):
         for attempt in range(1, self._retry + 1):
             try:
-                result = func(input_data)
+                with self._limiter():
+                    result = func(input_data)
+                self._limiter.feedback(True)
                 if post_processor is not None:
                     result = post_processor(result)
                 if result_validator is None or result_validator(result):
                     return result
                 lazyllm.LOG.warning(f'Validation failed on attempt {attempt}/{self._retry}')
             except Exception as e:
+                self._limiter.feedback(False)
                 lazyllm.LOG.error(f'Attempt {attempt}/{self._retry} failed: {str(e)}')
+                if attempt < self._retry:
+                    # full jitter keeps the workers that failed together from retrying together
+                    time.sleep(random.uniform(0, min(self._max_backoff, self._backoff * 2 ** (attempt - 1))))
         lazyllm.LOG.error(f'All {self._retry} attempts exhausted')
+        # a sample scored from an exhausted call is neither cached nor checkpointed, so a rerun tries it again
+        self._local.failed = True
         return ''
 
+    def _metric_config(self) -> Dict[str, Any]:
+        # settings that change the result of a sample, e.g. prompts, thresholds and the models called
+        return {}
+
+    @staticmethod
+    def _describe_model(model) -> Optional[str]:
+        # what a result depends on: the source and model name of an online module, the weights of a local one
+        if model is None: return None
+        identity = []
+        for attr in ('series', 'base_model', 'finetuned_model_path', '_model_name', '_embed_model_name'):
+            try:
+                value = getattr(model, attr, None)
+            except Exception:
+                value = None
+            if isinstance(value, str) and value: identity.append(f'{attr.lstrip("_")}={value}')
+        if all(item.startswith('series=') for item in identity): raise _UnidentifiedModel(type(model).__name__)
+        return f'{type(model).__name__}:{",".join(identity)}'
+
+    @property
+    def _metric_key(self) -> Optional[str]:
+        # None when a model the metric calls cannot be identified, its results are then neither cached nor resumed
+        try:
+            config = json.dumps(self._metric_config(), sort_keys=True, ensure_ascii=False, default=str)
+        except _UnidentifiedModel:
+            return None
+        return f'{self.__class__.__name__}@{hashlib.md5(config.encode()).hexdigest()}'
+
+    @staticmethod
+    def _sample_key(data) -> str:
+        return hashlib.md5(json.dumps(data, sort_keys=True, ensure_ascii=False, default=str).encode()).hexdigest()
+
+    def _checkpoint_path(self, metric_key: Optional[str], keys: List[str]) -> Optional[str]:
+        if self._checkpoint: return self._checkpoint
+        if metric_key is None: return None
+        dataset = hashlib.md5(''.join(keys).encode()).hexdigest()
+        return os.path.join(lazyllm.config['eval_result_dir'], 'checkpoints',
+                            f'{metric_key.replace("@", "_")}_{dataset}.jsonl')
+
+    @staticmethod
+    def _load_checkpoint(path: str) -> Dict[str, Any]:
+        done = {}
+        if not os.path.exists(path): return done
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    done[record['key']] = record['result']
+                except (ValueError, KeyError):
+                    pass  # a line torn by a crash is recomputed
+        return done
+
     def forward(self, data):
         if not data:
             lazyllm.LOG.warning('Empty input data received')
@@ -50,13 +170,40 @@ class BaseEvaluator(ModuleBase):
         total_score = sum(item.get('final_score', 0) for item in results)
         return total_score / len(results)
 
-    def process_one_data(self, data, progress_bar=None):
-        res = self._process_one_data_impl(data)
+    def process_one_data(self, data, progress_bar=None, checkpoint=None):
+        key = self._sample_key(data)
+        res = self._get_cached_result(key)
+        if res is None:
+            self._local.failed = False
+            res = self._process_one_data_impl(data)
+            if not self._local.failed:
+                self._set_cached_result(key, res)
+                self._append_checkpoint(checkpoint, key, res)
+        else:
+            self._append_checkpoint(checkpoint, key, res)
         if progress_bar is not None:
             with self._lock:
                 progress_bar.update(1)
         return res
 
+    def _get_cached_result(self, key: str):
+        if not self._cache or (metric_key := self._metric_key) is None: return None
+        try:
+            return _get_eval_cache().get(metric_key, (key,), {})
+        except CacheNotFoundError:
+            return None
+
+    def _set_cached_result(self, key: str, res) -> None:
+        if self._cache and (metric_key := self._metric_key) is not None:
+            _get_eval_cache().set(metric_key, (key,), {}, res)
+
+    def _append_checkpoint(self, checkpoint, key: str, res) -> None:
+        if checkpoint is None: return
+        line = json.dumps({'key': key, 'result': res}, ensure_ascii=False, default=str)
+        with self._lock:
+            checkpoint.write(line + '\n')
+            checkpoint.flush()
+
     @abc.abstractmethod
     def _process_one_data_impl(self, data):
         pass
@@ -74,9 +221,29 @@ class BaseEvaluator(ModuleBase):
                     f'keys: {self._necessary_keys}, but cannot find: {missing_keys}')
 
     def batch_process(self, data, progress_bar):
+        # results are appended to a checkpoint as they finish; samples found there are not evaluated again,
+        # and the checkpoint is removed once the results are saved unless it was given explicitly
         self.validate_inputs_key(data)
-        results = self._warp(data, progress_bar=progress_bar)
-        self.save_res(results)
+        keys = [self._sample_key(item) for item in data]
+        path = self._checkpoint_path(metric_key := self._metric_key, keys)
+        if metric_key is None:
+            lazyllm.LOG.warning(f'{self.__class__.__name__} calls a model that cannot be identified, '
+                                'its results are neither cached nor resumed')
+        if path is None:
+            results = self._warp(data, progress_bar=progress_bar)
+            self.save_res(results)
+            return results
+        done = self._load_checkpoint(path)
+        todo = [item for item, key in zip(data, keys) if key not in done]
+        if len(todo) < len(data):
+            lazyllm.LOG.info(f'Resume {len(data) - len(todo)} evaluated samples from {path}')
+            progress_bar.update(len(data) - len(todo))
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'a', encoding='utf-8') as checkpoint:
+            new_results = iter(self._warp(todo, progress_bar=progress_bar, checkpoint=checkpoint) if todo else [])
+        results = [done[key] if key in done else next(new_results) for key in keys]
+        if self.save_res(results) and not self._checkpoint:
+            os.remove(path)
         return results
 
     def save_res(self, data, eval_res_save_name=None):
@@ -89,5 +256,7 @@ class BaseEvaluator(ModuleBase):
         try:
             with open(save_path, 'w') as file:
                 json.dump(data, file, ensure_ascii=False, indent=4)
+            return True
         except Exception as e:
             lazyllm.LOG.error(f'Dump Json error: {e}')
+            return False
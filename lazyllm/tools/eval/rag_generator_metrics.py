@@ -14,17 +14,22 @@ class ResponseRelevancy(BaseEvaluator):
     _default_generate_prompt_zh = ('请根据输入生成最可能的一个问题，保持简洁明了。')
 
     def __init__(self, llm, embedding, prompt=None, prompt_lang='en',
-                 num_infer_questions=3, retry=3, concurrency=1):
-        super().__init__(concurrency, retry)
+                 num_infer_questions=3, retry=3, concurrency=1, **kwargs):
+        super().__init__(concurrency, retry, **kwargs)
         if prompt_lang.strip().lower() == 'zh':
             default_prompt = self._default_generate_prompt_zh
         else:
             default_prompt = self._default_generate_prompt_en
-        self._llm = llm.prompt(prompt or default_prompt)
+        self._prompt = prompt or default_prompt
+        self._llm = llm.prompt(self._prompt)
         self._embedding = embedding
         self._num_infer_questions = num_infer_questions
         self._necessary_keys = ['question', 'answer']
 
+    def _metric_config(self):
+        return dict(prompt=self._prompt, llm=self._describe_model(self._llm),
+                    embedding=self._describe_model(self._embedding), num_infer_questions=self._num_infer_questions)
+
     def _cosine(self, x, y):
         product = np.dot(x, y)
         norm = np.linalg.norm(x) * np.linalg.norm(y)
@@ -134,8 +139,9 @@ class Faithfulness(BaseEvaluator):
         '{"statement": "叶绿素将水和CO2转化为葡萄糖。","score": 0}]\n'
     )
 
-    def __init__(self, llm, generate_prompt=None, eval_prompt=None, prompt_lang='en', retry=3, concurrency=1):
-        super().__init__(concurrency, retry)
+    def __init__(self, llm, generate_prompt=None, eval_prompt=None, prompt_lang='en', retry=3, concurrency=1,
+                 **kwargs):
+        super().__init__(concurrency, retry, **kwargs)
         self._base_llm = llm
         if prompt_lang == 'zh':
             default_generate_prompt = generate_prompt or self._default_generate_prompt_zh
@@ -143,9 +149,13 @@ class Faithfulness(BaseEvaluator):
         else:
             default_generate_prompt = generate_prompt or self._default_generate_prompt_en
             default_eval_prompt = eval_prompt or self._default_eval_prompt_en
+        self._prompts = (default_generate_prompt, default_eval_prompt)
         self._build_llms(self._base_llm, default_generate_prompt, default_eval_prompt)
         self._necessary_keys = ['question', 'answer', 'context']
 
+    def _metric_config(self):
+        return dict(prompts=self._prompts, llm=self._describe_model(self._base_llm))
+
     def _build_llms(self, base_llm, generate_prompt, eval_prompt):
         self._gene_llm = base_llm.share(prompt=generate_prompt)
         self._eval_llm = base_llm.share(prompt=eval_prompt).formatter(JsonFormatter())
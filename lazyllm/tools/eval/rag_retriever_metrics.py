@@ -50,15 +50,19 @@ class LLMContextRecall(BaseEvaluator):
         ' {"statement": "光合作用发生在叶绿体中，并利用阳光产生 ATP。", "reason": "给定上下文中存在确切的句子", "score": 1}]\n'
     )
 
-    def __init__(self, llm, eval_prompt=None, prompt_lang='en', retry=3, concurrency=1):
-        super().__init__(concurrency, retry)
+    def __init__(self, llm, eval_prompt=None, prompt_lang='en', retry=3, concurrency=1, **kwargs):
+        super().__init__(concurrency, retry, **kwargs)
         if prompt_lang == 'zh':
             default_eval_prompt = eval_prompt or self._default_eval_prompt_zh
         else:
             default_eval_prompt = eval_prompt or self._default_eval_prompt_en
+        self._prompt = default_eval_prompt
         self._llm = llm.prompt(default_eval_prompt).formatter(JsonFormatter()) if llm else None
         self._necessary_keys = ['question', 'answer', 'context_retrieved']
 
+    def _metric_config(self):
+        return dict(prompt=self._prompt, llm=self._describe_model(self._llm))
+
     def _validate_eval_result(self, result):
         return (
             isinstance(result, list)
@@ -84,12 +88,15 @@ class LLMContextRecall(BaseEvaluator):
         return res
 
 class NonLLMContextRecall(BaseEvaluator):
-    def __init__(self, th=0.5, binary=True, retry=3, concurrency=1):
-        super().__init__(concurrency, retry)
+    def __init__(self, th=0.5, binary=True, retry=3, concurrency=1, **kwargs):
+        super().__init__(concurrency, retry, **kwargs)
         self._binary = binary
         self._threshold = th
         self._necessary_keys = ['context_retrieved', 'context_reference']
 
+    def _metric_config(self):
+        return dict(th=self._threshold, binary=self._binary)
+
     def _calc_levenshtein_distance(self, reference, context):
         return 1 - rapidfuzz.distance.Levenshtein.normalized_distance(reference, context)
 
@@ -122,11 +129,14 @@ class NonLLMContextRecall(BaseEvaluator):
         return res
 
 class ContextRelevance(BaseEvaluator):
-    def __init__(self, splitter='。', retry=3, concurrency=1):
-        super().__init__(concurrency, retry)
+    def __init__(self, splitter='。', retry=3, concurrency=1, **kwargs):
+        super().__init__(concurrency, retry, **kwargs)
         self._splitter = splitter
         self._necessary_keys = ['context_retrieved', 'context_reference']
 
+    def _metric_config(self):
+        return dict(splitter=self._splitter)
+
     def _calc_context_relevance(self, data):
         sentences_retrieved, sentences_reference = data['context'], data['reference']
         scores = [0] * len(sentences_retrieved)
@@ -1,15 +1,79 @@
+import time
+import asyncio
+import weakref
 import importlib.util
 
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 from urllib.parse import urlparse
 from contextlib import asynccontextmanager
+from lazyllm import LOG, reset_on_pickle
 from lazyllm.thirdparty import mcp
 
-from .utils import patch_sync
+from .utils import background_loop, run_in_background_loop, await_in_background_loop
 from .tool_adaptor import generate_lazyllm_tool
 from .deploy import SseServerSettings, start_sse_server
 
+# sessions idle for longer than this are pinged before being reused
+_HEALTH_CHECK_INTERVAL = 30
+_clients = weakref.WeakSet()
 
+
+class _MCPSession(object):
+    # One long-lived MCP session. The transport context managers are entered and exited by a dedicated task on the
+    # background loop (anyio requires both to happen in the same task); calls from other tasks share the session.
+    def __init__(self, open_session: Callable):
+        self._open_session = open_session
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._error: Optional[Exception] = None
+        self.session = None
+        self.inflight = 0
+        self.last_used = time.monotonic()
+
+    @property
+    def alive(self) -> bool:
+        return self.session is not None and self._task is not None and not self._task.done()
+
+    async def _serve(self):
+        try:
+            async with self._open_session() as session:
+                self.session = session
+                self._ready.set()
+                await self._closing.wait()
+        except Exception as e:
+            self._error = e
+        finally:
+            self.session = None
+
+    async def start(self, timeout: Optional[float] = None):
+        self._task = asyncio.ensure_future(self._serve())
+        ready = asyncio.ensure_future(self._ready.wait())
+        await asyncio.wait([ready, self._task], timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        if not self._ready.is_set():
+            ready.cancel()
+            await self.close()
+            raise self._error or TimeoutError(f'MCP session is not ready after {timeout}s')
+
+    async def ping(self, timeout: Optional[float] = None) -> bool:
+        if not self.alive: return False
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout)
+            self.last_used = time.monotonic()
+            return True
+        except Exception:
+            return False
+
+    async def close(self, timeout: float = 5):
+        self._closing.set()
+        if self._task is None or self._task.done(): return
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout)
+        except Exception:
+            self._task.cancel()
+
+
+@reset_on_pickle(('_sessions', list), ('_pool_lock', None), ('_tools_cache', None))
 class MCPClient(object):
     def __init__(
         self,
@@ -18,12 +82,22 @@ class MCPClient(object):
         env: dict[str, str] = None,
         headers: dict[str, Any] = None,
         timeout: float = 5,
+        pool_size: int = 4,
+        persistent: bool = True,
     ):
         self._command_or_url = command_or_url
         self._args = args or []
         self._env = env
         self._headers = headers
         self._timeout = timeout
+        self._is_remote = urlparse(command_or_url).scheme in ('http', 'https')
+        # a stdio server is a single subprocess, concurrent calls are multiplexed over one session
+        self._pool_size = max(1, pool_size) if self._is_remote else 1
+        self._persistent = persistent
+        self._sessions: list[_MCPSession] = []
+        self._pool_lock: Optional[asyncio.Lock] = None
+        self._tools_cache = None
+        _clients.add(self)
 
     @asynccontextmanager
     async def _run_session(self):
@@ -55,13 +129,62 @@ class MCPClient(object):
                     await session.initialize()
                     yield session
 
+    async def _acquire(self) -> _MCPSession:
+        if self._pool_lock is None: self._pool_lock = asyncio.Lock()
+        async with self._pool_lock:
+            self._sessions = [s for s in self._sessions if s.alive]
+            holder = min(self._sessions, key=lambda s: s.inflight, default=None)
+            if holder and holder.inflight == 0 and time.monotonic() - holder.last_used > _HEALTH_CHECK_INTERVAL \
+                    and not await holder.ping(self._timeout):
+                await self._discard(holder)
+                holder = None
+            if holder is None or (holder.inflight > 0 and len(self._sessions) < self._pool_size):
+                holder = _MCPSession(self._run_session)
+                await holder.start(self._timeout if self._is_remote else None)
+                self._sessions.append(holder)
+            holder.inflight += 1
+            return holder
+
+    async def _discard(self, holder: _MCPSession):
+        if holder in self._sessions: self._sessions.remove(holder)
+        await holder.close()
+
+    async def _call_in_session(self, func: Callable):
+        if not self._persistent:
+            async with self._run_session() as session:
+                return await func(session)
+        for attempt in range(2):
+            holder = await self._acquire()
+            try:
+                return await func(holder.session)
+            except Exception as e:
+                # only retry when the transport itself is gone, errors reported by a live server are raised as is
+                if attempt or await holder.ping(self._timeout): raise
+                LOG.warning(f'MCP session to `{self._command_or_url}` is broken ({e!r}), reconnecting')
+                await self._discard(holder)
+            finally:
+                holder.inflight -= 1
+                holder.last_used = time.monotonic()
+
+    async def _close_sessions(self):
+        sessions, self._sessions = self._sessions, []
+        for holder in sessions: await holder.close()
+
     async def call_tool(self, tool_name: str, arguments: dict):
-        async with self._run_session() as session:
-            return await session.call_tool(tool_name, arguments)
+        return await await_in_background_loop(self._call_in_session,
+                                              lambda session: session.call_tool(tool_name, arguments))
 
-    async def list_tools(self):
-        async with self._run_session() as session:
-            return await session.list_tools()
+    async def list_tools(self, refresh: bool = False):
+        if self._tools_cache is None or refresh:
+            self._tools_cache = await await_in_background_loop(self._call_in_session,
+                                                               lambda session: session.list_tools())
+        return self._tools_cache
+
+    async def aclose(self):
+        await await_in_background_loop(self._close_sessions)
+
+    def close(self):
+        if self._sessions: run_in_background_loop(self._close_sessions)
 
     async def aget_tools(self, allowed_tools: list[str] = None):
         res = await self.list_tools()
@@ -72,8 +195,14 @@ class MCPClient(object):
         return [generate_lazyllm_tool(self, tool) for tool in mcp_tools]
 
     def get_tools(self, allowed_tools: list[str] = None):
-        return patch_sync(self.aget_tools)(allowed_tools=allowed_tools)
+        return run_in_background_loop(self.aget_tools, allowed_tools=allowed_tools)
 
     async def deploy(self, sse_settings: SseServerSettings):
         async with self._run_session() as session:
             await start_sse_server(session, sse_settings)
+
+
+async def _close_all_clients():
+    for client in list(_clients): await client._close_sessions()
+
+background_loop.add_shutdown_hook(_close_all_clients)
@@ -1,11 +1,10 @@
 import inspect
-import asyncio
 
 from typing import Any, Callable, Dict, List, Set
 from lazyllm import LOG
 from lazyllm.thirdparty import mcp
 
-from .utils import run_async_in_new_loop, run_async_in_thread
+from .utils import run_in_background_loop
 
 type_mapping = {
     'string': ('str', str),
@@ -94,15 +93,8 @@ def generate_lazyllm_tool(client, mcp_tool) -> Callable:
             LOG.warning(f'Missing required parameters: {missing_params}')
             return f'Missing required parameters: {missing_params}'
         try:
-            try:
-                loop = asyncio.get_running_loop()
-            except RuntimeError:
-                loop = None
-
-            if loop and loop.is_running():
-                result = run_async_in_thread(client.call_tool, tool_name, kwargs)
-            else:
-                result = run_async_in_new_loop(client.call_tool, tool_name, kwargs)
+            # the client keeps its sessions on a shared background loop, no event loop is created per call
+            result = run_in_background_loop(client.call_tool, tool_name, kwargs)
         except Exception as e:
             LOG.error(f'Failed to call MCP tool "{tool_name}": {e!s}')
             return f'Failed to call MCP tool "{tool_name}": {e!s}'
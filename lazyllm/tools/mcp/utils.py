@@ -1,7 +1,8 @@
+import atexit
 import asyncio
 import threading
 from functools import wraps
-from typing import Any, Callable
+from typing import Any, Callable, Optional
 
 
 def run_async_in_new_loop(func_async: Callable, *args: Any, **kwargs: Any) -> Any:
@@ -47,3 +48,58 @@ def patch_sync(func_async: Callable) -> Callable:
             return run_async_in_new_loop(func_async, *args, **kwargs)
 
     return patched_sync
+
+
+class _BackgroundLoop(object):
+    # A process-wide event loop living in a daemon thread. Long-lived MCP sessions are bound to the loop they were
+    # opened on, so every session is owned by this loop and callers from other threads/loops submit work to it.
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._shutdown_hooks = []
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    self._thread = threading.Thread(target=loop.run_forever, name='lazyllm-mcp-loop', daemon=True)
+                    self._thread.start()
+                    self._loop = loop
+                    atexit.register(self.shutdown)
+        return self._loop
+
+    def in_loop(self) -> bool:
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def add_shutdown_hook(self, hook: Callable) -> None:
+        self._shutdown_hooks.append(hook)
+
+    def shutdown(self, timeout: float = 5) -> None:
+        if self._loop is None: return
+        for hook in self._shutdown_hooks:
+            try:
+                asyncio.run_coroutine_threadsafe(hook(), self._loop).result(timeout)
+            except Exception:
+                pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._loop, self._thread = None, None
+
+
+background_loop = _BackgroundLoop()
+
+
+def run_in_background_loop(func_async: Callable, *args: Any, **kwargs: Any) -> Any:
+    if background_loop.in_loop():
+        raise RuntimeError('Cannot block on the MCP background loop from inside it, await the coroutine instead')
+    return asyncio.run_coroutine_threadsafe(func_async(*args, **kwargs), background_loop.loop).result()
+
+
+async def await_in_background_loop(func_async: Callable, *args: Any, **kwargs: Any) -> Any:
+    if background_loop.in_loop():
+        return await func_async(*args, **kwargs)
+    return await asyncio.wrap_future(
+        asyncio.run_coroutine_threadsafe(func_async(*args, **kwargs), background_loop.loop))
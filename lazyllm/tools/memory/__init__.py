@@ -1,3 +1,4 @@
-from .memory import Memory, memory_hook
+from .memory import Memory, memory_hook, flush_memory
+from .supplier import LocalMemory
 
-__all__ = ['Memory', 'memory_hook']
+__all__ = ['Memory', 'memory_hook', 'flush_memory', 'LocalMemory']
@@ -2,7 +2,7 @@ from abc import ABC, abstractmethod
 from lazyllm import globals
 from lazyllm.common import LazyLLMRegisterMetaABCClass
 from lazyllm import ChatPrompter
-from typing import Union, List, Dict, Any, Optional
+from typing import Union, List, Dict, Any, Optional, Tuple
 
 class LazyLLMMemoryBase(ABC, metaclass=LazyLLMRegisterMetaABCClass):
     def __init__(self, topk: int = 10):
@@ -11,9 +11,19 @@ class LazyLLMMemoryBase(ABC, metaclass=LazyLLMRegisterMetaABCClass):
     def add(self, query: str, output: Optional[str] = None,
             history: Optional[Union[List[List[str]], List[Dict[str, Any]]]] = None,
             user_id: Optional[str] = None, agent_id: Optional[str] = None):
+        self._add(self._format_messages(query, output, history), user_id, agent_id)
+
+    def add_batch(self, records: List[Dict[str, Any]]):
+        # each record holds the keyword arguments of `add`; suppliers may write a whole batch at once
+        self._add_batch([(self._format_messages(r['query'], r.get('output'), r.get('history')),
+                          r.get('user_id'), r.get('agent_id')) for r in records])
+
+    @staticmethod
+    def _format_messages(query: str, output: Optional[str] = None,
+                         history: Optional[Union[List[List[str]], List[Dict[str, Any]]]] = None):
         r = ChatPrompter(history=history, enable_system=False).generate_prompt(query, return_dict=True)['messages']
         if output: r.append(output if isinstance(output, dict) else dict(role='assistant', content=output))
-        self._add(r, user_id, agent_id)
+        return r
 
     def get(self, query: Optional[str] = None, user_id: Optional[str] = None, agent_id: Optional[str] = None):
         return self._get(query, user_id, agent_id)
@@ -21,6 +31,10 @@ class LazyLLMMemoryBase(ABC, metaclass=LazyLLMRegisterMetaABCClass):
     @abstractmethod
     def _add(self, message: List[Dict[str, Any]], user_id: Optional[str] = None, agent_id: Optional[str] = None): pass
 
+    def _add_batch(self, items: List[Tuple[List[Dict[str, Any]], Optional[str], Optional[str]]]):
+        for message, user_id, agent_id in items:
+            self._add(message, user_id, agent_id)
+
     @abstractmethod
     def _get(self, query: Optional[str] = None, user_id: Optional[str] = None, agent_id: Optional[str] = None): pass
 
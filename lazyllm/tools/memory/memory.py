@@ -1,23 +1,118 @@
-from .supplier import MemUMemory, Mem0Memory, PowerMemMemory
+import atexit
+import queue
+import threading
+from .supplier import MemUMemory, Mem0Memory, PowerMemMemory, LocalMemory
 from .base import LazyLLMMemoryBase
-from typing import Optional
+from typing import Optional, Dict, Any
 import lazyllm
+from lazyllm import LOG, config
+
+config.add('memory_source', str, '', 'MEMORY_SOURCE',
+           description='The memory supplier used when none is given (memu, mem0, powermem or local); '
+                       'when empty, the first remote supplier with an api key is used.')
+config.add('memory_write_queue_size', int, 1024, 'MEMORY_WRITE_QUEUE_SIZE',
+           description='The maximum number of memory writes buffered by memory_hook before callers block.')
+config.add('memory_write_batch_size', int, 64, 'MEMORY_WRITE_BATCH_SIZE',
+           description='The maximum number of buffered memory writes handed to a supplier at once.')
 
 
 class Memory():
     SUPPLIERS = {'memu': MemUMemory,
                  'mem0': Mem0Memory,
-                 'powermem': PowerMemMemory}
+                 'powermem': PowerMemMemory,
+                 'local': LocalMemory}
 
     def __new__(cls, source: Optional[str] = None, *args, **kwargs) -> LazyLLMMemoryBase:
+        source = source or config['memory_source'] or None
         if source is None:
+            # remote suppliers are picked by their api keys; the in-process memory is never a silent fallback, a
+            # misconfigured deployment would keep the memories of its users in a local file
             for source in Memory.SUPPLIERS.keys():
-                if lazyllm.config[f'{source}_api_key']: break
-            else: raise ValueError(f'No memory supplier found, please set LAZYLLM_{source.upper()}_API_KEY env variable')
+                # suppliers set up otherwise (e.g. powermem by a config file) are only used when chosen by name
+                if (key := f'{source}_api_key') in config.get_all_configs() and config[key]: break
+            else:
+                raise ValueError('No memory supplier found, please set the api key of a remote supplier '
+                                 '(e.g. LAZYLLM_MEM0_API_KEY), or use the in-process memory with '
+                                 "Memory('local') or LAZYLLM_MEMORY_SOURCE=local")
+        if source == 'local':
+            LOG.info('Memories are stored in-process by LocalMemory')
         return cls.SUPPLIERS[source](*args, **kwargs)
 
 
+class _MemoryWriter(object):
+    # write-behind buffer of `memory_hook`: callers only enqueue, one daemon thread drains the bounded queue and
+    # hands every memory its writes in batches. `put` blocks when the queue is full, pending writes are flushed
+    # at interpreter exit.
+    def __init__(self, maxsize: int, batch_size: int):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._batch_size = max(1, batch_size)
+        self._thread = None
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def put(self, memory: LazyLLMMemoryBase, record: Dict[str, Any]) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, daemon=True, name='lazyllm-memory-writer')
+                    self._thread.start()
+        self._queue.put((memory, record))
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            while len(items) < self._batch_size:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            batches: Dict[int, Any] = {}
+            for memory, record in items:
+                batches.setdefault(id(memory), (memory, []))[1].append(record)
+            for memory, records in batches.values():
+                try:
+                    memory.add_batch(records)
+                except Exception as e:
+                    LOG.warning(f'Failed to write {len(records)} memories to {type(memory).__name__}: {e}')
+            for _ in items:
+                self._queue.task_done()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        # wait until every write enqueued so far is handed to its memory, returns False on timeout
+        with self._queue.all_tasks_done:
+            return self._queue.all_tasks_done.wait_for(lambda: not self._queue.unfinished_tasks, timeout)
+
+    @property
+    def pending(self) -> int:
+        return self._queue.unfinished_tasks
+
+
+_writer: Optional[_MemoryWriter] = None
+_default_memory: Optional[LazyLLMMemoryBase] = None
+_init_lock = threading.Lock()
+
+def _get_writer() -> _MemoryWriter:
+    global _writer
+    if _writer is None:
+        with _init_lock:
+            if _writer is None:
+                _writer = _MemoryWriter(config['memory_write_queue_size'], config['memory_write_batch_size'])
+    return _writer
+
+def _get_default_memory() -> LazyLLMMemoryBase:
+    global _default_memory
+    if _default_memory is None:
+        with _init_lock:
+            if _default_memory is None: _default_memory = Memory()
+    return _default_memory
+
+def flush_memory(timeout: Optional[float] = None) -> bool:
+    return _writer.flush(timeout) if _writer is not None else True
+
+
 def memory_hook(query, *inputs, **kw):
-    m = Memory()
+    m = _get_default_memory()
     output = yield
-    m.add(query, output, user_id=globals.get('user_id'), agent_id=globals.get('agent_id'))
+    # session globals are read here, on the caller's thread, the write itself happens in the background
+    _get_writer().put(m, dict(query=query, output=output, user_id=lazyllm.globals.get('user_id'),
+                              agent_id=lazyllm.globals.get('agent_id')))
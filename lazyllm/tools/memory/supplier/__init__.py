@@ -1,9 +1,11 @@
 from .memu import MemUMemory  # noqa NID002
 from .mem0 import Mem0Memory  # noqa NID002
 from  .powermem import PowerMemMemory  # noqa NID002
+from .local import LocalMemory  # noqa NID002
 
 __all__ = [
     'MemUMemory',
     'Mem0Memory',
-    'PowerMemMemory'
+    'PowerMemMemory',
+    'LocalMemory',
 ]
@@ -0,0 +1,114 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from ..base import LazyLLMMemoryBase
+from lazyllm import config
+from lazyllm.thirdparty import numpy as np
+from typing import Optional, List, Dict, Any, Callable, Tuple
+
+
+_HASH_EMBED_DIM = 512
+_TOKEN_PATTERN = re.compile(r'[a-z0-9]+|[\u4e00-\u9fff]')
+
+def _hash_embed(text: str) -> List[float]:
+    # bag of words hashed into a fixed number of buckets, needs no model and stays stable across processes
+    vec = [0.0] * _HASH_EMBED_DIM
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        vec[int.from_bytes(hashlib.md5(token.encode('utf-8')).digest()[:4], 'little') % _HASH_EMBED_DIM] += 1.0
+    return vec
+
+
+class _OwnerIndex(object):
+    def __init__(self, texts: List[str], vectors: 'np.ndarray'):
+        self.texts = texts
+        self.known = set(texts)
+        self.vectors = vectors  # normalized rows, scored with one matrix product
+
+    def extend(self, texts: List[str], vectors: 'np.ndarray'):
+        self.texts.extend(texts)
+        self.known.update(texts)
+        self.vectors = np.vstack([self.vectors, vectors]) if len(self.vectors) else vectors
+
+
+class LocalMemory(LazyLLMMemoryBase):
+    def __init__(self, data_path: Optional[str] = None, *, embed: Optional[Callable[[str], List[float]]] = None,
+                 topk: int = 10):
+        super().__init__(topk=topk)
+        if data_path is None:
+            os.makedirs(os.path.join(config['home'], 'memory'), exist_ok=True)
+            data_path = os.path.join(config['home'], 'memory', 'local_memory.db')
+        self._embed = embed or _hash_embed
+        self._lock = threading.Lock()
+        self._indices: Dict[str, _OwnerIndex] = {}
+        self._conn = sqlite3.connect(data_path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS memories (id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                               'owner TEXT NOT NULL, content TEXT NOT NULL, embedding BLOB, UNIQUE(owner, content))')
+
+    @staticmethod
+    def _owner(user_id: Optional[str] = None, agent_id: Optional[str] = None) -> str:
+        return f'{user_id}___{"default" if agent_id is None else agent_id}'
+
+    def _embed_texts(self, texts: List[str]) -> 'np.ndarray':
+        vectors = np.asarray([self._embed(t) for t in texts], dtype=np.float32).reshape(len(texts), -1)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def _get_index(self, owner: str) -> _OwnerIndex:
+        # the rows of one owner are loaded once, later reads and dedup checks never touch sqlite
+        if (index := self._indices.get(owner)) is None:
+            rows = self._conn.execute('SELECT content, embedding FROM memories WHERE owner = ? ORDER BY id',
+                                      (owner,)).fetchall()
+            texts = [r[0] for r in rows]
+            vectors = [np.frombuffer(r[1], dtype=np.float32) if r[1] else None for r in rows]
+            dims = {len(v) for v in vectors if v is not None}
+            if len(dims) == 1 and all(v is not None for v in vectors):
+                vectors = np.vstack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+            else:
+                vectors = self._embed_texts(texts) if texts else np.zeros((0, 0), dtype=np.float32)
+            index = self._indices[owner] = _OwnerIndex(texts, vectors)
+        return index
+
+    def _add(self, message: List[Dict[str, Any]], user_id: Optional[str] = None, agent_id: Optional[str] = None):
+        self._add_batch([(message, user_id, agent_id)])
+
+    def _add_batch(self, items: List[Tuple[List[Dict[str, Any]], Optional[str], Optional[str]]]):
+        new_texts: Dict[str, List[str]] = {}
+        with self._lock:
+            for message, user_id, agent_id in items:
+                owner = self._owner(user_id, agent_id)
+                index, pending = self._get_index(owner), new_texts.setdefault(owner, [])
+                for msg in message:
+                    if not msg.get('content'): continue
+                    text = f'{msg.get("role", "unknown")}: {msg.get("content", "")}'
+                    # history is sent again with every turn, only unseen messages are stored
+                    if text not in index.known and text not in pending: pending.append(text)
+            rows, batches = [], []
+            for owner, texts in new_texts.items():
+                if not texts: continue
+                vectors = self._embed_texts(texts)
+                rows.extend((owner, t, v.tobytes()) for t, v in zip(texts, vectors))
+                batches.append((owner, texts, vectors))
+            if not rows: return
+            with self._conn:
+                self._conn.executemany('INSERT OR IGNORE INTO memories (owner, content, embedding) VALUES (?, ?, ?)',
+                                       rows)
+            for owner, texts, vectors in batches:
+                self._indices[owner].extend(texts, vectors)
+
+    def _get(self, query: Optional[str] = None, user_id: Optional[str] = None, agent_id: Optional[str] = None):
+        with self._lock:
+            index = self._get_index(self._owner(user_id, agent_id))
+            texts, vectors = index.texts[:], index.vectors
+        if not query or not texts: return '\n'.join(texts)
+        scores = vectors @ self._embed_texts([query])[0]
+        topk = min(self._topk, len(texts))
+        best = np.argpartition(-scores, topk - 1)[:topk]
+        return '\n'.join(texts[i] for i in sorted(best, key=lambda i: -scores[i]))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
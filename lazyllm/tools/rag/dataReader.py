@@ -3,18 +3,21 @@ The overall process of SimpleDirectoryReader is borrowed from LLAMA_INDEX, but w
 based on it, that is, allowing users to register custom rules instead of processing only based on file suffixes.
 '''
 import os
+import atexit
 import mimetypes
 import multiprocessing
 import fnmatch
+import threading
 import traceback
+import concurrent.futures
 from tqdm import tqdm
 from datetime import datetime
-from functools import reduce
+from collections import deque
 from itertools import repeat
-from typing import Dict, Optional, List, Callable, Type, Union
+from typing import Dict, Optional, List, Callable, Type, Union, Iterator, Iterable
 from pathlib import Path, PurePosixPath, PurePath
 from lazyllm.thirdparty import fsspec
-from lazyllm import ModuleBase, LOG, config
+from lazyllm import ModuleBase, LOG, config, ThreadPoolExecutor
 from lazyllm.components.formatter.formatterbase import _lazyllm_get_file_list
 from lazyllm.tools.rag.readers.readerBase import TxtReader, DefaultReader
 from .doc_node import DocNode
@@ -60,6 +63,59 @@ class _DefaultFileMetadataFunc:
 
         return {meta_key: meta_value for meta_key, meta_value in default_meta.items() if meta_value is not None}
 
+_PREFETCH_WORKERS = 4
+_worker_pools: Dict[int, 'multiprocessing.pool.Pool'] = {}
+_prefetch_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+_pools_lock = threading.Lock()
+
+
+def _get_worker_pool(num_workers: int) -> 'multiprocessing.pool.Pool':
+    # spawning interpreters is far more expensive than reading most files, so the pools outlive the calls
+    with _pools_lock:
+        if num_workers not in _worker_pools:
+            _worker_pools[num_workers] = multiprocessing.get_context('spawn').Pool(num_workers)
+        return _worker_pools[num_workers]
+
+
+def _get_prefetch_executor() -> concurrent.futures.ThreadPoolExecutor:
+    global _prefetch_executor
+    with _pools_lock:
+        if _prefetch_executor is None:
+            _prefetch_executor = ThreadPoolExecutor(max_workers=_PREFETCH_WORKERS, thread_name_prefix='lazyllm-reader')
+        return _prefetch_executor
+
+
+@atexit.register
+def _shutdown_worker_pools():
+    with _pools_lock:
+        for pool in _worker_pools.values(): pool.terminate()
+        _worker_pools.clear()
+
+
+def _submit_to_pool(pool: 'multiprocessing.pool.Pool', fn: Callable, args: tuple) -> concurrent.futures.Future:
+    future = concurrent.futures.Future()
+    pool.apply_async(fn, args, callback=future.set_result, error_callback=future.set_exception)
+    return future
+
+
+def _iter_windowed(submit: Callable[[tuple], concurrent.futures.Future], tasks: Iterable[tuple], window: int,
+                   ordered: bool) -> Iterator:
+    # at most `window` files are being read or waiting to be consumed, which bounds the memory held by results
+    pending = deque() if ordered else set()
+
+    def take():
+        if ordered: return pending.popleft().result()
+        done = next(iter(concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)[0]))
+        pending.discard(done)
+        return done.result()
+
+    for args in tasks:
+        future = submit(args)
+        pending.append(future) if ordered else pending.add(future)
+        if len(pending) >= window: yield take()
+    while pending: yield take()
+
+
 class SimpleDirectoryReader(ModuleBase):
     default_file_readers: Dict[str, Type[ReaderBase]] = {
         '*.pdf': PDFReader,
@@ -244,6 +300,38 @@ class SimpleDirectoryReader(ModuleBase):
                 doc._uid = f'{input_file!s}_index_{i}'
         return docs
 
+    def _load_tasks(self, process_file: Iterable, metadatas: Optional[List[Dict]]) -> Iterator[tuple]:
+        for input_file, metadata in zip(process_file, metadatas or repeat(None)):
+            yield (input_file, self._metadata_genf, self._file_extractor, self._encoding, self._Path, self._fs, metadata)
+
+    def _check_num_workers(self, num_workers: int) -> None:
+        if num_workers > multiprocessing.cpu_count():
+            LOG.warning('Specified num_workers exceed number of CPUs in the system. '
+                        'Setting `num_workers` down to the maximum CPU count.')
+
+    def iter_data(self, num_workers: Optional[int] = None, metadatas: Optional[List[Dict]] = None,
+                  input_dir: Optional[str] = None, input_files: Optional[List] = None,
+                  max_inflight: Optional[int] = None, ordered: bool = False) -> Iterator[List[DocNode]]:
+        metadatas = metadatas or self._metadatas
+        process_file = self._get_input_files(input_dir, input_files) if input_dir or input_files else self._input_files
+        return self._iter_files(process_file, metadatas, num_workers, max_inflight, ordered)
+
+    def _iter_files(self, process_file: Iterable, metadatas: Optional[List[Dict]], num_workers: Optional[int],
+                    max_inflight: Optional[int], ordered: bool) -> Iterator[List[DocNode]]:
+        tasks = self._load_tasks(process_file, metadatas)
+        if num_workers and num_workers >= 1:
+            self._check_num_workers(num_workers)
+            pool = _get_worker_pool(num_workers)
+            results = _iter_windowed(lambda args: _submit_to_pool(pool, SimpleDirectoryReader.load_file, args),
+                                     tasks, max_inflight or 2 * num_workers, ordered)
+        else:
+            # files are read by background threads, ahead of the consumer
+            executor = _get_prefetch_executor()
+            results = _iter_windowed(lambda args: executor.submit(SimpleDirectoryReader.load_file, *args),
+                                     tasks, max_inflight or 2, True)
+        for documents in results:
+            yield self._exclude_metadata(documents)
+
     def _load_data(self, show_progress: bool = False, num_workers: Optional[int] = None,
                    fs: Optional['fsspec.AbstractFileSystem'] = None, metadatas: Optional[Dict] = None,
                    input_dir: Optional[str] = None, input_files: Optional[List] = None) -> List[DocNode]:
@@ -251,15 +339,9 @@ class SimpleDirectoryReader(ModuleBase):
         process_file = self._get_input_files(input_dir, input_files) if input_dir or input_files else self._input_files
 
         if num_workers and num_workers >= 1:
-            if num_workers > multiprocessing.cpu_count():
-                LOG.warning('Specified num_workers exceed number of CPUs in the system. '
-                            'Setting `num_workers` down to the maximum CPU count.')
-            with multiprocessing.get_context('spawn').Pool(num_workers) as p:
-                results = p.starmap(SimpleDirectoryReader.load_file,
-                                    zip(process_file, repeat(self._metadata_genf), repeat(self._file_extractor),
-                                        repeat(self._encoding), repeat(self._Path),
-                                        repeat(self._fs), metadatas or repeat(None)))
-                documents = reduce(lambda x, y: x + y, results)
+            for docs in self._iter_files(process_file, metadatas, num_workers, None, ordered=True):
+                documents.extend(docs)
+            return documents
         else:
             if show_progress:
                 process_file = tqdm(self._input_files, desc='Loading files', unit='file')
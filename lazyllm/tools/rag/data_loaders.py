@@ -1,4 +1,4 @@
-from typing import List, Optional, Dict, Union
+from typing import Iterator, List, Optional, Dict, Union
 from lazyllm import LOG
 from lazyllm.common.common import once_wrapper
 
@@ -22,15 +22,41 @@ class DirectoryReader:
     def _lazy_init(self):
         self._reader = SimpleDirectoryReader(file_extractor={**self._global_readers, **self._local_readers})
 
+    @staticmethod
+    def _group_nodes(docs: List[DocNode], nodes: Union[List[DocNode], Dict[str, List[DocNode]]]):
+        for doc in docs:
+            doc._group = type_mapping.get(type(doc), LAZY_ROOT_NAME)
+            nodes[doc._group].append(doc) if isinstance(nodes, dict) else nodes.append(doc)
+        return nodes
+
     def load_data(self, input_files: Optional[List[str]] = None, metadatas: Optional[Dict] = None,
                   *, split_nodes_by_type: bool = False) -> List[DocNode]:
         self._lazy_init()
         input_files = input_files or self._input_files
         nodes: Union[List[DocNode], Dict[str, List[DocNode]]] = defaultdict(list) if split_nodes_by_type else []
-        for doc in self._reader(input_files=input_files, metadatas=metadatas):
-            doc._group = type_mapping.get(type(doc), LAZY_ROOT_NAME)
-            nodes[doc._group].append(doc) if split_nodes_by_type else nodes.append(doc)
+        self._group_nodes(self._reader(input_files=input_files, metadatas=metadatas), nodes)
         if not nodes:
             raise ValueError(f'No nodes load from path {input_files}, please check your data path.')
         LOG.info('DirectoryReader loads data done!')
         return nodes
+
+    def iter_data(self, input_files: Optional[List[str]] = None, metadatas: Optional[Dict] = None,
+                  *, split_nodes_by_type: bool = False, batch_nodes: int = 256, num_workers: Optional[int] = None,
+                  max_inflight: Optional[int] = None) -> Iterator[Union[List[DocNode], Dict[str, List[DocNode]]]]:
+        # yields batches of whole files (at least `batch_nodes` nodes, except the last one) while later files are
+        # still being read, so that the caller can transform and store them meanwhile
+        self._lazy_init()
+        input_files = input_files or self._input_files
+        new_batch = (lambda: defaultdict(list)) if split_nodes_by_type else list
+        batch, size, loaded = new_batch(), 0, False
+        for docs in self._reader.iter_data(num_workers, metadatas, input_files=input_files,
+                                           max_inflight=max_inflight, ordered=True):
+            self._group_nodes(docs, batch)
+            size += len(docs)
+            if size >= batch_nodes:
+                yield batch
+                batch, size, loaded = new_batch(), 0, True
+        if size: yield batch
+        elif not loaded:
+            raise ValueError(f'No nodes load from path {input_files}, please check your data path.')
+        LOG.info('DirectoryReader loads data done!')
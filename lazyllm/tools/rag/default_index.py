@@ -1,25 +1,80 @@
+import threading
+from collections import defaultdict
 from typing import List, Callable, Optional, Dict, Union, Tuple, Any
 from .doc_node import DocNode
 from .index_base import IndexBase
-from lazyllm import LOG
+from lazyllm import LOG, reset_on_pickle
 from lazyllm.common import override
-from .utils import parallel_do_embedding, generic_process_filters, is_sparse
+from .utils import parallel_do_embedding, generic_process_filters, is_sparse, _MetadataInvertedIndex
 from .similarity import registered_similarities
 
 # ---------------------------------------------------------------------------- #
 
+@reset_on_pickle(('_meta_lock', threading.Lock), ('_meta_indices', dict))
 class DefaultIndex(IndexBase):
     def __init__(self, embed: Dict[str, Callable], store, **kwargs):
         self.embed = embed
         self.store = store
+        # per-group inverted indexes over the declared global metadata; they follow the writes seen through
+        # `update`/`remove` and are rebuilt on the next filtered query once the store version moved without them
+        self._meta_indices: Dict[str, _MetadataInvertedIndex] = {}
+        self._meta_lock = threading.Lock()
 
     @override
     def update(self, nodes: List[DocNode]) -> None:
-        pass
+        group_nodes = defaultdict(list)
+        for node in nodes:
+            group_nodes[node._group].append(node)
+        for group, g_nodes in group_nodes.items():
+            self._sync_meta_index(group, lambda index, g_nodes=g_nodes: [
+                index.add(n._uid, n.global_metadata) for n in g_nodes])
 
     @override
     def remove(self, uids: List[str], group_name: Optional[str] = None) -> None:
-        pass
+        # removals by doc id carry no uids and removals over all groups only name the last one, so every
+        # group is synced and the ones that cannot be patched are dropped
+        apply = (lambda index: [index.remove(uid) for uid in uids]) if uids else None
+        for group in list(self._meta_indices.keys()):
+            self._sync_meta_index(group, apply)
+
+    def _meta_index_enabled(self) -> bool:
+        # version counters only observe writes made through this store, see `_DocumentStore.enable_cache`
+        return hasattr(self.store, 'data_version') and getattr(self.store, '_cache_enabled', False)
+
+    def _sync_meta_index(self, group: str, apply: Optional[Callable[[_MetadataInvertedIndex], Any]]) -> None:
+        with self._meta_lock:
+            index = self._meta_indices.get(group)
+            if index is None: return
+            version = self.store.data_version(group)[0] if self._meta_index_enabled() else None
+            if version is not None and version == index.version: return
+            if apply is not None and version is not None and version == index.version + 1:
+                apply(index)
+                index.version = version
+            else:
+                del self._meta_indices[group]
+
+    def _get_filtered_nodes(self, group_name: str, filters: Dict[str, List]) -> List[DocNode]:
+        uids = None
+        keys = getattr(self.store, '_global_metadata_desc', None) or {}
+        if self._meta_index_enabled() and any(key in keys for key in filters):
+            with self._meta_lock:
+                version = self.store.data_version(group_name)[0]
+                index = self._meta_indices.get(group_name)
+                if index is None or index.version != version:
+                    index = _MetadataInvertedIndex(keys, version)
+                    for segment in self.store.get_segments(group=group_name):
+                        index.add(segment['uid'], segment.get('global_meta'))
+                    self._meta_indices[group_name] = index
+                uids = index.candidates(filters)
+                # a broad filter is cheaper to serve with one scan than with a lookup of most uids
+                if uids and len(uids) * 2 > len(index): uids = None
+        if uids is None:
+            nodes = self.store.get_nodes(group=group_name)
+        elif not uids:
+            return []
+        else:
+            nodes = self.store.get_nodes_by_uids(group_name, list(uids))
+        return generic_process_filters(nodes, filters)
 
     @override
     def query(
@@ -40,9 +95,10 @@ class DefaultIndex(IndexBase):
             )
         similarity_func, mode, descend = registered_similarities[similarity_name]
 
-        nodes = self.store.get_nodes(group=group_name)
         if filters:
-            nodes = generic_process_filters(nodes, filters)
+            nodes = self._get_filtered_nodes(group_name, filters)
+        else:
+            nodes = self.store.get_nodes(group=group_name)
 
         if mode == 'embedding':
             assert self.embed, 'Chosen similarity needs embed model.'
@@ -1,6 +1,7 @@
 import json
 import threading
 import time
+import unicodedata
 from enum import Enum
 from pydantic import BaseModel
 from typing import Callable, Dict, List, Optional, Set, Union, Tuple, Any, Type
@@ -178,6 +179,8 @@ class DocImpl:
         self._resolve_index_pending_registrations()
         if self._processor:
             assert cloud and isinstance(self._processor, DocumentProcessor)
+            # writes happen in the processor service, so local read caches cannot observe them
+            self._store.enable_cache(False)
             self._processor.register_algorithm(self._algo_name, self._store, self._reader, self.node_groups,
                                                self._schema_extractor, self._display_name, self._description)
         else:
@@ -327,9 +330,8 @@ class DocImpl:
         while True:
             # Apply meta changes
             rows = self._dlm.fetch_docs_changed_meta(self._kb_group_name)
-            for row in rows:
-                new_meta_dict = json.loads(row[1]) if row[1] else {}
-                self._processor.update_doc_meta(doc_id=row[0], metadata=new_meta_dict)
+            if rows:
+                self._processor.update_docs_meta({row[0]: json.loads(row[1]) if row[1] else {} for row in rows})
 
             # Step 1: do doc-parsing, highest priority
             docs = self._dlm.get_docs_need_reparse(group=self._kb_group_name)
@@ -415,9 +417,35 @@ class DocImpl:
 
     def retrieve(self, query: str, group_name: str, similarity: str, similarity_cut_off: Union[float, Dict[str, float]],
                  index: str, topk: int, similarity_kws: dict, embed_keys: Optional[List[str]] = None,
-                 filters: Optional[Dict[str, Union[str, int, List, Set]]] = None, **kwargs) -> List[DocNode]:
+                 filters: Optional[Dict[str, Union[str, int, List, Set]]] = None, cache: bool = False,
+                 **kwargs) -> List[DocNode]:
         self._lazy_init()
+        args = (query, group_name, similarity, similarity_cut_off, index, topk, similarity_kws, embed_keys, filters)
+        key = self._retrieve_cache_key(*args, **kwargs) if cache else None
+        if key is None: return self._retrieve(*args, **kwargs)
+        kb_ids = (filters or {}).get(RAG_KB_ID)
+        kb_ids = [kb_ids] if isinstance(kb_ids, str) else (list(kb_ids) if kb_ids else None)
+        return self._store.cached_query(key, group_name, kb_ids, lambda: self._retrieve(*args, **kwargs))
 
+    @staticmethod
+    def _retrieve_cache_key(query: str, group_name: str, similarity: str,
+                            similarity_cut_off: Union[float, Dict[str, float]], index: str, topk: int,
+                            similarity_kws: dict, embed_keys: Optional[List[str]],
+                            filters: Optional[Dict[str, Union[str, int, List, Set]]], **kwargs) -> Optional[str]:
+        # queries differing only in unicode form or whitespace share a key, filter values are compared as sets;
+        # None when a parameter cannot be keyed (e.g. a callable), such queries are not cached
+        if isinstance(query, str): query = ' '.join(unicodedata.normalize('NFKC', query).split())
+        filters = {k: sorted(v, key=str) if isinstance(v, (list, set, tuple)) else v for k, v in (filters or {}).items()}
+        try:
+            return json.dumps([query, group_name, similarity, similarity_cut_off, index, topk, similarity_kws,
+                               embed_keys, filters, kwargs], sort_keys=True, ensure_ascii=False)
+        except (TypeError, ValueError):
+            return None
+
+    def _retrieve(self, query: str, group_name: str, similarity: str,
+                  similarity_cut_off: Union[float, Dict[str, float]], index: str, topk: int, similarity_kws: dict,
+                  embed_keys: Optional[List[str]] = None,
+                  filters: Optional[Dict[str, Union[str, int, List, Set]]] = None, **kwargs) -> List[DocNode]:
         if index and index != 'default':
             query_instance = self._store.get_index(type=index)
             if query_instance is None:
@@ -437,20 +465,19 @@ class DocImpl:
             n._children_loaded = False
         return nodes
 
+    def _get_full_path(self, name: str) -> List[str]:
+        path = [name]
+        while name != LAZY_ROOT_NAME:
+            name = self.node_groups[name]['parent']
+            path.append(name)
+        return list(reversed(path))
+
     def find(self, nodes: List[DocNode], group: str) -> List[DocNode]:
         if len(nodes) == 0: return nodes
         self._lazy_init()
 
-        def get_full_path(name: str) -> List[str]:
-            path = [name]
-            while name != LAZY_ROOT_NAME:
-                name = self.node_groups[name]['parent']
-                path.append(name)
-            return list(reversed(path))
-
-        cur_group = nodes[0]._group
-        path_cur = get_full_path(cur_group)
-        path_tgt = get_full_path(group)
+        path_cur = self._get_full_path(nodes[0]._group)
+        path_tgt = self._get_full_path(group)
 
         idx = 0
         for a, b in zip(path_cur, path_tgt):
@@ -460,20 +487,42 @@ class DocImpl:
                 break
         parent_path = list(reversed(path_cur[idx - 1:-1]))
         child_path = path_tgt[idx:]
-
-        for next_group in parent_path:
-            if not nodes: break
-            nodes = self.find_parent(nodes, next_group)
+        if not parent_path and not child_path: return nodes
+
+        # walk the hierarchy with uids only (one batched lookup per hop), and materialize the target group once
+        kb_id = nodes[0].global_metadata.get(RAG_KB_ID)
+        if parent_path and isinstance(nodes[0].parent, DocNode):
+            nodes = self._find_parent_with_node(nodes, parent_path[-1])
+            uids = [n._uid for n in nodes]
+        elif parent_path:
+            uids = self._resolve_parent_uids(nodes, parent_path, kb_id)
+        else:
+            uids = [n._uid for n in nodes]
 
         for next_group in child_path:
-            if not nodes: break
-            nodes = self.find_children(nodes, next_group)
+            if not uids: break
+            uids = self._resolve_child_uids(uids, next_group, kb_id)
 
-        if not nodes:
+        if uids and (child_path or not isinstance(nodes[0].parent, DocNode)):
+            nodes = self._store.get_nodes_by_uids(group, uids, kb_id=kb_id, display=True)
+        if not uids or not nodes:
             LOG.warning(f'We can not find any nodes for group `{group}`, please check your input')
             return []
         return nodes
 
+    def _resolve_parent_uids(self, nodes: List[DocNode], parent_path: List[str], kb_id: Optional[str]) -> List[str]:
+        # parent_path[0] is the group of the direct parents, the uids of parent_path[-1] are returned
+        uids = list(dict.fromkeys(n.parent for n in nodes if n.parent))
+        for cur_group in parent_path[:-1]:
+            if not uids: break
+            relations = self._store.get_parent_uids(cur_group, uids, kb_id=kb_id)
+            uids = list(dict.fromkeys(p for p in (relations.get(uid) for uid in uids) if p))
+        return uids
+
+    def _resolve_child_uids(self, uids: List[str], group: str, kb_id: Optional[str]) -> List[str]:
+        relations = self._store.get_child_uids(group, uids, kb_id=kb_id)
+        return [child for uid in uids for child in relations.get(uid, [])]
+
     def find_parent(self, nodes: List[DocNode], group: str) -> List[DocNode]:
         if isinstance(nodes[0].parent, DocNode):
             result = self._find_parent_with_node(nodes, group)
@@ -502,21 +551,19 @@ class DocImpl:
 
     def _find_parent_with_uid(self, nodes: list[DocNode], group: str):
         cur_group = nodes[0]._group
-        cur_nodes = nodes
-        while cur_group != group and cur_nodes[0].parent:
-            name = self.node_groups[cur_group]['parent']
-            parent_uids = {n.parent for n in cur_nodes}
-            kb_id = cur_nodes[0].global_metadata.get(RAG_KB_ID)
-            parents = self._store.get_nodes(group=name, kb_id=kb_id, uids=list(parent_uids), display=True)
-            if not parents: break
-            cur_group = parents[0]._group
-            cur_nodes = parents
-        return cur_nodes if cur_group == group else []
+        if cur_group == group: return nodes
+        if cur_group not in self.node_groups: return []
+        ancestors = list(reversed(self._get_full_path(cur_group)))[1:]
+        if group not in ancestors: return []
+        kb_id = nodes[0].global_metadata.get(RAG_KB_ID)
+        uids = self._resolve_parent_uids(nodes, ancestors[:ancestors.index(group) + 1], kb_id)
+        return self._store.get_nodes_by_uids(group, uids, kb_id=kb_id, display=True) if uids else []
 
     def find_children(self, nodes: List[DocNode], group: str) -> List[DocNode]:
         if not nodes: return []
         kb_id = nodes[0].global_metadata.get(RAG_KB_ID, None)
-        result = self._store.get_nodes(group=group, kb_id=kb_id, parent=[n._uid for n in nodes], display=True)
+        uids = self._resolve_child_uids([n._uid for n in nodes], group, kb_id)
+        result = self._store.get_nodes_by_uids(group, uids, kb_id=kb_id, display=True) if uids else []
         if not result:
             LOG.warning(f'We cannot find any nodes for group `{group}`, please check your input.')
         LOG.debug(f'Found children nodes for {group}: {result}')
@@ -561,39 +608,44 @@ class DocImpl:
                           merge: bool = False) -> Union[List[DocNode], DocNode]:
         if node is None:
             return []
+        return self._get_window_nodes_batch([node], span, merge)[0]
+
+    def _get_window_nodes_batch(self, nodes: List[DocNode], span: tuple[int, int] = (-5, 5),
+                                merge: bool = False) -> List[Union[List[DocNode], DocNode]]:
         self._lazy_init()
 
         if not isinstance(span, tuple) or len(span) != 2:
             raise ValueError('span must be a tuple of (start, end)')
-
-        group = node.group
-        if not group:
-            LOG.warning('Window nodes query failed: node has no group')
-            return []
-
-        doc_id = node.global_metadata.get(RAG_DOC_ID)
-        if not doc_id:
-            LOG.warning('Window nodes query failed: node has no doc id')
-            return []
-
-        kb_id = node.global_metadata.get(RAG_KB_ID, DEFAULT_KB_ID)
         start, end = span
         if start > end:
             start, end = end, start
 
-        node_number = node.number
-        numbers = set(range(node_number + start, node_number + end + 1))
-        numbers = {n for n in numbers if n > 0}
-
-        if not numbers:
-            return []
-
-        nodes = self._store.get_nodes(group=group, kb_id=kb_id, doc_ids=[doc_id], numbers=numbers)
-        nodes = sorted(nodes, key=lambda n: n.number)
-
-        if not merge:
-            return nodes
+        results: List[Union[List[DocNode], DocNode]] = [[] for _ in nodes]
+        group_windows: Dict[str, List[Tuple[int, Tuple[str, str, int, int]]]] = {}
+        for i, node in enumerate(nodes):
+            if node is None:
+                continue
+            if not node.group:
+                LOG.warning('Window nodes query failed: node has no group')
+                continue
+            doc_id = node.global_metadata.get(RAG_DOC_ID)
+            if not doc_id:
+                LOG.warning('Window nodes query failed: node has no doc id')
+                continue
+            kb_id = node.global_metadata.get(RAG_KB_ID, DEFAULT_KB_ID)
+            lo, hi = max(node.number + start, 1), node.number + end
+            if lo > hi:
+                continue
+            group_windows.setdefault(node.group, []).append((i, (kb_id, doc_id, lo, hi)))
+
+        for group, items in group_windows.items():
+            windows = self._store.get_window_nodes(group, [w for _, w in items])
+            for (i, _), window in zip(items, windows):
+                results[i] = self._merge_window_nodes(nodes[i], window) if merge else window
+        return results
 
+    @staticmethod
+    def _merge_window_nodes(node: DocNode, nodes: List[DocNode]) -> Union[List[DocNode], DocNode]:
         if any(type(n) is not DocNode for n in nodes):
             # NOTE: QADocNode, ImageDocNode is not supported merge
             LOG.warning('Merge window nodes only supports DocNode, returning list instead')
@@ -603,7 +655,7 @@ class DocImpl:
         metadata = dict(node.metadata)
         metadata.pop('lazyllm_store_num', None)
         metadata.pop('number', None)
-        merged_node = DocNode(content=merged_text, group=group, embedding=node.embedding, parent=node._parent,
+        merged_node = DocNode(content=merged_text, group=node.group, embedding=node.embedding, parent=node._parent,
                               metadata=metadata, global_metadata=dict(node.global_metadata))
         return merged_node
 
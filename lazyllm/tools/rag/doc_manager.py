@@ -2,17 +2,25 @@ import os
 import json
 import traceback
 
-from typing import List, Optional, Dict, Union
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Dict, Union, Set
 from pydantic import BaseModel, Field
 from starlette.responses import RedirectResponse
 
 import lazyllm
 from lazyllm import LOG, FastapiApp as app
 from lazyllm.thirdparty import fastapi
-from .utils import DocListManager, BaseResponse, gen_docid
+from .utils import DocListManager, BaseResponse, gen_docid, _save_file
 from .global_metadata import RAG_DOC_ID, RAG_DOC_PATH
 import uuid
 
+lazyllm.config.add('max_upload_workers', int, 8, 'MAX_UPLOAD_WORKERS',
+                   description='The max number of uploaded files DocManager writes to disk concurrently.')
+lazyllm.config.add('max_parsing_backlog', int, 100000, 'MAX_PARSING_BACKLOG',
+                   description='DocManager rejects uploads (HTTP 429) that would leave more files than this waiting '
+                               'to be parsed, 0 disables the check.')
+
 
 class DocManager(lazyllm.ModuleBase):
     def __init__(self, dlm: DocListManager) -> None:
@@ -47,12 +55,13 @@ class DocManager(lazyllm.ModuleBase):
             return f'metadata MUST not contain key `{RAG_DOC_PATH}`'
         return None
 
-    def _gen_unique_filepath(self, file_path: str) -> str:
+    def _gen_unique_filepath(self, file_path: str, reserved: Optional[Set[str]] = None) -> str:
+        # `reserved`: paths taken by earlier files of the same request, which are not in the database yet
         suffix = os.path.splitext(file_path)[1]
         prefix = file_path[0: len(file_path) - len(suffix)]
         pattern = f'{prefix}%{suffix}'
         MAX_TRIES = 10000
-        exist_paths = set(self._manager.get_existing_paths_by_pattern(pattern))
+        exist_paths = set(self._manager.get_existing_paths_by_pattern(pattern)) | (reserved or set())
         if file_path not in exist_paths:
             return file_path
         for i in range(1, MAX_TRIES):
@@ -61,6 +70,26 @@ class DocManager(lazyllm.ModuleBase):
                 return new_path
         return f'{str(uuid.uuid4())}{suffix}'
 
+    def _check_parsing_backlog(self, num_files: int):
+        if (max_backlog := lazyllm.config['max_parsing_backlog']) <= 0: return
+        backlog = self._manager.count_kb_group_files(status=DocListManager.Status.waiting)
+        if backlog + num_files > max_backlog:
+            raise fastapi.HTTPException(status_code=429, headers={'Retry-After': '30'},
+                                        detail=f'{backlog} files are waiting to be parsed, please retry later')
+
+    @staticmethod
+    def _save_files(files: List['fastapi.UploadFile'], file_paths: List[str]):
+        # files uploaded to the same path are written in order by one worker, so the last one wins
+        path_files = defaultdict(list)
+        for file, path in zip(files, file_paths): path_files[path].append(file)
+
+        def save(path: str):
+            for file in path_files[path]: _save_file(file, path)
+
+        if not path_files: return
+        with ThreadPoolExecutor(max_workers=max(1, min(lazyllm.config['max_upload_workers'], len(path_files)))) as pool:
+            list(pool.map(save, path_files))
+
     def _parse_json_param(self, value: Optional[str]):
         if value is None:
             return None
@@ -93,29 +122,37 @@ class DocManager(lazyllm.ModuleBase):
                 is_success, msg, paths_is_new = self._manager.validate_paths(file_paths)
                 if not is_success:
                     raise fastapi.HTTPException(status_code=500, detail=msg)
+            self._check_parsing_backlog(sum(paths_is_new))
             directorys = set(os.path.dirname(path) for path in file_paths)
             [os.makedirs(directory, exist_ok=True) for directory in directorys if directory]
-            ids, results = [], []
-            for i in range(len(files)):
-                file_path = file_paths[i]
-                content = files[i].file.read()
-                metadata = metadatas[i] if metadatas else None
-                if override is False:
-                    file_path = self._gen_unique_filepath(file_path)
-                with open(file_path, 'wb') as f: f.write(content)
-                msg = 'success'
-                doc_id = gen_docid(file_path)
-                if paths_is_new[i]:
-                    docs = self._manager.add_files(
-                        [file_path], metadatas=[metadata], status=DocListManager.Status.success)
-                    if not docs:
-                        msg = f'Failed: path {file_path} already exists in Database.'
+            if override is False:
+                reserved = set()
+                for i, file_path in enumerate(file_paths):
+                    file_paths[i] = self._gen_unique_filepath(file_path, reserved)
+                    reserved.add(file_paths[i])
+            self._save_files(files, file_paths)
+
+            # register the whole request at once: one batched insert for the new files, one update for the others
+            ids = [gen_docid(file_path) for file_path in file_paths]
+            new_files = [i for i in range(len(files)) if paths_is_new[i]]
+            added = set(doc.doc_id for doc in self._manager.add_files(
+                [file_paths[i] for i in new_files], metadatas=[metadatas[i] for i in new_files] if metadatas else None,
+                status=DocListManager.Status.success)) if new_files else set()
+            if (reparse_ids := [ids[i] for i in range(len(files)) if not paths_is_new[i]]):
+                self._manager.update_kb_group(cond_file_ids=reparse_ids, new_need_reparse=True)
+
+            results = []
+            for i, file_path in enumerate(file_paths):
+                if not paths_is_new[i]:
+                    results.append(f'Success: path {file_path} will be reparsed.')
+                elif ids[i] in added:
+                    added.discard(ids[i])
+                    results.append('success')
                 else:
-                    self._manager.update_kb_group(cond_file_ids=[doc_id], new_need_reparse=True)
-                    msg = f'Success: path {file_path} will be reparsed.'
-                ids.append(doc_id)
-                results.append(msg)
+                    results.append(f'Failed: path {file_path} already exists in Database.')
             return BaseResponse(data=[ids, results])
+        except fastapi.HTTPException:
+            raise
         except Exception as e:
             LOG.error(f'upload_files exception: {e}')
             raise fastapi.HTTPException(status_code=500, detail=str(e))
@@ -221,6 +258,8 @@ class DocManager(lazyllm.ModuleBase):
             ids = response.data[0]
             self._manager.add_files_to_kb_group(ids, group_name)
             return BaseResponse(data=ids)
+        except fastapi.HTTPException:
+            raise
         except Exception as e:
             raise fastapi.HTTPException(status_code=500, detail=str(e))
 
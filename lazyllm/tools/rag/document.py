@@ -402,6 +402,10 @@ class Document(ModuleBase, BuiltinGroups, metaclass=_MetaDocument):
                          merge: bool = False) -> Union[List[DocNode], DocNode]:
         return self._forward('_get_window_nodes', node, span, merge)
 
+    def get_window_nodes_batch(self, nodes: List[DocNode], span: tuple[int, int] = (-5, 5),
+                               merge: bool = False) -> List[Union[List[DocNode], DocNode]]:
+        return self._forward('_get_window_nodes_batch', nodes, span, merge)
+
     def _get_post_process_tasks(self):
         return lazyllm.pipeline(lambda *a: self._forward('_lazy_init'))
 
@@ -435,6 +439,10 @@ class UrlDocument(ModuleBase):
                          merge: bool = False) -> Union[List[DocNode], DocNode]:
         return self._forward('_get_window_nodes', node, span, merge)
 
+    def get_window_nodes_batch(self, nodes: List[DocNode], span: tuple[int, int] = (-5, 5),
+                               merge: bool = False) -> List[Union[List[DocNode], DocNode]]:
+        return self._forward('_get_window_nodes_batch', nodes, span, merge)
+
     @cached_property
     def active_node_groups(self):
         return self._forward('active_node_groups')
@@ -3,6 +3,7 @@ import json
 import inspect
 from typing import Any, Callable
 from functools import update_wrapper
+from lazyllm.components.deploy.embed import is_float32_embeddings, decode_float32_embeddings
 
 
 class _EmbedWrapper:
@@ -29,6 +30,8 @@ class _EmbedWrapper:
         return (_EmbedWrapper, (self.func,))
 
     def _normalize(self, res: Any) -> Any:
+        if is_float32_embeddings(res):
+            return decode_float32_embeddings(res)
         if isinstance(res, (bytes, bytearray, memoryview)):
             res = res.decode('utf-8', 'ignore')
         if isinstance(res, str):
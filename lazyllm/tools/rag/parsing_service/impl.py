@@ -102,24 +102,24 @@ class _Processor:
                 metadata.setdefault(RAG_DOC_PATH, path)
                 metadata.setdefault(RAG_KB_ID, kb_id or DEFAULT_KB_ID)
             kb_id = metadatas[0].get(RAG_KB_ID, DEFAULT_KB_ID) if kb_id is None else kb_id
-            root_nodes = self._reader.load_data(input_files, metadatas, split_nodes_by_type=True)
             schema_futures = []
             schema_errors: List[Exception] = []
-            if self._schema_extractor:
-                doc_to_root_nodes = defaultdict(list)
-                for n in root_nodes[LAZY_ROOT_NAME]:
-                    doc_to_root_nodes[n.global_metadata.get(RAG_DOC_ID)].append(n)
+            # batches hold whole files and arrive while later files are still being read
+            for root_nodes in self._reader.iter_data(input_files, metadatas, split_nodes_by_type=True):
+                if self._schema_extractor:
+                    doc_to_root_nodes = defaultdict(list)
+                    for n in root_nodes[LAZY_ROOT_NAME]:
+                        doc_to_root_nodes[n.global_metadata.get(RAG_DOC_ID)].append(n)
 
-                if doc_to_root_nodes:
                     for nodes in doc_to_root_nodes.values():
                         schema_futures.append(
                             self._thread_pool.submit(self._schema_extractor, nodes, algo_id=self._algo_id)
                         )
 
-            for k, v in root_nodes.items():
-                if not v: continue
-                self._store.update_nodes(self._set_nodes_number(v))
-                self._create_nodes_recursive(v, k)
+                for k, v in root_nodes.items():
+                    if not v: continue
+                    self._store.update_nodes(self._set_nodes_number(v))
+                    self._create_nodes_recursive(v, k)
 
             for future in schema_futures:
                 try:
@@ -247,6 +247,13 @@ class _Processor:
             LOG.error(f'Failed to update doc meta: {e}, {traceback.format_exc()}')
             raise e
 
+    def update_docs_meta(self, doc_metas: Dict[str, dict], kb_id: str = None):
+        try:
+            self._store.update_docs_meta(doc_metas=doc_metas, kb_id=kb_id)
+        except Exception as e:
+            LOG.error(f'Failed to update docs meta: {e}, {traceback.format_exc()}')
+            raise e
+
     def delete_doc(self, doc_ids: List[str] = None, kb_id: str = None) -> None:
         try:
             self._store.remove_nodes(kb_id=kb_id, doc_ids=doc_ids)
@@ -161,10 +161,8 @@ class DocumentProcessorWorker(ModuleBase):
             try:
                 file_infos = payload.get('file_infos')
                 kb_id = payload.get('kb_id', None)
-                for file_info in file_infos:
-                    doc_id = file_info.get('doc_id')
-                    metadata = file_info.get('metadata')
-                    processor.update_doc_meta(doc_id=doc_id, metadata=metadata, kb_id=kb_id)
+                doc_metas = {file_info.get('doc_id'): file_info.get('metadata') or {} for file_info in file_infos}
+                processor.update_docs_meta(doc_metas=doc_metas, kb_id=kb_id)
             except Exception as e:
                 LOG.error(f'[DocumentProcessorWorker._Impl] Task-{task_id}: execute update meta task failed,'
                           f'error: {e}')
@@ -1,9 +1,19 @@
 import io
+import os
+import atexit
+import hashlib
+import sqlite3
+import threading
+import time
+import tempfile
+import multiprocessing
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import List, Optional, Callable
+from typing import Dict, Iterable, List, Optional, Callable, Tuple
 from lazyllm.common import retry
 from lazyllm.thirdparty import fsspec, pypdf
-from lazyllm import LOG
+from lazyllm import LOG, config
 
 from .readerBase import get_default_fs, is_default_fs
 from ..doc_node import DocNode
@@ -11,35 +21,206 @@ from .readerBase import _RichReader
 
 RETRY_TIMES = 3
 
+config.add('pdf_page_cache_dir', str, os.path.join(os.path.expanduser(config['home']), 'cache', 'pdf_pages'),
+           'PDF_PAGE_CACHE_DIR', description='The directory of the per-page text cache of PDFReader, '
+           'an empty string disables the cache.')
+config.add('pdf_page_cache_max_bytes', int, 1 << 30, 'PDF_PAGE_CACHE_MAX_BYTES',
+           description='The approximate size of the text kept by the PDF page cache, the least recently read files '
+           'are evicted beyond it, 0 means unlimited.')
+
+_page_executors: Dict[int, concurrent.futures.ProcessPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def _get_page_executor(num_workers: int) -> concurrent.futures.ProcessPoolExecutor:
+    with _executors_lock:
+        if num_workers not in _page_executors:
+            _page_executors[num_workers] = concurrent.futures.ProcessPoolExecutor(
+                num_workers, mp_context=multiprocessing.get_context('spawn'))
+        return _page_executors[num_workers]
+
+
+def _drop_page_executor(num_workers: int, executor: concurrent.futures.ProcessPoolExecutor) -> None:
+    # a worker that dies (e.g. killed for memory) breaks the whole pool, so the next file gets a new one
+    with _executors_lock:
+        if _page_executors.get(num_workers) is executor: del _page_executors[num_workers]
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _submit_page_ranges(num_workers: int, path: str, ranges: List[Tuple[int, int]]):
+    for _ in range(2):
+        executor = _get_page_executor(num_workers)
+        try:
+            return executor, [executor.submit(_extract_page_range, path, start, end) for start, end in ranges]
+        except BrokenProcessPool:
+            _drop_page_executor(num_workers, executor)
+    return None, None
+
+
+@atexit.register
+def _shutdown_page_executors():
+    with _executors_lock:
+        for executor in _page_executors.values(): executor.shutdown(wait=False, cancel_futures=True)
+        _page_executors.clear()
+
+
+def _extract_pages(pdf: 'pypdf.PdfReader', start: int, end: int) -> List[Tuple[int, str, str]]:
+    # `page_labels` rebuilds the labels of the whole document on every access, so read it once per range
+    labels = pdf.page_labels
+    return [(page, labels[page], pdf.pages[page].extract_text()) for page in range(start, end)]
+
+
+@retry(stop_after_attempt=RETRY_TIMES)
+def _extract_page_range(path: str, start: int, end: int) -> List[Tuple[int, str, str]]:
+    return _extract_pages(pypdf.PdfReader(path), start, end)
+
+
+def _file_hash(fp) -> str:
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: fp.read(1 << 20), b''): digest.update(chunk)
+    return digest.hexdigest()
+
+
+class _PdfPageCache(object):
+    # page texts keyed by the hash of the file; `files` tracks the size and last read of every file, so the least
+    # recently read ones are evicted once `pdf_page_cache_max_bytes` is exceeded
+    def __init__(self, cache_dir: str):
+        os.makedirs(cache_dir, exist_ok=True)
+        self._path = os.path.join(cache_dir, 'pages.db')
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS pages (file_hash TEXT NOT NULL, page INTEGER NOT NULL, '
+                         'label TEXT, text TEXT NOT NULL, PRIMARY KEY (file_hash, page))')
+            conn.execute('CREATE TABLE IF NOT EXISTS files (file_hash TEXT PRIMARY KEY, nbytes INTEGER NOT NULL, '
+                         'accessed REAL NOT NULL)')
+            conn.execute('INSERT OR IGNORE INTO files SELECT file_hash, '
+                         "SUM(LENGTH(text) + LENGTH(COALESCE(label, ''))), 0 FROM pages GROUP BY file_hash")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._path, timeout=30)
+
+    def get(self, file_hash: str) -> Dict[int, Tuple[str, str]]:
+        with self._connect() as conn:
+            rows = conn.execute('SELECT page, label, text FROM pages WHERE file_hash = ?', (file_hash,)).fetchall()
+            if rows: conn.execute('UPDATE files SET accessed = ? WHERE file_hash = ?', (time.time(), file_hash))
+        return {page: (label, text) for page, label, text in rows}
+
+    def put(self, file_hash: str, pages: List[Tuple[int, str, str]]) -> None:
+        nbytes = sum(len(text) + len(label or '') for _, label, text in pages)
+        with self._connect() as conn:
+            conn.executemany('INSERT OR REPLACE INTO pages (file_hash, page, label, text) VALUES (?, ?, ?, ?)',
+                             [(file_hash, page, label, text) for page, label, text in pages])
+            conn.execute('INSERT INTO files (file_hash, nbytes, accessed) VALUES (?, ?, ?) ON CONFLICT(file_hash) '
+                         'DO UPDATE SET nbytes = nbytes + excluded.nbytes, accessed = excluded.accessed',
+                         (file_hash, nbytes, time.time()))
+            if not (max_bytes := config['pdf_page_cache_max_bytes']): return
+            total = conn.execute('SELECT COALESCE(SUM(nbytes), 0) FROM files').fetchone()[0]
+            if total <= max_bytes: return
+            for evicted, size in conn.execute('SELECT file_hash, nbytes FROM files WHERE file_hash != ? '
+                                              'ORDER BY accessed', (file_hash,)).fetchall():
+                conn.execute('DELETE FROM pages WHERE file_hash = ?', (evicted,))
+                conn.execute('DELETE FROM files WHERE file_hash = ?', (evicted,))
+                total -= size
+                if total <= max_bytes: break
+
+
+_page_caches: Dict[str, _PdfPageCache] = {}
+_caches_lock = threading.Lock()
+
+
+def _get_page_cache() -> Optional[_PdfPageCache]:
+    cache_dir = config['pdf_page_cache_dir']
+    if not cache_dir: return None
+    with _caches_lock:
+        if cache_dir not in _page_caches:
+            try:
+                _page_caches[cache_dir] = _PdfPageCache(cache_dir)
+            except (OSError, sqlite3.Error) as e:
+                LOG.warning(f'PDF page cache `{cache_dir}` is unavailable, pages will not be cached: {e}')
+                return None
+        return _page_caches[cache_dir]
+
 
 class PDFReader(_RichReader):
     def __init__(self, split_doc: bool = True,
                  post_func: Optional[Callable[[List[DocNode]], List[DocNode]]] = None,
-                 return_trace: bool = True, *, return_full_document=None) -> None:
+                 return_trace: bool = True, *, return_full_document=None, num_workers: int = 0,
+                 pages_per_task: int = 16, use_cache: bool = False) -> None:
         if return_full_document is not None:
             LOG.warning('return_full_document is deprecated, please use split_doc instead')
             assert split_doc ^ return_full_document, \
                 'split_doc and return_full_document cannot be both True or False'
             split_doc = not return_full_document
         super().__init__(post_func=post_func, split_doc=split_doc, return_trace=return_trace)
+        self._num_workers = num_workers
+        self._pages_per_task = max(1, pages_per_task)
+        self._use_cache = use_cache
 
-    @retry(stop_after_attempt=3)
-    def _load_data(self, file: Path, fs: Optional['fsspec.AbstractFileSystem'] = None) -> List[DocNode]:
-        if not isinstance(file, Path): file = Path(file)
+    def _missing_ranges(self, num_pages: int, cached: Dict[int, Tuple[str, str]]) -> List[Tuple[int, int]]:
+        ranges, start = [], None
+        for page in range(num_pages + 1):
+            if page < num_pages and page not in cached:
+                if start is None: start = page
+                if page - start + 1 < self._pages_per_task: continue
+                ranges.append((start, page + 1))
+                start = None
+            elif start is not None:
+                ranges.append((start, page))
+                start = None
+        return ranges
 
-        fs = fs or get_default_fs()
+    def _iter_pages(self, file: Path, fs: 'fsspec.AbstractFileSystem') -> Iterable[Tuple[int, str, str]]:
+        # pages are yielded in order as soon as they are available; every extracted range is persisted right away,
+        # so a retried or re-ingested document only extracts the pages that are not in the cache yet
         with fs.open(file, 'rb') as fp:
-            stream = fp if is_default_fs(fs) else io.BytesIO(fp.read())
+            data = None if is_default_fs(fs) else fp.read()
+            stream = fp if data is None else io.BytesIO(data)
+            cache = _get_page_cache() if self._use_cache else None
+            file_hash = None
+            if cache is not None:
+                file_hash = hashlib.sha256(data).hexdigest() if data is not None else _file_hash(fp)
+                stream.seek(0)
+            cached = cache.get(file_hash) if cache is not None else {}
             pdf = pypdf.PdfReader(stream)
             num_pages = len(pdf.pages)
-            docs = []
-            if self._split_doc:
-                for page in range(num_pages):
-                    page_text = pdf.pages[page].extract_text()
-                    page_label = pdf.page_labels[page]
-                    metadata = {'page_label': page_label}
-                    docs.append(DocNode(text=page_text, metadata=metadata))
-            else:
-                text = '\n'.join(pdf.pages[page].extract_text() for page in range(num_pages))
-                docs.append(DocNode(text=text))
-            return docs
+            ranges = self._missing_ranges(num_pages, cached)
+
+            executor, futures, spill = None, None, None
+            extract = retry(stop_after_attempt=RETRY_TIMES)(_extract_pages)
+            try:
+                if (self._num_workers > 1 and len(ranges) > 1
+                        and not multiprocessing.current_process().daemon):
+                    if data is not None:
+                        # workers read a local copy instead of getting the whole document pickled into every task
+                        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as spill: spill.write(data)
+                    executor, futures = _submit_page_ranges(self._num_workers, spill.name if spill else str(file),
+                                                            ranges)
+
+                page = 0
+                for i, (start, end) in enumerate(ranges):
+                    yield from ((p, *cached[p]) for p in range(page, start))
+                    pages = None
+                    if futures is not None:
+                        try:
+                            pages = futures[i].result()
+                        except BrokenProcessPool:
+                            LOG.warning(f'PDF page workers died, extract the rest of {file} in this process')
+                            _drop_page_executor(self._num_workers, executor)
+                            futures = None
+                    if pages is None: pages = extract(pdf, start, end)
+                    if cache is not None: cache.put(file_hash, pages)
+                    yield from pages
+                    page = end
+                yield from ((p, *cached[p]) for p in range(page, num_pages))
+            finally:
+                for future in futures or []: future.cancel()
+                if spill is not None: os.unlink(spill.name)
+
+    def _lazy_load_data(self, file: Path, fs: Optional['fsspec.AbstractFileSystem'] = None) -> Iterable[DocNode]:
+        if not isinstance(file, Path): file = Path(file)
+        pages = self._iter_pages(file, fs or get_default_fs())
+        if self._split_doc:
+            for _, label, text in pages:
+                yield DocNode(text=text, metadata={'page_label': label})
+        else:
+            yield DocNode(text='\n'.join(text for _, _, text in pages))
@@ -43,7 +43,8 @@ class Retriever(_RetrieverBase, _PostProcess):
                  similarity_cut_off: Union[float, Dict[str, float]] = float('-inf'), index: str = 'default',
                  topk: int = 6, embed_keys: Optional[List[str]] = None, target: Optional[str] = None,
                  output_format: Optional[str] = None, join: Union[bool, str] = False,
-                 weight: Optional[float] = None, priority: Optional[_RetrieverBase.Priority] = None, **kwargs):
+                 weight: Optional[float] = None, priority: Optional[_RetrieverBase.Priority] = None,
+                 cache: bool = False, **kwargs):
         super().__init__()
         if similarity:
             if similarity not in registered_similarities:
@@ -76,6 +77,7 @@ class Retriever(_RetrieverBase, _PostProcess):
         self._per_doc_embed_keys = False
         self._target = target
         self._weight, self._priority = weight, priority
+        self._cache = cache
         if weight or priority:
             assert not (weight and priority), f'Cannot provide weight({weight}) and priority({priority}) together!'
             assert not output_format or not join, 'shouldn\'t provide output_format/join when weight or priority is set'
@@ -133,7 +135,7 @@ class Retriever(_RetrieverBase, _PostProcess):
                  'similarity_cut_off': self._similarity_cut_off, 'index': self._index, 'topk': self._topk,
                  'similarity_kw': self._similarity_kw, 'embed_keys': self._embed_keys, 'target': self._target,
                  'output_format': self._output_format, 'join': self._join,
-                 'per_doc_embed_keys': self._per_doc_embed_keys}
+                 'per_doc_embed_keys': self._per_doc_embed_keys, 'cache': self._cache}
         docs = []
         for doc in self._docs:
             if isinstance(doc, UrlDocument):
@@ -155,6 +157,7 @@ class Retriever(_RetrieverBase, _PostProcess):
         self._similarity_kw = state['similarity_kw']
         self._embed_keys = state['embed_keys']
         self._per_doc_embed_keys = state.get('per_doc_embed_keys', False)
+        self._cache = state.get('cache', False)
         self._target = state['target']
         self._output_format = state['output_format']
         self._join = state['join']
@@ -189,6 +192,8 @@ class Retriever(_RetrieverBase, _PostProcess):
                 raise RuntimeError('Per-doc embed_keys misaligned with docs after lazy init')
         for idx, doc in enumerate(self._docs):
             embed_keys = self._embed_keys[idx] if self._per_doc_embed_keys else self._embed_keys
+            # only sent when enabled, so documents served by older versions keep accepting the call
+            if self._cache: kwargs['cache'] = True
             nodes = doc.forward(query=query, group_name=self._group_name, similarity=self._similarity,
                                 similarity_cut_off=self._similarity_cut_off, index=self._index,
                                 topk=self._topk, similarity_kws=self._similarity_kw, embed_keys=embed_keys,
@@ -1,10 +1,15 @@
 import os
+import copy
+import json
+import bisect
+import threading
 import traceback
+import concurrent.futures
 import lazyllm
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 from typing import Optional, List, Union, Set, Dict, Callable, Any, Tuple
 from pathlib import Path
-from lazyllm import LOG, once_wrapper
+from lazyllm import LOG, once_wrapper, reset_on_pickle, ThreadPoolExecutor
 
 from .store_base import (LazyLLMStoreBase, StoreCapability, SegmentType, Segment, INSERT_BATCH_SIZE,
                          BUILDIN_GLOBAL_META_DESC, DEFAULT_KB_ID)
@@ -18,7 +23,44 @@ from ..data_type import DataType
 from ..global_metadata import GlobalMetadataDesc, RAG_DOC_ID, RAG_KB_ID
 from ..similarity import registered_similarities
 
+_MAX_WINDOW_CACHE_SIZE = 1024
+_MAX_RELATION_CACHE_SIZE = 65536
+_MAX_SEGMENT_CACHE_SIZE = 4096
+_MAX_COUNT_CACHE_SIZE = 65536
+_MAX_RESULT_CACHE_SIZE = 1024
+_MAX_SEARCH_WORKERS = 8
+_MISSING = object()
 
+
+@reset_on_pickle(('_lock', threading.Lock), ('_data', OrderedDict))
+class _LRUCache(object):
+    def __init__(self, maxsize: int):
+        self._maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data: return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock: self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+@reset_on_pickle(('_version_lock', threading.Lock), ('_versions', lambda: defaultdict(int)),
+                 ('_search_executor', None), ('_executor_lock', threading.Lock))
 class _DocumentStore(object):
     def __init__(self, algo_name: str, store: Union[Dict, LazyLLMStoreBase],
                  group_embed_keys: Optional[Dict[str, Set[str]]] = None, embed: Optional[Dict[str, Callable]] = None,
@@ -32,7 +74,20 @@ class _DocumentStore(object):
         self._global_metadata_desc = (global_metadata_desc or {}) | BUILDIN_GLOBAL_META_DESC
         self._activated_groups = set()
         self._indices = {}
+        # write counters, keyed by `group` (any write), `(group, None)` (group-wide) and `(group, kb_id)`
+        self._versions: Dict[Union[str, Tuple[str, Optional[str]]], int] = defaultdict(int)
+        self._version_lock = threading.Lock()
+        self._window_cache = _LRUCache(_MAX_WINDOW_CACHE_SIZE)
+        self._relation_cache = _LRUCache(_MAX_RELATION_CACHE_SIZE)
+        self._segment_cache = _LRUCache(_MAX_SEGMENT_CACHE_SIZE)
+        self._count_cache = _LRUCache(_MAX_COUNT_CACHE_SIZE)
+        self._result_cache = _LRUCache(_MAX_RESULT_CACHE_SIZE)
+        self._search_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
         self._impl = self._prepare_store(store)
+        # only an in-memory MapStore is sure to be written through this instance alone, caching reads of any
+        # other store is left to `enable_cache`
+        self._cache_enabled = isinstance(self._impl, MapStore) and not self._impl.dir
         if self._impl.supports_index_registration:
             self._indices['default'] = DefaultIndex(self._embed, self)
 
@@ -151,7 +206,9 @@ class _DocumentStore(object):
         return group in self._activated_groups
 
     def is_group_empty(self, group: str) -> bool:
-        return not self.impl.get(self._gen_collection_name(group), {}, limit=10)
+        # a hybrid store would otherwise fetch the embeddings of the probed segments as well
+        kwargs = dict(fields=['uid']) if isinstance(self.impl, HybridStore) else {}
+        return not self.impl.get(self._gen_collection_name(group), {}, limit=10, **kwargs)
 
     def update_nodes(self, nodes: List[DocNode]):   # noqa: C901
         if not nodes:
@@ -165,13 +222,20 @@ class _DocumentStore(object):
             group_segments = defaultdict(list)
             for node in nodes:
                 group_segments[node._group].append(self._serialize_node(node))
-            # upsert batch segments
-            for group, segments in group_segments.items():
-                if not self.is_group_active(group):
-                    LOG.warning(f'[_DocumentStore - {self._algo_name}] Group {group} is not active, skip')
-                    continue
-                for i in range(0, len(segments), INSERT_BATCH_SIZE):
-                    self.impl.upsert(self._gen_collection_name(group), segments[i:i + INSERT_BATCH_SIZE])
+            # upsert batch segments; they become visible together when the ingestion block ends, versions are bumped
+            # after that so no reader caches a result from before the refresh
+            written = []
+            try:
+                with self.impl.ingestion():
+                    for group, segments in group_segments.items():
+                        if not self.is_group_active(group):
+                            LOG.warning(f'[_DocumentStore - {self._algo_name}] Group {group} is not active, skip')
+                            continue
+                        written.append(group)
+                        for i in range(0, len(segments), INSERT_BATCH_SIZE):
+                            self.impl.upsert(self._gen_collection_name(group), segments[i:i + INSERT_BATCH_SIZE])
+            finally:
+                for group in written: self._bump_version(group, {seg.get('kb_id') for seg in group_segments[group]})
             # update indices
             for index in self._indices.values():
                 index.update(nodes)
@@ -198,11 +262,17 @@ class _DocumentStore(object):
                 groups = self._activated_groups
             else:
                 groups = [group]
-            for group in groups:
-                if not self.is_group_active(group):
-                    LOG.warning(f'[_DocumentStore - {self._algo_name}] Group {group} is not active, skip')
-                    continue
-                self.impl.delete(self._gen_collection_name(group), criteria)
+            removed = []
+            try:
+                with self.impl.ingestion():
+                    for group in groups:
+                        if not self.is_group_active(group):
+                            LOG.warning(f'[_DocumentStore - {self._algo_name}] Group {group} is not active, skip')
+                            continue
+                        removed.append(group)
+                        self.impl.delete(self._gen_collection_name(group), criteria)
+            finally:
+                for group in removed: self._bump_version(group, [kb_id] if kb_id else None)
             # update indices
             for index in self._indices.values():
                 index.remove(uids, group)
@@ -229,44 +299,225 @@ class _DocumentStore(object):
     def get_segments(self, uids: Optional[List[str]] = None, doc_ids: Optional[Set] = None,
                      group: Optional[str] = None, kb_id: Optional[str] = None,
                      limit: Optional[int] = None, offset: int = 0, return_total: bool = False,
-                     numbers: Optional[Set] = None, **kwargs) -> Union[List[dict], Tuple[List[dict], int]]:
+                     numbers: Optional[Set] = None, after: Optional[str] = None,
+                     **kwargs) -> Union[List[dict], Tuple[List[dict], int]]:
         # get a set of segments by uids
         # get the segments of the whole file -- doc ids only
         # get the segments of a certain group for one file -- doc ids and group (kb_id is optional)
         # forbid to get the segments from multiple kb (only one kb_id is allowed)
         # pagination is applied after merging groups; group=None uses sorted activation order for stability
-        # return_total triggers a full scan to count all matching segments
+        # paged reads are ordered by uid and cut by the store, `after` is a keyset cursor (the last uid of the
+        # previous page) for one group; totals come from store-side counts cached per (group, kb_id, doc_id)
         try:
             limit, offset = self._normalize_pagination(limit, offset)
             criteria = self._build_get_criteria(uids, doc_ids, kb_id, numbers, kwargs.get('parent'))
-            groups = self._resolve_groups(group)
-            segments = []
+            groups = []
+            for g in self._resolve_groups(group):
+                if self.is_group_active(g): groups.append(g)
+                else: LOG.warning(f'[_DocumentStore - {self._algo_name}] Group {g} is not active, skip')
+            if limit is None and not offset and after is None:
+                segments = []
+                for group in groups:
+                    segments.extend(self.impl.get(self._gen_collection_name(group), criteria, **kwargs))
+                return (segments, len(segments)) if return_total else segments
+            if after is not None and len(groups) > 1:
+                raise ValueError('`after` pages through a single group, please specify `group`')
+
+            segments, total = [], 0
             for group in groups:
-                if not self.is_group_active(group):
-                    LOG.warning(f'[_DocumentStore - {self._algo_name}] Group {group} is not active, skip')
+                remaining = None if limit is None else limit - len(segments)
+                count = (self._count_segments(group, criteria, kb_id, **kwargs)
+                         if return_total or (offset and after is None) else None)
+                total += count or 0
+                if remaining == 0:
+                    if not return_total: break
+                    continue
+                if count is not None and after is None and offset >= count:
+                    # whole groups before the requested page are skipped by their counts, nothing is read
+                    offset -= count
                     continue
-                segments.extend(self.impl.get(self._gen_collection_name(group), criteria, **kwargs))
-            total = len(segments)
-            segments = self._slice_segments(segments, limit, offset)
+                segments.extend(self.impl.get_page(self._gen_collection_name(group), criteria, limit=remaining,
+                                                   offset=offset, after=after, **kwargs))
+                offset = 0
             return (segments, total) if return_total else segments
         except Exception as e:
             LOG.error(f'[_DocumentStore - {self._algo_name}] Failed to get segments: {e}')
             raise
 
+    def count_segments(self, group: Optional[str] = None, kb_id: Optional[str] = None,
+                       doc_ids: Optional[Set] = None, **kwargs) -> int:
+        return self.get_segments(doc_ids=doc_ids, group=group, kb_id=kb_id, limit=0, return_total=True, **kwargs)[1]
+
+    def _count_segments(self, group: str, criteria: Dict[str, Any], kb_id: Optional[str], **kwargs) -> int:
+        collection_name = self._gen_collection_name(group)
+        if set(criteria) - {RAG_KB_ID, RAG_DOC_ID}:
+            return self.impl.count(collection_name, criteria, **kwargs)
+        # counters are kept per (group, kb_id, doc_id) and keyed by the write version, so a listing reuses them
+        # until the group (or the kb) is written again
+        version, total = self.data_version(group, kb_id), 0
+        for doc_id in criteria.get(RAG_DOC_ID) or [None]:
+            key = (group, kb_id, doc_id, version)
+            count = self._count_cache.get(key) if self._cache_enabled else None
+            if count is None:
+                count = self.impl.count(collection_name, criteria if doc_id is None else
+                                        {**criteria, RAG_DOC_ID: [doc_id]}, **kwargs)
+                if self._cache_enabled: self._count_cache.put(key, count)
+            total += count
+        return total
+
+    def get_window_nodes(self, group: str, windows: List[Tuple[str, str, int, int]]) -> List[List[DocNode]]:
+        try:
+            return [[self._deserialize_node(self._copy_segment(seg)) for seg in segs]
+                    for segs in self.get_window_segments(group, windows)]
+        except Exception as e:
+            LOG.error(f'[_DocumentStore - {self._algo_name}] Failed to get window nodes: {e}')
+            raise
+
+    def get_window_segments(self, group: str, windows: List[Tuple[str, str, int, int]]) -> List[List[dict]]:
+        # windows: [(kb_id, doc_id, start, end)] with inclusive `end`; returns the segments of each window ordered
+        # by number. Windows missing from the cache are fetched in one batched, de-duplicated store call.
+        if not self.is_group_active(group):
+            LOG.warning(f'[_DocumentStore - {self._algo_name}] Group {group} is not active, skip')
+            return [[] for _ in windows]
+        results, missing = [None] * len(windows), []
+        keys = [(group, *w, self.data_version(group, w[0])) for w in windows]
+        for i, key in enumerate(keys):
+            cached = self._window_cache.get(key) if self._cache_enabled else None
+            if cached is None: missing.append(i)
+            else: results[i] = cached
+        if not missing: return results
+
+        doc_segments = defaultdict(list)
+        for seg in self.impl.get_windows(self._gen_collection_name(group), [windows[i] for i in missing]):
+            doc_segments[(seg.get('kb_id'), seg.get('doc_id'))].append(seg)
+        doc_numbers = {}
+        for key, segs in doc_segments.items():
+            segs.sort(key=lambda seg: seg.get('number') or 0)
+            doc_numbers[key] = [seg.get('number') or 0 for seg in segs]
+        for i in missing:
+            kb_id, doc_id, start, end = windows[i]
+            segs, numbers = doc_segments.get((kb_id, doc_id), []), doc_numbers.get((kb_id, doc_id), [])
+            results[i] = segs[bisect.bisect_left(numbers, start):bisect.bisect_right(numbers, end)]
+            if self._cache_enabled: self._window_cache.put(keys[i], results[i])
+        return results
+
+    def get_parent_uids(self, group: str, uids: List[str], kb_id: Optional[str] = None) -> Dict[str, Optional[str]]:
+        # uid -> parent uid for nodes of `group`; only uid and parent are fetched from the store
+        return self._get_relations(group, 'parent', uids, kb_id)
+
+    def get_child_uids(self, group: str, parent_uids: List[str], kb_id: Optional[str] = None) -> Dict[str, List[str]]:
+        # parent uid -> uids of its children in `group`
+        return self._get_relations(group, 'children', parent_uids, kb_id)
+
+    def _get_relations(self, group: str, kind: str, uids: List[str], kb_id: Optional[str]) -> Dict[str, Any]:
+        version = self.data_version(group, kb_id)
+        res, missing = {}, []
+        for uid in uids:
+            value = self._relation_cache.get((group, kb_id, kind, uid, version), _MISSING) \
+                if self._cache_enabled else _MISSING
+            if value is _MISSING: missing.append(uid)
+            else: res[uid] = value
+        if not missing or not self.is_group_active(group): return res
+
+        if kind == 'parent':
+            criteria = self._build_get_criteria(missing, None, kb_id)
+            fetched = dict.fromkeys(missing)
+            for uid, parent in self.impl.get_relations(self._gen_collection_name(group), criteria):
+                if uid in fetched: fetched[uid] = parent
+        else:
+            criteria = self._build_get_criteria(None, None, kb_id, parent=missing)
+            fetched = {uid: [] for uid in missing}
+            for uid, parent in self.impl.get_relations(self._gen_collection_name(group), criteria):
+                if parent in fetched: fetched[parent].append(uid)
+        for uid, value in fetched.items():
+            if self._cache_enabled: self._relation_cache.put((group, kb_id, kind, uid, version), value)
+            res[uid] = value
+        return res
+
+    def get_nodes_by_uids(self, group: str, uids: List[str], kb_id: Optional[str] = None,
+                          **kwargs) -> List[DocNode]:
+        # materialize nodes in the order of `uids`, served from a versioned segment cache when possible
+        version = self.data_version(group, kb_id)
+        segments, missing = {}, []
+        for uid in uids:
+            seg = self._segment_cache.get((group, kb_id, uid, version)) if self._cache_enabled else None
+            if seg is None: missing.append(uid)
+            else: segments[uid] = seg
+        if missing:
+            for seg in self.get_segments(uids=missing, group=group, kb_id=kb_id, **kwargs):
+                segments[seg['uid']] = seg
+                if self._cache_enabled: self._segment_cache.put((group, kb_id, seg['uid'], version), seg)
+        return [self._deserialize_node(self._copy_segment(segments[uid])) for uid in uids if uid in segments]
+
+    @staticmethod
+    def _copy_segment(seg: dict) -> dict:
+        # copy the metadata dicts so that callers mutating node metadata never touch the cached segments
+        return dict(seg, meta=dict(seg.get('meta') or {}), global_meta=dict(seg.get('global_meta') or {}))
+
+    def data_version(self, group: str, kb_id: Optional[str] = None) -> Tuple[int, ...]:
+        if kb_id is None: return (self._versions.get(group, 0),)
+        return self._versions.get((group, None), 0), self._versions.get((group, kb_id), 0)
+
+    def enable_cache(self, enabled: bool = True) -> None:
+        # NOTE: on by default for an in-memory MapStore only; enable it for another store only when nothing but
+        #       this instance writes to it, since version counters only observe writes made through this instance.
+        self._cache_enabled = enabled
+        if not enabled:
+            for cache in (self._window_cache, self._relation_cache, self._segment_cache, self._count_cache,
+                          self._result_cache):
+                cache.clear()
+
+    def cached_query(self, key: Any, group: str, kb_ids: Optional[List[str]],
+                     compute: Callable[[], List[DocNode]]) -> List[DocNode]:
+        # query results are keyed by the write versions of the (group, kb) pairs they read, taken before `compute`
+        # runs, so any upsert or delete through this store makes them unreachable; callers get copies of the nodes
+        if not self._cache_enabled: return compute()
+        version = (tuple(v for kb_id in sorted(set(kb_ids)) for v in self.data_version(group, kb_id))
+                   if kb_ids else self.data_version(group))
+        nodes = self._result_cache.get((key, group, version))
+        if nodes is None:
+            nodes = compute()
+            self._result_cache.put((key, group, version), nodes)
+        return [self._copy_node(node) for node in nodes]
+
+    @staticmethod
+    def _copy_node(node: DocNode) -> DocNode:
+        # a shallow copy would still share the metadata and embedding dicts with the cached node
+        node = copy.copy(node)
+        node._metadata, node._global_metadata = dict(node._metadata), dict(node._global_metadata)
+        node._embedding = {k: copy.copy(v) for k, v in (node._embedding or {}).items()}
+        node._embedding_state = set(node._embedding_state)
+        return node
+
+    def _bump_version(self, group: str, kb_ids: Optional[Union[List[str], Set[str]]] = None) -> None:
+        with self._version_lock:
+            self._versions[group] += 1
+            for kb_id in (kb_ids or [None]):
+                self._versions[(group, kb_id)] += 1
+
     def update_doc_meta(self, doc_id: str, metadata: dict, kb_id: str = None) -> None:
-        kb_id = metadata.get(RAG_KB_ID, None) if kb_id is None else kb_id
-        segments = self.get_segments(doc_ids=[doc_id], kb_id=kb_id, return_total=False)
-        if not segments:
-            LOG.warning(f'[_DocumentStore] No segments found for doc_id: {doc_id} in dataset: {kb_id}')
-            return
-        group_segments = defaultdict(list)
-        for segment in segments:
-            segment['global_meta'].update(metadata)
-            group_segments[segment.get('group')].append(segment)
-        for group, segments in group_segments.items():
-            self.impl.upsert(self._gen_collection_name(group), segments)
-        LOG.info(f'[_DocumentStore] Updated metadata for doc_id: {doc_id} in dataset: {kb_id}')
-        return
+        self.update_docs_meta({doc_id: metadata}, kb_id=kb_id)
+
+    def update_docs_meta(self, doc_metas: Dict[str, dict], kb_id: str = None) -> None:
+        # documents sharing the same patch are updated together with one criteria per (patch, kb); only
+        # `global_meta` is written, so contents and embeddings are never read back or re-upserted
+        batches: Dict[Tuple[str, Optional[str]], Tuple[dict, List[str]]] = {}
+        for doc_id, metadata in doc_metas.items():
+            kb = metadata.get(RAG_KB_ID, None) if kb_id is None else kb_id
+            key = (json.dumps(metadata, sort_keys=True, default=str), kb)
+            batches.setdefault(key, (metadata, []))[1].append(doc_id)
+        if not batches: return
+        updates, kb_ids = [], set()
+        for (_, kb), (metadata, doc_ids) in batches.items():
+            criteria = {RAG_DOC_ID: doc_ids}
+            if kb is not None: criteria[RAG_KB_ID] = kb
+            updates.append((criteria, metadata))
+            kb_ids.add(kb)
+        for group in self.activated_groups():
+            if not self.impl.update_global_meta(self._gen_collection_name(group), updates):
+                raise RuntimeError(f'[_DocumentStore] Failed to update metadata of group {group}')
+            self._bump_version(group, None if None in kb_ids else kb_ids)
+        LOG.info(f'[_DocumentStore] Updated metadata for {len(doc_metas)} docs')
 
     @staticmethod
     def _normalize_pagination(limit: Optional[int], offset: Optional[int]) -> Tuple[Optional[int], int]:
@@ -276,13 +527,6 @@ class _DocumentStore(object):
             limit = None
         return limit, offset
 
-    @staticmethod
-    def _slice_segments(segments: List[dict], limit: Optional[int], offset: int) -> List[dict]:
-        if offset > 0 or limit is not None:
-            end = None if limit is None else offset + limit
-            return segments[offset:end]
-        return segments
-
     def _resolve_groups(self, group: Optional[str]) -> List[str]:
         if not group:
             return sorted(self._activated_groups)
@@ -315,15 +559,8 @@ class _DocumentStore(object):
                 raise ValueError(f'[_DocumentStore - {self._algo_name}] Embed keys {embed_keys}'
                                  ' are not supported when no vector store is provided')
             # vector search
-            for embed_key in embed_keys:
-                query_embedding = self._embed.get(embed_key)(query)
-                search_res = self.impl.search(collection_name=self._gen_collection_name(group_name),
-                                              query=query, query_embedding=query_embedding,
-                                              topk=topk, filters=filters, embed_key=embed_key, **kwargs)
-                if search_res:
-                    sim_cut_off = similarity_cut_off if isinstance(similarity_cut_off, float)\
-                        else similarity_cut_off[embed_key]
-                    segments.extend([res for res in search_res if res.get('score', 0) >= sim_cut_off])
+            segments = self._multi_embed_search(query, self._gen_collection_name(group_name), embed_keys,
+                                                similarity_cut_off, topk, filters, **kwargs)
         else:
             # text search
             if self.impl.capability == StoreCapability.VECTOR:
@@ -333,6 +570,57 @@ class _DocumentStore(object):
                                              query=query, topk=topk, filters=filters, **kwargs))
         return [self._deserialize_node(segment, segment.get('score', 0)) for segment in segments]
 
+    def _get_search_executor(self) -> concurrent.futures.ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._search_executor is None:
+                self._search_executor = ThreadPoolExecutor(max_workers=_MAX_SEARCH_WORKERS,
+                                                           thread_name_prefix='lazyllm-doc-search')
+            return self._search_executor
+
+    def _search_embed_key(self, store: LazyLLMStoreBase, collection_name: str, query: str, embed_key: str,
+                          topk: Optional[int], filters: Optional[Dict], **kwargs) -> List[dict]:
+        query_embedding = self._embed.get(embed_key)(query)
+        return store.search(collection_name=collection_name, query=query, query_embedding=query_embedding,
+                            topk=topk, filters=filters, embed_key=embed_key, **kwargs) or []
+
+    def _multi_embed_search(self, query: str, collection_name: str, embed_keys: List[str],
+                            similarity_cut_off: Union[float, Dict[str, float]], topk: Optional[int],
+                            filters: Optional[Dict], **kwargs) -> List[dict]:
+        # every embed key is embedded and searched concurrently, results are de-duplicated by uid (keeping the best
+        # score) as they arrive; with a hybrid store the vector store only returns uids and scores, so the segments
+        # of the union are fetched once instead of once per key
+        hybrid = isinstance(self.impl, HybridStore)
+        store = self.impl.vector_store if hybrid else self.impl
+        if len(embed_keys) == 1:
+            results = [(embed_keys[0], self._search_embed_key(store, collection_name, query, embed_keys[0],
+                                                              topk, filters, **kwargs))]
+        else:
+            executor = self._get_search_executor()
+            futures = {executor.submit(self._search_embed_key, store, collection_name, query, key, topk, filters,
+                                       **kwargs): key for key in embed_keys}
+            results = ((futures[f], f.result()) for f in concurrent.futures.as_completed(futures))
+
+        rank = {key: i for i, key in enumerate(embed_keys)}
+        best: Dict[str, Tuple[float, Tuple[int, int], dict]] = {}
+        for embed_key, search_res in results:
+            sim_cut_off = similarity_cut_off if isinstance(similarity_cut_off, float) \
+                else similarity_cut_off[embed_key]
+            for pos, res in enumerate(search_res):
+                score = res.get('score', 0)
+                if score < sim_cut_off: continue
+                # ties are broken by the order of the embed keys and of the results, whatever the completion order
+                order = (rank[embed_key], pos)
+                if (old := best.get(res['uid'])) is None or (-score, order) < (-old[0], old[1]):
+                    best[res['uid']] = (score, order, res)
+        ranked = sorted(best.items(), key=lambda kv: (-kv[1][0], kv[1][1]))
+        if not hybrid: return [res for _, (_, _, res) in ranked]
+
+        if not ranked: return []
+        segments = self.impl.segment_store.get(collection_name=collection_name,
+                                               criteria={'uid': [uid for uid, _ in ranked]})
+        uid2segment = {segment['uid']: segment for segment in segments}
+        return [dict(uid2segment[uid], score=score) for uid, (score, _, _) in ranked if uid in uid2segment]
+
     def _validate_query_params(self, group_name: str, similarity: str,
                                embed_keys: Optional[List[str]] = None, **kwargs):
         assert self.is_group_active(group_name), f'[_DocumentStore - {self._algo_name}] Group {group_name} is not active'
@@ -368,6 +656,7 @@ class _DocumentStore(object):
             raise TypeError(f'Invalid type {type(groups)} for groups, expected list of str')
         for group in groups:
             self.impl.delete(self._gen_collection_name(group))
+            self._bump_version(group)
 
     def register_index(self, type: str, index: IndexBase) -> None:
         assert self._impl.supports_index_registration, \
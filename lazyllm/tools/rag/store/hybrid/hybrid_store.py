@@ -1,18 +1,142 @@
-from typing import Dict, List, Optional, Union, Set
+import os
+import pickle
+import sqlite3
+import threading
+import concurrent.futures
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Union, Set, Tuple
 
+from lazyllm import LOG, reset_on_pickle, ThreadPoolExecutor
 from lazyllm.common import override
 
 from ..store_base import LazyLLMStoreBase, StoreCapability
 
+_MAX_WRITE_WORKERS = 8
+_MAX_WRITE_ATTEMPTS = 3
+# failures worth another try, any other error means the batch itself is bad and it is dead-lettered at once
+_RETRYABLE_ERRORS = (ConnectionError, TimeoutError)
+_write_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+_write_executor_lock = threading.Lock()
 
+def _get_write_executor() -> concurrent.futures.ThreadPoolExecutor:
+    global _write_executor
+    with _write_executor_lock:
+        if _write_executor is None:
+            _write_executor = ThreadPoolExecutor(max_workers=_MAX_WRITE_WORKERS,
+                                                 thread_name_prefix='lazyllm-hybrid-write')
+        return _write_executor
+
+
+class _Outbox(object):
+    # journal of the dual writes: a batch is recorded before it is sent to the two stores and dropped once both
+    # applied it, so a batch that reached only one of them (a failed write or a crash) can be replayed. A batch that
+    # fails for good, or too many times, is moved to the dead letters. Entries are kept in sqlite when a path is
+    # given and in memory otherwise
+    def __init__(self, path: Optional[str] = None):
+        self._lock = threading.Lock()
+        self._entries: Dict[int, List[Any]] = {}  # id -> [op, collection, payload, attempts]
+        self._dead: Dict[int, Tuple[str, str, Any, str]] = {}
+        self._next_id = 0
+        self._conn = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            with self._conn:
+                self._conn.execute('PRAGMA journal_mode=WAL')
+                self._conn.execute('PRAGMA synchronous=NORMAL')
+                self._conn.execute('CREATE TABLE IF NOT EXISTS outbox (id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                                   'op TEXT NOT NULL, collection TEXT NOT NULL, payload BLOB NOT NULL, '
+                                   'attempts INTEGER NOT NULL DEFAULT 0)')
+                self._conn.execute('CREATE TABLE IF NOT EXISTS dead_letter (id INTEGER PRIMARY KEY, '
+                                   'op TEXT NOT NULL, collection TEXT NOT NULL, payload BLOB NOT NULL, error TEXT)')
+                if 'attempts' not in [row[1] for row in self._conn.execute('PRAGMA table_info(outbox)')]:
+                    self._conn.execute('ALTER TABLE outbox ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0')
+
+    def append(self, op: str, collection_name: str, payload: Any) -> int:
+        with self._lock:
+            if self._conn is None:
+                self._next_id += 1
+                self._entries[self._next_id] = [op, collection_name, payload, 0]
+                return self._next_id
+            with self._conn:
+                return self._conn.execute('INSERT INTO outbox (op, collection, payload) VALUES (?, ?, ?)',
+                                          (op, collection_name, pickle.dumps(payload, pickle.HIGHEST_PROTOCOL))
+                                          ).lastrowid
+
+    def done(self, entry_id: int) -> None:
+        with self._lock:
+            if self._conn is None:
+                self._entries.pop(entry_id, None)
+                return
+            with self._conn:
+                self._conn.execute('DELETE FROM outbox WHERE id = ?', (entry_id,))
+
+    def fail(self, entry_id: int, error: str, retryable: bool, max_attempts: int) -> bool:
+        # counts a failed attempt, returns True when the batch was moved to the dead letters
+        with self._lock:
+            if self._conn is None:
+                if (entry := self._entries.get(entry_id)) is None: return False
+                entry[3] += 1
+                if retryable and entry[3] < max_attempts: return False
+                self._dead[entry_id] = (*entry[:3], error)
+                del self._entries[entry_id]
+                return True
+            with self._conn:
+                self._conn.execute('UPDATE outbox SET attempts = attempts + 1 WHERE id = ?', (entry_id,))
+                row = self._conn.execute('SELECT attempts FROM outbox WHERE id = ?', (entry_id,)).fetchone()
+                if row is None or (retryable and row[0] < max_attempts): return False
+                self._conn.execute('INSERT OR REPLACE INTO dead_letter (id, op, collection, payload, error) '
+                                   'SELECT id, op, collection, payload, ? FROM outbox WHERE id = ?', (error, entry_id))
+                self._conn.execute('DELETE FROM outbox WHERE id = ?', (entry_id,))
+                return True
+
+    def entries(self) -> List[Tuple[int, str, str, Any]]:
+        with self._lock:
+            if self._conn is None:
+                return [(entry_id, *entry[:3]) for entry_id, entry in sorted(self._entries.items())]
+            rows = self._conn.execute('SELECT id, op, collection, payload FROM outbox ORDER BY id').fetchall()
+        return [(entry_id, op, collection, pickle.loads(payload)) for entry_id, op, collection, payload in rows]
+
+    def dead_letters(self) -> List[Tuple[int, str, str, Any, str]]:
+        with self._lock:
+            if self._conn is None:
+                return [(entry_id, *entry) for entry_id, entry in sorted(self._dead.items())]
+            rows = self._conn.execute('SELECT id, op, collection, payload, error FROM dead_letter ORDER BY id'
+                                      ).fetchall()
+        return [(entry_id, op, collection, pickle.loads(payload), error)
+                for entry_id, op, collection, payload, error in rows]
+
+    def drop_dead_letters(self, ids: Optional[List[int]] = None) -> None:
+        with self._lock:
+            if self._conn is None:
+                for entry_id in (list(self._dead) if ids is None else ids): self._dead.pop(entry_id, None)
+                return
+            with self._conn:
+                if ids is None: self._conn.execute('DELETE FROM dead_letter')
+                else: self._conn.executemany('DELETE FROM dead_letter WHERE id = ?', [(i,) for i in ids])
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None: self._conn.close()
+
+
+@reset_on_pickle(('_lock', threading.Lock), ('_replay_lock', threading.Lock), ('_inflight', set),
+                 ('_outbox', None), ('_pending', False))
 class HybridStore(LazyLLMStoreBase):
     capability = StoreCapability.ALL
     need_embedding = True
     supports_index_registration = False
 
-    def __init__(self, segment_store: LazyLLMStoreBase, vector_store: LazyLLMStoreBase):
+    def __init__(self, segment_store: LazyLLMStoreBase, vector_store: LazyLLMStoreBase,
+                 journal: Optional[str] = None):
         self.segment_store: LazyLLMStoreBase = segment_store
         self.vector_store: LazyLLMStoreBase = vector_store
+        self._journal = journal
+        self._lock = threading.Lock()
+        self._replay_lock = threading.Lock()
+        self._inflight: Set[int] = set()
+        self._outbox: Optional[_Outbox] = None
+        self._pending = False
 
     @property
     def dir(self):
@@ -22,21 +146,129 @@ class HybridStore(LazyLLMStoreBase):
     def connect(self, *args, **kwargs):
         self.segment_store.connect(*args, **kwargs)
         self.vector_store.connect(*args, **kwargs)
+        path = self._journal or self._default_journal()
+        self._outbox = _Outbox(path)
+        if self._outbox.entries():
+            LOG.warning(f'[HybridStore] Replay writes left unfinished in {path}')
+            self.recover()
+        if dead := self._outbox.dead_letters():
+            LOG.warning(f'[HybridStore] {len(dead)} batches that failed to reach both stores are kept in the dead '
+                        f'letters of {path}, see `HybridStore.dead_letters`')
+
+    def _default_journal(self) -> Optional[str]:
+        # one journal per segment store file, so stores sharing a directory never replay each other's batches
+        uri = getattr(self.segment_store, '_uri', None)
+        return f'{os.path.splitext(uri)[0]}.outbox.db' if uri else None
+
+    def _get_outbox(self) -> _Outbox:
+        with self._lock:
+            if self._outbox is None: self._outbox = _Outbox()
+            return self._outbox
+
+    def _dual_write(self, op: str, collection_name: str, payload: Any) -> bool:
+        # the vector store is written on a worker while the segment store is written here
+        if op == 'upsert':
+            segments = [{k: v for k, v in segment.items() if k != 'embedding'} for segment in payload]
+            calls = [(store.upsert, dict(collection_name=collection_name, data=data))
+                     for store, data in ((self.segment_store, segments), (self.vector_store, payload))]
+        elif op == 'delete':
+            criteria, kwargs = payload
+            calls = [(store.delete, dict(collection_name=collection_name, criteria=criteria, **kwargs))
+                     for store in (self.segment_store, self.vector_store)]
+        else:
+            updates, kwargs = payload
+            calls = [(store.update_global_meta, dict(collection_name=collection_name, updates=updates, **kwargs))
+                     for store in (self.segment_store, self.vector_store)]
+        future = _get_write_executor().submit(calls[1][0], **calls[1][1])
+        try:
+            segment_ok = calls[0][0](**calls[0][1])
+        except Exception:
+            concurrent.futures.wait([future])
+            raise
+        return bool(future.result()) and bool(segment_ok)
+
+    def _write(self, op: str, collection_name: str, payload: Any) -> bool:
+        # batches journaled by earlier failures are retried first, but a new batch never waits for them: one that
+        # keeps failing is dead-lettered after `_MAX_WRITE_ATTEMPTS` tries instead of blocking later writes
+        if self._pending: self.recover()
+        outbox = self._get_outbox()
+        with self._lock:
+            entry_id = outbox.append(op, collection_name, payload)
+            self._inflight.add(entry_id)
+        try:
+            return self._apply(outbox, entry_id, op, collection_name, payload)
+        finally:
+            with self._lock: self._inflight.discard(entry_id)
+
+    def _apply(self, outbox: _Outbox, entry_id: int, op: str, collection_name: str, payload: Any) -> bool:
+        try:
+            ok = self._dual_write(op, collection_name, payload)
+        except Exception as e:
+            self._failed(outbox, entry_id, repr(e), isinstance(e, _RETRYABLE_ERRORS))
+            raise
+        if ok: outbox.done(entry_id)
+        else: self._failed(outbox, entry_id, 'the store reported a failed write', True)
+        return ok
+
+    def _failed(self, outbox: _Outbox, entry_id: int, error: str, retryable: bool) -> None:
+        if outbox.fail(entry_id, error, retryable, _MAX_WRITE_ATTEMPTS):
+            LOG.error(f'[HybridStore] Move batch {entry_id} to the dead letters: {error}')
+        else:
+            with self._lock: self._pending = True
+
+    def recover(self) -> bool:
+        # replay the journaled batches that did not reach both stores, oldest first; returns True when all applied
+        outbox = self._get_outbox()
+        with self._replay_lock:
+            with self._lock:
+                self._pending = False
+                entries = [entry for entry in outbox.entries() if entry[0] not in self._inflight]
+            ok = True
+            for entry_id, op, collection_name, payload in entries:
+                try:
+                    ok = self._apply(outbox, entry_id, op, collection_name, payload) and ok
+                except Exception as e:
+                    LOG.warning(f'[HybridStore] Failed to replay batch {entry_id}: {e!r}')
+                    ok = False
+            return ok
+
+    def dead_letters(self) -> List[Dict[str, Any]]:
+        return [dict(id=entry_id, op=op, collection_name=collection_name, payload=payload, error=error)
+                for entry_id, op, collection_name, payload, error in self._get_outbox().dead_letters()]
+
+    def drop_dead_letters(self, ids: Optional[List[int]] = None) -> None:
+        self._get_outbox().drop_dead_letters(ids)
+
+    @override
+    @contextmanager
+    def ingestion(self):
+        with self.segment_store.ingestion(), self.vector_store.ingestion():
+            yield
 
     @override
     def upsert(self, collection_name: str, data: List[dict]) -> bool:
-        segments = [{k: v for k, v in segment.items() if k != 'embedding'} for segment in data]
-        return self.segment_store.upsert(collection_name=collection_name, data=segments) and \
-            self.vector_store.upsert(collection_name=collection_name, data=data)
+        return self._write('upsert', collection_name, data)
 
     @override
     def delete(self, collection_name: str, criteria: Optional[dict] = None, **kwargs) -> bool:
-        return self.segment_store.delete(collection_name=collection_name, criteria=criteria, **kwargs) and \
-            self.vector_store.delete(collection_name=collection_name, criteria=criteria, **kwargs)
+        return self._write('delete', collection_name, (criteria, kwargs))
+
+    @staticmethod
+    def _project(items: List[dict], fields: Optional[List[str]], *extra: str) -> List[dict]:
+        if fields is None: return items
+        keep = {'uid', *fields, *extra}
+        return [{k: v for k, v in item.items() if k in keep} for item in items]
 
     @override
-    def get(self, collection_name: str, criteria: Optional[dict] = None, **kwargs) -> List[dict]:
+    def get(self, collection_name: str, criteria: Optional[dict] = None, fields: Optional[List[str]] = None,
+            **kwargs) -> List[dict]:
+        # `fields` projects the result, embeddings are only fetched from the vector store when they are asked for
         res_segments = self.segment_store.get(collection_name=collection_name, criteria=criteria, **kwargs)
+        if fields is None or 'embedding' in fields:
+            res_segments = self._attach_embeddings(collection_name, res_segments, **kwargs)
+        return self._project(res_segments, fields)
+
+    def _attach_embeddings(self, collection_name: str, res_segments: List[dict], **kwargs) -> List[dict]:
         if not res_segments: return []
         uids = [item.get('uid') for item in res_segments]
         res_vectors = self.vector_store.get(collection_name=collection_name, criteria={'uid': uids}, **kwargs)
@@ -52,10 +284,40 @@ class HybridStore(LazyLLMStoreBase):
                                  ' but not found in segment store')
         return list(data.values())
 
+    @override
+    def get_windows(self, collection_name: str, windows: List[Tuple[str, str, int, int]], **kwargs) -> List[dict]:
+        # window lookups are served by the segment store only, embeddings are not needed for context expansion
+        return self.segment_store.get_windows(collection_name=collection_name, windows=windows, **kwargs)
+
+    @override
+    def update_global_meta(self, collection_name: str, updates: List[Tuple[dict, dict]], **kwargs) -> bool:
+        return self._write('update_global_meta', collection_name, (updates, kwargs))
+
+    @override
+    def get_relations(self, collection_name: str, criteria: Optional[dict] = None,
+                      **kwargs) -> List[Tuple[str, Optional[str]]]:
+        return self.segment_store.get_relations(collection_name=collection_name, criteria=criteria, **kwargs)
+
+    @override
+    def count(self, collection_name: str, criteria: Optional[dict] = None, **kwargs) -> int:
+        return self.segment_store.count(collection_name=collection_name, criteria=criteria, **kwargs)
+
+    @override
+    def get_page(self, collection_name: str, criteria: Optional[dict] = None, limit: Optional[int] = None,
+                 offset: int = 0, after: Optional[str] = None, fields: Optional[List[str]] = None,
+                 **kwargs) -> List[dict]:
+        # the page is cut by the segment store, embeddings are fetched for the uids of this page only
+        res_segments = self.segment_store.get_page(collection_name=collection_name, criteria=criteria, limit=limit,
+                                                   offset=offset, after=after, **kwargs)
+        if fields is None or 'embedding' in fields:
+            res_segments = self._attach_embeddings(collection_name, res_segments, **kwargs)
+        return self._project(res_segments, fields)
+
     @override
     def search(self, collection_name: str, query: str, query_embedding: Optional[Union[dict, List[float]]] = None,
                topk: int = 10, filters: Optional[Dict[str, Union[str, int, List, Set]]] = None,
-               embed_key: Optional[str] = None, **kwargs) -> List[dict]:
+               embed_key: Optional[str] = None, fields: Optional[List[str]] = None, **kwargs) -> List[dict]:
+        # results carry no embeddings unless `fields` asks for them, the score is always kept
         if embed_key:
             # vector store only give uid and score
             res = self.vector_store.search(collection_name=collection_name, query=query, query_embedding=query_embedding,
@@ -68,9 +330,10 @@ class HybridStore(LazyLLMStoreBase):
             for segment in segments:
                 segment['score'] = uid2score.get(segment['uid'], 0)
                 uid2segment[segment.get('uid')] = segment
-            ordered = [uid2segment[uid] for uid in uids if uid in uid2segment]
-            return ordered
+            res = [uid2segment[uid] for uid in uids if uid in uid2segment]
         else:
             res = self.segment_store.search(collection_name=collection_name, query=query,
                                             topk=topk, filters=filters, **kwargs)
-            return res
+        if fields is not None and 'embedding' in fields:
+            res = self._attach_embeddings(collection_name, res)
+        return self._project(res, fields, 'score')
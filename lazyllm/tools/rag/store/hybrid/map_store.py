@@ -1,31 +1,55 @@
 import json
 import sqlite3
 import os
+import bisect
+import atexit
+import weakref
 import threading
 
 from pathlib import Path
 from collections import defaultdict
-from typing import Dict, List, Optional, Union, Set
+from typing import Dict, List, Optional, Union, Set, Tuple
 
 from lazyllm import LOG
 from lazyllm.common import override
 
-from ..store_base import LazyLLMStoreBase, StoreCapability, DEFAULT_KB_ID
+from ..store_base import (LazyLLMStoreBase, StoreCapability, DEFAULT_KB_ID, WINDOW_BATCH_SIZE, INSERT_BATCH_SIZE,
+                          merge_windows)
 from ...global_metadata import RAG_DOC_ID, RAG_KB_ID
 from ...doc_node import DocNode
 from ...similarity import bm25, bm25_chinese
 
 
+_SEGMENT_COLUMNS = ('uid, doc_id, "group", content, meta, global_meta, type, number, kb_id, '
+                    'excluded_embed_metadata_keys, excluded_llm_metadata_keys, parent, answer, image_keys')
+_write_through_stores: 'weakref.WeakSet[MapStore]' = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_write_through_stores():
+    for store in list(_write_through_stores):
+        try:
+            store.flush()
+        except Exception as e:
+            LOG.error(f'[MapStore] Failed to persist pending segments at exit: {e}')
+
+
 class MapStore(LazyLLMStoreBase):
     capability = StoreCapability.ALL
     need_embedding = True
     supports_index_registration = True
 
-    def __init__(self, uri: Optional[str] = None, **kwargs):
+    def __init__(self, uri: Optional[str] = None, write_through: bool = False, flush_interval: float = 0.5,
+                 flush_batch_size: int = INSERT_BATCH_SIZE, **kwargs):
         self._uri = uri  # filepath to SQLite .db for persistence
-        self._sqlite_first = bool(uri)
+        # write-through: memory is the primary copy and SQLite is only written, in batches, by a background thread
+        self._write_through = bool(uri) and write_through
+        self._sqlite_first = bool(uri) and not write_through
+        self._flush_interval = flush_interval
+        self._flush_batch_size = max(1, flush_batch_size)
         self._conn = None
         self._sqlite_has_json = None
+        self._tables: Set[str] = set()
 
     def _open_conn(self):
         if not self._uri: return None
@@ -48,6 +72,7 @@ class MapStore(LazyLLMStoreBase):
         return path if path.endswith(os.sep) else path + os.sep
 
     def _ensure_table(self, cursor: sqlite3.Cursor, table: str):
+        if table in self._tables: return
         cursor.execute(f'''
         CREATE TABLE IF NOT EXISTS {table} (
             uid TEXT PRIMARY KEY,
@@ -69,17 +94,14 @@ class MapStore(LazyLLMStoreBase):
         cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_docid ON {table}(doc_id)')
         cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_kbid ON {table}(kb_id)')
         cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_number ON {table}(number)')
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_kb_doc_number ON {table}(kb_id, doc_id, number)')
+        self._tables.add(table)
 
     def _save_to_uri(self, collection_name: str, data: List[dict]):
         conn = self._open_conn()
         cur = conn.cursor()
         self._ensure_table(cur, collection_name)
-        sql = f'''INSERT OR REPLACE INTO {collection_name} (
-                uid, doc_id, \'group\', content,
-                meta, global_meta, type, number, kb_id,\
-                excluded_embed_metadata_keys, excluded_llm_metadata_keys,\
-                parent, answer, image_keys)\
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'''
+        sql = self._upsert_sql(collection_name)
         params = []
         for item in data:
             params.append(self._serialize_data(item))
@@ -88,6 +110,10 @@ class MapStore(LazyLLMStoreBase):
         affected_rows = cur.rowcount
         LOG.debug(f'[MapStore - _save_to_uri] Inserted {affected_rows} rows into {collection_name}')
 
+    def _upsert_sql(self, collection_name: str) -> str:
+        return (f'INSERT OR REPLACE INTO {collection_name} ({_SEGMENT_COLUMNS}) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)')
+
     def _del_from_uri(self, collection_name: str, criteria: Optional[dict] = None):
         conn = self._open_conn()
         cur = conn.cursor()
@@ -106,6 +132,9 @@ class MapStore(LazyLLMStoreBase):
             lambda: defaultdict(lambda: defaultdict(set)))
         self._col_parent_uids: Dict[str, Dict[str, Set[str]]] = defaultdict(lambda: defaultdict(set))
         self._col_number_uids: Dict[str, Dict[int, Set[str]]] = defaultdict(lambda: defaultdict(set))
+        # ordered (number, uid) list per (kb_id, doc_id), used to serve window queries by range
+        self._col_doc_numbers: Dict[str, Dict[Tuple[str, str], List[Tuple[int, str]]]] = defaultdict(
+            lambda: defaultdict(list))
         self._lock = threading.Lock()
         if self._uri:
             db_path = Path(self._uri)
@@ -119,26 +148,108 @@ class MapStore(LazyLLMStoreBase):
                     for c in collections:
                         self._ensure_table(cur, c)
                     conn.commit()
+                if self._write_through: self._load_from_uri(conn)
+        if self._write_through:
+            # pending writes per collection, keyed by uid with the latest segment (None for a deletion), so repeated
+            # writes of a segment between two flushes are persisted once
+            self._dirty: Dict[str, Dict[str, Optional[dict]]] = defaultdict(dict)
+            self._dirty_count = 0
+            self._flush_cond = threading.Condition(self._lock)
+            self._db_lock = threading.Lock()
+            self._flusher = None
+            _write_through_stores.add(self)
         return
 
+    def _load_from_uri(self, conn: sqlite3.Connection) -> None:
+        # warm start: the database is read once, later reads are served from memory
+        cur = conn.cursor()
+        tables = [r[0] for r in cur.execute('SELECT name FROM sqlite_master WHERE type = ? AND name NOT LIKE ?',
+                                            ('table', 'sqlite_%')).fetchall()]
+        for table in tables:
+            self._ensure_table(cur, table)
+            for row in cur.execute(f'SELECT {_SEGMENT_COLUMNS} FROM {table}'):
+                self._cache_segment(table, self._deserialize_data(row))
+        LOG.info(f'[MapStore] Loaded {len(self._uid2data)} segments from {self._uri}')
+
+    def _mark_dirty(self, collection_name: str, uid: str, item: Optional[dict]) -> None:
+        pending = self._dirty[collection_name]
+        if uid not in pending: self._dirty_count += 1
+        pending[uid] = item
+
+    def _start_flusher(self) -> None:
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._persist_loop, daemon=True, name='lazyllm-mapstore-flush')
+            self._flusher.start()
+        if self._dirty_count >= self._flush_batch_size: self._flush_cond.notify()
+
+    def _persist_loop(self) -> None:
+        while True:
+            with self._flush_cond:
+                self._flush_cond.wait_for(lambda: self._dirty_count >= self._flush_batch_size,
+                                          timeout=self._flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                LOG.error(f'[MapStore] Failed to persist segments to {self._uri}, will retry: {e}')
+
+    def flush(self) -> None:
+        if not self._write_through: return
+        with self._db_lock:
+            with self._lock:
+                if not self._dirty_count: return
+                dirty, self._dirty, self._dirty_count = self._dirty, defaultdict(dict), 0
+            conn = None
+            try:
+                conn = self._open_conn()
+                cur = conn.cursor()
+                for collection_name, pending in dirty.items():
+                    self._ensure_table(cur, collection_name)
+                    deleted = [uid for uid, item in pending.items() if item is None]
+                    for i in range(0, len(deleted), INSERT_BATCH_SIZE):
+                        batch = deleted[i:i + INSERT_BATCH_SIZE]
+                        cur.execute(f'DELETE FROM {collection_name} WHERE uid IN ({",".join("?" * len(batch))})',
+                                    batch)
+                    cur.executemany(self._upsert_sql(collection_name),
+                                    [self._serialize_data(item) for item in pending.values() if item is not None])
+                conn.commit()
+                LOG.debug(f'[MapStore - flush] Persisted {sum(len(p) for p in dirty.values())} segments')
+            except Exception:
+                if conn is not None: conn.rollback()
+                with self._lock:
+                    # keep the writes that failed unless they were superseded in the meantime
+                    for collection_name, pending in dirty.items():
+                        for uid, item in pending.items():
+                            if uid not in self._dirty[collection_name]: self._mark_dirty(collection_name, uid, item)
+                raise
+
     @override
     def upsert(self, collection_name: str, data: List[dict]) -> bool:
         try:
             if self._sqlite_first:
                 with self._lock:
                     self._save_to_uri(collection_name, data)
+            if self._write_through:
+                with self._lock:
+                    for item in data:
+                        self._upsert_one(collection_name, item)
+                        self._mark_dirty(collection_name, item['uid'], item)
+                    self._start_flusher()
+                return True
             for item in data:
-                uid = item.get('uid')
-                doc_id = item.get('doc_id')
-                kb_id = item.get(RAG_KB_ID, DEFAULT_KB_ID)
-                item['kb_id'] = kb_id
-                assert uid and doc_id, '[MapStore - upsert] uid and doc_id are required'
-                self._cache_segment(collection_name, item)
+                self._upsert_one(collection_name, item)
             return True
         except Exception as e:
             LOG.error(f'[MapStore - upsert] Error upserting data: {e}')
             return False
 
+    def _upsert_one(self, collection_name: str, item: dict) -> None:
+        uid = item.get('uid')
+        doc_id = item.get('doc_id')
+        kb_id = item.get(RAG_KB_ID, DEFAULT_KB_ID)
+        item['kb_id'] = kb_id
+        assert uid and doc_id, '[MapStore - upsert] uid and doc_id are required'
+        self._cache_segment(collection_name, item)
+
     @override
     def delete(self, collection_name: str, criteria: Optional[dict] = None, **kwargs) -> bool:
         try:
@@ -160,6 +271,15 @@ class MapStore(LazyLLMStoreBase):
                     self._col_doc_uids[collection_name][doc_id].discard(uid)
                     self._col_parent_uids[collection_name][data.get('parent')].discard(uid)
                     self._col_number_uids[collection_name][data.get('number')].discard(uid)
+                self._unindex_number(collection_name, data)
+
+            if self._write_through:
+                with self._lock:
+                    for uid in self._get_uids_by_criteria(collection_name, criteria):
+                        _remove_uid(uid, use_discard=True)
+                        self._mark_dirty(collection_name, uid, None)
+                    self._start_flusher()
+                return True
 
             if self._sqlite_first:
                 with self._lock:
@@ -232,13 +352,140 @@ class MapStore(LazyLLMStoreBase):
         uid = item.get('uid')
         if not uid:
             return
+        if (old := self._uid2data.get(uid)) is not None:
+            self._unindex_number(collection_name, old)
         self._uid2data[uid] = item
+        bisect.insort(self._col_doc_numbers[collection_name][(item['kb_id'], item['doc_id'])],
+                      (item.get('number') or 0, uid))
         self._collection2uids[collection_name].add(uid)
         self._col_doc_uids[collection_name][item['doc_id']].add(uid)
         self._col_kb_doc_uids[collection_name][item['kb_id']][item['doc_id']].add(uid)
         self._col_parent_uids[collection_name][item.get('parent')].add(uid)
         self._col_number_uids[collection_name][item['number']].add(item['uid'])
 
+    def _unindex_number(self, collection_name: str, item: dict) -> None:
+        key = (item.get(RAG_KB_ID, DEFAULT_KB_ID), item.get('doc_id'))
+        entries = self._col_doc_numbers.get(collection_name, {}).get(key)
+        if not entries:
+            return
+        entry = (item.get('number') or 0, item.get('uid'))
+        idx = bisect.bisect_left(entries, entry)
+        if idx < len(entries) and entries[idx] == entry:
+            entries.pop(idx)
+        if not entries:
+            self._col_doc_numbers[collection_name].pop(key, None)
+
+    @override
+    def get_windows(self, collection_name: str, windows: List[Tuple[str, str, int, int]], **kwargs) -> List[dict]:
+        merged = merge_windows(windows)
+        if not merged:
+            return []
+        if self._sqlite_first:
+            return self._get_windows_from_uri(collection_name, merged)
+        res = []
+        for key, spans in merged.items():
+            entries = self._col_doc_numbers.get(collection_name, {}).get(key)
+            if not entries:
+                continue
+            for start, end in spans:
+                lo = bisect.bisect_left(entries, (start,))
+                hi = bisect.bisect_left(entries, (end + 1,))
+                res.extend(self._uid2data[uid] for _, uid in entries[lo:hi] if uid in self._uid2data)
+        return res
+
+    @override
+    def get_relations(self, collection_name: str, criteria: Optional[dict] = None,
+                      **kwargs) -> List[Tuple[str, Optional[str]]]:
+        if self._sqlite_first:
+            with self._lock:
+                conn = self._open_conn()
+                cur = conn.cursor()
+                self._ensure_table(cur, collection_name)
+                where, args = self._build_where(criteria)
+                cur.execute(f'SELECT uid, parent FROM {collection_name}{where}', args)
+                return [(r[0], r[1]) for r in cur.fetchall()]
+        uids = self._get_uids_by_criteria(collection_name, criteria)
+        return [(uid, self._uid2data[uid].get('parent')) for uid in uids if uid in self._uid2data]
+
+    @override
+    def count(self, collection_name: str, criteria: Optional[dict] = None, **kwargs) -> int:
+        if self._sqlite_first:
+            with self._lock:
+                conn = self._open_conn()
+                cur = conn.cursor()
+                self._ensure_table(cur, collection_name)
+                where, args = self._build_where(criteria)
+                return cur.execute(f'SELECT COUNT(*) FROM {collection_name}{where}', args).fetchone()[0]
+        return sum(uid in self._uid2data for uid in self._get_uids_by_criteria(collection_name, criteria))
+
+    @override
+    def get_page(self, collection_name: str, criteria: Optional[dict] = None, limit: Optional[int] = None,
+                 offset: int = 0, after: Optional[str] = None, **kwargs) -> List[dict]:
+        if self._sqlite_first:
+            with self._lock:
+                conn = self._open_conn()
+                cur = conn.cursor()
+                self._ensure_table(cur, collection_name)
+                where, args = self._build_where(criteria)
+                if after is not None:
+                    where, args = f'{where} AND uid > ?' if where else ' WHERE uid > ?', (*args, after)
+                # `uid` is the primary key, so the page is read from its index instead of sorting the matches
+                cur.execute(f'SELECT {_SEGMENT_COLUMNS} FROM {collection_name}{where} ORDER BY uid LIMIT ? OFFSET ?',
+                            (*args, -1 if limit is None else limit, offset))
+                return [self._deserialize_data(r) for r in cur.fetchall()]
+        uids = sorted(uid for uid in self._get_uids_by_criteria(collection_name, criteria) if uid in self._uid2data)
+        if after is not None: uids = uids[bisect.bisect_right(uids, after):]
+        return [self._uid2data[uid] for uid in uids[offset:None if limit is None else offset + limit]]
+
+    @override
+    def update_global_meta(self, collection_name: str, updates: List[Tuple[dict, dict]], **kwargs) -> bool:
+        try:
+            if self._sqlite_first:
+                with self._lock:
+                    conn = self._open_conn()
+                    cur = conn.cursor()
+                    self._ensure_table(cur, collection_name)
+                    for criteria, patch in updates:
+                        # only the global_meta column is read and written back
+                        where, args = self._build_where(criteria)
+                        rows = cur.execute(f'SELECT uid, global_meta FROM {collection_name}{where}', args).fetchall()
+                        cur.executemany(f'UPDATE {collection_name} SET global_meta = ? WHERE uid = ?',
+                                        [(json.dumps({**(json.loads(meta) if meta else {}), **patch}), uid)
+                                         for uid, meta in rows])
+                    conn.commit()
+                return True
+            with self._lock:
+                for criteria, patch in updates:
+                    for uid in self._get_uids_by_criteria(collection_name, criteria):
+                        if (item := self._uid2data.get(uid)) is None: continue
+                        # replace rather than mutate, segments handed out by `get` keep their old metadata
+                        meta = {**(item.get('global_meta') or {}), **patch}
+                        item = self._uid2data[uid] = {**item, 'global_meta': meta}
+                        if self._write_through: self._mark_dirty(collection_name, uid, item)
+                if self._write_through: self._start_flusher()
+            return True
+        except Exception as e:
+            LOG.error(f'[MapStore - update_global_meta] Error updating metadata: {e}')
+            return False
+
+    def _get_windows_from_uri(self, collection_name: str,
+                              merged: Dict[Tuple[str, str], List[Tuple[int, int]]]) -> List[dict]:
+        ranges = [(kb_id, doc_id, start, end) for (kb_id, doc_id), spans in merged.items() for start, end in spans]
+        res = []
+        with self._lock:
+            conn = self._open_conn()
+            cur = conn.cursor()
+            self._ensure_table(cur, collection_name)
+            for i in range(0, len(ranges), WINDOW_BATCH_SIZE):
+                batch = ranges[i:i + WINDOW_BATCH_SIZE]
+                where = ' OR '.join('(kb_id = ? AND doc_id = ? AND number BETWEEN ? AND ?)' for _ in batch)
+                args = tuple(arg for r in batch for arg in r)
+                cur.execute(f'''SELECT uid, doc_id, "group", content, meta, global_meta, type, number, kb_id,
+                                excluded_embed_metadata_keys, excluded_llm_metadata_keys, parent, answer, image_keys
+                                FROM {collection_name} WHERE {where} ORDER BY kb_id, doc_id, number''', args)
+                res.extend(self._deserialize_data(r) for r in cur.fetchall())
+        return res
+
     def _check_sqlite_json(self, cursor: sqlite3.Cursor) -> bool:
         if self._sqlite_has_json is not None:
             return self._sqlite_has_json
@@ -2,20 +2,27 @@ import json
 import urllib3
 import threading
 import copy
+import concurrent.futures
 
-from typing import Dict, Union, List, Optional
+from contextlib import contextmanager
+from typing import Dict, Union, List, Optional, Set, Tuple
 
-from lazyllm import LOG
+from lazyllm import LOG, ThreadPoolExecutor
 from lazyllm.common import override
 from lazyllm.thirdparty import elasticsearch
 
-from ..store_base import (LazyLLMStoreBase, StoreCapability, INSERT_BATCH_SIZE)
+from ..store_base import (LazyLLMStoreBase, StoreCapability, merge_windows)
 from ...global_metadata import RAG_DOC_ID, RAG_KB_ID, GlobalMetadataDesc
 from ..store_base import BUILDIN_GLOBAL_META_DESC
 from ...data_type import DataType
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+PAGE_SIZE = 1000
+MAX_RESULT_WINDOW = 10000
+BULK_CHUNK_SIZE = 500
+BULK_CONCURRENCY = 4
+
 DEFAULT_MAPPING_BODY = {
     'settings': {
         'index': {
@@ -66,6 +73,16 @@ DEFAULT_MAPPING_BODY = {
     },
 }
 
+_bulk_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+_bulk_executor_lock = threading.Lock()
+
+def _get_bulk_executor() -> concurrent.futures.ThreadPoolExecutor:
+    global _bulk_executor
+    with _bulk_executor_lock:
+        if _bulk_executor is None:
+            _bulk_executor = ThreadPoolExecutor(max_workers=BULK_CONCURRENCY, thread_name_prefix='lazyllm-es-bulk')
+        return _bulk_executor
+
 
 class ElasticSearchStore(LazyLLMStoreBase):
     capability = StoreCapability.SEGMENT
@@ -95,6 +112,13 @@ class ElasticSearchStore(LazyLLMStoreBase):
     def connect(self, global_metadata_desc: Optional[Dict[str, GlobalMetadataDesc]] = None, **kwargs) -> bool:
         try:
             self._ddl_lock = threading.Lock()
+            # indices known to exist, kept up to date by index creation and deletion through this store
+            self._existing: Set[str] = set()
+            # indices where every document carries `uid` in its source, so `get_page` can sort on it
+            self._keyset_ready: Set[str] = set()
+            self._legacy_warned: Set[str] = set()
+            # the ingestion batch of each thread: indices written inside it are refreshed once when it ends
+            self._local = threading.local()
             # Elastic Cloud
             if self._client_kwargs.get('cloud_id') and self._client_kwargs.get('api_key'):
                 cloud_id = self._client_kwargs.get('cloud_id')
@@ -131,62 +155,102 @@ class ElasticSearchStore(LazyLLMStoreBase):
             LOG.error(f'Fail to connect ElasticSearch sever with cloud id {cloud_id} and api key {api_key}')
             raise e
 
+    def _index_exists(self, index: str) -> bool:
+        if index in self._existing: return True
+        if not self._client.indices.exists(index=index): return False
+        self._existing.add(index)
+        return True
+
     @override
     def _ensure_index(self, index: str = None) -> bool:
-        if not index or self._client.indices.exists(index=index):
+        if not index or self._index_exists(index):
             return False
         try:
             self._client.indices.create(index=index, body=self._index_kwargs)
+            self._existing.add(index)
             return True
         except elasticsearch.TransportError as e:
             if getattr(e, 'error', '') != 'resource_already_exists_exception':
                 raise e
+            self._existing.add(index)
         except Exception as e:
             LOG.error(f'[ElasticSearch - _ensure_index] Error creating index {index}: {e}')
             raise e
 
+    @override
+    @contextmanager
+    def ingestion(self):
+        # writes inside the block skip the per-request refresh, the written indices are refreshed once at the end
+        if getattr(self._local, 'batch', None) is not None:
+            yield
+            return
+        self._local.batch = batch = set()
+        try:
+            yield
+        finally:
+            self._local.batch = None
+            if batch: self._client.indices.refresh(index=','.join(sorted(batch)), ignore_unavailable=True)
+
+    def _refresh_mode(self, index: str, immediate: Union[bool, str]) -> Union[bool, str]:
+        batch = getattr(self._local, 'batch', None)
+        if batch is None: return immediate
+        batch.add(index)
+        return False
+
+    def _bulk(self, collection_name: str, actions: List[Dict], refresh: Union[bool, str]) -> None:
+        response = self._client.bulk(index=collection_name, body=actions, refresh=refresh)
+        if response.get('errors'):
+            raise ValueError(f'Error writing data to Elasticsearch: {response}')
+
+    def _bulk_concurrently(self, collection_name: str, actions: List[Dict], refresh: Union[bool, str]) -> None:
+        # actions come in (header, document) pairs, chunks of them are sent at the same time
+        chunks = [actions[i:i + 2 * BULK_CHUNK_SIZE] for i in range(0, len(actions), 2 * BULK_CHUNK_SIZE)]
+        if len(chunks) <= 1:
+            for chunk in chunks: self._bulk(collection_name, chunk, refresh)
+            return
+        executor = _get_bulk_executor()
+        for future in [executor.submit(self._bulk, collection_name, chunk, refresh) for chunk in chunks]:
+            future.result()
+
     @override
     def upsert(self, collection_name: str = None, data: List[Dict] = None) -> bool:
         if not data:
             return False
         try:
             self._ensure_index(collection_name)
-            for i in range(0, len(data), INSERT_BATCH_SIZE):
-                bulk_data = []
-                batch_data = data[i: i + INSERT_BATCH_SIZE]
-                for segment in batch_data:
-                    segment = self._serialize_node(segment)
-                    _id = segment.pop(self._primary_key, None)
-                    bulk_data.append({'index': {'_index': collection_name, '_id': _id}})
-                    bulk_data.append(segment)
-
-                response = self._client.bulk(index=collection_name, body=bulk_data, refresh='wait_for')
-                if response.get('errors'):
-                    raise ValueError(
-                        f'Error upserting data to Elasticsearch: {response}'
-                    )
+            bulk_data = []
+            for segment in data:
+                segment = self._serialize_node(segment)
+                # `uid` stays in the source as well, it is the sort key of `get_page`
+                _id = segment.get(self._primary_key)
+                bulk_data.append({'index': {'_index': collection_name, '_id': _id}})
+                bulk_data.append(segment)
+            self._bulk_concurrently(collection_name, bulk_data, self._refresh_mode(collection_name, 'wait_for'))
             return True
 
         except Exception as e:
+            self._existing.discard(collection_name)
             LOG.error(f'[ElasticSearchStore - upsert] Error upserting documents to {collection_name}: {e}')
             raise e
 
     @override
     def delete(self, collection_name: str = None, criteria: Optional[Dict] = None, **kwargs) -> bool:
         try:
-            if not self._client.indices.exists(index=collection_name):
+            if not self._index_exists(collection_name):
                 LOG.warning(f'[ElasticSearchStore - delete] Index {collection_name} does not exist')
                 return True
             if not criteria:
                 with self._ddl_lock:
                     if self._client.indices.exists(index=collection_name):
                         self._client.indices.delete(index=collection_name)
+                    self._existing.discard(collection_name)
+                    self._keyset_ready.discard(collection_name)
                 return True
             else:
                 resp = self._client.delete_by_query(
                     index=collection_name,
                     body=self._construct_criteria(criteria),
-                    refresh=True,
+                    refresh=self._refresh_mode(collection_name, True),
                     conflicts='proceed',
                     request_timeout=30,
                 )
@@ -200,13 +264,14 @@ class ElasticSearchStore(LazyLLMStoreBase):
                 return True
 
         except Exception as e:
+            self._existing.discard(collection_name)
             LOG.error(f'[ElasticSearchStore - delete] Error deleting from {collection_name}: {e}')
             raise e
 
     @override
     def get(self, collection_name: str, criteria: Optional[dict] = None, **kwargs) -> List[dict]:  # noqa: C901
         try:
-            if not self._client.indices.exists(index=collection_name):
+            if not self._index_exists(collection_name):
                 return []
 
             results: List[dict] = []
@@ -241,9 +306,105 @@ class ElasticSearchStore(LazyLLMStoreBase):
                         results.append(seg)
             return results
         except Exception as e:
+            self._existing.discard(collection_name)
             LOG.error(f'[ElasticsearchStore - get] Error getting data from Elasticsearch: {e}')
             return []
 
+    @override
+    def update_global_meta(self, collection_name: str, updates: List[Tuple[dict, dict]], **kwargs) -> bool:
+        # only `global_meta` is fetched and sent back as partial-document updates, content is left untouched
+        try:
+            if not self._index_exists(collection_name): return True
+            helpers = elasticsearch.helpers
+            for criteria, patch in updates:
+                query = self._construct_criteria(criteria) or {'query': {'match_all': {}}}
+                body = {**query, '_source': ['global_meta']}
+                actions = []
+                for hit in helpers.scan(client=self._client, index=collection_name, query=body, scroll='2m',
+                                        size=500, preserve_order=False):
+                    meta = self._deserialize_node(hit['_source']).get('global_meta') or {}
+                    seg = self._serialize_node({'global_meta': {**meta, **patch}})
+                    actions += [{'update': {'_index': collection_name, '_id': hit['_id']}},
+                                {'doc': {'global_meta': seg['global_meta']}}]
+                self._bulk_concurrently(collection_name, actions, self._refresh_mode(collection_name, 'wait_for'))
+            return True
+        except Exception as e:
+            self._existing.discard(collection_name)
+            LOG.error(f'[ElasticSearchStore - update_global_meta] Error updating metadata of {collection_name}: {e}')
+            return False
+
+    @override
+    def count(self, collection_name: str, criteria: Optional[dict] = None, **kwargs) -> int:
+        try:
+            if not self._index_exists(collection_name): return 0
+            query = self._construct_criteria(criteria) or {'query': {'match_all': {}}}
+            return self._client.count(index=collection_name, body=query)['count']
+        except Exception as e:
+            self._existing.discard(collection_name)
+            LOG.error(f'[ElasticSearchStore - count] Error counting {collection_name}: {e}')
+            raise e
+
+    @override
+    def get_page(self, collection_name: str, criteria: Optional[dict] = None, limit: Optional[int] = None,
+                 offset: int = 0, after: Optional[str] = None, **kwargs) -> List[dict]:
+        # keyset pagination on the `uid` keyword with `search_after`; `from` is only used for shallow offsets
+        try:
+            if not self._index_exists(collection_name): return []
+            if not self._is_keyset_ready(collection_name):
+                return super().get_page(collection_name, criteria, limit=limit, offset=offset, after=after, **kwargs)
+            query = self._construct_criteria(criteria) or {'query': {'match_all': {}}}
+            results, skip, search_after = [], offset, [after] if after is not None else None
+            while limit is None or len(results) < limit:
+                want = PAGE_SIZE if limit is None else min(PAGE_SIZE, limit - len(results))
+                body = {**query, 'sort': [{'uid': 'asc'}]}
+                if search_after is None and skip and skip + want <= MAX_RESULT_WINDOW:
+                    body['from'], skip = skip, 0
+                body['size'] = size = min(PAGE_SIZE, want + skip)
+                if search_after is not None: body['search_after'] = search_after
+                hits = self._client.search(index=collection_name, body=body)['hits']['hits']
+                dropped, skip = min(skip, len(hits)), skip - min(skip, len(hits))
+                results.extend(self._transform_segment(hit) for hit in hits[dropped:])
+                if len(hits) < size: break
+                search_after = hits[-1]['sort']
+            return results
+        except Exception as e:
+            self._existing.discard(collection_name)
+            LOG.error(f'[ElasticSearchStore - get_page] Error getting a page of {collection_name}: {e}')
+            raise e
+
+    def _is_keyset_ready(self, index: str) -> bool:
+        # documents written before `uid` was kept in the source have no sort value, an index holding any of them is
+        # paged by sorting in memory until it is reindexed (documents upserted again get the field)
+        if index in self._keyset_ready: return True
+        body = {'query': {'bool': {'must_not': {'exists': {'field': 'uid'}}}}}
+        if self._client.count(index=index, body=body)['count']:
+            if index in self._legacy_warned: return False
+            self._legacy_warned.add(index)
+            LOG.warning(f'[ElasticSearchStore - get_page] Index {index} has documents without `uid` in their '
+                        'source, reindex it to page on the uid keyword instead of sorting in memory')
+            return False
+        self._keyset_ready.add(index)
+        return True
+
+    @override
+    def get_windows(self, collection_name: str, windows: List[Tuple[str, str, int, int]], **kwargs) -> List[dict]:
+        try:
+            merged = merge_windows(windows)
+            if not merged or not self._index_exists(collection_name):
+                return []
+            should = [{'bool': {'must': [{'term': {'kb_id': kb_id}}, {'term': {'doc_id': doc_id}},
+                                         {'range': {'number': {'gte': start, 'lte': end}}}]}}
+                      for (kb_id, doc_id), spans in merged.items() for start, end in spans]
+            helpers = elasticsearch.helpers
+            results = [self._transform_segment(hit) for hit in helpers.scan(
+                client=self._client, index=collection_name, scroll='2m', size=500, preserve_order=False,
+                query={'query': {'bool': {'should': should, 'minimum_should_match': 1}}})]
+            return sorted(results, key=lambda seg: (seg.get('kb_id'), seg.get('doc_id'), seg.get('number') or 0))
+        except Exception as e:
+            self._existing.discard(collection_name)
+            LOG.error(f'[ElasticSearchStore - get_windows] Error getting windows from {collection_name}: {e}')
+            return []
+
     @override
     def search(self, collection_name: str, query: str,
                topk: Optional[int] = 10, filters: Optional[dict] = None, **kwargs) -> List[Dict]:  # noqa: C901
@@ -286,6 +447,7 @@ class ElasticSearchStore(LazyLLMStoreBase):
             return res
 
         except Exception as e:
+            self._existing.discard(collection_name)
             LOG.error(f'[ElasticSearchStore - search] Error searching {collection_name}: {e}')
             return []
 
@@ -330,9 +492,9 @@ class ElasticSearchStore(LazyLLMStoreBase):
         if RAG_KB_ID in criteria:
             _add_clause('kb_id', criteria.pop(RAG_KB_ID))
         if 'parent' in criteria:
-            must_clauses.append({'term': {'parent': criteria.pop('parent')}})
+            _add_clause('parent', criteria.pop('parent'))
         if 'number' in criteria:
-            must_clauses.append({'term': {'number': criteria.pop('number')}})
+            _add_clause('number', criteria.pop('number'))
 
         for k, v in criteria.items():
             field_key = k
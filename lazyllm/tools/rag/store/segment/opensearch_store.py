@@ -4,19 +4,22 @@ import threading
 import importlib.util
 import copy
 
-from typing import Dict, List, Union, Optional
+from typing import Dict, List, Union, Optional, Tuple
 
 from lazyllm import LOG
 from lazyllm.common import override
 from lazyllm.thirdparty import opensearchpy
 
-from ..store_base import LazyLLMStoreBase, StoreCapability, INSERT_BATCH_SIZE
+from ..store_base import LazyLLMStoreBase, StoreCapability, INSERT_BATCH_SIZE, merge_windows
 from ...global_metadata import RAG_DOC_ID, RAG_KB_ID, GlobalMetadataDesc
 from ...data_type import DataType
 from ..store_base import BUILDIN_GLOBAL_META_DESC
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+PAGE_SIZE = 1000
+MAX_RESULT_WINDOW = 10000
+
 DEFAULT_MAPPING_BODY = {
     'settings': {
         'index': {
@@ -193,6 +196,88 @@ class OpenSearchStore(LazyLLMStoreBase):
             LOG.error(f'[OpenSearchStore - get] Error getting data from OpenSearch: {e}')
             return []
 
+    @override
+    def update_global_meta(self, collection_name: str, updates: List[Tuple[dict, dict]], **kwargs) -> bool:
+        # only `global_meta` is fetched and sent back as partial-document updates, content is left untouched
+        try:
+            if not self._client.indices.exists(index=collection_name): return True
+            spec = importlib.util.find_spec('opensearchpy.helpers')
+            helpers = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(helpers)
+            for criteria, patch in updates:
+                query = self._construct_criteria(criteria) or {'query': {'match_all': {}}}
+                body = {**query, '_source': ['global_meta']}
+                actions = []
+                for hit in helpers.scan(client=self._client, index=collection_name, query=body, scroll='2m',
+                                        size=500, preserve_order=False):
+                    meta = self._deserialize_node(hit['_source']).get('global_meta') or {}
+                    seg = self._serialize_node({'global_meta': {**meta, **patch}})
+                    actions += [{'update': {'_index': collection_name, '_id': hit['_id']}},
+                                {'doc': {'global_meta': seg['global_meta']}}]
+                for i in range(0, len(actions), 2 * INSERT_BATCH_SIZE):
+                    response = self._client.bulk(index=collection_name, body=actions[i:i + 2 * INSERT_BATCH_SIZE],
+                                                 refresh='wait_for')
+                    if response.get('errors'): raise ValueError(f'Error updating metadata: {response}')
+            return True
+        except Exception as e:
+            LOG.error(f'[OpenSearchStore - update_global_meta] Error updating metadata of {collection_name}: {e}')
+            return False
+
+    @override
+    def count(self, collection_name: str, criteria: Optional[dict] = None, **kwargs) -> int:
+        try:
+            if not self._client.indices.exists(index=collection_name): return 0
+            query = self._construct_criteria(criteria) or {'query': {'match_all': {}}}
+            return self._client.count(index=collection_name, body=query)['count']
+        except Exception as e:
+            LOG.error(f'[OpenSearchStore - count] Error counting {collection_name}: {e}')
+            raise e
+
+    @override
+    def get_page(self, collection_name: str, criteria: Optional[dict] = None, limit: Optional[int] = None,
+                 offset: int = 0, after: Optional[str] = None, **kwargs) -> List[dict]:
+        # keyset pagination on the `uid` keyword with `search_after`; `from` is only used for shallow offsets
+        try:
+            if not self._client.indices.exists(index=collection_name): return []
+            query = self._construct_criteria(criteria) or {'query': {'match_all': {}}}
+            results, skip, search_after = [], offset, [after] if after is not None else None
+            while limit is None or len(results) < limit:
+                want = PAGE_SIZE if limit is None else min(PAGE_SIZE, limit - len(results))
+                body = {**query, 'sort': [{'uid': 'asc'}]}
+                if search_after is None and skip and skip + want <= MAX_RESULT_WINDOW:
+                    body['from'], skip = skip, 0
+                body['size'] = size = min(PAGE_SIZE, want + skip)
+                if search_after is not None: body['search_after'] = search_after
+                hits = self._client.search(index=collection_name, body=body)['hits']['hits']
+                dropped, skip = min(skip, len(hits)), skip - min(skip, len(hits))
+                results.extend(self._transform_segment(hit) for hit in hits[dropped:])
+                if len(hits) < size: break
+                search_after = hits[-1]['sort']
+            return results
+        except Exception as e:
+            LOG.error(f'[OpenSearchStore - get_page] Error getting a page of {collection_name}: {e}')
+            raise e
+
+    @override
+    def get_windows(self, collection_name: str, windows: List[Tuple[str, str, int, int]], **kwargs) -> List[dict]:
+        try:
+            merged = merge_windows(windows)
+            if not merged or not self._client.indices.exists(index=collection_name):
+                return []
+            should = [{'bool': {'must': [{'term': {'kb_id': kb_id}}, {'term': {'doc_id': doc_id}},
+                                         {'range': {'number': {'gte': start, 'lte': end}}}]}}
+                      for (kb_id, doc_id), spans in merged.items() for start, end in spans]
+            spec = importlib.util.find_spec('opensearchpy.helpers')
+            helpers = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(helpers)
+            results = [self._transform_segment(hit) for hit in helpers.scan(
+                client=self._client, index=collection_name, scroll='2m', size=500, preserve_order=False,
+                query={'query': {'bool': {'should': should, 'minimum_should_match': 1}}})]
+            return sorted(results, key=lambda seg: (seg.get('kb_id'), seg.get('doc_id'), seg.get('number') or 0))
+        except Exception as e:
+            LOG.error(f'[OpenSearchStore - get_windows] Error getting windows from {collection_name}: {e}')
+            return []
+
     @override
     def search(self, collection_name: str, query: Optional[str] = None,
                topk: Optional[int] = 10, filters: Optional[dict] = None, **kwargs) -> List[dict]:  # noqa: C901
@@ -276,9 +361,9 @@ class OpenSearchStore(LazyLLMStoreBase):
             val = criteria.pop(RAG_KB_ID)
             _add_clause('kb_id', val)
         if 'parent' in criteria:
-            must_clauses.append({'term': {'parent': criteria.pop('parent')}})
+            _add_clause('parent', criteria.pop('parent'))
         if 'number' in criteria:
-            must_clauses.append({'term': {'number': criteria.pop('number')}})
+            _add_clause('number', criteria.pop('number'))
 
         for k, v in criteria.items():
             field_key = k
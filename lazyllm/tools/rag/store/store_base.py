@@ -1,8 +1,11 @@
 import re
+import bisect
 
 from abc import ABC, abstractmethod
+from collections import defaultdict
+from contextlib import contextmanager
 from enum import IntFlag, auto
-from typing import Optional, List, Union, Set, Dict, Any
+from typing import Optional, List, Union, Set, Dict, Any, Tuple
 from lazyllm.common import LazyLLMRegisterMetaABCClass
 from pydantic import BaseModel, Field
 
@@ -32,6 +35,7 @@ BUILDIN_GLOBAL_META_DESC = {
     RAG_DOC_LAST_ACCESSED_DATE: GlobalMetadataDesc(data_type=DataType.VARCHAR, default_value=' ', max_size=10)
 }
 INSERT_BATCH_SIZE = 3000
+WINDOW_BATCH_SIZE = 200
 IMAGE_PATTERN = re.compile(r'!\[([^\]]*)\]\(([^)]+)\)')
 
 
@@ -64,6 +68,25 @@ class Segment(BaseModel):
     image_keys: Optional[List[str]] = Field(default_factory=list)
 
 
+def merge_windows(windows: List[Tuple[str, str, int, int]]) -> Dict[Tuple[str, str], List[Tuple[int, int]]]:
+    # windows: [(kb_id, doc_id, start, end)] with inclusive `end`; overlapping or adjacent ranges are merged
+    ranges = defaultdict(list)
+    for kb_id, doc_id, start, end in windows:
+        if start > end: start, end = end, start
+        ranges[(kb_id, doc_id)].append((start, end))
+    merged = {}
+    for key, spans in ranges.items():
+        spans.sort()
+        res = [list(spans[0])]
+        for start, end in spans[1:]:
+            if start <= res[-1][1] + 1:
+                res[-1][1] = max(res[-1][1], end)
+            else:
+                res.append([start, end])
+        merged[key] = [tuple(r) for r in res]
+    return merged
+
+
 class StoreCapability(IntFlag):
     SEGMENT = auto()
     VECTOR = auto()
@@ -101,3 +124,45 @@ class LazyLLMStoreBase(ABC, metaclass=LazyLLMRegisterMetaABCClass):
                filters: Optional[Dict[str, Union[str, int, List, Set]]] = None,
                embed_key: Optional[str] = None, **kwargs) -> List[dict]:
         raise NotImplementedError
+
+    def get_windows(self, collection_name: str, windows: List[Tuple[str, str, int, int]], **kwargs) -> List[dict]:
+        # Fallback for stores without a (kb_id, doc_id, number) index: one `get` per document
+        res = []
+        for (kb_id, doc_id), spans in merge_windows(windows).items():
+            numbers = [n for start, end in spans for n in range(start, end + 1)]
+            segments = self.get(collection_name, {RAG_KB_ID: kb_id, RAG_DOC_ID: [doc_id], 'number': numbers}, **kwargs)
+            res.extend(sorted(segments, key=lambda seg: seg.get('number', 0)))
+        return res
+
+    def get_relations(self, collection_name: str, criteria: Optional[dict] = None,
+                      **kwargs) -> List[Tuple[str, Optional[str]]]:
+        # (uid, parent) pairs of the matched segments; stores should override it to skip the payload
+        return [(seg['uid'], seg.get('parent')) for seg in self.get(collection_name, criteria, **kwargs)]
+
+    def update_global_meta(self, collection_name: str, updates: List[Tuple[dict, dict]], **kwargs) -> bool:
+        # merge each `global_meta` patch into the segments matched by its criteria; this fallback rewrites the whole
+        # segments, stores should override it to touch the metadata only
+        for criteria, patch in updates:
+            segments = self.get(collection_name, criteria, **kwargs)
+            for seg in segments: seg['global_meta'] = {**(seg.get('global_meta') or {}), **patch}
+            if segments and not self.upsert(collection_name, segments): return False
+        return True
+
+    def count(self, collection_name: str, criteria: Optional[dict] = None, **kwargs) -> int:
+        # number of matched segments; stores should override it to count without fetching the segments
+        return len(self.get(collection_name, criteria, **kwargs))
+
+    @contextmanager
+    def ingestion(self):
+        # writes of the calling thread inside the block form one batch: stores that make writes visible with a
+        # refresh may defer it to the end of the block. Reads after the block see every write of the batch
+        yield
+
+    def get_page(self, collection_name: str, criteria: Optional[dict] = None, limit: Optional[int] = None,
+                 offset: int = 0, after: Optional[str] = None, **kwargs) -> List[dict]:
+        # one page of the matched segments ordered by uid; `after` is a keyset cursor (the last uid of the previous
+        # page). This fallback sorts the full result, stores should override it to page on their uid index
+        segments = sorted(self.get(collection_name, criteria, **kwargs), key=lambda seg: seg['uid'])
+        if after is not None:
+            segments = segments[bisect.bisect_right([seg['uid'] for seg in segments], after):]
+        return segments[offset:None if limit is None else offset + limit]
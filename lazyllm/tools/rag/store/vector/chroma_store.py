@@ -2,7 +2,7 @@ import os
 import re
 import traceback
 
-from typing import Dict, List, Optional, Set, Union, Any
+from typing import Dict, List, Optional, Set, Union, Any, Tuple
 from collections import defaultdict
 from urllib.parse import urlparse
 from pathlib import Path
@@ -201,6 +201,31 @@ class ChromaStore(LazyLLMStoreBase):
             LOG.error(f'[ChromaStore - get] task fail: {e}')
             LOG.error(traceback.format_exc())
 
+    @override
+    def update_global_meta(self, collection_name: str, updates: List[Tuple[dict, dict]], **kwargs) -> bool:
+        # metadata is rewritten in place with `collection.update`, the embeddings are neither read nor written
+        updates = [(criteria, {self._gen_global_meta_key(k): v for k, v in patch.items()
+                               if k in self._global_metadata_desc}) for criteria, patch in updates]
+        updates = [(criteria, metas) for criteria, metas in updates if metas]
+        if not updates: return True
+        try:
+            for embed_key in self._embed_datatypes.keys():
+                try:
+                    collection = self._client.get_collection(name=self._gen_collection_name(collection_name, embed_key))
+                except chromadb.errors.NotFoundError:
+                    continue
+                for criteria, metas in updates:
+                    data = collection.get(include=['metadatas'], **self._construct_criteria(criteria))
+                    for i in range(0, len(data['ids']), INSERT_BATCH_SIZE):
+                        collection.update(ids=data['ids'][i:i + INSERT_BATCH_SIZE],
+                                          metadatas=[{**(meta or {}), **metas}
+                                                     for meta in data['metadatas'][i:i + INSERT_BATCH_SIZE]])
+            return True
+        except Exception as e:
+            LOG.error(f'[ChromaStore - update_global_meta] Failed to update collection {collection_name}: {e}')
+            LOG.error(traceback.format_exc())
+            return False
+
     @override
     def search(self, collection_name: str, query_embedding: List[float], embed_key: str, topk: Optional[int] = 10,
                filters: Optional[Dict[str, Union[str, int, List, Set]]] = None,
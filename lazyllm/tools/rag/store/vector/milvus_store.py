@@ -1,15 +1,16 @@
 import copy
 import traceback
 import threading
+import concurrent.futures
 
 from contextlib import contextmanager
 from queue import Queue, Empty, Full
 from packaging import version
 from urllib import parse
 from pathlib import Path
-from typing import Dict, List, Union, Optional, Set
+from typing import Dict, List, Union, Optional, Set, Tuple
 
-from lazyllm import LOG
+from lazyllm import LOG, ThreadPoolExecutor
 from lazyllm.thirdparty import pymilvus
 from lazyllm.common import override
 
@@ -18,6 +19,7 @@ from ...data_type import DataType
 from ...global_metadata import GlobalMetadataDesc
 
 MILVUS_UPSERT_BATCH_SIZE = 500
+MILVUS_UPSERT_CONCURRENCY = 4
 MILVUS_PAGINATION_OFFSET = 1000
 MILVUS_INDEX_MAX_RETRY = 3
 MILVUS_INDEX_TYPE_DEFAULTS = {
@@ -36,6 +38,18 @@ MILVUS_INDEX_TYPE_DEFAULTS = {
     'AUTOINDEX': {'metric_type': 'COSINE', 'params': {'nlist': 128}},
 }
 
+_upsert_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+_upsert_executor_lock = threading.Lock()
+
+def _get_upsert_executor() -> concurrent.futures.ThreadPoolExecutor:
+    global _upsert_executor
+    with _upsert_executor_lock:
+        if _upsert_executor is None:
+            _upsert_executor = ThreadPoolExecutor(max_workers=MILVUS_UPSERT_CONCURRENCY,
+                                                  thread_name_prefix='lazyllm-milvus-upsert')
+        return _upsert_executor
+
+
 class _ClientPool:
     def __init__(self, maker, max_size: int = 8):
         self._q = Queue(maxsize=max_size)
@@ -91,6 +105,12 @@ class MilvusStore(LazyLLMStoreBase):
 
         self._ddl_lock = threading.Lock()
         self._db_ready = False
+        # collection state is kept on the server, so it is cached once for all pooled clients: collections known
+        # to exist, collections already loaded and the embedding fields of each schema. Creating or dropping a
+        # collection through this store updates it, a failed request drops the entry and re-reads it next time
+        self._existing: Set[str] = set()
+        self._loaded: Set[str] = set()
+        self._embed_fields: Dict[str, List[str]] = {}
         self._ensure_database()
         self._index_kwargs = self.validate_milvus_embed_keys(self._index_kwargs)
 
@@ -141,6 +161,33 @@ class MilvusStore(LazyLLMStoreBase):
         finally:
             self._client_pool.release(c)
 
+    def _has_collection(self, client, collection_name: str) -> bool:
+        if collection_name in self._existing: return True
+        if not client.has_collection(collection_name): return False
+        self._existing.add(collection_name)
+        return True
+
+    def _ensure_loaded(self, client, collection_name: str) -> None:
+        if collection_name in self._loaded: return
+        client.load_collection(collection_name)
+        self._loaded.add(collection_name)
+
+    def _get_embed_fields(self, client, collection_name: str) -> List[str]:
+        if (fields := self._embed_fields.get(collection_name)) is None:
+            col_desc = client.describe_collection(collection_name=collection_name)
+            fields = self._embed_fields[collection_name] = [
+                field.get('name') for field in col_desc.get('fields', []) if field.get('name').startswith(EMBED_PREFIX)]
+        return fields
+
+    def _forget_collection(self, collection_name: str) -> None:
+        self._existing.discard(collection_name)
+        self._loaded.discard(collection_name)
+        self._embed_fields.pop(collection_name, None)
+
+    def _upsert_batch(self, collection_name: str, batch: List[dict]) -> None:
+        with self._client_context() as client:
+            client.upsert(collection_name=collection_name, data=[self._serialize_data(d) for d in batch])
+
     @override
     def upsert(self, collection_name: str, data: List[dict]) -> bool:
         try:
@@ -148,7 +195,7 @@ class MilvusStore(LazyLLMStoreBase):
             data_embeddings = data[0].get('embedding', {})
             if not data_embeddings: return True
             with self._client_context() as client:
-                if not client.has_collection(collection_name):
+                if not self._has_collection(client, collection_name):
                     embed_kwargs = {}
                     for embed_key in data_embeddings.keys():
                         assert self._embed_datatypes.get(embed_key), \
@@ -159,12 +206,20 @@ class MilvusStore(LazyLLMStoreBase):
                     with self._ddl_lock:
                         if not client.has_collection(collection_name):
                             self._create_collection(client, collection_name, embed_kwargs)
+                        self._forget_collection(collection_name)
+                        self._existing.add(collection_name)
 
-                for i in range(0, len(data), MILVUS_UPSERT_BATCH_SIZE):
-                    client.upsert(collection_name=collection_name,
-                                  data=[self._serialize_data(d) for d in data[i:i + MILVUS_UPSERT_BATCH_SIZE]])
+            # batches are sent concurrently, each one on a client of its own
+            batches = [data[i:i + MILVUS_UPSERT_BATCH_SIZE] for i in range(0, len(data), MILVUS_UPSERT_BATCH_SIZE)]
+            if len(batches) == 1:
+                self._upsert_batch(collection_name, batches[0])
+            else:
+                executor = _get_upsert_executor()
+                for future in [executor.submit(self._upsert_batch, collection_name, b) for b in batches]:
+                    future.result()
             return True
         except Exception as e:
+            self._forget_collection(collection_name)
             LOG.error(f'[Milvus Store - upsert] error: {e}')
             LOG.error(traceback.format_exc())
             return False
@@ -173,17 +228,19 @@ class MilvusStore(LazyLLMStoreBase):
     def delete(self, collection_name: str, criteria: Optional[dict] = None, **kwargs) -> bool:
         try:
             with self._client_context() as client:
-                if not client.has_collection(collection_name):
+                if not self._has_collection(client, collection_name):
                     return True
-                client.load_collection(collection_name)
                 if not criteria:
                     with self._ddl_lock:
                         if client.has_collection(collection_name):
                             client.drop_collection(collection_name=collection_name)
+                        self._forget_collection(collection_name)
                 else:
+                    self._ensure_loaded(client, collection_name)
                     client.delete(collection_name=collection_name, **self._construct_criteria(criteria))
             return True
         except Exception as e:
+            self._forget_collection(collection_name)
             LOG.error(f'[Milvus Store - delete] error: {e}')
             LOG.error(traceback.format_exc())
             return False
@@ -192,12 +249,10 @@ class MilvusStore(LazyLLMStoreBase):
     def get(self, collection_name: str, criteria: Optional[dict] = None, **kwargs) -> List[dict]:  # noqa: C901
         try:
             with self._client_context() as client:
-                if not client.has_collection(collection_name):
+                if not self._has_collection(client, collection_name):
                     return []
-                client.load_collection(collection_name)
-                col_desc = client.describe_collection(collection_name=collection_name)
-                field_names = [field.get('name') for field in col_desc.get('fields', [])
-                               if field.get('name').startswith(EMBED_PREFIX)]
+                self._ensure_loaded(client, collection_name)
+                field_names = list(self._get_embed_fields(client, collection_name))
                 query_kwargs = self._construct_criteria(criteria) if criteria else {}
                 if version.parse(pymilvus.__version__) < version.parse('2.4.11'):
                     # For older versions, batch query manually
@@ -225,10 +280,58 @@ class MilvusStore(LazyLLMStoreBase):
                         res += result
             return [self._deserialize_data(r) for r in res]
         except Exception as e:
+            self._forget_collection(collection_name)
             LOG.error(f'[Milvus Store - get] error: {e}')
             LOG.error(traceback.format_exc())
             return []
 
+    @override
+    def update_global_meta(self, collection_name: str, updates: List[Tuple[dict, dict]], **kwargs) -> bool:
+        # only the declared global metadata fields are stored here, patches of other keys need no write at all
+        updates = [(criteria, {self._gen_global_meta_key(k): v for k, v in patch.items()
+                               if k in self._global_metadata_desc and v is not None}) for criteria, patch in updates]
+        updates = [(criteria, fields) for criteria, fields in updates if fields]
+        if not updates: return True
+        try:
+            # milvus>=2.6 writes the given fields only, older versions need the full rows (vectors included)
+            partial = version.parse(pymilvus.__version__) >= version.parse('2.6.0')
+            with self._client_context() as client:
+                if not self._has_collection(client, collection_name): return True
+                self._ensure_loaded(client, collection_name)
+                for criteria, fields in updates:
+                    query_kwargs = self._construct_criteria(criteria)
+                    if 'ids' in query_kwargs:
+                        query_kwargs = {'filter': f'{self._primary_key} in {list(query_kwargs["ids"])}'}
+                    if not query_kwargs.get('filter'):
+                        LOG.warning(f'[Milvus Store - update_global_meta] Criteria {criteria} cannot be pushed down')
+                        continue
+                    output_fields = [self._primary_key] if partial else ['*']
+                    if version.parse(pymilvus.__version__) < version.parse('2.4.11'):
+                        batches = [self._batch_query_legacy(client, collection_name, output_fields, query_kwargs)]
+                    else:
+                        batches = self._iter_query(client, collection_name, output_fields, query_kwargs)
+                    for rows in batches:
+                        rows = [{self._primary_key: r[self._primary_key], **fields} if partial else {**r, **fields}
+                                for r in rows]
+                        for i in range(0, len(rows), MILVUS_UPSERT_BATCH_SIZE):
+                            client.upsert(collection_name=collection_name, data=rows[i:i + MILVUS_UPSERT_BATCH_SIZE],
+                                          **({'partial_update': True} if partial else {}))
+            return True
+        except Exception as e:
+            self._forget_collection(collection_name)
+            LOG.error(f'[Milvus Store - update_global_meta] error: {e}')
+            LOG.error(traceback.format_exc())
+            return False
+
+    def _iter_query(self, client, collection_name: str, output_fields: List[str], query_kwargs: dict):
+        iterator = client.query_iterator(collection_name=collection_name, batch_size=MILVUS_PAGINATION_OFFSET,
+                                         output_fields=output_fields, **query_kwargs)
+        try:
+            while (result := iterator.next()):
+                yield result
+        finally:
+            iterator.close()
+
     def _batch_query_legacy(self, client, collection_name: str, field_names: List[str], kwargs: dict) -> List[dict]:
         res = []
         offset = 0
@@ -473,18 +576,21 @@ class MilvusStore(LazyLLMStoreBase):
         with self._client_context() as client:
             if not embed_key or embed_key not in self._embed_datatypes:
                 raise ValueError(f'[Milvus Store - search] Not supported or None `embed_key`: {embed_key}')
-            if not client.has_collection(collection_name):
+            if not self._has_collection(client, collection_name):
                 return []
-            client.load_collection(collection_name)
-
             res = []
             filter_expr = self._construct_filter_expr(filters) if filters else ''
             if filter_str:
                 filter_expr = f'{filter_expr} and {filter_str}' if filter_expr else filter_str
 
-            results = client.search(collection_name=collection_name, data=[query_embedding], limit=topk,
-                                    anns_field=self._gen_embed_key(embed_key),
-                                    filter=filter_expr)
+            try:
+                self._ensure_loaded(client, collection_name)
+                results = client.search(collection_name=collection_name, data=[query_embedding], limit=topk,
+                                        anns_field=self._gen_embed_key(embed_key),
+                                        filter=filter_expr)
+            except Exception:
+                self._forget_collection(collection_name)
+                raise
             if len(results) != 1:
                 raise ValueError(f'number of results [{len(results)}] != expected [1]')
             for result in results[0]:
@@ -2,12 +2,12 @@ import hashlib
 import json
 import os
 import shutil
-import sqlite3
 import threading
 import time
 
 from abc import ABC, abstractmethod
 from collections import defaultdict
+from contextlib import contextmanager
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import (Any, Callable, Dict, Generator, List, Optional, Set, Tuple,
                     Union)
@@ -19,9 +19,9 @@ import sqlalchemy
 from lazyllm.thirdparty import fastapi
 from filelock import FileLock
 from pydantic import BaseModel
-from sqlalchemy import Column, Row, bindparam, insert, select, update
-from sqlalchemy.exc import NoResultFound
+from sqlalchemy import Column, Row, bindparam, delete, insert, select, update
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
+from sqlalchemy.pool import SingletonThreadPool
 
 import lazyllm
 from lazyllm import config
@@ -213,6 +213,10 @@ class DocListManager(ABC):
                             exclude_upload_status: Optional[Union[str, List[str]]] = None,
                             need_reparse: Optional[bool] = False): pass
 
+    def count_kb_group_files(self, group: Optional[str] = None, status: Union[str, List[str]] = Status.all) -> int:
+        # number of (file, group) records; subclasses should override it to count without listing the records
+        return len(self.list_kb_group_files(group=group, status=status))
+
     def add_files(
         self,
         files: List[str],
@@ -339,6 +343,25 @@ class DocListManager(ABC):
         self.enable_path_monitoring = False
 
 
+# bound parameters per statement, below the SQLITE_MAX_VARIABLE_NUMBER (999) of older sqlite builds
+_SQLITE_MAX_PARAMS = 900
+
+
+def _batched(items: List, size: int = _SQLITE_MAX_PARAMS) -> Generator[List, None, None]:
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _set_sqlite_pragmas(dbapi_conn, connection_record):
+    # WAL lets readers run alongside the (single) writer instead of queueing behind it
+    cursor = dbapi_conn.cursor()
+    cursor.execute('PRAGMA journal_mode = WAL')
+    cursor.execute('PRAGMA synchronous = NORMAL')
+    cursor.execute('PRAGMA busy_timeout = 30000')
+    cursor.close()
+
+
 class SqliteDocListManager(DocListManager):
     def __init__(self, path, name, enable_path_monitoring=True):
         super().__init__(path, name, enable_path_monitoring)
@@ -347,20 +370,34 @@ class SqliteDocListManager(DocListManager):
         root_dir = os.path.expanduser(os.path.join(config['home'], '.dbs'))
         os.makedirs(root_dir, exist_ok=True)
         self._db_path = os.path.join(root_dir, f'.lazyllm_dlmanager.{self._id}.db')
+        # writers are serialized (across processes) by the file lock; reads use pooled connections without it
         self._db_lock = FileLock(self._db_path + '.lock')
         # ensure that this connection is not used in another thread when sqlite3 is not threadsafe
         self._check_same_thread = not sqlite3_check_threadsafety()
         self._engine = sqlalchemy.create_engine(
-            f'sqlite:///{self._db_path}?check_same_thread={self._check_same_thread}'
+            f'sqlite:///{self._db_path}?check_same_thread={self._check_same_thread}',
+            connect_args={'timeout': 30}, **(dict(poolclass=SingletonThreadPool) if self._check_same_thread else
+                                             dict(pool_size=8, max_overflow=16))
         )
+        sqlalchemy.event.listen(self._engine, 'connect', _set_sqlite_pragmas)
         self._Session = sessionmaker(bind=self._engine)
         self.init_tables()
 
+    @contextmanager
+    def _connect(self):
+        # a pooled DB-API connection, returned to the pool (not closed) on exit
+        conn = self._engine.raw_connection()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
     def _init_tables(self):
-        KBDataBase.metadata.create_all(bind=self._engine)
+        with self._db_lock:
+            KBDataBase.metadata.create_all(bind=self._engine)
 
     def table_inited(self):
-        with self._db_lock, sqlite3.connect(self._db_path, check_same_thread=self._check_same_thread) as conn:
+        with self._connect() as conn:
             cursor = conn.execute('SELECT name FROM sqlite_master WHERE type=\'table\' AND name=\'documents\'')
             return cursor.fetchone() is not None
 
@@ -389,14 +426,17 @@ class SqliteDocListManager(DocListManager):
         return ' AND '.join(conds), params
 
     def _get_all_docs(self):
-        with self._db_lock, self._Session() as session:
+        with self._Session() as session:
             return session.query(KBDocument).all()
 
     def _get_docs(self, to_be_added_doc_ids: List, to_be_deleted_doc_ids: List, filter_status_list: List):
-        with self._db_lock, self._Session() as session:
-            docs_not_expected = session.query(KBDocument).filter(KBDocument.doc_id.in_(to_be_added_doc_ids)).all()
-            docs_expected = session.query(KBDocument).filter(KBDocument.doc_id.in_(to_be_deleted_doc_ids),
-                                                             KBDocument.status.in_(filter_status_list)).all()
+        docs_not_expected, docs_expected = [], []
+        with self._Session() as session:
+            for ids in _batched(to_be_added_doc_ids):
+                docs_not_expected.extend(session.query(KBDocument).filter(KBDocument.doc_id.in_(ids)).all())
+            for ids in _batched(to_be_deleted_doc_ids):
+                docs_expected.extend(session.query(KBDocument).filter(
+                    KBDocument.doc_id.in_(ids), KBDocument.status.in_(filter_status_list)).all())
         return docs_not_expected, docs_expected
 
     def validate_paths(self, paths: List[str]) -> Tuple[bool, str, List[bool]]:
@@ -407,16 +447,16 @@ class SqliteDocListManager(DocListManager):
         doc_id_to_path = {doc_id: path for doc_id, path in zip(doc_ids, paths)}
         found_doc_ids = []
         found_doc_group_rows = []
-        with self._db_lock, self._Session() as session:
-            rows = session.execute(
-                select(KBDocument.doc_id).where(KBDocument.doc_id.in_(doc_ids))
-            ).fetchall()
-            if len(rows) == 0:
+        with self._Session() as session:
+            for ids in _batched(doc_ids):
+                rows = session.execute(select(KBDocument.doc_id).where(KBDocument.doc_id.in_(ids))).fetchall()
+                found_doc_ids.extend(row.doc_id for row in rows)
+            if len(found_doc_ids) == 0:
                 return True, 'Success', paths_is_new
-            found_doc_ids = [row.doc_id for row in rows]
-            found_doc_group_rows = session.execute(
-                select(KBGroupDocuments.doc_id, KBGroupDocuments.need_reparse, KBGroupDocuments.status)
-                .where(KBGroupDocuments.doc_id.in_(found_doc_ids))).fetchall()
+            for ids in _batched(found_doc_ids):
+                found_doc_group_rows.extend(session.execute(
+                    select(KBGroupDocuments.doc_id, KBGroupDocuments.need_reparse, KBGroupDocuments.status)
+                    .where(KBGroupDocuments.doc_id.in_(ids))).fetchall())
 
         for doc_group_record in found_doc_group_rows:
             if doc_group_record.need_reparse:
@@ -450,15 +490,14 @@ class SqliteDocListManager(DocListManager):
         if limit:
             query += ' LIMIT ?'
             params.append(limit)
-        with self._db_lock, sqlite3.connect(self._db_path, check_same_thread=self._check_same_thread) as conn:
+        with self._connect() as conn:
             cursor = conn.execute(query, params)
             return cursor.fetchall() if details else [row[0] for row in cursor]
 
     def get_docs(self, doc_ids: List[str]) -> List[KBDocument]:
-        with self._db_lock, self._Session() as session:
-            docs = session.query(KBDocument).filter(KBDocument.doc_id.in_(doc_ids)).all()
-            return docs
-        return []
+        with self._Session() as session:
+            return [doc for ids in _batched(doc_ids)
+                    for doc in session.query(KBDocument).filter(KBDocument.doc_id.in_(ids)).all()]
 
     def set_docs_new_meta(self, doc_meta: Dict[str, dict]):
         data_to_update = [{'_doc_id': k, '_meta': json.dumps(v)} for k, v in doc_meta.items()]
@@ -490,12 +529,12 @@ class SqliteDocListManager(DocListManager):
         return rows
 
     def list_all_kb_group(self):
-        with self._db_lock, sqlite3.connect(self._db_path, check_same_thread=self._check_same_thread) as conn:
+        with self._connect() as conn:
             cursor = conn.execute('SELECT group_name FROM document_groups')
             return [row[0] for row in cursor]
 
     def add_kb_group(self, name):
-        with self._db_lock, sqlite3.connect(self._db_path, check_same_thread=self._check_same_thread) as conn:
+        with self._db_lock, self._connect() as conn:
             conn.execute('INSERT OR IGNORE INTO document_groups (group_name) VALUES (?)', (name,))
             conn.commit()
 
@@ -537,13 +576,27 @@ class SqliteDocListManager(DocListManager):
             query += ' LIMIT ?'
             params.append(limit)
 
-        with self._db_lock, sqlite3.connect(self._db_path, check_same_thread=self._check_same_thread) as conn:
+        with self._connect() as conn:
             cursor = conn.execute(query, params)
             rows = cursor.fetchall()
 
         if not details: return [row[:2] for row in rows]
         return rows
 
+    def count_kb_group_files(self, group: Optional[str] = None,
+                             status: Union[str, List[str]] = DocListManager.Status.all) -> int:
+        conds, params = [], []
+        if group:
+            conds.append('group_name = ?')
+            params.append(group)
+        status_cond, status_params = self.get_status_cond_and_params(status, prefix=None)
+        if status_cond:
+            conds.append(status_cond)
+            params.extend(status_params)
+        query = 'SELECT COUNT(*) FROM kb_group_documents' + (' WHERE ' + ' AND '.join(conds) if conds else '')
+        with self._connect() as conn:
+            return conn.execute(query, params).fetchone()[0]
+
     def delete_unreferenced_doc(self):
         with self._db_lock, self._Session() as session:
             docs_to_delete = (
@@ -560,42 +613,37 @@ class SqliteDocListManager(DocListManager):
     def _add_doc_records(self, files: List[str], metadatas: Optional[List[Dict[str, Any]]] = None,
                          status: Optional[str] = DocListManager.Status.waiting, batch_size: int = 64):
         documents = []
-
-        for i in range(0, len(files), batch_size):
-            batch_files = files[i:i + batch_size]
-            batch_metadatas = metadatas[i:i + batch_size] if metadatas else [None] * batch_size
-            vals = []
-
-            for i, file_path in enumerate(batch_files):
-                doc_id = gen_docid(file_path)
-
-                metadata = batch_metadatas[i].copy() if batch_metadatas[i] else {}
-                metadata.setdefault(RAG_DOC_ID, doc_id)
-                metadata.setdefault(RAG_DOC_PATH, file_path)
-
-                vals.append(
-                    {
-                        KBDocument.doc_id.name: doc_id,
-                        KBDocument.filename.name: os.path.basename(file_path),
-                        KBDocument.path.name: file_path,
-                        KBDocument.meta.name: json.dumps(metadata),
-                        KBDocument.status.name: status,
-                        KBDocument.count.name: 0,
-                    }
-                )
-            with self._db_lock, self._Session() as session:
-                rows = session.execute(
-                    insert(KBDocument)
-                    .values(vals)
-                    .prefix_with('OR IGNORE')
-                    .returning(KBDocument.doc_id, KBDocument.path)
-                ).fetchall()
-                session.commit()
-                documents.extend(rows)
+        # a single cached statement executed with multi-row batches (insertmanyvalues), all in one transaction
+        stmt = (insert(KBDocument.__table__).prefix_with('OR IGNORE')
+                .returning(KBDocument.doc_id, KBDocument.path))
+        with self._db_lock, self._Session() as session:
+            for i in range(0, len(files), batch_size):
+                batch_files = files[i:i + batch_size]
+                batch_metadatas = metadatas[i:i + batch_size] if metadatas else [None] * batch_size
+                documents.extend(session.execute(
+                    stmt, self._doc_record_values(batch_files, batch_metadatas, status)).fetchall())
+            session.commit()
         return documents
 
+    @staticmethod
+    def _doc_record_values(batch_files: List[str], batch_metadatas: List[Optional[Dict[str, Any]]], status: str):
+        vals = []
+        # resolve the column names once, the instrumented attributes are slow to access per row
+        doc_id_key, filename_key, path_key = KBDocument.doc_id.name, KBDocument.filename.name, KBDocument.path.name
+        meta_key, status_key, count_key = KBDocument.meta.name, KBDocument.status.name, KBDocument.count.name
+        for i, file_path in enumerate(batch_files):
+            doc_id = gen_docid(file_path)
+
+            metadata = batch_metadatas[i].copy() if batch_metadatas[i] else {}
+            metadata.setdefault(RAG_DOC_ID, doc_id)
+            metadata.setdefault(RAG_DOC_PATH, file_path)
+
+            vals.append({doc_id_key: doc_id, filename_key: os.path.basename(file_path), path_key: file_path,
+                         meta_key: json.dumps(metadata), status_key: status, count_key: 0})
+        return vals
+
     def get_docs_need_reparse(self, group: str) -> List[KBDocument]:
-        with self._db_lock, self._Session() as session:
+        with self._Session() as session:
             filter_status_list = [DocListManager.Status.success, DocListManager.Status.failed]
             documents = (
                 session.query(KBDocument).join(KBGroupDocuments, KBDocument.doc_id == KBGroupDocuments.doc_id)
@@ -607,7 +655,7 @@ class SqliteDocListManager(DocListManager):
 
     def get_existing_paths_by_pattern(self, pattern: str) -> List[str]:
         exist_paths = []
-        with self._db_lock, self._Session() as session:
+        with self._Session() as session:
             docs = session.query(KBDocument).filter(KBDocument.path.like(pattern)).all()
             exist_paths = [doc.path for doc in docs]
         return exist_paths
@@ -616,71 +664,65 @@ class SqliteDocListManager(DocListManager):
     def update_file_message(self, fileid: str, **kw):
         set_clause = ', '.join([f'{k} = ?' for k in kw.keys()])
         params = list(kw.values()) + [fileid]
-        with self._db_lock, sqlite3.connect(self._db_path, check_same_thread=self._check_same_thread) as conn:
+        with self._db_lock, self._connect() as conn:
             conn.execute(f'UPDATE documents SET {set_clause} WHERE doc_id = ?', params)
             conn.commit()
 
     def update_file_status(self, file_ids: List[str], status: str,
                            cond_status_list: Union[None, List[str]] = None) -> List[DocPartRow]:
         rows = []
-        if cond_status_list is None:
-            sql_cond = KBDocument.doc_id.in_(file_ids)
-        else:
-            sql_cond = sqlalchemy.and_(KBDocument.status.in_(cond_status_list), KBDocument.doc_id.in_(file_ids))
         with self._db_lock, self._Session() as session:
-            stmt = (
-                update(KBDocument)
-                .where(sql_cond)
-                .values(status=status)
-                .returning(KBDocument.doc_id, KBDocument.path)
-            )
-            rows = session.execute(stmt).fetchall()
+            for ids in _batched(file_ids, _SQLITE_MAX_PARAMS - len(cond_status_list or [])):
+                if cond_status_list is None:
+                    sql_cond = KBDocument.doc_id.in_(ids)
+                else:
+                    sql_cond = sqlalchemy.and_(KBDocument.status.in_(cond_status_list), KBDocument.doc_id.in_(ids))
+                stmt = (
+                    update(KBDocument)
+                    .where(sql_cond)
+                    .values(status=status)
+                    .returning(KBDocument.doc_id, KBDocument.path)
+                )
+                rows.extend(session.execute(stmt).fetchall())
             session.commit()
         return rows
 
     def add_files_to_kb_group(self, file_ids: List[str], group: str):
+        stmt = insert(KBGroupDocuments.__table__).prefix_with('OR IGNORE').returning(KBGroupDocuments.doc_id)
         with self._db_lock, self._Session() as session:
-            vals = []
-            for doc_id in file_ids:
-                vals = {
-                    KBGroupDocuments.doc_id.name: doc_id,
-                    KBGroupDocuments.group_name.name: group,
-                    KBGroupDocuments.status.name: DocListManager.Status.waiting,
-                }
-                rows = session.execute(
-                    insert(KBGroupDocuments).values(vals).prefix_with('OR IGNORE').returning(KBGroupDocuments.doc_id)
-                ).fetchall()
-                session.commit()
-                if not rows:
+            for ids in _batched(file_ids, _SQLITE_MAX_PARAMS):
+                vals = [{'doc_id': doc_id, 'group_name': group, 'status': DocListManager.Status.waiting}
+                        for doc_id in ids]
+                added = session.execute(stmt, vals).scalars().all()
+                if not added:
                     continue
-                doc = session.query(KBDocument).filter_by(doc_id=rows[0].doc_id).one()
-                doc.count += 1
-                session.commit()
+                session.execute(update(KBDocument).where(KBDocument.doc_id.in_(added))
+                                .values(count=KBDocument.count + 1).execution_options(synchronize_session=False))
+            session.commit()
 
     def delete_files_from_kb_group(self, file_ids: List[str], group: str):
         with self._db_lock, self._Session() as session:
-            for doc_id in file_ids:
-                records_to_delete = (
-                    session.query(KBGroupDocuments)
-                    .filter(KBGroupDocuments.doc_id == doc_id, KBGroupDocuments.group_name == group)
-                    .all()
-                )
-                for record in records_to_delete:
-                    session.delete(record)
-                session.commit()
-                if not records_to_delete:
+            for ids in _batched(file_ids, _SQLITE_MAX_PARAMS - 1):
+                deleted = session.execute(
+                    delete(KBGroupDocuments)
+                    .where(KBGroupDocuments.group_name == group, KBGroupDocuments.doc_id.in_(ids))
+                    .returning(KBGroupDocuments.doc_id)
+                ).scalars().all()
+                if not deleted:
                     continue
-                try:
-                    doc = session.query(KBDocument).filter_by(doc_id=records_to_delete[0].doc_id).one()
-                    doc.count = max(0, doc.count - 1)
-                    session.commit()
-                except NoResultFound:
+                updated = session.execute(
+                    update(KBDocument).where(KBDocument.doc_id.in_(deleted))
+                    .values(count=sqlalchemy.func.max(KBDocument.count - 1, 0))
+                    .returning(KBDocument.doc_id).execution_options(synchronize_session=False)
+                ).scalars().all()
+                for doc_id in set(deleted) - set(updated):
                     lazyllm.LOG.warning(f'No document found for {doc_id}')
+            session.commit()
 
     def get_file_status(self, fileid: str):
-        with self._db_lock, sqlite3.connect(self._db_path, check_same_thread=self._check_same_thread) as conn:
+        with self._connect() as conn:
             cursor = conn.execute('SELECT status FROM documents WHERE doc_id = ?', (fileid,))
-        return cursor.fetchone()
+            return cursor.fetchone()
 
     def update_kb_group(self, cond_file_ids: List[str], cond_group: Optional[str] = None,
                         cond_status_list: Optional[List[str]] = None, new_status: Optional[str] = None,
@@ -715,7 +757,7 @@ class SqliteDocListManager(DocListManager):
         return rows
 
     def release(self):
-        with self._db_lock, sqlite3.connect(self._db_path, check_same_thread=self._check_same_thread) as conn:
+        with self._db_lock, self._connect() as conn:
             conn.execute('delete from documents')
             conn.execute('delete from document_groups')
             conn.execute('delete from kb_group_documents')
@@ -757,10 +799,13 @@ def run_in_thread_pool(func: Callable, params: Optional[List[Dict]] = None) -> G
 Default_Suport_File_Types = ['.docx', '.pdf', '.txt', '.json']
 
 
+_SAVE_FILE_CHUNK_SIZE = 1024 * 1024
+
+
 def _save_file(_file: 'fastapi.UploadFile', _file_path: str):
-    file_content = _file.file.read()
+    # copy in chunks, the upload may be much larger than what should be held in memory
     with open(_file_path, 'wb') as f:
-        f.write(file_content)
+        shutil.copyfileobj(_file.file, f, _SAVE_FILE_CHUNK_SIZE)
 
 
 def _convert_path_to_underscores(file_path: str) -> str:
@@ -921,6 +966,7 @@ def parallel_do_embedding(embed: Dict[str, Callable], embed_keys: Optional[Union
 class _FileNodeIndex(IndexBase):
     def __init__(self):
         self._file_node_map = {}  # Dict[path, Dict[uid, DocNode]]
+        self._uid_path_map = {}  # Dict[uid, path]
 
     @override
     def update(self, nodes: List[DocNode]) -> None:
@@ -928,13 +974,15 @@ class _FileNodeIndex(IndexBase):
             path = node.global_metadata.get(RAG_DOC_PATH)
             if path:
                 self._file_node_map.setdefault(path, {}).setdefault(node._uid, node)
+                self._uid_path_map.setdefault(node._uid, path)
 
     @override
     def remove(self, uids: List[str], group_name: Optional[str] = None) -> None:
-        for path in list(self._file_node_map.keys()):
-            uid2node = self._file_node_map[path]
-            for uid in uids:
-                uid2node.pop(uid, None)
+        for uid in uids or []:
+            path = self._uid_path_map.pop(uid, None)
+            uid2node = self._file_node_map.get(path)
+            if uid2node is None: continue
+            uid2node.pop(uid, None)
             if not uid2node:
                 del self._file_node_map[path]
 
@@ -947,6 +995,61 @@ class _FileNodeIndex(IndexBase):
                 ret.extend(list(nodes.values()))
         return ret
 
+class _MetadataInvertedIndex(object):
+    # value -> uid postings over the declared global metadata keys of one group. `candidates` returns a superset
+    # of the uids matching `filters` (values that cannot be hashed are always kept), so callers still apply
+    # `generic_process_filters` to the (small) candidate set for exact semantics.
+    def __init__(self, keys: Union[List[str], Set[str]], version: Any = None):
+        self.version = version
+        self._postings: Dict[str, Dict[Any, Set[str]]] = {key: defaultdict(set) for key in keys}
+        self._unhashable: Dict[str, Set[str]] = {key: set() for key in keys}
+        self._uid_values: Dict[str, Dict[str, Any]] = {}
+
+    def __len__(self):
+        return len(self._uid_values)
+
+    def add(self, uid: str, global_metadata: Optional[Dict[str, Any]]) -> None:
+        if uid in self._uid_values: self.remove(uid)
+        values = {}
+        for key, postings in self._postings.items():
+            value = values[key] = (global_metadata or {}).get(key)
+            try:
+                postings[value].add(uid)
+            except TypeError:
+                self._unhashable[key].add(uid)
+        self._uid_values[uid] = values
+
+    def remove(self, uid: str) -> None:
+        values = self._uid_values.pop(uid, None)
+        if values is None: return
+        for key, value in values.items():
+            try:
+                uids = self._postings[key].get(value)
+            except TypeError:
+                self._unhashable[key].discard(uid)
+                continue
+            if uids is not None:
+                uids.discard(uid)
+                if not uids: del self._postings[key][value]
+
+    def candidates(self, filters: Dict[str, Union[str, int, List, Set]]) -> Optional[Set[str]]:
+        # None means no filter key is indexed and every uid stays a candidate
+        matched = []
+        for name, values in filters.items():
+            postings = self._postings.get(name)
+            if postings is None: continue
+            if not isinstance(values, (list, set)): values = [values]
+            try:
+                hits = [postings[v] for v in values if v in postings]
+            except TypeError:
+                continue
+            uids = self._unhashable[name].union(*hits)
+            if not uids: return set()
+            matched.append(uids)
+        if not matched: return None
+        matched.sort(key=len)
+        return matched[0].intersection(*matched[1:])
+
 def generic_process_filters(nodes: List[DocNode], filters: Dict[str, Union[str, int, List, Set]]) -> List[DocNode]:
     res = []
     for node in nodes:
@@ -0,0 +1,54 @@
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from lazyllm.tools.rag.utils import DocListManager
+
+
+def run(n_files: int, batch: int, n_readers: int, path: str):
+    manager = DocListManager(path, 'BenchManager', enable_path_monitoring=False)
+    files = [os.path.join(path, f'{i}.txt') for i in range(n_files)]
+    begin = time.time()
+    fids = [doc.doc_id for doc in manager.add_files(files)]
+    print(f'add {len(fids)} files: {time.time() - begin:.2f}s')
+
+    writing, reads = threading.Event(), []
+
+    def reader():
+        while writing.is_set():
+            t = time.time()
+            manager.list_kb_group_files(DocListManager.DEFAULT_GROUP_NAME, limit=100,
+                                        status=DocListManager.Status.waiting)
+            manager.get_file_status(fids[-1])
+            reads.append(time.time() - t)
+
+    writing.set()
+    readers = [threading.Thread(target=reader) for _ in range(n_readers)]
+    for r in readers: r.start()
+    t = time.time()
+    for i in range(0, len(fids), batch):
+        manager.update_file_status(fids[i:i + batch], DocListManager.Status.working)
+        manager.update_kb_group(fids[i:i + batch], DocListManager.DEFAULT_GROUP_NAME,
+                                new_status=DocListManager.Status.working)
+    writing.clear()
+    for r in readers: r.join()
+    reads.sort()
+    print(f'update {len(fids)} files in batches of {batch}: {time.time() - t:.2f}s')
+    if reads:
+        print(f'{len(reads)} reads while writing, median {reads[len(reads) // 2] * 1000:.1f}ms, '
+              f'p99 {reads[int(len(reads) * 0.99)] * 1000:.1f}ms, max {reads[-1] * 1000:.1f}ms')
+    print(f'total: {time.time() - begin:.2f}s')
+    manager.release()
+
+
+if __name__ == '__main__':
+    # concurrent reads of the document list while a large knowledge base is being updated
+    parser = argparse.ArgumentParser(description='Benchmark DocListManager reads under concurrent writes.')
+    parser.add_argument('--files', type=int, default=100000)
+    parser.add_argument('--batch', type=int, default=5000)
+    parser.add_argument('--readers', type=int, default=4)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        run(args.files, args.batch, args.readers, tmp)
@@ -202,3 +202,65 @@ class TestToolManager:
             test_value = 333
         finally:
             assert test_value == 333
+
+
+def _slow_tool(x: int):
+    '''
+    Sleep for a while and echo the input.
+
+    Args:
+        x (int): the value to echo.
+    '''
+    import time
+    time.sleep(x)
+    return f'slept {x}'
+
+
+def _echo_tool(text: str):
+    '''
+    Echo the text.
+
+    Args:
+        text (str): the text to echo.
+    '''
+    import time
+    time.sleep(0.2)
+    return f'echo {text}'
+
+
+class _FakeLLM(object):
+    def share(self, *args, **kw): return self
+
+
+class TestToolCalls:
+    def test_diverter_built_once(self):
+        tm = ToolManager([_echo_tool])
+        calls = [{'function': {'name': '_echo_tool', 'arguments': {'text': 'a'}}}]
+        assert list(tm(calls)) == ['echo a']
+        assert list(tm(calls + calls)) == ['echo a', 'echo a']
+        diverter = tm._diverters[(('_echo_tool', True),)]
+        assert list(tm(calls)) == ['echo a'] and len(tm._diverters) == 2
+        assert tm._diverters[(('_echo_tool', True),)] is diverter
+
+    def test_tool_timeout(self):
+        tm = ToolManager([_slow_tool, _echo_tool], timeout={'_slow_tool': 0.2})
+        res = tm([{'function': {'name': '_slow_tool', 'arguments': {'x': 1}}},
+                  {'function': {'name': '_echo_tool', 'arguments': {'text': 'b'}}}])
+        assert list(res) == ['Tool [_slow_tool] timed out after 0.2s.', 'echo b']
+
+    def test_rewoo_independent_steps_run_concurrently(self):
+        import time
+        from lazyllm.tools import ReWOOAgent
+        agent = ReWOOAgent(_FakeLLM(), [_echo_tool])
+        plan = ('Plan: a\n#E1 = _echo_tool[{"text": "a"}]\n'
+                'Plan: b\n#E2 = _echo_tool[{"text": "b"}]\n'
+                'Plan: c\n#E3 = _echo_tool[{"text": "#E1 and #E2"}]\n'
+                'Plan: d\n#E4 = _echo_tool[{"text": "d"}]')
+        lazyllm.locals['_lazyllm_agent']['workspace'] = {'tool_call_trace': []}
+        start = time.time()
+        evidences = agent._get_worker_evidences(plan)
+        assert time.time() - start < 0.6
+        assert 'Evidence:\necho echo a and echo b\n' in evidences
+        assert evidences.index('Plan: c') < evidences.index('echo echo a') < evidences.index('Plan: d')
+        trace = lazyllm.locals['_lazyllm_agent']['workspace']['tool_call_trace']
+        assert [t['tool_call_result'] for t in trace] == ['echo a', 'echo b', 'echo echo a and echo b', 'echo d']
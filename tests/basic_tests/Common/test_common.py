@@ -227,6 +227,72 @@ class TestCommonGlobals(object):
         t.start()
         t.join()
 
+    def test_globals_session_is_lazy(self):
+        try:
+            with lazyllm.new_session('lazy-session-test'):
+                before = lazyllm.globals.session_stats()['created']
+                assert lazyllm.globals['user_id'] is None
+                assert 'chat_history' in lazyllm.globals
+                assert lazyllm.globals.session_stats()['created'] == before
+                lazyllm.globals['user_id'] = 'u1'
+                assert lazyllm.globals.session_stats()['created'] == before + 1
+                assert lazyllm.globals['user_id'] == 'u1'
+        finally:
+            # new_session leaves its sid behind, later tests in this thread must not share it
+            lazyllm.globals._init_sid()
+            lazyllm.locals._init_sid()
+
+
+class TestSessionStore(object):
+    def _store(self):
+        from lazyllm.common.globals import _SessionStore, ThreadSafeDict
+        return _SessionStore(ThreadSafeDict(chat_history={}, user_id=None), n_shards=4)
+
+    def test_copy_per_session(self):
+        store = self._store()
+        assert store.get('a') is None
+        store.get('a', create=True)['chat_history']['m'] = 1
+        assert store.get('b', create=True)['chat_history'] == {}
+        assert store.get('a')['chat_history'] == {'m': 1}
+        assert len(store) == 2 and store.stats()['created'] == 2
+        store.pop('a')
+        assert 'a' not in store and len(store) == 1
+
+    def test_ttl_eviction(self):
+        store = self._store()
+        with lazyllm.config.temp('session_ttl', 10):
+            store.get('old', create=True)
+            now = time.monotonic()
+            store.get('new', create=True)
+            store._shard('old')[1]['old'].last_access = now - 100
+            assert store.sweep(now) == 1
+        assert 'old' not in store and 'new' in store
+        assert store.stats()['expired'] == 1
+        # without a ttl idle sessions are kept
+        store.get('idle', create=True)
+        store._shard('idle')[1]['idle'].last_access = now - 10 ** 6
+        assert store.sweep(now) == 0 and 'idle' in store
+
+    def test_lru_eviction(self):
+        store = self._store()
+        with lazyllm.config.temp('session_max_count', 8):
+            for i in range(20):
+                store.get(f's{i}', create=True)
+                store.get('hot')
+            assert len(store) <= 8
+            assert 's19' in store
+            assert store.stats()['evicted'] == 20 - len(store)
+
+    def test_memory_eviction(self):
+        store = self._store()
+        with lazyllm.config.temp('session_max_bytes', 20000), lazyllm.config.temp('session_ttl', 0):
+            for i in range(10):
+                store.get(f's{i}', create=True)['chat_history']['m'] = 'x' * 5000
+            store.sweep()
+            stats = store.stats()
+            assert 0 < stats['approx_bytes'] <= 20000
+            assert stats['evicted'] > 0 and 's9' in store
+
 
 class TestCommonRegistry(object):
     def test_component_registry(self):
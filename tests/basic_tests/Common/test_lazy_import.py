@@ -0,0 +1,40 @@
+import os
+import re
+import sys
+import json
+import subprocess
+
+
+def _run(code: str, *args: str) -> subprocess.CompletedProcess:
+    env = {k: v for k, v in os.environ.items() if k != 'LAZYLLM_INIT_DOC'}
+    return subprocess.run([sys.executable, *args, '-c', code], capture_output=True, text=True, env=env, check=True)
+
+
+class TestLazyImport(object):
+    LAZY_SUBPACKAGES = ['lazyllm.launcher', 'lazyllm.components', 'lazyllm.module', 'lazyllm.prompt_templates',
+                        'lazyllm.tools']
+
+    def test_import_does_not_load_subpackages(self):
+        code = ('import sys, json, resource, lazyllm; '
+                f'print(json.dumps([[m for m in {self.LAZY_SUBPACKAGES!r} if m in sys.modules], '
+                'resource.getrusage(resource.RUSAGE_SELF).ru_maxrss]))')
+        res = _run(code, '-X', 'importtime')
+        loaded, maxrss = json.loads(res.stdout.strip().splitlines()[-1])
+        assert loaded == []
+        assert maxrss < 256 * 1024  # KiB on linux
+        pattern = re.compile(r'import time:\s+\d+ \|\s+(\d+) \| lazyllm$', re.MULTILINE)
+        cumulative = [int(m.group(1)) for m in pattern.finditer(res.stderr)]
+        assert len(cumulative) == 1 and cumulative[0] < 3 * 10 ** 6  # microseconds, a generous budget for slow CI
+
+    def test_lazy_exports(self):
+        code = ('import sys, lazyllm; '
+                'from lazyllm import ModuleBase, OnlineChatModule; '
+                'assert lazyllm.Module is ModuleBase and "lazyllm.module" in sys.modules; '
+                'assert isinstance(lazyllm.Prompter, type) and "alpacaprompter" in lazyllm.prompter; '
+                'assert "emptylauncher" in lazyllm.launchers and lazyllm.deploy is lazyllm.Deploy; '
+                'assert lazyllm.config["launcher"] and lazyllm.Document.__module__.startswith("lazyllm.tools")')
+        _run(code)
+
+    def test_config_of_lazy_subpackage(self):
+        # config keys registered by a lazy subpackage resolve before the subpackage is imported explicitly
+        _run('import sys, lazyllm; assert lazyllm.config["launcher"]; assert "lazyllm.launcher" in sys.modules')
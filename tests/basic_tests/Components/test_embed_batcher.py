@@ -0,0 +1,99 @@
+import json
+import threading
+import time
+
+import pytest
+
+from lazyllm.components.deploy.embed import (_DynamicBatcher, _dump_embeddings, encode_float32_embeddings,
+                                             decode_float32_embeddings, is_float32_embeddings)
+from lazyllm.tools.rag.embed_wrapper import _EmbedWrapper
+
+
+class _FakeModel(object):
+    def __init__(self, delay=0.0):
+        self.batches = []
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    def __call__(self, texts):
+        with self.lock:
+            self.batches.append(list(texts))
+        time.sleep(self.delay)
+        if any(t == 'boom' for t in texts): raise ValueError('bad input')
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+class TestDynamicBatcher(object):
+    def test_concurrent_requests_are_batched(self):
+        model = _FakeModel()
+        batcher = _DynamicBatcher(model, max_batch_size=64, max_wait=0.2)
+        results, barrier = {}, threading.Barrier(8)
+
+        def request(i):
+            barrier.wait()
+            results[i] = batcher(['x' * (i + 1), 'y' * (10 - i)])
+
+        threads = [threading.Thread(target=request, args=(i,)) for i in range(8)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        for i in range(8):
+            assert results[i] == [[float(i + 1), 1.0], [float(10 - i), 1.0]]
+        assert len(model.batches) < 8
+        assert sum(len(b) for b in model.batches) == 16
+
+    def test_length_bucketing_and_max_batch_size(self):
+        model = _FakeModel()
+        batcher = _DynamicBatcher(model, max_batch_size=2, max_wait=0)
+        texts = ['aaaa', 'a', 'aaa', 'aa', 'aaaaa']
+        assert batcher(texts) == [[float(len(t)), 1.0] for t in texts]
+        assert model.batches == [['a', 'aa'], ['aaa', 'aaaa'], ['aaaaa']]
+
+    def test_disabled_batching(self):
+        model = _FakeModel()
+        batcher = _DynamicBatcher(model, max_batch_size=1, max_wait=0.1)
+        assert batcher(['ab', 'c']) == [[2.0, 1.0], [1.0, 1.0]]
+        assert model.batches == [['ab', 'c']]
+        assert batcher([]) == []
+
+    def test_failure_is_isolated(self):
+        model = _FakeModel(delay=0.05)
+        batcher = _DynamicBatcher(model, max_batch_size=64, max_wait=0.2)
+        results, barrier = {}, threading.Barrier(2)
+
+        def request(texts):
+            barrier.wait()
+            try:
+                results[texts[0]] = batcher(texts)
+            except ValueError as e:
+                results[texts[0]] = e
+
+        threads = [threading.Thread(target=request, args=(t,)) for t in (['boom'], ['ok'])]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        assert isinstance(results['boom'], ValueError)
+        assert results['ok'] == [[2.0, 1.0]]
+
+
+class TestFloat32Encoding(object):
+    def test_roundtrip(self):
+        vectors = [[0.5, -1.25, 3.0], [1.0, 2.0, 4.0]]
+        payload = encode_float32_embeddings(vectors)
+        assert is_float32_embeddings(payload)
+        assert decode_float32_embeddings(payload) == vectors
+        assert decode_float32_embeddings(encode_float32_embeddings(vectors[:1], single=True)) == vectors[0]
+        assert decode_float32_embeddings(encode_float32_embeddings([])) == []
+        realistic = [[i / 7 for i in range(64)]]
+        assert len(encode_float32_embeddings(realistic)) < len(json.dumps(realistic).encode()) / 3
+
+    def test_dump_embeddings(self):
+        vectors = [[0.5, 0.25]]
+        assert json.loads(_dump_embeddings(vectors, True, None)) == [0.5, 0.25]
+        assert json.loads(_dump_embeddings(vectors, False, 'json')) == vectors
+        assert decode_float32_embeddings(_dump_embeddings(vectors, False, 'float32')) == vectors
+
+    def test_embed_wrapper_decodes_float32(self):
+        wrapper = _EmbedWrapper(lambda text: encode_float32_embeddings([[0.5, 1.5]], single=True))
+        assert wrapper('hello') == [0.5, 1.5]
+        assert _EmbedWrapper(lambda text: b'[1.0, 2.0]')('hello') == [1.0, 2.0]
+        with pytest.raises(ValueError):
+            decode_float32_embeddings(b'[1.0]')
@@ -217,3 +217,39 @@ class TestModule:
 
         assert prl([dict(a=1, b=2), dict(a=3, b=4)]) == 10
         assert prl(dict(a=1, b=2), dict(a=3, b=4)) == 10
+
+    def test_deploy_concurrently(self):
+        events = []
+
+        class MyModule(lazyllm.ModuleBase):
+            def __init__(self, name, *submodules, fail=False):
+                super().__init__()
+                self.name, self._fail = name, fail
+                for i, m in enumerate(submodules): setattr(self, f'm{i}', m)
+
+            def _get_deploy_tasks(self):
+                def deploy():
+                    events.append(('start', self.name))
+                    time.sleep(0.3)
+                    if self._fail: raise RuntimeError(f'{self.name} failed')
+                    events.append(('ready', self.name))
+                return lazyllm.pipeline(deploy)
+
+        top = MyModule('top', MyModule('a'), MyModule('b', MyModule('c')))
+        top.start()
+        # submodules are ready before the module depending on them starts, independent ones start together
+        assert events.index(('ready', 'c')) < events.index(('start', 'b'))
+        assert events.index(('ready', 'a')) < events.index(('start', 'top'))
+        assert events.index(('start', 'c')) < events.index(('ready', 'a'))
+        assert [t['name'] for t in sorted(top._deploy_timeline, key=lambda t: t['start'])][-1] == 'top'
+
+        events.clear()
+        with pytest.raises(Exception, match='a failed'):
+            MyModule('top', MyModule('a', fail=True), MyModule('b')).start()
+        assert ('start', 'top') not in events
+
+        events.clear()
+        with lazyllm.config.temp('deploy_concurrency', 1):
+            MyModule('top', MyModule('a'), MyModule('b')).start()
+        assert events == [('start', 'a'), ('ready', 'a'), ('start', 'b'), ('ready', 'b'), ('start', 'top'),
+                          ('ready', 'top')]
@@ -0,0 +1,51 @@
+import os
+import tempfile
+
+import pytest
+
+from lazyllm.tools.rag import SimpleDirectoryReader
+from lazyllm.tools.rag import dataReader
+from lazyllm.tools.rag.data_loaders import DirectoryReader
+from lazyllm.tools.rag.store import LAZY_ROOT_NAME
+
+
+class TestSimpleDirectoryReaderStream(object):
+    @classmethod
+    def setup_class(cls):
+        cls._dir = tempfile.TemporaryDirectory()
+        cls.files = []
+        for i in range(6):
+            path = os.path.join(cls._dir.name, f'file_{i}.txt')
+            with open(path, 'w') as f: f.write(f'content of file {i}')
+            cls.files.append(path)
+
+    @classmethod
+    def teardown_class(cls):
+        cls._dir.cleanup()
+
+    def test_iter_data_serial(self):
+        reader = SimpleDirectoryReader(input_files=self.files)
+        batches = list(reader.iter_data(max_inflight=2))
+        assert len(batches) == len(self.files)
+        assert [b[0].text for b in batches] == [f'content of file {i}' for i in range(6)]
+        assert [n.text for n in reader._load_data()] == [b[0].text for b in batches]
+        assert 'file_name' in batches[0][0]._excluded_embed_metadata_keys
+
+    def test_iter_data_reuses_worker_pool(self):
+        reader = SimpleDirectoryReader(input_files=self.files)
+        texts = sorted(n.text for docs in reader.iter_data(num_workers=2) for n in docs)
+        assert texts == sorted(f'content of file {i}' for i in range(6))
+        pool = dataReader._worker_pools[2]
+        ordered = [n.text for n in reader._load_data(num_workers=2)]
+        assert ordered == [f'content of file {i}' for i in range(6)]
+        assert dataReader._worker_pools[2] is pool
+
+    def test_directory_reader_batches(self):
+        reader = DirectoryReader(None, {}, {})
+        batches = list(reader.iter_data(self.files, split_nodes_by_type=True, batch_nodes=4))
+        assert [len(b[LAZY_ROOT_NAME]) for b in batches] == [4, 2]
+        assert all(n._group == LAZY_ROOT_NAME for b in batches for n in b[LAZY_ROOT_NAME])
+        empty = os.path.join(self._dir.name, 'empty.none')
+        open(empty, 'w').close()
+        with pytest.raises(ValueError):
+            list(DirectoryReader(None, {'*.none': lambda file, **kw: []}, {}).iter_data([empty]))
@@ -9,7 +9,9 @@ import unittest
 import requests
 import io
 import json
+import os
 import time
+import threading
 
 
 @pytest.fixture(autouse=True)
@@ -158,6 +160,82 @@ class TestDocListManager(unittest.TestCase):
         # delete will literally erase the record
         assert len(files_list) == 1
 
+    def test_kb_group_counts_in_batches(self):
+        files = [str(self.test_dir.join(f'batch_{i}.txt')) for i in range(2000)]
+        docs = self.manager.add_files(files + files[:10])
+        assert len(docs) == 2000
+        self.manager.add_files_to_kb_group(get_fid(files) + get_fid(files[:10]), group='group1')
+        assert len(self.manager.list_kb_group_files('group1')) == 2000
+        self.manager.delete_files_from_kb_group(get_fid(files[:1500]), 'group1')
+        assert len(self.manager.list_kb_group_files('group1')) == 500
+        counts = {doc.doc_id: doc.count for doc in self.manager.get_docs(get_fid(files[1490:1510]))}
+        assert all(counts[fid] == 1 for fid in get_fid(files[1490:1500]))
+        assert all(counts[fid] == 2 for fid in get_fid(files[1500:1510]))
+        assert len(self.manager.update_file_status(get_fid(files), DocListManager.Status.working)) == 2000
+
+    def test_concurrent_read_write(self):
+        # scripts/benchmark_doc_list_manager.py measures the same workload on 100k files
+        manager = DocListManager(str(self.tmpdir.mkdir('concurrent_documents')), 'ConcurrentManager',
+                                 enable_path_monitoring=False)
+        files = [str(self.tmpdir.join(f'concurrent_documents/{i}.txt')) for i in range(2000)]
+        fids = [doc.doc_id for doc in manager.add_files(files)]
+        assert len(fids) == 2000
+
+        writing, reads, errors = threading.Event(), [], []
+
+        def reader():
+            try:
+                while writing.is_set():
+                    manager.list_kb_group_files(DocListManager.DEFAULT_GROUP_NAME, limit=100,
+                                                status=DocListManager.Status.waiting)
+                    reads.append(manager.get_file_status(fids[-1])[0])
+            except Exception as e:
+                errors.append(e)
+
+        writing.set()
+        readers = [threading.Thread(target=reader) for _ in range(4)]
+        for r in readers: r.start()
+        for i in range(0, len(fids), 200):
+            manager.update_file_status(fids[i:i + 200], DocListManager.Status.working)
+            manager.update_kb_group(fids[i:i + 200], DocListManager.DEFAULT_GROUP_NAME,
+                                    new_status=DocListManager.Status.working)
+        writing.clear()
+        for r in readers: r.join()
+        assert errors == [] and reads
+        assert manager.get_file_status(fids[0])[0] == DocListManager.Status.working
+        assert len(manager.list_kb_group_files(status=DocListManager.Status.working)) == 2000
+        manager.release()
+
+    def test_upload_files_streamed_and_batched(self):
+        from fastapi import HTTPException, UploadFile
+        manager = DocManager(self.manager)
+        existing = len(self.manager.list_kb_group_files(DocListManager.DEFAULT_GROUP_NAME))
+
+        def uploads(n, size=16):
+            return [UploadFile(io.BytesIO(bytes([i % 256]) * size), filename=f'up_{i % (n - 1)}.txt') for i in range(n)]
+
+        big = 3 * 1024 * 1024
+        response = manager.upload_files(uploads(200) + [UploadFile(io.BytesIO(b'x' * big), filename='big.bin')],
+                                        user_path='up')
+        ids, results = response.data
+        assert len(ids) == 201 and results.count('success') == 201
+        # same names in one request get unique paths, as they did when registered one by one
+        paths = {row[0]: row[2] for row in self.manager.list_files(details=True) if row[0] in ids}
+        assert len(set(paths.values())) == 201 and any(p.endswith('up_0-1.txt') for p in paths.values())
+        assert os.path.getsize(paths[ids[-1]]) == big
+        assert len(self.manager.list_kb_group_files(DocListManager.DEFAULT_GROUP_NAME)) == existing + 201
+
+        self.manager.update_kb_group(ids, new_status=DocListManager.Status.success)
+        response = manager.upload_files(uploads(3), override=True, user_path='up')
+        assert response.data[1][0].startswith('Success') and response.data[1][0].endswith('will be reparsed.')
+        waiting = self.manager.count_kb_group_files(status=DocListManager.Status.waiting)
+        assert waiting == len(self.manager.list_kb_group_files(status=DocListManager.Status.waiting))
+
+        with lazyllm.config.temp('max_parsing_backlog', waiting + 50):
+            with pytest.raises(HTTPException) as e:
+                manager.upload_files(uploads(100), user_path='other')
+            assert e.value.status_code == 429
+
 
 @pytest.fixture(scope="class", autouse=True)
 def setup_tmpdir_class(request, tmpdir_factory):
@@ -33,6 +33,8 @@ class TestDocImpl(unittest.TestCase):
         mock_node = DocNode(group=LAZY_ROOT_NAME, text='dummy text')
         mock_node._global_metadata = {RAG_DOC_ID: gen_docid(self.tmp_file_a.name), RAG_DOC_PATH: self.tmp_file_a.name}
         self.mock_directory_reader.load_data.return_value = {LAZY_ROOT_NAME: [mock_node], LAZY_IMAGE_GROUP: []}
+        self.mock_directory_reader.iter_data.side_effect = \
+            lambda *args, **kw: iter([self.mock_directory_reader.load_data.return_value])
 
         self.doc_impl = DocImpl(embed=self.mock_embed, doc_files=[self.tmp_file_a.name])
         self.doc_impl._reader = self.mock_directory_reader
@@ -88,6 +90,39 @@ class TestDocImpl(unittest.TestCase):
         self.doc_impl._add_doc_to_store([self.tmp_file_b.name])
         assert len(self.doc_impl.store.get_nodes(group=LAZY_ROOT_NAME)) == 2
 
+    def test_retrieve_cache(self):
+        self.mock_embed.return_value = [0.1, 0.2, 0.3]
+        self.doc_impl = DocImpl(embed={'vec': self.mock_embed}, doc_files=[self.tmp_file_a.name])
+        self.doc_impl._reader = self.mock_directory_reader
+        self.doc_impl.activate_group(LAZY_ROOT_NAME, ['vec'])
+        self.doc_impl._lazy_init()
+        kw = dict(group_name=LAZY_ROOT_NAME, similarity='cosine', similarity_cut_off=-100.0, index='default',
+                  topk=5, similarity_kws={})
+        calls = self.mock_embed.call_count
+
+        r1 = self.doc_impl.retrieve(query='test  query', cache=True, **kw)
+        assert self.mock_embed.call_count == calls + 1
+        r2 = self.doc_impl.retrieve(query=' test query\n', cache=True, **kw)
+        assert self.mock_embed.call_count == calls + 1  # served from the cache
+        assert [n.uid for n in r1] == [n.uid for n in r2] and r1[0] is not r2[0]
+        r1[0].metadata['tag'] = 'x'
+        r1[0].global_metadata['tag'] = 'x'
+        r1[0].embedding['vec'] = [0.0]
+        r2 = self.doc_impl.retrieve(query='test query', cache=True, **kw)
+        # the cached nodes keep their own metadata and embedding dicts
+        assert 'tag' not in r2[0].metadata and 'tag' not in r2[0].global_metadata
+        assert r2[0].embedding.get('vec') != [0.0]
+        self.doc_impl.retrieve(query='test query', **kw)
+        assert self.mock_embed.call_count == calls + 2  # uncached queries always run
+
+        new_doc = DocNode(text='new dummy text', group=LAZY_ROOT_NAME)
+        new_doc._global_metadata = {RAG_DOC_ID: gen_docid(self.tmp_file_b.name), RAG_DOC_PATH: self.tmp_file_b.name}
+        self.mock_directory_reader.load_data.return_value = {LAZY_ROOT_NAME: [new_doc], LAZY_IMAGE_GROUP: []}
+        self.doc_impl._add_doc_to_store([self.tmp_file_b.name])
+        calls = self.mock_embed.call_count
+        r3 = self.doc_impl.retrieve(query='test query', cache=True, **kw)
+        assert self.mock_embed.call_count == calls + 1 and len(r3) == 2  # the write invalidated the cached result
+
 class TestDocument(unittest.TestCase):
     @classmethod
     def tearDownClass(cls):
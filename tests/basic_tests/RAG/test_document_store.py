@@ -1,4 +1,5 @@
 import os
+import time
 import tempfile
 import unittest
 import pytest
@@ -8,6 +9,7 @@ from unittest.mock import MagicMock
 
 from lazyllm.tools.rag.store.document_store import _DocumentStore
 from lazyllm.tools.rag.store import MapStore, MilvusStore, BUILDIN_GLOBAL_META_DESC, HybridStore
+from lazyllm.tools.rag.store.store_base import LazyLLMStoreBase, StoreCapability
 from lazyllm.tools.rag.data_type import DataType
 from lazyllm.tools.rag.global_metadata import RAG_DOC_ID, RAG_KB_ID
 from lazyllm.tools.rag.doc_node import DocNode, QADocNode, ImageDocNode, JsonDocNode, RichDocNode, MetadataMode
@@ -219,6 +221,23 @@ class TestStoreWithMapAndMilvus(unittest.TestCase):
         segments = self.document_store.get_segments(doc_ids={node1.global_metadata.get(RAG_DOC_ID)}, limit=1)
         self.assertEqual(len(segments), 1)
 
+    def test_update_docs_meta(self):
+        from lazyllm.tools.rag.global_metadata import RAG_DOC_PATH
+        patch = {'tags': ['new'], RAG_DOC_PATH: '/data/new.txt'}
+        self.document_store.update_docs_meta({'doc1': dict(patch), 'doc3': dict(patch)})
+        nodes = {n.uid: n for n in self.document_store.get_nodes(group='group1')}
+        self.assertEqual(nodes['1'].global_metadata['tags'], ['new'])
+        self.assertEqual(nodes['2'].global_metadata['tags'], ['tag2'])
+        self.assertEqual(nodes['1'].text, 'text1')
+        self.assertEqual(self.document_store.get_nodes(uids=['4'], group='qa')[0].global_metadata['tags'], ['new'])
+        # declared fields are pushed to the vector store, embeddings are left as they were
+        rows = self.document_store.impl.vector_store.get(self.document_store._gen_collection_name('group1'),
+                                                         {RAG_DOC_ID: ['doc1']})
+        self.assertEqual(rows[0]['embedding']['vec_dense'], [1.0, 2.0, 3.0])
+        nodes = self.document_store.query(query='text1', group_name='group1', embed_keys=['vec_dense'],
+                                          topk=2, filters={RAG_DOC_PATH: ['/data/new.txt']})
+        self.assertEqual([n.uid for n in nodes], ['1'])
+
     def test_json_node_store_and_retrieve(self):
         '''Test that JsonDocNode can be stored and correctly reconstructed from store.'''
         # Retrieve the node from store
@@ -278,3 +297,186 @@ class TestStoreWithMapAndMilvus(unittest.TestCase):
         # Verify global_metadata of RichDocNode itself
         self.assertEqual(retrieved_node.global_metadata.get(RAG_DOC_ID), 'doc6')
         self.assertEqual(retrieved_node.global_metadata.get('tags'), ['tag7'])
+
+
+class TestDocumentStoreWindow(unittest.TestCase):
+    def setUp(self):
+        self.document_store = _DocumentStore(algo_name='__default__', store=MapStore(), embed={},
+                                             group_embed_keys={'group1': set()})
+        self.document_store.activate_group(['group1'])
+        self.nodes = []
+        for i in range(1, 9):
+            node = DocNode(uid=f'w{i}', text=f'text{i}', group='group1',
+                           global_metadata={RAG_KB_ID: 'kb1', RAG_DOC_ID: 'doc1'})
+            node.number = i
+            self.nodes.append(node)
+        self.document_store.update_nodes(self.nodes)
+
+    def test_get_window_nodes_batch(self):
+        windows = [('kb1', 'doc1', 1, 3), ('kb1', 'doc1', 2, 5), ('kb1', 'doc2', 1, 3)]
+        res = self.document_store.get_window_nodes('group1', windows)
+        self.assertEqual([[n.uid for n in w] for w in res], [['w1', 'w2', 'w3'], ['w2', 'w3', 'w4', 'w5'], []])
+
+    def test_window_cache_invalidated_by_update(self):
+        impl = self.document_store.impl
+        impl.get_windows = MagicMock(wraps=impl.get_windows)
+        windows = [('kb1', 'doc1', 3, 4)]
+        self.document_store.get_window_segments('group1', windows)
+        self.document_store.get_window_segments('group1', windows)
+        self.assertEqual(impl.get_windows.call_count, 1)
+
+        self.document_store.remove_nodes(uids=['w4'], group='group1', kb_id='kb1')
+        res = self.document_store.get_window_segments('group1', windows)
+        self.assertEqual(impl.get_windows.call_count, 2)
+        self.assertEqual([seg['uid'] for seg in res[0]], ['w3'])
+
+    def test_window_nodes_do_not_share_cached_metadata(self):
+        nodes = self.document_store.get_window_nodes('group1', [('kb1', 'doc1', 1, 2)])[0]
+        nodes[0].metadata['tag'] = 'x'
+        again = self.document_store.get_window_nodes('group1', [('kb1', 'doc1', 1, 2)])[0]
+        self.assertNotIn('tag', again[0].metadata)
+
+    def test_cache_only_on_for_in_memory_map_store(self):
+        self.assertTrue(self.document_store._cache_enabled)
+        with tempfile.TemporaryDirectory() as tmp:
+            # a file backed store may be written by other processes, so its reads are not cached unless asked
+            store = _DocumentStore(algo_name='__default__', store=MapStore(uri=os.path.join(tmp, 'map.db')),
+                                   embed={}, group_embed_keys={'group1': set()})
+            self.assertFalse(store._cache_enabled)
+            store.enable_cache()
+            self.assertTrue(store._cache_enabled)
+
+
+class TestDocumentStorePagination(unittest.TestCase):
+    def setUp(self):
+        self.document_store = _DocumentStore(algo_name='__default__', store=MapStore(), embed={},
+                                             group_embed_keys={'block': set(), 'line': set()})
+        self.document_store.activate_group(['block', 'line'])
+        nodes = [DocNode(uid=f'{group[0]}{doc[-1]}_{i:02d}', text=f'{group} {i}', group=group,
+                         global_metadata={RAG_KB_ID: 'kb1', RAG_DOC_ID: doc})
+                 for group, n in (('block', 3), ('line', 10)) for doc in ('doc1', 'doc2') for i in range(n)]
+        self.document_store.update_nodes(nodes)
+
+    def test_offset_pages_across_groups(self):
+        segments, total = self.document_store.get_segments(kb_id='kb1', limit=4, offset=4, return_total=True)
+        self.assertEqual(total, 26)
+        self.assertEqual([s['uid'] for s in segments], ['b2_01', 'b2_02', 'l1_00', 'l1_01'])
+        self.assertEqual(self.document_store.get_segments(limit=5, offset=25), [self.document_store.get_segments(
+            group='line', doc_ids=['doc2'], limit=1, offset=9)[0]])
+        self.assertEqual(self.document_store.count_segments(group='line', kb_id='kb1', doc_ids=['doc1']), 10)
+
+    def test_keyset_pagination(self):
+        uids, after = [], None
+        while True:
+            page = self.document_store.get_segments(group='line', doc_ids=['doc1'], limit=3, after=after)
+            if not page: break
+            uids.extend(s['uid'] for s in page)
+            after = page[-1]['uid']
+        self.assertEqual(uids, [f'l1_{i:02d}' for i in range(10)])
+        with self.assertRaises(ValueError):
+            self.document_store.get_segments(limit=3, after='b1_00')
+
+    def test_counts_are_cached_until_written(self):
+        impl = self.document_store.impl
+        impl.count = MagicMock(wraps=impl.count)
+        impl.get = MagicMock(wraps=impl.get)
+        for _ in range(2):
+            _, total = self.document_store.get_segments(group='line', kb_id='kb1', doc_ids=['doc1', 'doc2'],
+                                                        limit=2, return_total=True)
+            self.assertEqual(total, 20)
+        self.assertEqual(impl.count.call_count, 2)
+        impl.get.assert_not_called()
+        self.document_store.remove_nodes(uids=['l1_00'], group='line', kb_id='kb1')
+        self.assertEqual(self.document_store.count_segments(group='line', kb_id='kb1', doc_ids=['doc1']), 9)
+        self.assertEqual(self.document_store.count_segments(group='block', kb_id='kb1'), 6)
+
+
+class TestDocumentStoreRelation(unittest.TestCase):
+    def setUp(self):
+        self.document_store = _DocumentStore(algo_name='__default__', store=MapStore(), embed={},
+                                             group_embed_keys={'block': set(), 'line': set()})
+        self.document_store.activate_group(['block', 'line'])
+        meta = {RAG_KB_ID: 'kb1', RAG_DOC_ID: 'doc1'}
+        blocks = [DocNode(uid=f'b{i}', text=f'block{i}', group='block', global_metadata=meta) for i in range(2)]
+        lines = [DocNode(uid=f'l{i}', text=f'line{i}', group='line', parent=f'b{i // 2}', global_metadata=meta)
+                 for i in range(4)]
+        self.document_store.update_nodes(blocks + lines)
+
+    def test_parent_and_child_uids(self):
+        self.assertEqual(self.document_store.get_parent_uids('line', ['l0', 'l3'], kb_id='kb1'),
+                         {'l0': 'b0', 'l3': 'b1'})
+        children = self.document_store.get_child_uids('line', ['b1', 'b2'], kb_id='kb1')
+        self.assertEqual({k: sorted(v) for k, v in children.items()}, {'b1': ['l2', 'l3'], 'b2': []})
+
+    def test_relation_cache_invalidated_by_update(self):
+        impl = self.document_store.impl
+        impl.get_relations = MagicMock(wraps=impl.get_relations)
+        self.document_store.get_child_uids('line', ['b0'], kb_id='kb1')
+        self.document_store.get_child_uids('line', ['b0'], kb_id='kb1')
+        self.assertEqual(impl.get_relations.call_count, 1)
+
+        self.document_store.remove_nodes(uids=['l1'], group='line', kb_id='kb1')
+        self.assertEqual(self.document_store.get_child_uids('line', ['b0'], kb_id='kb1'), {'b0': ['l0']})
+        self.assertEqual(impl.get_relations.call_count, 2)
+
+    def test_get_nodes_by_uids(self):
+        nodes = self.document_store.get_nodes_by_uids('block', ['b1', 'b0', 'b9'], kb_id='kb1')
+        self.assertEqual([n.uid for n in nodes], ['b1', 'b0'])
+        nodes[0].metadata['tag'] = 'x'
+        again = self.document_store.get_nodes_by_uids('block', ['b1'], kb_id='kb1')
+        self.assertNotIn('tag', again[0].metadata)
+
+
+class _SlowVectorStore(LazyLLMStoreBase):
+    capability = StoreCapability.VECTOR
+    need_embedding = True
+    supports_index_registration = False
+
+    def __init__(self, results, delay):
+        self._results, self._delay, self.searched = results, delay, []
+
+    @property
+    def dir(self): return None
+
+    def connect(self, *args, **kwargs): pass
+    def upsert(self, collection_name, data): return True
+    def delete(self, collection_name, criteria=None, **kwargs): return True
+    def get(self, collection_name, criteria=None, **kwargs): return []
+
+    def search(self, collection_name, query=None, query_embedding=None, topk=10, filters=None, embed_key=None,
+               **kwargs):
+        time.sleep(self._delay)
+        self.searched.append(embed_key)
+        return [{'uid': uid, 'score': score} for uid, score in self._results[embed_key]]
+
+
+class TestDocumentStoreMultiEmbedQuery(unittest.TestCase):
+    def setUp(self):
+        results = {'dense': [('m1', 0.9), ('m2', 0.5)], 'sparse': [('m2', 0.7), ('m3', 0.2)],
+                   'image': [('m3', 0.6), ('m9', 0.8)]}
+        self.vector_store = _SlowVectorStore(results, delay=0.3)
+        embed = {key: (lambda text: [1.0]) for key in results}
+        self.document_store = _DocumentStore(algo_name='__default__', store=self.vector_store, embed=embed,
+                                             group_embed_keys={'group1': set(results)})
+        self.document_store.activate_group(['group1'])
+        meta = {RAG_KB_ID: 'kb1', RAG_DOC_ID: 'doc1'}
+        self.document_store.update_nodes([DocNode(uid=f'm{i}', text=f'text{i}', group='group1',
+                                                  global_metadata=meta) for i in range(1, 4)])
+        segment_store = self.document_store.impl.segment_store
+        segment_store.get = MagicMock(wraps=segment_store.get)
+
+    def test_concurrent_search_and_fusion(self):
+        start = time.perf_counter()
+        nodes = self.document_store.query('text', 'group1', embed_keys=['dense', 'sparse', 'image'], topk=2)
+        self.assertLess(time.perf_counter() - start, 0.8)
+        self.assertEqual(sorted(self.vector_store.searched), ['dense', 'image', 'sparse'])
+        # duplicates keep their best score, unknown uids are dropped and segments are fetched once
+        self.assertEqual([(n.uid, n.similarity_score) for n in nodes], [('m1', 0.9), ('m2', 0.7), ('m3', 0.6)])
+        self.assertEqual(self.document_store.impl.segment_store.get.call_count, 1)
+
+    def test_cut_off_per_key(self):
+        nodes = self.document_store.query('text', 'group1', embed_keys=['dense', 'sparse'], topk=2,
+                                          similarity_cut_off={'dense': 0.6, 'sparse': 0.1})
+        self.assertEqual([(n.uid, n.similarity_score) for n in nodes], [('m1', 0.9), ('m2', 0.7), ('m3', 0.2)])
+        self.assertEqual(self.document_store.query('text', 'group1', embed_keys=['sparse'],
+                                                   similarity_cut_off=0.5)[0].uid, 'm2')
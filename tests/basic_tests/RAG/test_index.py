@@ -11,7 +11,7 @@ from lazyllm.tools.rag.utils import parallel_do_embedding, generic_process_filte
 from typing import List, Optional, Dict
 from lazyllm.common import override
 from lazyllm import SentenceSplitter, Retriever
-from lazyllm.tools.rag.global_metadata import RAG_DOC_ID
+from lazyllm.tools.rag.global_metadata import RAG_DOC_ID, GlobalMetadataDesc
 
 class TestDefaultIndex(unittest.TestCase):
     def setUp(self):
@@ -111,6 +111,54 @@ class TestDefaultIndex(unittest.TestCase):
         self.assertEqual(len(results), 1)
         self.assertIn(self.doc_node_2, results)
 
+class TestDefaultIndexFilters(unittest.TestCase):
+    def setUp(self):
+        self.embed = {'default': MagicMock(return_value=[1, 0])}
+        self.store = _DocumentStore(algo_name='filter_algo', store={'type': 'map'},
+                                    group_embed_keys={'group1': ['default']}, embed=self.embed,
+                                    embed_dims={'default': 2}, embed_datatypes={'default': DataType.FLOAT_VECTOR},
+                                    global_metadata_desc={'department': GlobalMetadataDesc(DataType.VARCHAR,
+                                                                                           max_size=32)})
+        self.store.activate_group('group1')
+        self.index = self.store.get_index('default')
+        nodes = []
+        for i in range(100):
+            node = DocNode(uid=f'n{i}', group='group1', text=f'text {i}',
+                           global_metadata={RAG_DOC_ID: f'doc{i % 10}', 'department': f'dep{i % 4}'})
+            node.embedding = {'default': [1, i / 100]}
+            nodes.append(node)
+        self.store.update_nodes(nodes)
+
+    def _query(self, filters):
+        return self.index.query(query='q', group_name='group1', similarity_name='cosine', similarity_cut_off=0.0,
+                                topk=100, filters=filters)
+
+    def test_filters_are_served_by_inverted_index(self):
+        with unittest.mock.patch.object(self.store, 'get_nodes', wraps=self.store.get_nodes) as get_nodes:
+            res = self._query({'department': 'dep1', RAG_DOC_ID: ['doc1', 'doc5']})
+        assert sorted(n._uid for n in res) == sorted(f'n{i}' for i in range(100) if i % 4 == 1 and i % 10 in (1, 5))
+        get_nodes.assert_not_called()
+        assert self._query({'department': 'dep9'}) == []
+        # undeclared keys fall back to the full scan
+        assert self._query({'undeclared': 'x'}) == []
+
+    def test_inverted_index_follows_writes(self):
+        assert len(self._query({'department': 'dep2'})) == 25
+        version = self.index._meta_indices['group1'].version
+        node = DocNode(uid='n2', group='group1', text='text 2',
+                       global_metadata={RAG_DOC_ID: 'doc2', 'department': 'dep3'})
+        node.embedding = {'default': [1, 0]}
+        self.store.update_nodes([node])
+        self.store.remove_nodes(uids=['n6'], group='group1')
+        assert self.index._meta_indices['group1'].version == version + 2
+        assert {n._uid for n in self._query({'department': 'dep2'})} == {f'n{i}' for i in range(10, 100, 4)}
+        # writes the index cannot patch (removal by doc id, metadata updates) drop it until the next query
+        self.store.update_doc_meta('doc3', {'department': 'dep2'})
+        self.store.remove_nodes(doc_ids={'doc0'})
+        assert 'group1' not in self.index._meta_indices
+        expected = {f'n{i}' for i in range(100) if (i % 4 == 2 or i % 10 == 3) and i % 10 and i not in (2, 6)}
+        assert {n._uid for n in self._query({'department': 'dep2'})} == expected
+
 class KeywordIndex(IndexBase):
     def __init__(self, cstore: LazyLLMStoreBase):
         self.store = cstore
@@ -0,0 +1,135 @@
+import os
+import sqlite3
+import tempfile
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+
+import lazyllm
+from lazyllm.thirdparty import pypdf
+from lazyllm.tools.rag.readers import PDFReader
+from lazyllm.tools.rag.readers import pdfReader
+
+
+def _make_pdf(path, num_pages):
+    from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+    writer = pypdf.PdfWriter()
+    font = writer._add_object(DictionaryObject({NameObject('/Type'): NameObject('/Font'),
+                                                NameObject('/Subtype'): NameObject('/Type1'),
+                                                NameObject('/BaseFont'): NameObject('/Helvetica')}))
+    for i in range(num_pages):
+        page = writer.add_blank_page(200, 200)
+        content = DecodedStreamObject()
+        content.set_data(f'BT /F1 12 Tf 20 100 Td (page {i}) Tj ET'.encode())
+        page[NameObject('/Contents')] = writer._add_object(content)
+        page[NameObject('/Resources')] = DictionaryObject(
+            {NameObject('/Font'): DictionaryObject({NameObject('/F1'): font})})
+    with open(path, 'wb') as f: writer.write(f)
+
+
+class _FakeExecutor(object):
+    def __init__(self, broken=False):
+        self.broken, self.sources, self.shut = broken, [], False
+
+    def submit(self, fn, path, start, end):
+        self.sources.append((path, os.path.exists(path)))
+        future = concurrent.futures.Future()
+        if self.broken: future.set_exception(BrokenProcessPool('a worker died'))
+        else: future.set_result(fn(path, start, end))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut = True
+
+
+class TestPDFReaderPages(object):
+    @classmethod
+    def setup_class(cls):
+        cls._dir = tempfile.TemporaryDirectory()
+        cls.pdf = os.path.join(cls._dir.name, 'doc.pdf')
+        _make_pdf(cls.pdf, 7)
+        cls.expected = [f'page {i}' for i in range(7)]
+
+    @classmethod
+    def teardown_class(cls):
+        cls._dir.cleanup()
+
+    def test_missing_ranges(self):
+        reader = PDFReader(pages_per_task=2)
+        assert reader._missing_ranges(7, {}) == [(0, 2), (2, 4), (4, 6), (6, 7)]
+        assert reader._missing_ranges(7, {1: None, 2: None, 6: None}) == [(0, 1), (3, 5), (5, 6)]
+        assert reader._missing_ranges(2, {0: None, 1: None}) == []
+
+    def test_pages_and_full_document(self):
+        with lazyllm.config.temp('pdf_page_cache_dir', ''):
+            nodes = PDFReader(split_doc=True)._load_data(self.pdf)
+            assert [n.text for n in nodes] == self.expected
+            assert [n.metadata['page_label'] for n in nodes] == [str(i + 1) for i in range(7)]
+            assert [n.text for n in PDFReader(split_doc=False)._load_data(self.pdf)] == ['\n'.join(self.expected)]
+
+    def test_cache_skips_completed_pages(self, monkeypatch):
+        extracted, extract = [], pdfReader._extract_pages
+
+        def counting_extract(pdf, start, end):
+            extracted.append((start, end))
+            return extract(pdf, start, end)
+
+        monkeypatch.setattr(pdfReader, '_extract_pages', counting_extract)
+        with tempfile.TemporaryDirectory() as cache_dir, lazyllm.config.temp('pdf_page_cache_dir', cache_dir):
+            # the cache is opt-in
+            assert [n.text for n in PDFReader(pages_per_task=3)._load_data(self.pdf)] == self.expected
+            assert not os.path.exists(os.path.join(cache_dir, 'pages.db'))
+            extracted.clear()
+
+            reader = PDFReader(pages_per_task=3, use_cache=True)
+            assert [n.text for n in reader._load_data(self.pdf)] == self.expected
+            assert extracted == [(0, 3), (3, 6), (6, 7)]
+
+            extracted.clear()
+            assert [n.text for n in reader._load_data(self.pdf)] == self.expected
+            assert extracted == []
+
+            # a partially parsed document only extracts the pages that were lost
+            with sqlite3.connect(os.path.join(cache_dir, 'pages.db')) as conn:
+                conn.execute('DELETE FROM pages WHERE page IN (2, 3)')
+            assert [n.text for n in reader._load_data(self.pdf)] == self.expected
+            assert extracted == [(2, 4)]
+
+    def test_cache_eviction(self):
+        with tempfile.TemporaryDirectory() as cache_dir, lazyllm.config.temp('pdf_page_cache_dir', cache_dir), \
+                lazyllm.config.temp('pdf_page_cache_max_bytes', 60):
+            other = os.path.join(cache_dir, 'other.pdf')
+            _make_pdf(other, 6)
+            reader = PDFReader(use_cache=True)
+            reader._load_data(self.pdf)
+            reader._load_data(other)
+            # 49 and 42 bytes of text do not fit in 60 together, the least recently read file is evicted
+            with sqlite3.connect(os.path.join(cache_dir, 'pages.db')) as conn:
+                assert conn.execute('SELECT COUNT(*) FROM files').fetchone()[0] == 1
+                assert conn.execute('SELECT COUNT(*) FROM pages').fetchone()[0] == 6
+
+    def test_parallel_extraction(self):
+        with lazyllm.config.temp('pdf_page_cache_dir', ''):
+            reader = PDFReader(num_workers=2, pages_per_task=2)
+            assert [n.text for n in reader._load_data(self.pdf)] == self.expected
+            assert 2 in pdfReader._page_executors
+
+    def test_remote_file_spilled_once(self, monkeypatch):
+        executor = _FakeExecutor()
+        monkeypatch.setattr(pdfReader, 'is_default_fs', lambda fs: False)
+        monkeypatch.setattr(pdfReader, '_page_executors', {2: executor})
+        with lazyllm.config.temp('pdf_page_cache_dir', ''):
+            reader = PDFReader(num_workers=2, pages_per_task=2)
+            assert [n.text for n in reader._load_data(self.pdf)] == self.expected
+        # every task reads the same local copy instead of the pickled document, and the copy is removed afterwards
+        assert len(executor.sources) == 4 and len({path for path, _ in executor.sources}) == 1
+        path, existed = executor.sources[0]
+        assert existed and path != self.pdf and not os.path.exists(path)
+
+    def test_broken_executor_replaced(self, monkeypatch):
+        broken = _FakeExecutor(broken=True)
+        monkeypatch.setattr(pdfReader, '_page_executors', {2: broken})
+        with lazyllm.config.temp('pdf_page_cache_dir', ''):
+            reader = PDFReader(num_workers=2, pages_per_task=2)
+            # the pages of the dead workers are extracted in this process, the next file gets a new pool
+            assert [n.text for n in reader._load_data(self.pdf)] == self.expected
+        assert broken.shut and 2 not in pdfReader._page_executors
@@ -5,6 +5,9 @@ import pytest
 import tempfile
 import unittest
 import copy
+import types
+import threading
+import collections
 import lazyllm
 from lazyllm.tools.rag.store import (MapStore, ChromaStore, MilvusStore, OceanBaseStore,
                                      SenseCoreStore, BUILDIN_GLOBAL_META_DESC, HybridStore)
@@ -171,6 +174,105 @@ class TestMapStore(unittest.TestCase):
         self.assertEqual(len(res), 1)
         self.assertEqual(res[0].get('uid'), data[2].get('uid'))
 
+    def test_mapstore_write_through(self):
+        store2 = MapStore(uri=self.store_dir, write_through=True, flush_interval=60)
+        store2.connect(collections=self.collections)
+        store2.upsert(self.collections[0], [data[0], data[2]])
+        store2.upsert(self.collections[0], [data[0]])
+        store2.upsert(self.collections[1], [data[1]])
+        self.assertEqual(store2._dirty_count, 3)
+        # reads are served from memory before anything is persisted
+        self.assertEqual(len(store2.get(collection_name=self.collections[0])), 2)
+        store3 = MapStore(uri=self.store_dir)
+        store3.connect(collections=self.collections)
+        self.assertEqual(store3.get(collection_name=self.collections[0]), [])
+        store2.delete(self.collections[0], criteria={RAG_DOC_ID: ['doc1']})
+        store2.flush()
+        self.assertEqual(store2._dirty_count, 0)
+        self.assertEqual([r['uid'] for r in store3.get(collection_name=self.collections[0])], ['uid3'])
+        # warm start loads the database once, then everything is answered from memory
+        store4 = MapStore(uri=self.store_dir, write_through=True)
+        store4.connect()
+        self.assertEqual([r['uid'] for r in store4.get(collection_name=self.collections[0])], ['uid3'])
+        self.assertEqual(store4.get_relations(self.collections[1], {'uid': ['uid2']}), [('uid2', 'p2')])
+
+    def test_mapstore_write_through_background_flush(self):
+        store2 = MapStore(uri=self.store_dir, write_through=True, flush_interval=60, flush_batch_size=2)
+        store2.connect(collections=self.collections)
+        store2.upsert(self.collections[0], [data[0], data[2]])
+        reader = MapStore(uri=self.store_dir)
+        reader.connect(collections=self.collections)
+        for _ in range(100):
+            if len(reader.get(collection_name=self.collections[0])) == 2: break
+            time.sleep(0.05)
+        self.assertEqual(len(reader.get(collection_name=self.collections[0])), 2)
+
+    def test_mapstore_update_global_meta(self):
+        updates = [({RAG_DOC_ID: ['doc1', 'doc3']}, {'tag': 'new'}),
+                   ({RAG_DOC_ID: ['doc3'], RAG_KB_ID: 'kb3'}, {'x': 1})]
+        for store in (self.store1, MapStore(uri=self.store_dir),
+                      MapStore(uri=self.store_dir + '.wt', write_through=True, flush_interval=60)):
+            if store is not self.store1: store.connect(collections=self.collections)
+            store.upsert(self.collections[0], [copy.deepcopy(data[0]), copy.deepcopy(data[2])])
+            self.assertTrue(store.update_global_meta(self.collections[0], updates))
+            res = {r['uid']: r for r in store.get(collection_name=self.collections[0])}
+            self.assertEqual(res['uid1']['global_meta'], {**data[0]['global_meta'], 'tag': 'new'})
+            self.assertEqual(res['uid3']['global_meta'], {**data[2]['global_meta'], 'tag': 'new', 'x': 1})
+            self.assertEqual(res['uid3']['content'], data[2]['content'])
+        store.flush()
+        reader = MapStore(uri=self.store_dir + '.wt')
+        reader.connect(collections=self.collections)
+        self.assertEqual(reader.get(self.collections[0], {'uid': ['uid1']})[0]['global_meta']['tag'], 'new')
+        os.remove(self.store_dir + '.wt')
+
+    def test_mapstore_count_and_get_page(self):
+        store2 = MapStore(uri=self.store_dir)
+        store2.connect(collections=self.collections)
+        for store in (self.store1, store2):
+            store.upsert(self.collections[0], [data[2], data[0]])
+            self.assertEqual(store.count(self.collections[0]), 2)
+            self.assertEqual(store.count(self.collections[0], {RAG_DOC_ID: ['doc3'], RAG_KB_ID: 'kb3'}), 1)
+            self.assertEqual([r['uid'] for r in store.get_page(self.collections[0], limit=1)], ['uid1'])
+            self.assertEqual([r['uid'] for r in store.get_page(self.collections[0], limit=5, offset=1)], ['uid3'])
+            self.assertEqual([r['uid'] for r in store.get_page(self.collections[0], after='uid1')], ['uid3'])
+            self.assertEqual(store.get_page(self.collections[0], {RAG_DOC_ID: ['doc1']}, after='uid1'), [])
+
+    def _window_data(self):
+        res = []
+        for doc_id in ('doc1', 'doc2'):
+            for number in range(1, 11):
+                item = copy.deepcopy(data[0])
+                item.update(uid=f'{doc_id}_{number}', doc_id=doc_id, number=number, content=f'{doc_id} {number}')
+                item['global_meta'][RAG_DOC_ID] = doc_id
+                res.append(item)
+        return res
+
+    def test_get_windows(self):
+        self.store1.upsert(self.collections[0], self._window_data())
+        res = self.store1.get_windows(self.collections[0], [('kb1', 'doc1', 2, 4), ('kb1', 'doc1', 3, 6),
+                                                            ('kb1', 'doc2', 9, 12), ('kb2', 'doc1', 1, 3)])
+        self.assertEqual([r['uid'] for r in res], [f'doc1_{i}' for i in range(2, 7)] + ['doc2_9', 'doc2_10'])
+        self.store1.delete(self.collections[0], criteria={'uid': ['doc1_3']})
+        res = self.store1.get_windows(self.collections[0], [('kb1', 'doc1', 2, 4)])
+        self.assertEqual([r['uid'] for r in res], ['doc1_2', 'doc1_4'])
+
+    def test_get_windows_with_uri(self):
+        store2 = MapStore(uri=self.store_dir)
+        store2.connect(collections=self.collections)
+        store2.upsert(self.collections[0], self._window_data())
+        res = store2.get_windows(self.collections[0], [('kb1', 'doc2', 4, 5), ('kb1', 'doc1', 1, 2),
+                                                       ('kb1', 'doc1', 2, 3)])
+        self.assertEqual([r['uid'] for r in res], ['doc1_1', 'doc1_2', 'doc1_3', 'doc2_4', 'doc2_5'])
+
+    def test_get_relations(self):
+        self.store1.upsert(self.collections[1], [data[1]])
+        self.assertEqual(self.store1.get_relations(self.collections[1], {'parent': ['p2']}), [('uid2', 'p2')])
+        store2 = MapStore(uri=self.store_dir)
+        store2.connect(collections=self.collections)
+        store2.upsert(self.collections[1], [data[1]])
+        self.assertEqual(store2.get_relations(self.collections[1], {'uid': ['uid2']}), [('uid2', 'p2')])
+        self.assertEqual(store2.get_relations(self.collections[1], {'parent': ['p1']}), [])
+
     def test_search_by_group_without_filters(self):
         self.store1.upsert(self.collections[0], [data[0], data[2]])
         self.store1.upsert(self.collections[1], [data[1]])
@@ -241,6 +343,14 @@ class TestChromaStore(unittest.TestCase):
         self.assertEqual(len(res), 1)
         self.assertEqual(res[0].get('uid'), self.data[1].get('uid'))
 
+    def test_update_global_meta(self):
+        self.store.upsert(self.collections[0], [self.data[0], self.data[2]])
+        self.assertTrue(self.store.update_global_meta(self.collections[0], [
+            ({RAG_DOC_ID: ['doc1']}, {RAG_KB_ID: 'kb9', 'undeclared': 1})]))
+        res = self.store.search(collection_name=self.collections[0], query_embedding=[0.1, 0.2, 0.3], topk=2,
+                                embed_key='vec_dense', filters={RAG_KB_ID: ['kb9']})
+        self.assertEqual([r['uid'] for r in res], ['uid1'])
+
     def test_delete_segments_by_kb_id(self):
         self.store.upsert(self.collections[0], [self.data[0], self.data[2]])
         self.store.delete(self.collections[0], criteria={RAG_KB_ID: 'kb1'})
@@ -387,6 +497,41 @@ class TestMilvusStore(unittest.TestCase):
     def tearDown(self):
         os.remove(self.store_dir)
 
+    def test_collection_state_cached(self):
+        calls = collections.Counter()
+
+        class _CountingClient(object):
+            def __init__(self, client):
+                self._client = client
+
+            def __getattr__(self, name):
+                attr = getattr(self._client, name)
+                if not callable(attr): return attr
+
+                def call(*args, **kwargs):
+                    calls[name] += 1
+                    return attr(*args, **kwargs)
+                return call
+        maker = self.store._client_pool._maker
+        self.store._client_pool._maker = lambda: _CountingClient(maker())
+
+        rows = [dict(copy.deepcopy(data[0]), uid=f'uid{i}') for i in range(1200)]
+        assert self.store.upsert(self.collections[0], rows)
+        assert calls['upsert'] == 3
+        for _ in range(3):
+            assert len(self.store.get(self.collections[0], {'uid': ['uid1', 'uid2']})) == 2
+            assert len(self.store.search(self.collections[0], query_embedding=[0.1, 0.2, 0.3], topk=2,
+                                         embed_key='vec_dense')) == 2
+        assert len(self.store.get(self.collections[0])) == 1200
+        # one check before and one under the lock when the collection is created, none afterwards
+        assert calls['has_collection'] == 2 and calls['load_collection'] <= 1 and calls['describe_collection'] <= 1
+
+        assert self.store.delete(self.collections[0])
+        assert self.store.get(self.collections[0]) == []
+        assert calls['has_collection'] == 4  # the dropped collection is checked again
+        assert self.store.upsert(self.collections[0], [data[0]])
+        assert len(self.store.get(self.collections[0])) == 1
+
     def test_invalid_index_kwargs(self):
         invalid_index_kwargs = [
             {
@@ -1160,6 +1305,258 @@ class TestHybridStore(unittest.TestCase):
                                 filters={RAG_KB_ID: ['kb1']})
         self.assertEqual(len(res), 0)
 
+    def test_get_and_search_with_fields(self):
+        self.store.upsert(self.collections[0], [data[0], data[2]])
+        res = self.store.get(collection_name=self.collections[0], criteria={'uid': ['uid1']})
+        self.assertIn('embedding', res[0])
+        res = self.store.get(collection_name=self.collections[0], criteria={'uid': ['uid1']},
+                             fields=['content', 'global_meta'])
+        self.assertEqual(res, [{'uid': 'uid1', 'content': 'test1', 'global_meta': data[0]['global_meta']}])
+        res = self.store.search(collection_name=self.collections[0], query='test3', query_embedding=[0.3, 0.2, 0.1],
+                                embed_key='vec_dense', topk=2, fields=['content'])
+        self.assertEqual([sorted(r) for r in res], [['content', 'score', 'uid']] * 2)
+        self.assertEqual(res[0]['uid'], 'uid3')
+        res = self.store.search(collection_name=self.collections[0], query='test3', query_embedding=[0.3, 0.2, 0.1],
+                                embed_key='vec_dense', topk=1, fields=['embedding'])
+        self.assertEqual(sorted(res[0]), ['embedding', 'score', 'uid'])
+
+
+class _FlakyMapStore(MapStore):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fail = False
+        self.bad_uids = {}  # uid -> the exception raised whenever a batch holds it
+        self.barrier = None
+        self.calls = []
+
+    def upsert(self, collection_name, data):
+        if self.barrier: self.barrier.wait(timeout=5)
+        self.calls.append(('upsert', [item['uid'] for item in data]))
+        if self.fail: raise ConnectionError('vector store is down')
+        for item in data:
+            if item['uid'] in self.bad_uids: raise self.bad_uids[item['uid']]
+        return super().upsert(collection_name, data)
+
+    def delete(self, collection_name, criteria=None, **kwargs):
+        self.calls.append(('delete', criteria))
+        if self.fail: return False
+        return super().delete(collection_name, criteria, **kwargs)
+
+
+class TestHybridStoreOutbox(object):
+    @pytest.fixture(autouse=True)
+    def _store(self, tmp_path):
+        self.tmp_path = tmp_path
+        self.collection = 'col_g1'
+        self.journal = str(tmp_path / 'outbox.db')
+
+    def _make(self, journal=None):
+        segment_store, vector_store = MapStore(), _FlakyMapStore()
+        store = HybridStore(segment_store, vector_store, journal=journal)
+        store.connect(collections=[self.collection])
+        return store, segment_store, vector_store
+
+    def test_concurrent_dual_write(self):
+        store, segment_store, vector_store = self._make()
+        # both writes must be in progress at once to pass the barrier
+        vector_store.barrier = barrier = threading.Barrier(2)
+
+        def upsert(collection_name, data):
+            barrier.wait(timeout=5)
+            return MapStore.upsert(segment_store, collection_name, data)
+        segment_store.upsert = upsert
+        assert store.upsert(self.collection, copy.deepcopy(data[:2]))
+        assert 'embedding' not in segment_store.get(self.collection)[0]
+        assert len(store.get(self.collection)) == 2
+
+    def test_replay_after_failure(self):
+        store, segment_store, vector_store = self._make()
+        vector_store.fail = True
+        with pytest.raises(ConnectionError):
+            store.upsert(self.collection, copy.deepcopy(data[:1]))
+        assert len(segment_store.get(self.collection)) == 1 and not vector_store.get(self.collection)
+        # the unfinished batch is retried before every later write, which is still applied
+        assert not store.delete(self.collection, {'uid': ['uid1']})
+        vector_store.fail = False
+        assert store.upsert(self.collection, copy.deepcopy(data[2:3]))
+        assert vector_store.calls[-3:] == [('upsert', ['uid1']), ('delete', {'uid': ['uid1']}), ('upsert', ['uid3'])]
+        assert [item['uid'] for item in store.get(self.collection)] == ['uid3']
+        assert [item['uid'] for item in vector_store.get(self.collection)] == ['uid3']
+        assert store.recover()
+
+    def test_replay_on_connect(self):
+        store, segment_store, vector_store = self._make(self.journal)
+        vector_store.fail = True
+        with pytest.raises(ConnectionError):
+            store.upsert(self.collection, copy.deepcopy(data[:1]))
+        assert os.path.exists(self.journal)
+
+        # a new process replays the journal against its stores when it connects
+        store, segment_store, vector_store = self._make(self.journal)
+        assert [item['uid'] for item in vector_store.get(self.collection)] == ['uid1']
+        assert store.get(self.collection, fields=['embedding'])[0]['embedding'] == data[0]['embedding']
+        store, _, vector_store = self._make(self.journal)
+        assert vector_store.calls == []
+
+    def test_journal_per_segment_store(self):
+        def make(name):
+            vector_store = _FlakyMapStore()
+            store = HybridStore(MapStore(uri=str(self.tmp_path / name)), vector_store)
+            store.connect(collections=[self.collection])
+            return store, vector_store
+
+        store, vector_store = make('a.db')
+        vector_store.fail = True
+        with pytest.raises(ConnectionError):
+            store.upsert(self.collection, copy.deepcopy(data[:1]))
+        assert os.path.exists(self.tmp_path / 'a.outbox.db')
+        # a store in the same directory keeps its own journal and never replays the batches of another
+        _, vector_store = make('b.db')
+        assert vector_store.calls == []
+        _, vector_store = make('a.db')
+        assert [item['uid'] for item in vector_store.get(self.collection)] == ['uid1']
+
+    @pytest.mark.parametrize('error', [ValueError('dim mismatch'), ConnectionError('timed out')])
+    def test_failing_batch_is_dead_lettered(self, error):
+        store, segment_store, vector_store = self._make(self.journal)
+        vector_store.bad_uids['uid1'] = error
+        with pytest.raises(type(error)):
+            store.upsert(self.collection, copy.deepcopy(data[:1]))
+        # a batch that never goes through does not block later writes
+        for item in data[1:]:
+            assert store.upsert(self.collection, copy.deepcopy([item]))
+        assert sorted(item['uid'] for item in vector_store.get(self.collection)) == ['uid2', 'uid3']
+        # a bad batch is dead-lettered at once, a retryable one once it failed `_MAX_WRITE_ATTEMPTS` times
+        assert vector_store.calls.count(('upsert', ['uid1'])) == (1 if isinstance(error, ValueError) else 3)
+        assert [letter['payload'][0]['uid'] for letter in store.dead_letters()] == ['uid1']
+        assert store.recover()
+
+        store, _, vector_store = self._make(self.journal)
+        assert vector_store.calls == [] and len(store.dead_letters()) == 1
+        store.drop_dead_letters()
+        assert store.dead_letters() == []
+
+
+class _FakeElasticsearch(object):
+    # in-process stand-in of the client: written documents become visible to searches after a refresh
+    def __init__(self, hosts=None, **kwargs):
+        self.docs, self.visible, self.calls, self.bulk_refresh = {}, {}, collections.Counter(), []
+        self.inflight = self.max_inflight = 0
+        self._lock = threading.Lock()
+        self.indices = types.SimpleNamespace(exists=self._exists, create=self._create, delete=self._delete,
+                                             refresh=self._refresh, analyze=self._analyze)
+        self.cat = types.SimpleNamespace(plugins=lambda **kw: [])
+
+    def _exists(self, index):
+        self.calls['exists'] += 1
+        return index in self.docs
+
+    def _create(self, index, body):
+        self.docs[index], self.visible[index] = {}, {}
+
+    def _delete(self, index):
+        del self.docs[index], self.visible[index]
+
+    def _refresh(self, index, **kwargs):
+        self.calls['refresh'] += 1
+        for name in index.split(','):
+            if name in self.docs: self.visible[name] = dict(self.docs[name])
+
+    def _analyze(self, body):
+        raise RuntimeError('no ik')
+
+    def bulk(self, index, body, refresh=False):
+        with self._lock:
+            self.inflight += 1
+            self.max_inflight = max(self.max_inflight, self.inflight)
+            self.bulk_refresh.append(refresh)
+        time.sleep(0.1)
+        for header, doc in zip(body[::2], body[1::2]):
+            self.docs[index][header['index']['_id']] = doc
+        if refresh: self._refresh(index)
+        with self._lock: self.inflight -= 1
+        return {'errors': False}
+
+    def delete_by_query(self, index, body, refresh=False, **kwargs):
+        for uid in body['query']['ids']['values']: self.docs[index].pop(uid, None)
+        if refresh: self._refresh(index)
+        return {}
+
+    def count(self, index, body):
+        docs = self.visible[index]
+        if 'must_not' in body['query'].get('bool', {}):  # documents without `uid` in their source
+            return {'count': sum('uid' not in doc for doc in docs.values())}
+        return {'count': len(docs)}
+
+    def search(self, index, body):
+        # match_all sorted on `uid`, a document without the field cannot be sorted
+        self.calls['search'] += 1
+        hits = sorted(({'_id': _id, '_source': dict(doc), 'sort': [doc['uid']]}
+                       for _id, doc in self.visible[index].items()), key=lambda hit: hit['sort'])
+        if 'search_after' in body: hits = [hit for hit in hits if hit['sort'] > body['search_after']]
+        start = body.get('from', 0)
+        return {'hits': {'hits': hits[start:start + body['size']]}}
+
+    @staticmethod
+    def scan(client, index, **kwargs):
+        for _id, doc in client.visible[index].items(): yield {'_id': _id, '_source': dict(doc)}
+
+
+class TestElasticSearchStoreWithFakeClient(object):
+    @pytest.fixture(autouse=True)
+    def _store(self, monkeypatch):
+        from lazyllm.tools.rag.store.segment import elasticsearch_store
+        monkeypatch.setattr(elasticsearch_store, 'elasticsearch', types.SimpleNamespace(
+            Elasticsearch=_FakeElasticsearch, NotFoundError=KeyError, AuthenticationException=PermissionError,
+            AuthorizationException=PermissionError, TransportError=ConnectionError,
+            helpers=types.SimpleNamespace(scan=_FakeElasticsearch.scan)))
+        self.store = elasticsearch_store.ElasticSearchStore(uris=['localhost:9200'])
+        self.store.connect(global_metadata_desc=BUILDIN_GLOBAL_META_DESC)
+        self.client = self.store._client
+        self.rows = [dict(copy.deepcopy(data[0]), uid=f'uid{i}') for i in range(1200)]
+
+    def test_index_state_cached(self):
+        for _ in range(3):
+            assert self.store.upsert('col', self.rows[:10])
+            assert self.store.count('col') == 10
+        assert self.client.calls['exists'] == 1
+        assert self.store.delete('col')
+        # the index is checked again under the lock before it is dropped and once more after it
+        assert self.store.count('col') == 0 and self.client.calls['exists'] == 3
+
+    def test_concurrent_bulk(self):
+        start = time.perf_counter()
+        assert self.store.upsert('col', self.rows)
+        assert time.perf_counter() - start < 0.25
+        assert self.client.max_inflight == 3 and self.client.bulk_refresh == ['wait_for'] * 3
+        assert self.store.count('col') == 1200
+
+    def test_ingestion_defers_refresh(self):
+        with self.store.ingestion():
+            assert self.store.upsert('col', self.rows[:600])
+            assert self.store.upsert('col2', self.rows[600:])
+            assert self.store.delete('col', {'uid': ['uid0']})
+            assert self.store.count('col') == 0 and self.client.calls['refresh'] == 0
+        assert set(self.client.bulk_refresh) == {False} and self.client.calls['refresh'] == 1
+        assert self.store.count('col') == 599 and self.store.count('col2') == 600
+        assert self.store.upsert('col', self.rows[:1])
+        assert self.client.bulk_refresh[-1] == 'wait_for' and self.store.count('col') == 600
+
+    def test_get_page_on_index_without_uid(self):
+        rows = self.rows[:30]
+        assert self.store.upsert('col', rows)
+        expected = sorted(row['uid'] for row in rows)
+        # documents written before `uid` was kept in the source
+        for doc in list(self.client.visible['col'].values())[:5]: del doc['uid']
+        page = self.store.get_page('col', limit=10, offset=5)
+        assert [seg['uid'] for seg in page] == expected[5:15] and self.client.calls['search'] == 0
+        assert [seg['uid'] for seg in self.store.get_page('col', limit=10, after=expected[20])] == expected[21:]
+
+        # once they are written again, pages are cut by the index
+        assert self.store.upsert('col', rows)
+        page = self.store.get_page('col', limit=10, offset=5)
+        assert [seg['uid'] for seg in page] == expected[5:15] and self.client.calls['search'] > 0
+
 
 STORE_TEMPLATES = {
     'elasticsearch': {
@@ -1,6 +1,6 @@
 from lazyllm.tools.rag.utils import generic_process_filters
 from lazyllm.tools.rag.doc_node import DocNode
-from lazyllm.tools.rag.utils import _FileNodeIndex, sparse2normal, is_sparse
+from lazyllm.tools.rag.utils import _FileNodeIndex, _MetadataInvertedIndex, sparse2normal, is_sparse
 from lazyllm.tools.rag.store import LAZY_ROOT_NAME
 from lazyllm.tools.rag.global_metadata import RAG_DOC_PATH
 import unittest
@@ -69,6 +69,13 @@ class TestFileNodeIndex(unittest.TestCase):
         ret = self.index.query([self.node2.global_metadata[RAG_DOC_PATH]])
         assert len(ret) == 0
 
+    def test_remove_unknown_uid(self):
+        self.index.update([self.node1, self.node2])
+        self.index.remove(['3', self.node1._uid])
+        self.index.remove(None)
+        assert self.index.query(self.files) == [self.node2]
+        assert self.index._uid_path_map == {self.node2._uid: 'd2'}
+
     def test_query(self):
         self.index.update([self.node1, self.node2])
         ret = self.index.query([self.node2.global_metadata[RAG_DOC_PATH]])
@@ -77,3 +84,23 @@ class TestFileNodeIndex(unittest.TestCase):
         ret = self.index.query([self.node1.global_metadata[RAG_DOC_PATH]])
         assert len(ret) == 1
         assert ret[0] is self.node1
+
+class TestMetadataInvertedIndex(unittest.TestCase):
+    def test_candidates(self):
+        index = _MetadataInvertedIndex(['k1', 'k2'])
+        index.add('1', {'k1': 'v1', 'k2': 'v2'})
+        index.add('2', {'k1': 'v1', 'k2': ['v2', 'v3']})
+        index.add('3', {'k2': 'v3'})
+        assert index.candidates({'k1': 'v1'}) == {'1', '2'}
+        assert index.candidates({'k1': ['v1', 'v9'], 'k2': 'v2'}) == {'1', '2'}  # '2' is unhashable, kept
+        assert index.candidates({'k2': 'v3', 'k3': 'v3'}) == {'2', '3'}
+        assert index.candidates({'k1': 'v9'}) == set()
+        assert index.candidates({'k3': 'v3'}) is None
+
+        index.add('1', {'k1': 'v4'})
+        index.remove('2')
+        index.remove('unknown')
+        assert len(index) == 2
+        assert index.candidates({'k1': 'v1'}) == set()
+        assert index.candidates({'k1': 'v4'}) == {'1'}
+        assert index.candidates({'k2': None}) == {'1'}
@@ -6,7 +6,7 @@ import socketserver
 from functools import partial
 
 from lazyllm.tools.agent.file_tool import (read_file, write_file, list_dir, search_in_files,
-                                           move_file, delete_file)
+                                           move_file, delete_file, _required_literal)
 from lazyllm.tools.agent.shell_tool import shell_tool
 from lazyllm.tools.agent.download_tool import download_file
 
@@ -37,6 +37,87 @@ class TestFileTool(object):
             res = delete_file(dst, root=tmp, allow_unsafe=True)
             assert res['status'] == 'ok'
 
+    def test_read_file_line_range(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'big.log')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(''.join(f'行 {i}\n' for i in range(1, 100001)) + 'tail')
+            res = read_file(path, start_line=50000, end_line=50002, root=tmp)
+            assert res['content'] == '行 50000\n行 50001\n行 50002\n'
+            assert res['total_lines'] == 100001 and res['end_line'] == 50002
+            assert read_file(path, start_line=100001)['content'] == 'tail'
+            assert read_file(path, start_line=100005)['content'] == ''
+            res = read_file(path, max_chars=10)
+            assert res['truncated'] and res['content'] == '行 1\n行 2\n行 '
+
+            # the cached line index follows changes of the file
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write('\nappended')
+            res = read_file(path, start_line=100002)
+            assert res['content'] == 'appended' and res['total_lines'] == 100002
+
+            path16 = os.path.join(tmp, 'utf16.txt')
+            with open(path16, 'w', encoding='utf-16') as f:
+                f.write('a\nb\nc\n')
+            assert read_file(path16, start_line=2, end_line=2, encoding='utf-16')['content'] == 'b\n'
+
+    def test_search_in_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for i in range(100):
+                with open(os.path.join(tmp, f'f{i:03d}.py'), 'w', encoding='utf-8') as f:
+                    f.write(f'import os\ndef func_{i}(x):\n    return x\n')
+            os.makedirs(os.path.join(tmp, 'build'))
+            os.makedirs(os.path.join(tmp, '.git'))
+            for d in ('build', '.git'):
+                with open(os.path.join(tmp, d, 'x.py'), 'w', encoding='utf-8') as f:
+                    f.write('def func_hidden(x):\n')
+            with open(os.path.join(tmp, '.gitignore'), 'w', encoding='utf-8') as f:
+                f.write('# generated\nbuild/\n*.bin\n')
+            with open(os.path.join(tmp, 'data.dat'), 'wb') as f:
+                f.write(b'\x00\x01def func_binary(x):\n')
+
+            res = search_in_files(r'def (func_\w+)\(', path=tmp, root=tmp, max_results=1000)
+            names = sorted(item['text'] for item in res['results'])
+            assert names == sorted(f'def func_{i}(x):' for i in range(100))
+            assert all(item['line'] == '2' for item in res['results'])
+            assert len(search_in_files('func_', path=tmp, max_results=7)['results']) == 7
+
+            res = search_in_files('func_hidden', path=tmp, respect_ignore=False)
+            assert sorted(os.path.basename(os.path.dirname(r['path'])) for r in res['results']) == ['.git', 'build']
+            assert search_in_files('func_hidden', path=tmp)['results'] == []
+            assert search_in_files('return x', path=tmp, glob='f001.py')['results'][0]['line'] == '3'
+
+    def test_search_prefilter(self):
+        # bounds of a `{m,n}` quantifier are not text that a match has to contain
+        assert _required_literal(r'\d{1,3}') is None
+        assert _required_literal('x{100}') is None
+        assert _required_literal('[0-9]{2,4}') is None
+        assert _required_literal('port{2} 8080') == ' 8080'
+        assert _required_literal('def func_') == 'def func_'
+        # character codes and backreferences are skipped whole, their digits and names are not text to match
+        assert _required_literal(r'\x41bcd') == 'bcd'
+        assert _required_literal(r'\101bcd') == 'bcd'
+        assert _required_literal(r'\u0041bcd') == 'bcd'
+        assert _required_literal(r'\U00000041bcd') == 'bcd'
+        assert _required_literal(r'\N{LATIN CAPITAL LETTER A}bcd') == 'bcd'
+        assert _required_literal(r'(ab)\1234') is None
+        assert _required_literal(r'\.py\b') == '.py'
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, 'a.txt'), 'w', encoding='utf-8') as f:
+                f.write('port 8080\nid 42\n')
+            with open(os.path.join(tmp, 'b.txt'), 'w', encoding='utf-16') as f:
+                f.write('port 9090\n')
+            with open(os.path.join(tmp, 'c.txt'), 'wb') as f:
+                f.write(b'port 7070\n\xff\xfe\n')
+
+            res = search_in_files(r'\d{1,3}', path=tmp, glob='a.txt')['results']
+            assert [r['text'] for r in res] == ['port 8080', 'id 42']
+            res = search_in_files('port', path=tmp, glob='b.txt', encoding='utf-16')['results']
+            assert [r['text'] for r in res] == ['port 9090']
+            # a file that fails to decode is skipped instead of failing the search
+            res = search_in_files('port', path=tmp, errors='strict')
+            assert res['status'] == 'ok' and [r['text'] for r in res['results']] == ['port 8080']
+
 
 class TestShellTool(object):
     def test_shell_tool(self):
@@ -0,0 +1,126 @@
+import os
+import json
+import pytest
+
+import lazyllm
+from lazyllm.tools.eval import BaseEvaluator
+
+
+class _Crash(Exception): pass
+
+
+class CountingEvaluator(BaseEvaluator):
+    def __init__(self, weight=1, crash_at=None, **kwargs):
+        super().__init__(concurrency=1, **kwargs)
+        self._weight = weight
+        self._crash_at = crash_at
+        self.calls = []
+        self._necessary_keys = ['x']
+
+    def _metric_config(self):
+        return dict(weight=self._weight)
+
+    def _process_one_data_impl(self, data):
+        if data['x'] == self._crash_at: raise _Crash(f'crash at {data["x"]}')
+        self.calls.append(data['x'])
+        return dict(data, final_score=data['x'] * self._weight)
+
+
+class TestEvalResume(object):
+    @pytest.fixture(autouse=True)
+    def _dirs(self, tmp_path):
+        with lazyllm.config.temp('eval_result_dir', str(tmp_path / 'eval_res')), \
+                lazyllm.config.temp('cache_dir', str(tmp_path / 'cache')):
+            self.tmp_path = tmp_path
+            yield
+
+    def test_resume_from_checkpoint(self):
+        data = [dict(x=i) for i in range(10)]
+        checkpoint = str(self.tmp_path / 'ckpt.jsonl')
+        m = CountingEvaluator(crash_at=6, cache=False, checkpoint=checkpoint)
+        with pytest.raises(Exception, match='crash at 6'):
+            m(data)
+        with open(checkpoint) as f:
+            # samples finished before and after the failing one are all kept
+            assert sorted(json.loads(line)['result']['x'] for line in f) == [0, 1, 2, 3, 4, 5, 7, 8, 9]
+
+        m = CountingEvaluator(cache=False, checkpoint=checkpoint)
+        assert m(data) == 4.5
+        assert m.calls == [6]
+        assert os.path.exists(checkpoint)  # an explicit checkpoint is kept
+
+    def test_cache_per_sample_and_metric_config(self):
+        data = [dict(x=i) for i in range(5)]
+        m = CountingEvaluator(cache=True)
+        assert m(data) == 2.0 and m.calls == list(range(5))
+        # the automatic checkpoint is removed once results are saved
+        assert os.listdir(self.tmp_path / 'eval_res' / 'checkpoints') == []
+
+        m = CountingEvaluator(cache=True)
+        assert m(data + [dict(x=5)]) == 2.5
+        assert m.calls == [5]
+
+        m = CountingEvaluator(weight=2, cache=True)
+        assert m(data) == 4.0 and m.calls == list(range(5))
+        # the cache is off unless asked for
+        m = CountingEvaluator()
+        assert m(data) == 2.0 and m.calls == list(range(5))
+
+    def test_cache_needs_metric_config(self):
+        class PlainEvaluator(BaseEvaluator):
+            def _process_one_data_impl(self, data):
+                return dict(final_score=1)
+
+        assert PlainEvaluator()([dict(x=1)]) == 1
+        with pytest.raises(ValueError, match='_metric_config'):
+            PlainEvaluator(cache=True)
+
+    def test_backoff_and_failed_samples_not_cached(self):
+        class FlakyEvaluator(CountingEvaluator):
+            def __init__(self, failures, **kwargs):
+                super().__init__(retry=3, backoff=0.01, **kwargs)
+                self._failures = failures
+
+            def _call(self, x):
+                if self._failures > 0:
+                    self._failures -= 1
+                    raise RuntimeError('429 Too Many Requests')
+                return x
+
+            def _process_one_data_impl(self, data):
+                r = self._execute_with_retries(data['x'], self._call)
+                return dict(data, final_score=r or 0)
+
+        m = FlakyEvaluator(failures=2)
+        assert m([dict(x=3)]) == 3
+        m = FlakyEvaluator(failures=3)
+        assert m([dict(x=4)]) == 0
+        assert FlakyEvaluator(failures=0)([dict(x=4)]) == 4
+
+    def test_key_follows_model_identity(self):
+        class Model(object):
+            def __init__(self, name): self._model_name = name
+
+        class ModelEvaluator(CountingEvaluator):
+            def __init__(self, model, **kwargs):
+                super().__init__(**kwargs)
+                self._model = model
+
+            def _metric_config(self):
+                return dict(model=self._describe_model(self._model))
+
+        assert ModelEvaluator(Model('a'))._metric_key != ModelEvaluator(Model('b'))._metric_key
+        assert ModelEvaluator(Model('a'))._metric_key == ModelEvaluator(Model('a'))._metric_key
+
+        # a model that cannot be identified is neither cached nor resumed
+        data = [dict(x=i) for i in range(3)]
+        m = ModelEvaluator(object(), cache=True)
+        assert m._metric_key is None
+        assert m(data) == 1.0 and m.calls == [0, 1, 2]
+        m = ModelEvaluator(object(), cache=True)
+        assert m(data) == 1.0 and m.calls == [0, 1, 2]
+
+    def test_checkpoint_keyed_by_dataset(self):
+        m = CountingEvaluator()
+        keys = [m._sample_key(dict(x=i)) for i in range(3)]
+        assert m._checkpoint_path(m._metric_key, keys) != m._checkpoint_path(m._metric_key, keys[:2])
@@ -0,0 +1,82 @@
+import lazyllm
+from lazyllm.module import ModuleBase
+from lazyllm.tools import IntentClassifier
+
+_VOCAB = ['weather', 'rain', 'sunny', 'stock', 'fund', 'price', 'hello', 'who']
+
+
+class _FakeLLM(ModuleBase):
+    def __init__(self, answers):
+        super().__init__()
+        self.answers, self.calls = answers, []
+
+    def share(self, prompt=None, **kw):
+        return self
+
+    def used_by(self, module_id):
+        return self
+
+    def forward(self, input, **kw):
+        self.calls.append(input)
+        return self.answers.get(input, 'Chat')
+
+
+def _fake_embed(text):
+    words = text.lower().replace('?', '').split()
+    return [float(sum(w.startswith(v) for w in words)) for v in _VOCAB] + [0.01]
+
+
+class TestIntentClassifierFastPath(object):
+    def setup_method(self):
+        self.intents = ['Weather Query', 'Financial Q&A', 'Chat']
+        self.examples = [['will it rain tomorrow', 'Weather Query'], ['is it sunny', 'Weather Query'],
+                         ['stock price of apple', 'Financial Q&A'], ['which fund to buy', 'Financial Q&A'],
+                         ['hello who are you', 'Chat']]
+
+    def test_confident_inputs_skip_llm(self):
+        llm = _FakeLLM({})
+        ic = IntentClassifier(llm, self.intents, examples=self.examples, embed=_fake_embed, threshold=0.6)
+        assert ic('rain or sunny weather') == 'Weather Query'
+        assert ic('fund and stock price') == 'Financial Q&A'
+        assert llm.calls == []
+        intent, confidence = ic.predict('weather rain')
+        assert intent == 'Weather Query' and confidence > 0.6
+
+    def test_fallback_cache_and_online_learning(self):
+        llm = _FakeLLM({'bananas': 'Financial Q&A', 'nonsense': 'not an intent'})
+        ic = IntentClassifier(llm, self.intents, examples=self.examples, embed=_fake_embed, threshold=0.99)
+        assert ic('bananas') == 'Financial Q&A'
+        assert ic('bananas') == 'Financial Q&A'
+        assert llm.calls == ['bananas']
+        # an invalid llm answer falls back to the first intent and is not learned
+        assert ic('nonsense') == 'Weather Query'
+        assert ic._get_router()._labels == self.intents
+
+    def test_online_learning_updates_centroid(self):
+        llm = _FakeLLM({'hello price': 'Chat'})
+        ic = IntentClassifier(llm, self.intents, examples=self.examples, embed=_fake_embed, threshold=0.99,
+                              cache_size=0)
+        before = ic.predict('hello price')[1]
+        assert ic('hello price') == 'Chat'
+        intent, after = ic.predict('hello price')
+        assert intent == 'Chat' and after > before
+
+    def test_without_embed_keeps_llm_path(self):
+        llm = _FakeLLM({'rain': 'Weather Query'})
+        ic = IntentClassifier(llm, self.intents)
+        assert ic('rain') == 'Weather Query'
+        assert ic('rain') == 'Weather Query'
+        assert llm.calls == ['rain', 'rain']
+
+    def test_chat_history_is_not_cached(self):
+        llm = _FakeLLM({'bananas': 'Chat'})
+        ic = IntentClassifier(llm, self.intents, embed=_fake_embed, threshold=1.01)
+        try:
+            with lazyllm.new_session('intent-history-test'):
+                ic('bananas', llm_chat_history=[['hi', 'hello']])
+                ic('bananas', llm_chat_history=[['hi', 'hello']])
+        finally:
+            # new_session leaves its sid behind, later tests in this thread must not share it
+            lazyllm.globals._init_sid()
+            lazyllm.locals._init_sid()
+        assert llm.calls == ['bananas', 'bananas']
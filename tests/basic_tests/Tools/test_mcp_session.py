@@ -0,0 +1,74 @@
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+
+from lazyllm.tools.mcp.client import MCPClient
+
+
+class _FakeSession(object):
+    def __init__(self, calls):
+        self._calls = calls
+        self.broken = False
+
+    async def call_tool(self, name, arguments):
+        if self.broken: raise ConnectionError('transport closed')
+        await asyncio.sleep(0.05)
+        self._calls.append((name, arguments, threading.current_thread().name))
+        return f'{name}:{arguments}'
+
+    async def list_tools(self):
+        self._calls.append(('list_tools', None, None))
+        return []
+
+    async def send_ping(self):
+        if self.broken: raise ConnectionError('transport closed')
+
+
+class TestMCPSessionPool(object):
+    def setup_method(self):
+        self.opened, self.calls = [], []
+
+        @asynccontextmanager
+        async def fake_run_session():
+            session = _FakeSession(self.calls)
+            self.opened.append(session)
+            yield session
+
+        self.client = MCPClient('npx', args=['fake-server'])
+        self.client._run_session = fake_run_session
+
+    def teardown_method(self):
+        self.client.close()
+
+    def test_session_is_reused(self):
+        for i in range(3):
+            assert self.client.get_tools() == []
+            assert asyncio.run(self.client.call_tool('echo', {'i': i})) == f"echo:{{'i': {i}}}"
+        assert len(self.opened) == 1
+        assert [c[0] for c in self.calls].count('list_tools') == 1
+        assert all(c[2] == 'lazyllm-mcp-loop' for c in self.calls if c[0] == 'echo')
+
+    def test_concurrent_calls_share_stdio_session(self):
+        threads = [threading.Thread(target=lambda i=i: asyncio.run(self.client.call_tool('echo', {'i': i})))
+                   for i in range(8)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        assert len(self.opened) == 1 and len(self.calls) == 8
+
+    def test_reconnect_when_transport_broken(self):
+        asyncio.run(self.client.call_tool('echo', {}))
+        self.opened[0].broken = True
+        assert asyncio.run(self.client.call_tool('echo', {'retry': True})) == "echo:{'retry': True}"
+        assert len(self.opened) == 2
+
+    def test_remote_pool(self):
+        client = MCPClient('http://127.0.0.1:1/sse', pool_size=2)
+        client._run_session = self.client._run_session
+        try:
+            threads = [threading.Thread(target=lambda i=i: asyncio.run(client.call_tool('echo', {'i': i})))
+                       for i in range(6)]
+            for t in threads: t.start()
+            for t in threads: t.join()
+            assert len(self.opened) == 2 and len(self.calls) == 6
+        finally:
+            client.close()
@@ -0,0 +1,85 @@
+import os
+import time
+import threading
+
+import lazyllm
+from lazyllm.hook import LazyLLMFuncHook
+import pytest
+from lazyllm.tools.memory import Memory, LocalMemory, memory_hook, flush_memory
+from lazyllm.tools.memory import memory as memory_module
+
+
+class TestLocalMemory(object):
+    def test_add_and_get(self, tmp_path):
+        path = str(tmp_path / 'memory.db')
+        m = LocalMemory(path, topk=2)
+        m.add('My order #1234 was a Nova 2000 phone, it arrived damaged', 'Sorry, we will replace it', user_id='u1')
+        m.add('I like hiking in the mountains', user_id='u1')
+        m.add('I like swimming', user_id='u2')
+        # history sent again with the next turn is not stored twice
+        m.add('What about a refund?', history=[['I like hiking in the mountains', '']], user_id='u1')
+
+        all_memories = m.get(user_id='u1').split('\n')
+        assert len(all_memories) == 4 and all_memories[0].startswith('user: My order #1234')
+        assert m.get('hiking mountains', user_id='u1').split('\n')[0] == 'user: I like hiking in the mountains'
+        assert len(m.get('order', user_id='u1').split('\n')) == 2
+        assert m.get(user_id='u2') == 'user: I like swimming'
+        assert m.get('anything', user_id='u3') == ''
+
+        m.close()
+        reloaded = LocalMemory(path, topk=2)
+        assert reloaded.get(user_id='u1').split('\n') == all_memories
+        assert 'Nova 2000' in reloaded.get('damaged phone', user_id='u1')
+
+    def test_add_batch(self, tmp_path):
+        m = LocalMemory(str(tmp_path / 'memory.db'))
+        m.add_batch([dict(query=f'fact {i}', user_id='u1', agent_id='a1') for i in range(50)]
+                    + [dict(query='fact 0', user_id='u1', agent_id='a1')])
+        assert len(m.get(user_id='u1', agent_id='a1').split('\n')) == 50
+        assert m.get(user_id='u1') == ''
+
+
+class TestMemorySource(object):
+    def test_local_is_explicit(self, tmp_path):
+        with lazyllm.config.temp('memory_source', ''), lazyllm.config.temp('mem0_api_key', ''), \
+                lazyllm.config.temp('memu_api_key', ''):
+            with pytest.raises(ValueError, match='No memory supplier'):
+                Memory()
+            assert isinstance(Memory('local', str(tmp_path / 'a.db')), LocalMemory)
+            with lazyllm.config.temp('memory_source', 'local'):
+                assert isinstance(Memory(data_path=str(tmp_path / 'b.db')), LocalMemory)
+
+
+class _SlowMemory(LocalMemory):
+    def __init__(self, *args, **kw):
+        super().__init__(*args, **kw)
+        self.batches = []
+
+    def _add_batch(self, items):
+        time.sleep(0.2)
+        self.batches.append(len(items))
+        super()._add_batch(items)
+
+
+class TestMemoryHook(object):
+    def test_write_behind(self, tmp_path, monkeypatch):
+        m = _SlowMemory(str(tmp_path / 'memory.db'))
+        monkeypatch.setattr(memory_module, '_default_memory', m)
+        monkeypatch.setattr(memory_module, '_writer', memory_module._MemoryWriter(maxsize=100, batch_size=8))
+
+        def respond(i, hook):
+            lazyllm.globals._init_sid(f'session-{i}')
+            lazyllm.globals['user_id'] = 'u1'
+            hook.pre_hook(f'question {i}')
+            hook.post_hook(f'answer {i}')
+
+        # hooks are built up front, inspecting the hook function is not safe from many threads at once
+        hooks = [LazyLLMFuncHook(memory_hook) for _ in range(20)]
+        threads = [threading.Thread(target=respond, args=(i, hook)) for i, hook in enumerate(hooks)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        assert flush_memory(timeout=30)
+        assert memory_module._writer.pending == 0
+        assert sum(m.batches) == 20 and len(m.batches) < 20
+        assert len(m.get(user_id='u1').split('\n')) == 40
+        assert os.path.exists(tmp_path / 'memory.db')